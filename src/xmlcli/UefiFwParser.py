@@ -14,6 +14,7 @@ from . import XmlCliLib as clb
 from . import XmlIniParser as prs
 from .common import utils
 from .common import compress
+from .common import buffer_reader
 from .common import configurations
 from .common.logger import log
 
@@ -395,18 +396,12 @@ def ProcessBin(BiosBinListBuff=[], BiosFvBase=0x800000, Files2saveGuidList=[], L
               PrintLog(' Current compressed Section is FIRMWARE_VOLUME_IMAGE, decompresing and parsing it...', LogFile)
             LzmaBuffStart = FFSsectionDataStart+clb.ReadList(BiosBinListBuff, (BiosFFsbase+FfsHeaderSize+FFSsectionDataStart+4+0x10), 2)
             LzmaFvMainCompactBuff = bytearray(BiosBinListBuff[(BiosFFsbase+FfsHeaderSize+LzmaBuffStart):(BiosFFsbase+FfsHeaderSize+FFSsectionDataStart+FFSsectionSize)])
-            FvInFileLocation = os.path.join(clb.TempFolder, 'FwComp.sec')
-            FvOutFileLocation = os.path.join(clb.TempFolder, 'FwVol.fv')
-            with open(FvInFileLocation, 'wb') as TmpFile:
-              TmpFile.write(LzmaFvMainCompactBuff)
             if SectionGuid == gLzmaCustomDecompressGuid:
               PrintLog(' Found LZMA Compressed section', LogFile)
-              compress.lzma_decompress(FvInFileLocation, FvOutFileLocation)
-            if SectionGuid == gBrotliCustomDecompressGuid:
+              FvMainListBuffer = compress.lzma_decompress_data(LzmaFvMainCompactBuff)
+            else:
               PrintLog(' Found Brotli Compressed section', LogFile)
-              utils.system_call(cmd_lis=[clb.BrotliCompressUtility, "-d", "-i", FvInFileLocation, "-o", FvOutFileLocation])
-            with open(FvOutFileLocation, 'rb') as TmpFile:
-              FvMainListBuffer = list(TmpFile.read())
+              FvMainListBuffer = compress.brotli_decompress_data(LzmaFvMainCompactBuff, temp_file=os.path.join(clb.TempFolder, 'FwComp.sec'))
 
             TabLevel = TabLevel + 1
             TempBuff = BiosBinListBuff
@@ -438,8 +433,6 @@ def ProcessBin(BiosBinListBuff=[], BiosFvBase=0x800000, Files2saveGuidList=[], L
             FFSsize = TempFFSsize
             FvSize = TempFvSize
             TabLevel = TabLevel - 1
-            clb.RemoveFile(FvOutFileLocation)
-            clb.RemoveFile(FvInFileLocation)
             if( (FileSystemSaveCount != 0) and (FileSystemSaveCount >= len(Files2saveGuidList)) ):
               TabLevel = 0
               return
@@ -465,7 +458,7 @@ def UpdateBiosId(BiosBinaryFile=0, NewMajorVer='', NewMinorVer='', OutFolder=0,
     OutFolder = clb.TempFolder
   DelTempFvFfsFiles(clb.TempFolder)
   with open(BiosBinaryFile, 'rb') as BiosBinFile:
-    BiosBinListBuff = list(BiosBinFile.read())
+    BiosBinListBuff = bytearray(BiosBinFile.read())
   BiosFileName = os.path.basename(BiosBinaryFile)
   FlashRegionInfo(BiosBinListBuff, False)
   if (FwIngredientDict['FlashDescpValid'] != 0):
@@ -487,11 +480,7 @@ def UpdateBiosId(BiosBinaryFile=0, NewMajorVer='', NewMinorVer='', OutFolder=0,
         BiosIdString = ''
         BiosIdSig = clb.ReadList(BiosBinListBuff, BiosIdSecBase, 8)
         if(BiosIdSig != 0):
-          for count in range (0, (FfsSize-FFS_FILE_HEADER_SIZE-EFI_COMMON_SECTION_HEADER_SIZE)):
-            ChrVal = clb.ReadList(BiosBinListBuff, (BiosIdSecBase+8+(count*2)), 1)
-            if(ChrVal == 0):
-              break
-            BiosIdString = BiosIdString + chr(ChrVal)
+          BiosIdString = buffer_reader.read_chars(BiosBinListBuff, (BiosIdSecBase+8), (FfsSize-FFS_FILE_HEADER_SIZE-EFI_COMMON_SECTION_HEADER_SIZE), 2)
         log.info( 'Current BIOS ID String is %s' %(BiosIdString))
         NewBiosId = BiosIdString.split('.')
         if(BiosIdString != 'Unknown'):
@@ -556,12 +545,11 @@ def ParseNvram(NvRamFvListBuffer, BiosKnobDict, NvRamPointer=0, LogFile=0):
   NvRamDict = {}
   VarCount = 0
   if(NvRamPointer == 0):
-    for CurrPtr in range (NvRamPointer, (len(NvRamFvListBuffer)-0x10)):
-      VarStoreHdrGuid = clb.FetchGuid(NvRamFvListBuffer, CurrPtr)
-      if( (VarStoreHdrGuid == gEfiGlobalVariableGuid) or (VarStoreHdrGuid == gEfiAuthenticatedVariableGuid) or (VarStoreHdrGuid == gEfiVariableGuid) ):
-        NvRamPointer = CurrPtr
-        PrintLog(' Found NvRam Start at 0x%X offset' %NvRamPointer, LogFile)
-        break
+    VarStoreHdrOffsets = [buffer_reader.find_guid(NvRamFvListBuffer, VarStoreGuid, 0, len(NvRamFvListBuffer)-1) for VarStoreGuid in (gEfiGlobalVariableGuid, gEfiAuthenticatedVariableGuid, gEfiVariableGuid)]
+    VarStoreHdrOffsets = [Offset for Offset in VarStoreHdrOffsets if Offset >= 0]
+    if(VarStoreHdrOffsets):
+      NvRamPointer = min(VarStoreHdrOffsets)
+      PrintLog(' Found NvRam Start at 0x%X offset' %NvRamPointer, LogFile)
   for VarStrHdrCount in range (0, 0x100):
     if(NvRamPointer >= (len(NvRamFvListBuffer)-VARIABLE_STORE_HEADER_SIZE)):
       return NvRamDict
@@ -607,12 +595,7 @@ def ParseNvram(NvRamFvListBuffer, BiosKnobDict, NvRamPointer=0, LogFile=0):
       VarNameSize = clb.ReadList(NvRamFvListBuffer, (CurVarPtr+NameSzOffst), 4)
       VarDataSize = clb.ReadList(NvRamFvListBuffer, (CurVarPtr+DataSzOffst), 4)
       VarGuid = clb.FetchGuid(NvRamFvListBuffer, (CurVarPtr+GuidOffset))
-      VarName = ''
-      for index in range (0, int(VarNameSize/2)):
-        Val = clb.ReadList(NvRamFvListBuffer, (CurVarPtr+HdrSize+(index*2)), 1)
-        if(Val == 0):
-          break
-        VarName = VarName + chr(Val)
+      VarName = buffer_reader.read_chars(NvRamFvListBuffer, (CurVarPtr+HdrSize), int(VarNameSize/2), 2)
       PrintLog (' 0x%-8X |  0x%02X  | 0x%08X | 0x%-8X | %-30s | %s' %(CurVarPtr, VarState, VarAtri, VarDataSize, VarName, clb.GuidStr(VarGuid)), LogFile)
       PrintLog ('------------|--------|------------|------------|--------------------------------|-------------', LogFile)
       if(BiosKnobDictLen):
@@ -632,7 +615,19 @@ def GetIfrFormsHdr(HiiDbBinListBuff, HiiDbPointer=0):
     return 0
   ReturnAddrDict = { 'IfrList' : [], 'StrPkgHdr' : 0, 'UqiPkgHdr' : 0}
   BufLen = len(HiiDbBinListBuff)
+  # jump between occurrences of the signatures looked for, instead of checking every byte
+  Signatures = [buffer_reader.UINT32.pack(gEfiIfrTianoGuid[0]), b'en-U']
+  if(Parse_Print_Uqi):
+    Signatures.append(b'uqi\x00')
+  NextMatch = {Signature: None for Signature in Signatures}  # next offset of each signature, -1 once exhausted
   while(HiiDbPointer < BufLen):
+    for Signature in Signatures:
+      if(NextMatch[Signature] is None) or (0 <= NextMatch[Signature] < HiiDbPointer):
+        NextMatch[Signature] = buffer_reader.find_bytes(HiiDbBinListBuff, Signature, HiiDbPointer, BufLen)
+    Candidates = [Offset for Offset in NextMatch.values() if Offset >= 0]
+    if(not Candidates):
+      break
+    HiiDbPointer = min(Candidates)
     Guid_LowHalf = clb.ReadList(HiiDbBinListBuff, HiiDbPointer, 4)
     if (Guid_LowHalf == gEfiIfrTianoGuid[0]):
       HiiLstGuid  = clb.FetchGuid(HiiDbBinListBuff, HiiDbPointer)
@@ -967,45 +962,24 @@ def ParseIfrStrings(HiiDbBinListBuff=0, StringHdrPtr=0, LogFile=0):
     if(BlockType == EFI_HII_SIBT_END):  # end of string block?
       break
     elif(BlockType == EFI_HII_SIBT_STRING_SCSU):
-      StrSize = 0
-      String = ''
-      while(1):
-        ChrValue = clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 1)
-        StrSize = StrSize + 1
-        if(ChrValue):
-          String = String + chr(ChrValue)
-        else:
-          break
+      String = buffer_reader.read_c_string(HiiDbBinListBuff, CurrStringPtr)
+      StrSize = len(String) + 1
       HiiStringDict[Prompt] = String.replace('<=', ' &lte; ').replace('>=', ' &gte; ').replace('&', 'n').replace('\"', '&quot;').replace('\'', '').replace('\x13', '').replace('\x19', '').replace('\xB5', 'u').replace('\xAE', '').replace('<', ' &lt; ').replace('>', ' &gt; ').replace('\r\n', ' ').replace('\n', ' ')
       Prompt = Prompt + 1
       CurrStringPtr = CurrStringPtr + StrSize
     elif(BlockType == EFI_HII_SIBT_STRING_UCS2):
-      StrSize = 0
-      String = ''
-      while(1):
-        ChrValue = clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 2)
-        StrSize = StrSize + 2
-        if(ChrValue):
-          String = String + chr(ChrValue & 0xFF)
-        else:
-          break
+      StrSize = buffer_reader.ucs2_string_size(HiiDbBinListBuff, CurrStringPtr)
+      String = bytes(HiiDbBinListBuff[CurrStringPtr:CurrStringPtr+StrSize:2]).decode('latin-1')  # low byte of each character
+      StrSize = StrSize + 2
       HiiStringDict[Prompt] = String.replace('<=', ' &lte; ').replace('>=', ' &gte; ').replace('&', 'n').replace('\"', '&quot;').replace('\'', '').replace('\x13', '').replace('\x19', '').replace('\xB5', 'u').replace('\xAE', '').replace('<', ' &lt; ').replace('>', ' &gt; ').replace('\r\n', ' ').replace('\n', ' ')
       Prompt = Prompt + 1
       CurrStringPtr = CurrStringPtr + StrSize
     elif(BlockType == EFI_HII_SIBT_STRING_SCSU_FONT):
-      StrSize = 0
-      String = ''
       CurrStringPtr = CurrStringPtr + 1
-      while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 1)):
-        StrSize = StrSize + 1
-      CurrStringPtr = CurrStringPtr + StrSize + 1
+      CurrStringPtr = CurrStringPtr + buffer_reader.c_string_size(HiiDbBinListBuff, CurrStringPtr) + 1
     elif(BlockType == EFI_HII_SIBT_STRING_UCS2_FONT):
-      StrSize = 0
-      String = ''
       CurrStringPtr = CurrStringPtr + 1
-      while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 2)):
-        StrSize = StrSize + 2
-      CurrStringPtr = CurrStringPtr + StrSize + 2
+      CurrStringPtr = CurrStringPtr + buffer_reader.ucs2_string_size(HiiDbBinListBuff, CurrStringPtr) + 2
     elif(BlockType == EFI_HII_SIBT_SKIP1):
       Prompt = Prompt + clb.ReadList(HiiDbBinListBuff, CurrStringPtr, 1)
       CurrStringPtr = CurrStringPtr + 1
@@ -1026,9 +1000,7 @@ def ParseIfrStrings(HiiDbBinListBuff=0, StringHdrPtr=0, LogFile=0):
       CurrStringPtr = CurrStringPtr + 2
       CurStrCnt = 0
       while(CurStrCnt < StrCount):
-        while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 1)):
-          StrSize = StrSize + 1
-        StrSize = StrSize + 1
+        StrSize = StrSize + buffer_reader.c_string_size(HiiDbBinListBuff, (CurrStringPtr+StrSize)) + 1
         CurStrCnt = CurStrCnt + 1
       CurrStringPtr = CurrStringPtr + StrSize
     elif(BlockType == EFI_HII_SIBT_STRINGS_SCSU_FONT):
@@ -1037,9 +1009,7 @@ def ParseIfrStrings(HiiDbBinListBuff=0, StringHdrPtr=0, LogFile=0):
       CurrStringPtr = CurrStringPtr + 3
       CurStrCnt = 0
       while(CurStrCnt < StrCount):
-        while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 1)):
-          StrSize = StrSize + 1
-        StrSize = StrSize + 1
+        StrSize = StrSize + buffer_reader.c_string_size(HiiDbBinListBuff, (CurrStringPtr+StrSize)) + 1
         CurStrCnt = CurStrCnt + 1
       CurrStringPtr = CurrStringPtr + StrSize
     elif(BlockType == EFI_HII_SIBT_STRINGS_UCS2):
@@ -1048,9 +1018,7 @@ def ParseIfrStrings(HiiDbBinListBuff=0, StringHdrPtr=0, LogFile=0):
       CurrStringPtr = CurrStringPtr + 2
       CurStrCnt = 0
       while(CurStrCnt < StrCount):
-        while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 2)):
-          StrSize = StrSize + 2
-        StrSize = StrSize + 2
+        StrSize = StrSize + buffer_reader.ucs2_string_size(HiiDbBinListBuff, (CurrStringPtr+StrSize)) + 2
         CurStrCnt = CurStrCnt + 1
       CurrStringPtr = CurrStringPtr + StrSize
     elif(BlockType == EFI_HII_SIBT_STRINGS_UCS2_FONT):
@@ -1059,9 +1027,7 @@ def ParseIfrStrings(HiiDbBinListBuff=0, StringHdrPtr=0, LogFile=0):
       CurrStringPtr = CurrStringPtr + 3
       CurStrCnt = 0
       while(CurStrCnt < StrCount):
-        while(clb.ReadList(HiiDbBinListBuff, (CurrStringPtr+StrSize), 2)):
-          StrSize = StrSize + 2
-        StrSize = StrSize + 2
+        StrSize = StrSize + buffer_reader.ucs2_string_size(HiiDbBinListBuff, (CurrStringPtr+StrSize)) + 2
         CurStrCnt = CurStrCnt + 1
       CurrStringPtr = CurrStringPtr + StrSize
   PrintLog('===========    Hii String Package Parsing End = 0x%X    ==========|' %CurrStringPtr, LogFile)
@@ -1170,7 +1136,7 @@ def FetchBiosId(BinaryFile, PcBiosId=False):
     BiosIdFfsToSave  = [ gEfiBiosIdGuid, gCpPcBiosIdFileGuid ]
     DelTempFvFfsFiles(clb.TempFolder)
     with open(BinaryFile, 'rb') as BiosBinFile:
-      BiosBinListBuff = list(BiosBinFile.read())
+      BiosBinListBuff = bytearray(BiosBinFile.read())
     FlashRegionInfo(BiosBinListBuff, False)
     if (FwIngredientDict['FlashDescpValid'] != 0):
       BiosRegionBase = FwIngredientDict['FlashRegions'][BIOS_Region]['BaseAddr']
@@ -1187,7 +1153,7 @@ def FetchBiosId(BinaryFile, PcBiosId=False):
 
   if(os.path.isfile(BinaryFile)):
     with open(BinaryFile, 'rb') as BiosIdFile:
-      BiosIdListBuff = list(BiosIdFile.read())
+      BiosIdListBuff = bytearray(BiosIdFile.read())
     FfsSize = clb.ReadList(BiosIdListBuff, 0x14, 3)
     BiosIdString = ''
     CharSz = 2
@@ -1196,11 +1162,7 @@ def FetchBiosId(BinaryFile, PcBiosId=False):
       CharSz = 1
       CharStart = 0x1C
     if (FfsSize < 0x100):
-      for count in range (0, 100):
-        ChrVal = clb.ReadList(BiosIdListBuff, (CharStart+(count*CharSz)), 1)
-        if(ChrVal == 0):
-          break
-        BiosIdString = BiosIdString + chr(ChrVal)
+      BiosIdString = buffer_reader.read_chars(BiosIdListBuff, CharStart, 100, CharSz)
     else:
       BiosIdString = 'Unknown'
   return BiosIdString
@@ -1249,7 +1211,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
 
   BiosXmlCliVer = '?.?.?'
   with open(BiosBinaryFile, 'rb') as BiosBinFile:
-    BiosBinListBuff = list(BiosBinFile.read())
+    BiosBinListBuff = bytearray(BiosBinFile.read())
   FetchFwIngrediantInfo(BiosBinListBuff, False)
   if (FwIngredientDict['FlashDescpValid'] != 0):
     BiosRegionBase = FwIngredientDict['FlashRegions'][BIOS_Region]['BaseAddr']
@@ -1339,13 +1301,12 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
       log.error('BiosKnobsDataBin not found in the binary, Aborting due to Error!')
       clb.LastErrorSig = 0xFE90  # BiosKnobsDataBin not found
       file_content += '</SYSTEM>\n'
-      with open(XmlFilename,'w') as outXml:
-        outXml.write(file_content)
+      clb.WriteXml(XmlFilename, file_content)
       clb.SanitizeXml(XmlFilename)
       return 1
     NvRamFileName = os.path.join(clb.TempFolder, '%X_File.fv' %gNvRamFvGuid[0])
     with open(NvRamFileName, 'rb') as NvRamFile:
-      NvRamFvListBuffer = list(NvRamFile.read())
+      NvRamFvListBuffer = bytearray(NvRamFile.read())
     NvRamDefDataFileGuid = gNvRamFvGuid
     NvramTblDict = ParseNvram(NvRamFvListBuffer, BiosKnobDict, 0x48, LogFile)
     if(len(NvramTblDict) == 0):
@@ -1362,7 +1323,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
       if (os.path.isfile(NvRamFileName)):
         with open(NvRamFileName, 'rb') as NvRamFile:
           NvRamDefDataFileDict = {}
-          NvRamFvListBuffer = list(NvRamFile.read())
+          NvRamFvListBuffer = bytearray(NvRamFile.read())
         NvramTblDict = ParseNvram(NvRamFvListBuffer, BiosKnobDict, 0, LogFile)
     BiosDictArray[FvMainCopyCount] = {}
     KnobStartTag = False
@@ -1377,7 +1338,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
         continue  # didnt found this file, maybe unsupported driver for following binary
       BiosKnobDictNew = copy.deepcopy(BiosKnobDict)
       with open(CurFfsFileName, 'rb') as HiiDbBinFile:
-        HiiDbBinListBuff = list(HiiDbBinFile.read())
+        HiiDbBinListBuff = bytearray(HiiDbBinFile.read())
       PrintLog('=============== Now Parsing %s binary ================|' %(os.path.join(clb.TempFolder, '%X_File.ffs' %SetupDriverGuidList[count][0])), LogFile)
       HiiPkgAddrDict = GetIfrFormsHdr(HiiDbBinListBuff)
       for FileCountId in FileGuidListDict:
@@ -1411,8 +1372,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
     file_content += ''.join(outXmlList)
     if(FvMainCopyCount == (ForLoopCnt-1)):
       file_content += '</SYSTEM>\n'
-      with open(XmlFilename,'w') as outXml:
-        outXml.write(file_content)
+      clb.WriteXml(XmlFilename, file_content)
       clb.SanitizeXml(XmlFilename)
       log.info(f' Fetching Firmware Info Done in {XmlFilename} ')
     if( (Operation == 'prog') or (Operation == 'readonly') ):
@@ -1455,7 +1415,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
         clb.LastErrorSig = 0xFE91  # GetsetBiosKnobsFromBin: Empty Input Knob List
         return 1
       with open(ProgBinfileName, 'rb') as ProgBinfile:
-        KnobsProgListBuff = list(ProgBinfile.read())
+        KnobsProgListBuff = bytearray(ProgBinfile.read())
       NvRamUpdateFlag = 0
       if(MulSetupDrivers):
         PrintLog(' see below for the results on Build %d...' %FvMainCopyCount, LogFile)
@@ -1591,7 +1551,7 @@ def GetsetBiosKnobsFromBin(BiosBinaryFile=0, BiosOutSufix=0, Operation='genxml',
           PrintLog ('Error Running the Re-signing process, Skip Re-signing..', LogFile)
         if(os.path.isfile(TempBIOS_resign)):
           with open(TempBIOS_resign, 'rb') as TempRomFile:
-            BiosBinListBuff[BiosRegionBase:BiosEnd] = list(TempRomFile.read())
+            BiosBinListBuff[BiosRegionBase:BiosEnd] = bytearray(TempRomFile.read())
           PrintLog ('\n Resigning Process completed Successfully\n', LogFile)
         else:
           PrintLog ('OutFile not created by Re-signing process, please make sure correct re-signing Pkg and .bat is used\n  continue without re-signing...', LogFile)
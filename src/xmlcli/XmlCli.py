@@ -4,14 +4,19 @@ __author__ = ["Gahan Saraiya", "ashinde"]
 # Built-in Imports
 import os
 import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Custom Imports
 from .common import configurations
 from .common.logger import log
+from .common.knob_model import get_knob_model
 from . import XmlCliLib as clb
 from . import XmlIniParser as prs
 from . import UefiFwParser as fwp
 from .common.uefi_nvar import get_set_var
+from .common.utils import XmlCliException
 
 if not configurations.PERFORMANCE:
   # Optional helper utilities
@@ -22,14 +27,76 @@ if not configurations.PERFORMANCE:
 
 
 BootOrderDict = {}
+FLEET_MAX_WORKERS = 8
+RESPONSE_TO_REQUEST_SIZE_RATIO = 2.5  # response entry (10 + 2 x width bytes) is at most 2.5 times of request entry (4 + width bytes)
 
 
-def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=False, PrintResParams=True, ResBufFilename=0, KnobsVerify=False, KnobsDict={}):
+def get_xml_header_hash(xml_file):
+  """Hash of platform XML header (content preceding knobs section) and size of XML
+
+  Targets flashed with the same BIOS report the same hash, hence
+  share the same layout of knobs (varstore, offset and size).
+
+  :param xml_file: platform XML file
+  :return: hex digest
+  """
+  with open(xml_file, 'rb') as xml_ptr:
+    xml_data = xml_ptr.read()
+  knobs_start = xml_data.find(b'<biosknobs>')
+  header = xml_data if knobs_start < 0 else xml_data[:knobs_start]
+  return hashlib.sha256(header + len(xml_data).to_bytes(8, 'little')).hexdigest()
+
+
+class SharedRequestBuffer(object):
+  """Knobs request buffer built once and shared by all the targets reporting same XML header hash
+
+  Every build of request buffer (shared or not) is serialized by class wide `lock`,
+  as parser keeps state of parsed XML in module globals (`SETUP_FLAG`, `SIG_FLAG`, `NVAR_MAP`).
+  """
+  lock = threading.RLock()
+
+  def __init__(self):
+    self.buffers = {}  # (xml header hash, ini content, UFS, FlexCon) -> (varstore buffers, request buffer)
+    self.build_count = 0
+
+  @classmethod
+  def generate(cls, xmlfilename, inifilename, binfile, Operation='Prog'):
+    """Build request buffer of knobs in ini file as per `UfsFlag` and `FlexConCfgFile` of current session
+
+    :return: tuple (dictionary of varstore index -> request buffer of varstore (empty unless UFS), request buffer)
+    """
+    with cls.lock:
+      if(clb.FlexConCfgFile):
+        prs.generate_bios_knobs_config(xmlfilename, inifilename, clb.TmpKnobsIniFile)
+        inifilename = clb.TmpKnobsIniFile
+      if(clb.UfsFlag):
+        return prs.generate_knobs_data_bin(xmlfilename, inifilename, binfile, Operation)
+      return {}, prs.parse_cli_ini_xml(xmlfilename, inifilename, binfile)
+
+  def build(self, xmlfilename, inifilename, binfile, Operation='Prog'):
+    if Operation != 'Prog':
+      return self.generate(xmlfilename, inifilename, binfile, Operation)  # restored knobs depend on current values of the target, not only on layout
+    with open(inifilename, 'rb') as ini_ptr:
+      key = (get_xml_header_hash(xmlfilename), ini_ptr.read(), bool(clb.UfsFlag), bool(clb.FlexConCfgFile))
+    with self.lock:
+      if key not in self.buffers:
+        self.buffers[key] = self.generate(xmlfilename, inifilename, binfile, Operation)
+        self.build_count += 1
+        return self.buffers[key]
+    BuffDict, RequestBuff = self.buffers[key]
+    if RequestBuff:
+      with open(binfile, 'wb') as out_file:
+        out_file.write(RequestBuff)
+    return BuffDict, RequestBuff
+
+
+@clb.record_access_statistics
+def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=False, PrintResParams=True, ResBufFilename=0, KnobsVerify=False, KnobsDict={}, SharedRequestBuff=None):
   clb.LastErrorSig = 0x0000
   clb.InitInterface()
   DRAM_MbAddr = clb.GetDramMbAddr() # Get DRam MAilbox Address.
   log.result(f'CLI Spec Version = {clb.GetCliSpecVersion(DRAM_MbAddr)}')
-  DramSharedMBbuf = clb.memBlock(DRAM_MbAddr,0x200) # Read/save parameter buffer
+  DramSharedMBbuf = clb.readDramSharedMb(DRAM_MbAddr,0x200) # Read/save parameter buffer
 
   Operation = 'Prog'
   Retries = 5
@@ -59,6 +126,11 @@ def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=Fa
     clb.CloseInterface()
     clb.LastErrorSig = 0xC140  # XmlCli Req or Resp Buffer Address is Zero
     return 1
+  # knob entries referred by response are resolved from host XML, when it is the one present in target memory
+  XmlAddr, XmlSize = clb.readxmldetails(DramSharedMBbuf)
+  KnobEntryIndex = None
+  if (XmlAddr != 0) and ((not ignoreXmlgeneration and (CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS)) or clb.XmlCmp(xmlfilename, XmlAddr)):
+    KnobEntryIndex = clb.KnobEntryIndex.from_file(xmlfilename, XmlAddr, XmlSize)
 
   CommandId = 0
   if (CmdSubType == clb.CLI_KNOB_APPEND):
@@ -71,14 +143,15 @@ def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=Fa
     CommandId = clb.LOAD_DEFAULT_KNOBS_CMD_ID
 
   SmiLoopCount = 1
+  RequestBuff = b''
   if (CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS):
     binfile = os.path.join(clb.TempFolder, 'biosKnobsdata.bin')
-    if(clb.FlexConCfgFile):
-      prs.generate_bios_knobs_config(xmlfilename, inifilename, clb.TmpKnobsIniFile)
-      inifilename = clb.TmpKnobsIniFile
+    if SharedRequestBuff:
+      BuffDict, RequestBuff = SharedRequestBuff.build(xmlfilename, inifilename, binfile, Operation)
+    else:
+      BuffDict, RequestBuff = SharedRequestBuffer.generate(xmlfilename, inifilename, binfile, Operation)
     if(clb.UfsFlag):
-      BuffDict,tmpBuff = prs.generate_knobs_data_bin(xmlfilename, inifilename, binfile, Operation)
-      if((len(BuffDict) == 0) or (clb.ReadBuffer(tmpBuff, 0, 4, clb.HEX) == 0)) and (CmdSubType != clb.CLI_KNOB_RESTORE_MODIFY):
+      if((len(BuffDict) == 0) or (clb.ReadBuffer(RequestBuff, 0, 4, clb.HEX) == 0)) and (CmdSubType != clb.CLI_KNOB_RESTORE_MODIFY):
         log.result('Request buffer is Empty, No Action required, Aborting...')
         clb.CloseInterface()
         clb.LastErrorSig = 0xC4B0  # XmlCli Request Buffer Empty no action needed on XmlCli Command
@@ -88,60 +161,55 @@ def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=Fa
       if (CmdSubType == clb.CLI_KNOB_READ_ONLY):
         SmiLoopCount = 1
     else:
-      tmpBuff = prs.parse_cli_ini_xml(xmlfilename, inifilename, binfile)
-      if((len(tmpBuff) == 0) or (clb.ReadBuffer(tmpBuff, 0, 4, clb.HEX) == 0)) and (CmdSubType != clb.CLI_KNOB_RESTORE_MODIFY):
+      if((len(RequestBuff) == 0) or (clb.ReadBuffer(RequestBuff, 0, 4, clb.HEX) == 0)) and (CmdSubType != clb.CLI_KNOB_RESTORE_MODIFY):
         log.result('Request buffer is Empty, No Action required, Aborting...')
         clb.CloseInterface()
         clb.LastErrorSig = 0xC4B0  # XmlCli Request Buffer Empty no action needed on XmlCli Command
         return 0
 
-  #For Loop for number of current requested NVAR's
+  # request buffer of each SMI is already packed in memory, response of previous SMI is decoded while target services the next one
+  if(SmiLoopCount == 1):
+    SmiRequests = [(None, RequestBuff)]
+  else:
+    SmiRequests = list(BuffDict.items())
+  ResParambuff = bytearray(int(sum(len(Request) for _, Request in SmiRequests) * RESPONSE_TO_REQUEST_SIZE_RATIO))  # grown if responses exceed the estimate
   ResParamSize = 0
-  for SmiCount in range (0, SmiLoopCount):
-    # Clear CLI Command & Response buffer headers
-    clb.ClearCliBuff(CLI_ReqBuffAddr, CLI_ResBuffAddr)
-    if (CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS):
-      if(SmiLoopCount == 1):
-        log.info(f'Req Buffer Bin file used is {binfile}')
-        clb.load_data(binfile, CLI_ReqBuffAddr+clb.CLI_REQ_RES_READY_PARAMSZ_OFF)
-      else:
-        loopCnt = Index = 0
-        for VarId in BuffDict:
-          Index = VarId
-          if(loopCnt == SmiCount):
-            break
-          loopCnt = loopCnt + 1
-        log.result(
-          f'Processing NVARId = {Index:d} CurrentLoopCount={SmiCount:d} RemCount={(SmiLoopCount - SmiCount - 1):d}')
-        NewBinfile = os.path.join(clb.TempFolder, 'biosKnobsdata_%d.bin' %Index)
-        log.info(f'Req Buffer Bin file used is {NewBinfile}')
-        clb.load_data(NewBinfile, CLI_ReqBuffAddr+clb.CLI_REQ_RES_READY_PARAMSZ_OFF)
-        clb.RemoveFile(NewBinfile)
-    clb.memwrite( CLI_ReqBuffAddr + clb.CLI_REQ_RES_READY_CMD_OFF, 4, CommandId)
-    clb.memwrite( CLI_ReqBuffAddr + clb.CLI_REQ_RES_READY_SIG_OFF, 4, clb.CLI_REQ_READY_SIG )
-    log.info('CLI Mailbox programmed, issuing S/W SMI to program knobs...')
-
-    Status = clb.TriggerXmlCliEntry()  # trigger S/W SMI for CLI Entry
-    if(Status):
-      log.error('Error while triggering CLI Entry Point, Aborting....')
-      clb.CloseInterface()
-      return 1
+  DecodedResponses = []
+  with ThreadPoolExecutor(max_workers=1) as ResponseDecoder:
+    for SmiCount, (Index, SmiRequest) in enumerate(SmiRequests):
+      # Clear CLI Command & Response buffer headers
+      clb.ClearCliBuff(CLI_ReqBuffAddr, CLI_ResBuffAddr)
+      if (CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS):
+        if(SmiLoopCount == 1):
+          log.info(f'Req Buffer of {len(RequestBuff)} bytes is programmed (saved at {binfile})')
+        else:
+          log.result(
+            f'Processing NVARId = {Index:d} CurrentLoopCount={SmiCount:d} RemCount={(SmiLoopCount - SmiCount - 1):d}')
+        clb.memBlockWrite(CLI_ReqBuffAddr+clb.CLI_REQ_RES_READY_PARAMSZ_OFF, SmiRequest)
+      clb.memwrite( CLI_ReqBuffAddr + clb.CLI_REQ_RES_READY_CMD_OFF, 4, CommandId)
+      clb.memwrite( CLI_ReqBuffAddr + clb.CLI_REQ_RES_READY_SIG_OFF, 4, clb.CLI_REQ_READY_SIG )
+      log.info('CLI Mailbox programmed, issuing S/W SMI to program knobs...')
+
+      Status = clb.TriggerXmlCliEntry()  # trigger S/W SMI for CLI Entry
+      if(Status):
+        log.error('Error while triggering CLI Entry Point, Aborting....')
+        clb.CloseInterface()
+        return 1
 
-    if (clb.WaitForCliResponse(CLI_ResBuffAddr, Delay, Retries) != 0):
-      log.error('CLI Response not ready, Aborting....')
-      clb.CloseInterface()
-      return 1
+      if (clb.WaitForCliResponse(CLI_ResBuffAddr, Delay, Retries, CmdId=CommandId) != 0):
+        log.error('CLI Response not ready, Aborting....')
+        clb.CloseInterface()
+        return 1
 
-    CurParamSize = int(clb.memread(CLI_ResBuffAddr + clb.CLI_REQ_RES_READY_PARAMSZ_OFF, 4))
-    ResParambuff = bytearray()
-    if(CurParamSize != 0):
-      CurParambuff = clb.memBlock((CLI_ResBuffAddr + clb.CLI_REQ_RES_BUFF_HEADER_SIZE), CurParamSize)
-      if(SmiCount == 0):
-        ResParambuff = CurParambuff
-      else:
-        ResParambuff = ResParambuff + CurParambuff
-    ResParamSize = ResParamSize + CurParamSize
-  #For Loop ends here.
+      CurParamSize = int(clb.memread(CLI_ResBuffAddr + clb.CLI_REQ_RES_READY_PARAMSZ_OFF, 4))
+      if(CurParamSize != 0):
+        CurParambuff = clb.memBlock((CLI_ResBuffAddr + clb.CLI_REQ_RES_BUFF_HEADER_SIZE), CurParamSize)
+        DecodedResponses.append(ResponseDecoder.submit(clb.parseCliResponseEntries, CurParambuff))
+        ResParambuff[ResParamSize:ResParamSize+CurParamSize] = CurParambuff
+      ResParamSize = ResParamSize + CurParamSize
+    #For Loop ends here.
+    del ResParambuff[ResParamSize:]
+    ResponseEntries = [ResponseEntry for DecodedResponse in DecodedResponses for ResponseEntry in DecodedResponse.result()]
   if (ResParamSize == 0):
     log.result('BIOS knobs CLI Command ended successfully, CLI Response buffer Parameter size is 0, hence returning..')
     clb.CloseInterface()
@@ -155,60 +223,13 @@ def cliProcessKnobs(xmlfilename, inifilename, CmdSubType, ignoreXmlgeneration=Fa
 
   log.result('BIOS knobs CLI Command ended successfully',)
 
-  offsetIn = 4
-  Index = 0
   KnobsDict.clear()
-  if( CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS ):
-    with open(binfile, 'rb') as InputFile:
-      InputFilePart = InputFile.read()
-    NumberOfEntries = clb.ReadBuffer(InputFilePart, 0, 4, clb.HEX)
-  else:
-    NumberOfEntries = 1
-  while(NumberOfEntries != 0):
-    offsetOut = 0
-    if( CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS ):
-      InVarId      = clb.ReadBuffer(InputFilePart, offsetIn+0, 1, clb.HEX)
-      InKnobOffset = clb.ReadBuffer(InputFilePart, offsetIn+1, 2, clb.HEX)
-      InKnobSize   = clb.ReadBuffer(InputFilePart, offsetIn+3, 1, clb.HEX)
-      InByteSize = InKnobSize
-      if InKnobOffset & 0x8000:
-        InKnobOffset = clb.BITWISE_KNOB_PREFIX + ((InKnobOffset & 0x7FFF) * 8) + (InKnobSize & 0x7)
-        BitEnd = ( ((InKnobSize >> 3) & 0x3F) + (InKnobSize & 0x7) )
-        if BitEnd % 8:
-          InByteSize = int(BitEnd / 8) + 1
-        else:
-          InByteSize = int(BitEnd / 8)
-        InKnobSize = ((InKnobSize >> 3) & 0x3F)
-      InputValue   = clb.ReadBuffer(InputFilePart, offsetIn+4, InByteSize, clb.HEX)
-    else:
-      InVarId = InKnobOffset = InKnobSize = InByteSize = InputValue = 0
-    while(1):
-      if (offsetOut >= ResParamSize):
-        break
-      OutVarId      = clb.ReadBuffer(ResParambuff, offsetOut+6, 1, clb.HEX)
-      OutKnobOffset = clb.ReadBuffer(ResParambuff, offsetOut+7, 2, clb.HEX)
-      OutKnobSize   = clb.ReadBuffer(ResParambuff, offsetOut+9, 1, clb.HEX)
-      OutByteSize = OutKnobSize
-      if OutKnobOffset & 0x8000:
-        OutKnobOffset = clb.BITWISE_KNOB_PREFIX + ((OutKnobOffset & 0x7FFF) * 8) + (OutKnobSize & 0x7)
-        BitEnd = ( ((OutKnobSize >> 3) & 0x3F) + (OutKnobSize & 0x7) )
-        if BitEnd % 8:
-          OutByteSize = int(BitEnd / 8) + 1
-        else:
-          OutByteSize = int(BitEnd / 8)
-        OutKnobSize = ((OutKnobSize >> 3) & 0x3F)
-      if( ((OutVarId == InVarId) and (OutKnobOffset == InKnobOffset) and (OutKnobSize == InKnobSize)) or  (CmdSubType == clb.CLI_KNOB_LOAD_DEFAULTS) ):
-        DefVal           = clb.ReadBuffer(ResParambuff, offsetOut+10, OutByteSize, clb.HEX)
-        OutValue         = clb.ReadBuffer(ResParambuff, offsetOut+10+OutByteSize, OutByteSize, clb.HEX)
-        KnobEntryAdd     = clb.ReadBuffer(ResParambuff, offsetOut+0, 4, clb.HEX)
-        Type, KnobName   = clb.findKnobName(KnobEntryAdd)
-        KnobsDict[Index] = {'Type': Type, 'KnobName': KnobName, 'VarId': OutVarId, 'Offset': OutKnobOffset, 'Size': OutKnobSize, 'InValue': InputValue, 'DefValue': DefVal, 'OutValue': OutValue, 'UqiVal': '', 'Prompt': ''}
-        Index = Index + 1
-        if( CmdSubType != clb.CLI_KNOB_LOAD_DEFAULTS ):
-          break
-      offsetOut = offsetOut + 10 + (OutByteSize*2)
-    offsetIn = offsetIn + 4 + InByteSize
-    NumberOfEntries = NumberOfEntries-1
+  Matches = clb.matchCliResponseEntries(None if (CmdSubType == clb.CLI_KNOB_LOAD_DEFAULTS) else RequestBuff, ResParambuff, ResponseEntries)
+  for Index, (ResponseEntry, InputValue) in enumerate(Matches):
+    KnobEntryAdd, OutVarId, OutKnobOffset, OutKnobSize, DefVal, OutValue = ResponseEntry
+    KnobEntry        = KnobEntryIndex.lookup(KnobEntryAdd) if KnobEntryIndex else None
+    Type, KnobName   = KnobEntry if KnobEntry else clb.findKnobName(KnobEntryAdd)
+    KnobsDict[Index] = {'Type': Type, 'KnobName': KnobName, 'VarId': OutVarId, 'Offset': OutKnobOffset, 'Size': OutKnobSize, 'InValue': InputValue, 'DefValue': DefVal, 'OutValue': OutValue, 'UqiVal': '', 'Prompt': ''}
   create_json(KnobsDict, CmdSubType) # Function call to create json output
   if (PrintResParams):
     log.result(', see below for the results..')
@@ -494,27 +515,196 @@ def CvReadKnobs(KnobStr=0, BiosBin=0, BuildType=0xFF):
     Status = fwp.GetsetBiosKnobsFromBin(BiosBin, 0, 'readonly', clb.PlatformConfigXml, IniFile, BuildType=BuildType, KnobsVerify=True)
   return Status
 
+def getFleetSession(target, index=0):
+  """Session for the given target of fleet operation
+
+  :param target: `XmlCliSession`, name of access method or instance of access method
+  :param index: index of target in fleet, sessions created here keep generated files in `target_<index>` of out directory
+  :return: XmlCliSession
+  """
+  if isinstance(target, clb.XmlCliSession):
+    return target
+  out_dir = os.path.join(clb.TempFolder, f'target_{index:d}')
+  os.makedirs(out_dir, exist_ok=True)
+  return clb.XmlCliSession(target, out_dir=out_dir)
+
+
+def _processKnobsTarget(index, session, KnobStr, CmdSubType, SharedRequestBuff):
+  KnobsDict = {}
+  with session:
+    try:
+      IniFile = CreateTmpIniFile(KnobStr)
+      Status = cliProcessKnobs(clb.PlatformConfigXml, IniFile, CmdSubType, 0, False, KnobsVerify=True, KnobsDict=KnobsDict, SharedRequestBuff=SharedRequestBuff)
+    except Exception as e:
+      log.error(f'Knobs operation failed on target {index:d} ("{session.InterfaceType}"): {e}')
+      Status = 1
+    log.result(f'Target {index:d} ("{session.InterfaceType}"): Status = {Status}  LastErrorSig = 0x{session.LastErrorSig:X}')
+    return {'Session': session, 'Status': Status, 'LastErrorSig': session.LastErrorSig, 'KnobsDict': KnobsDict}
+
+
+def cliProcessKnobsFleet(targets, KnobStr, CmdSubType, max_workers=FLEET_MAX_WORKERS):
+  """
+  Run knobs operation (XML download, request buffer build, SMI, response parse
+  and verify) on each of the targets concurrently with bounded pool of workers.
+  Request buffer is built once for the targets reporting same XML header hash.
+
+  :param targets: list of targets, each of them can be `XmlCliSession`, name of access method or instance of access method
+  :param KnobStr: knobs string (i.e. "Knob1=Value1, Knob2=Value2")
+  :param CmdSubType: one of CLI_KNOB_APPEND, CLI_KNOB_RESTORE_MODIFY or CLI_KNOB_READ_ONLY
+  :param max_workers: maximum number of targets processed in parallel
+  :return: list of dictionary {Session, Status, LastErrorSig, KnobsDict} in order of targets
+  """
+  sessions = [getFleetSession(target, index) for index, target in enumerate(targets)]
+  shared_request_buffer = SharedRequestBuffer()
+  with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sessions)))) as executor:
+    results = list(executor.map(lambda index: _processKnobsTarget(index, sessions[index], KnobStr, CmdSubType, shared_request_buffer), range(len(sessions))))
+  log.result(f'Processed {len(sessions)} target(s), request buffer built {shared_request_buffer.build_count} time(s), '
+             f'{sum(result["Status"] != 0 for result in results)} target(s) failed')
+  return results
+
+
+# Program given BIOS knobs on multiple targets concurrently.
+def CvProgKnobsFleet(targets, KnobStr, max_workers=FLEET_MAX_WORKERS):
+  return cliProcessKnobsFleet(targets, KnobStr, clb.CLI_KNOB_APPEND, max_workers)
+
+
+# Restore & then modify given BIOS knobs on multiple targets concurrently.
+def CvRestoreModifyKnobsFleet(targets, KnobStr, max_workers=FLEET_MAX_WORKERS):
+  return cliProcessKnobsFleet(targets, KnobStr, clb.CLI_KNOB_RESTORE_MODIFY, max_workers)
+
+
+# Read BIOS knobs on multiple targets concurrently.
+def CvReadKnobsFleet(targets, KnobStr, max_workers=FLEET_MAX_WORKERS):
+  return cliProcessKnobsFleet(targets, KnobStr, clb.CLI_KNOB_READ_ONLY, max_workers)
+
+
+class KnobTransaction(object):
+  """
+  Batch of knob writes committed with single knobs operation on target
+
+  Requested knobs are compared against the platform XML (refreshed once at commit),
+  knobs already holding the requested value are dropped and the rest is sent ordered
+  by varstore, hence in UFS mode each varstore is programmed by one SMI.
+  Commit is verified from the CLI response of the operation itself.
+
+  Usage:
+    with XmlCli.knobs() as tx:
+      tx.set('Knob1', 0x1)
+      tx.set('Knob2', '0x2')
+    tx.status  # 0 on success
+
+  :param xmlfilename: platform config xml file, defaults to `PlatformConfigXml`
+  :param restore_modify: restore knobs to their defaults and then modify requested knobs, instead of append
+  :param verify: verify requested values against the CLI response
+  :param print_results: print knobs entries of CLI response
+  """
+
+  def __init__(self, xmlfilename=None, restore_modify=False, verify=True, print_results=False):
+    self.xmlfilename = xmlfilename if xmlfilename else clb.PlatformConfigXml
+    self.restore_modify = restore_modify
+    self.verify = verify
+    self.print_results = print_results
+    self.requests = {}  # knob name -> requested value, in order of request
+    self.skipped = []  # knobs dropped as their value is already the requested one
+    self.results = {}  # knob name -> knob entry of CLI response
+    self.status = None
+
+  def set(self, name, value):
+    """Request value for knob, later request of same knob overrides the earlier one
+
+    :param name: name of knob
+    :param value: integer or value as given in ini file (hex, decimal, `"string"` or `L"unicode string"`)
+    :return: transaction itself
+    """
+    if self.status is not None:
+      raise XmlCliException(f'Knob transaction is already committed, can not set knob "{name}"')
+    self.requests[name] = f'0x{value:X}' if isinstance(value, int) else str(value).strip()
+    return self
+
+  def get_changes(self, knob_model):
+    """Requested knobs which are not no-op against given knob model
+
+    Knob is no-op when requested value is its current value (or default value
+    in case of restore modify). Knobs unknown to the knob model are kept in the
+    request, to be reported by request buffer compiler.
+
+    :param knob_model: `KnobModel` of platform XML
+    :return: dictionary of knob name -> requested value, ordered by varstore and offset of knobs
+    """
+    changes = []
+    self.skipped = []
+    for order, (name, value) in enumerate(self.requests.items()):
+      knob = knob_model.get_knob(name)
+      if knob is None:
+        changes.append(((0x100, order), name, value))
+        continue
+      reference = knob.default if self.restore_modify else knob.current
+      if prs.is_same_knob_value(knob, value, reference):
+        self.skipped.append(name)
+        continue
+      changes.append(((knob.varstore_id, knob.offset_value), name, value))
+    return {name: value for _, name, value in sorted(changes, key=lambda change: change[0])}
+
+  def commit(self):
+    """Send the requested knobs to target
+
+    :return: 0 on success (including nothing to be sent), 1 on failure
+    """
+    if self.status is not None:
+      return self.status
+    if not self.requests:
+      self.status = 0
+      return self.status
+    if clb.SaveXml(self.xmlfilename) != 0:
+      log.error('Unable to download platform XML, knob transaction is not committed')
+      self.status = 1
+      return self.status
+    knob_model = get_knob_model(self.xmlfilename)
+    changes = self.get_changes(knob_model)
+    if self.skipped:
+      log.result(f'{len(self.skipped)} knob(s) already have the requested value: {", ".join(self.skipped)}')
+    if not changes and not (self.restore_modify and knob_model.modified_knobs()):
+      log.result('All the requested knobs already have the requested value, No Action required')
+      self.status = 0
+      return self.status
+    CmdSubType = clb.CLI_KNOB_RESTORE_MODIFY if self.restore_modify else clb.CLI_KNOB_APPEND
+    IniFile = CreateTmpIniFile(','.join(f'{name}={value}' for name, value in changes.items()))
+    KnobsDict = {}
+    self.status = cliProcessKnobs(self.xmlfilename, IniFile, CmdSubType, ignoreXmlgeneration=True, PrintResParams=self.print_results, KnobsVerify=self.verify, KnobsDict=KnobsDict)
+    self.results = {KnobEntry['KnobName']: KnobEntry for KnobEntry in KnobsDict.values()}
+    return self.status
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    if exc_type is None:  # requests are discarded if block is not completed
+      self.commit()
+    return False
+
+
+def knobs(xmlfilename=None, restore_modify=False, verify=True, print_results=False):
+  """Knob transaction, refer `KnobTransaction`"""
+  return KnobTransaction(xmlfilename, restore_modify=restore_modify, verify=verify, print_results=print_results)
+
+
 def GenBootOrderDict(PcXml, NewBootOrderStr=''):
   global BootOrderDict
   clb.LastErrorSig = 0x0000
-  Tree = prs.ET.parse(PcXml)
+  KnobModel = get_knob_model(PcXml)
   BootOrderDict = {}
   BootOrderDict['OptionsDict'] = {}
   BootOrderDict['OrderList'] = {}
   OrderIndex = 0
-  for SetupKnobs in Tree.iter(tag='biosknobs'):
-    for BiosKnob in SetupKnobs:
-      SETUPTYPE = (prs.nstrip(BiosKnob.get('setupType'))).upper()
-      KnobName = prs.nstrip(BiosKnob.get('name'))
-      if (KnobName[0:10] == 'BootOrder_'):
-        BootOrderDict['OrderList'][OrderIndex] = int(prs.nstrip(BiosKnob.get('CurrentVal')), 16)
-        if ( (SETUPTYPE == 'ONEOF') and (OrderIndex == 0) ):
-          OptionsCount = 0
-          for options in BiosKnob:
-            for option in options:
-              BootOrderDict['OptionsDict'][OptionsCount] = { 'OptionText': prs.nstrip(option.get('text')), 'OptionVal': int(prs.nstrip(option.get('value')), 16) }
-              OptionsCount = OptionsCount + 1
-        OrderIndex = OrderIndex + 1
+  for BiosKnob in KnobModel.iter_knobs():
+    SETUPTYPE = (prs.nstrip(BiosKnob.setup_type)).upper()
+    KnobName = prs.nstrip(BiosKnob.name)
+    if (KnobName[0:10] == 'BootOrder_'):
+      BootOrderDict['OrderList'][OrderIndex] = int(prs.nstrip(BiosKnob.current), 16)
+      if ( (SETUPTYPE == 'ONEOF') and (OrderIndex == 0) ):
+        for OptionsCount, (OptionText, OptionVal) in enumerate(BiosKnob.options):
+          BootOrderDict['OptionsDict'][OptionsCount] = { 'OptionText': prs.nstrip(OptionText), 'OptionVal': int(prs.nstrip(OptionVal), 16) }
+      OrderIndex = OrderIndex + 1
   if (NewBootOrderStr == ''):
     BootOrderLen = len(BootOrderDict['OrderList'])
     if(BootOrderLen == 0):
@@ -594,7 +784,7 @@ def MsrAccess(operation, MsrNumber=0xFFFFFFFF, ApicId=0xFFFFFFFF, MsrValue=0):
   clb.InitInterface()
   DRAM_MbAddr = clb.GetDramMbAddr()  # Get Dram Mailbox Address.
   log.result(f'CLI Spec Version = {clb.GetCliSpecVersion(DRAM_MbAddr)}')
-  DramSharedMBbuf = clb.memBlock(DRAM_MbAddr,0x110) # Read/save parameter buffer
+  DramSharedMBbuf = clb.readDramSharedMb(DRAM_MbAddr,0x110) # Read/save parameter buffer
   CLI_ReqBuffAddr = clb.readclireqbufAddr(DramSharedMBbuf)  # Get CLI Request Buffer Adderss
   CLI_ResBuffAddr = clb.readcliresbufAddr(DramSharedMBbuf)  # Get CLI Response Buffer Address
   log.info(f'CLI Request Buffer Addr = 0x{CLI_ReqBuffAddr:X}   CLI Response Buffer Addr = 0x{CLI_ResBuffAddr:X}')
@@ -622,7 +812,7 @@ def MsrAccess(operation, MsrNumber=0xFFFFFFFF, ApicId=0xFFFFFFFF, MsrValue=0):
     log.error('Error while triggering CLI Entry Point, Aborting....')
     clb.CloseInterface()
     return 1
-  if (clb.WaitForCliResponse(CLI_ResBuffAddr, 8) != 0):
+  if (clb.WaitForCliResponse(CLI_ResBuffAddr, 8, CmdId=operation) != 0):
     log.error('CLI Response not ready, Aborting....')
     clb.CloseInterface()
     return 1
@@ -640,7 +830,7 @@ def IoAccess(operation, IoPort=0xFFFF, Size=0xFF, IoValue=0):
   clb.InitInterface()
   DRAM_MbAddr = clb.GetDramMbAddr()  # Get Dram Mailbox Address.
   log.result(f'CLI Spec Version = {clb.GetCliSpecVersion(DRAM_MbAddr)}')
-  DramSharedMBbuf = clb.memBlock(DRAM_MbAddr,0x110) # Read/save parameter buffer
+  DramSharedMBbuf = clb.readDramSharedMb(DRAM_MbAddr,0x110) # Read/save parameter buffer
   CLI_ReqBuffAddr = clb.readclireqbufAddr(DramSharedMBbuf)  # Get CLI Request Buffer Address
   CLI_ResBuffAddr = clb.readcliresbufAddr(DramSharedMBbuf)  # Get CLI Response Buffer Address
   log.info(f'CLI Request Buffer Addr = 0x{CLI_ReqBuffAddr:X}   CLI Response Buffer Addr = 0x{CLI_ResBuffAddr:X}')
@@ -668,7 +858,7 @@ def IoAccess(operation, IoPort=0xFFFF, Size=0xFF, IoValue=0):
     log.error('Error while triggering CLI Entry Point, Aborting....')
     clb.CloseInterface()
     return 1
-  if (clb.WaitForCliResponse(CLI_ResBuffAddr, 8) != 0):
+  if (clb.WaitForCliResponse(CLI_ResBuffAddr, 8, CmdId=operation) != 0):
     log.error('CLI Response not ready, Aborting....')
     clb.CloseInterface()
     return 1
@@ -3,11 +3,20 @@ __author__ = ['ashinde', 'Gahan Saraiya']
 
 # Built-in Imports
 import os
+import re
 import sys
 import time
 import copy
+import json
+import bisect
+import locale
+import struct
 import binascii
+import functools
 import importlib
+import threading
+import types
+from xml.parsers import expat
 
 
 # Custom Imports
@@ -15,48 +24,26 @@ from .common import utils
 from .common import configurations
 from .common import logger
 from .common import compress
+from .common import xml_cache
+from .common import buffer_reader
 from .common.logger import log
 from .access.stub import stub
+from .access.base.base import IO_READ, IO_WRITE
+from .access.base.instrumentation import InstrumentedAccess
 from ._version import __version__
 
-try:
-  from defusedxml import ElementTree as ET
-except ModuleNotFoundError as e:
-  log.warn("Insecure module import used! Please install all the required dependencies by running `pip install -r requirements.txt`")
-  from xml.etree import ElementTree as ET
-
-cliaccess = stub.StubAccess("stub")
-FlexConCfgFile = False
 ForceReInitCliAccess = False
-UfsFlag = False
 KnobsIniFile = configurations.BIOS_KNOBS_CONFIG
 XmlCliToolsDir = configurations.TOOL_DIR
 TianoCompressUtility = configurations.TIANO_COMPRESS_BIN
 BrotliCompressUtility = configurations.BROTLI_COMPRESS_BIN
 
-TempFolder = configurations.OUT_DIR
-
-KnobsXmlFile = os.path.join(TempFolder, 'BiosKnobs.xml')
-PlatformConfigXml = os.path.join(TempFolder, 'PlatformConfig.xml')
-PlatformConfigLiteXml = os.path.join(TempFolder, 'PlatformConfigLite.xml')
-SvXml = os.path.join(TempFolder, 'SvPlatformConfig.xml')
-
-TmpKnobsIniFile = os.path.join(TempFolder, 'TmpBiosKnobs.ini')
-JSON_OUT_FILE = os.path.join(TempFolder, 'json_output.json')
 OutBinFile = ''
-gDramSharedMbAddr = 0
-MerlinxXmlCliEnableAddr = 0
-InterfaceType = configurations.ACCESS_METHOD
-XmlCliLogFile = os.path.join(TempFolder, 'XmlCli.log')
-XmlCliRespFlags = {'Status': 0, 'CantExe': 0, 'WrongParam': 0, 'TimedOut': 0, 'SideEffect': 'NoSideEffect'}
-LastErrorSig = 0x0000
+XmlCliLogFile = os.path.join(configurations.OUT_DIR, 'XmlCli.log')
 LastErrorSigDict = {int(key, 16): value["msg"] for key, value in utils.STATUS_CODE_RECORD.items()}
 
 log = logger.settings.logger
 
-CliRespFlags = 0
-_isExeAvailable = True
-
 SHAREDMB_SIG1                   = 0xBA5EBA11
 SHAREDMB_SIG2                   = 0xBA5EBA11
 SHARED_MB_LEGMB_SIG_OFF         = 0x20
@@ -71,7 +58,6 @@ CLI_SPEC_VERSION_MAJOR_OFF      = 0x15
 CLI_SPEC_VERSION_RELEASE_OFF    = 0x17
 LEGACYMB_SIG_OFF                = 0x20
 LEGACYMB_OFF                    = 0x24
-LEGACYMB_XML_OFF                = 0x0C
 MERLINX_XML_CLI_ENABLED_OFF     = 0x28
 LEGACYMB_XML_CLI_TEMP_ADDR_OFF  = 0x60
 STRING                          = 0x51
@@ -89,8 +75,6 @@ SHARED_MB_CLI_REQ_BUFF_ADDR_OFF = 0x34
 SHARED_MB_CLI_RES_BUFF_ADDR_OFF = 0x44
 SHARED_MB_CLI_REQ_BUFF_SIZE_OFF = 0x38
 SHARED_MB_CLI_RES_BUFF_SIZE_OFF = 0x48
-CLI_REQ_READY_SIG               = 0xC001C001
-CLI_RES_READY_SIG               = 0xCAFECAFE
 CLI_REQ_RES_READY_SIG_OFF       = 0x00
 CLI_REQ_RES_READY_CMD_OFF       = 0x04
 CLI_REQ_RES_READY_FLAGS_OFF     = 0x06
@@ -120,10 +104,6 @@ CLI_KNOB_RESTORE_MODIFY         = 0x1
 CLI_KNOB_READ_ONLY              = 0x2
 CLI_KNOB_LOAD_DEFAULTS          = 0x3
 
-CliSpecRelVersion               = 0x00
-CliSpecMajorVersion             = 0x00
-CliSpecMinorVersion             = 0x00
-
 MAXIMUM_BIOS_MEMORY_MAP         = 0xFFFFFFFF
 PAGE_SIZE                       = 0x1000
 FIRMWARE_BASE_MASK_ALIGNMENT    = (MAXIMUM_BIOS_MEMORY_MAP - PAGE_SIZE + 0x1)
@@ -142,10 +122,207 @@ Xml_Sanitization_Mapping = {0x00: 0x20, 0x01: 0x20, 0x02: 0x20, 0x03: 0x20, 0x04
                             0x11: 0x20, 0x12: 0x20, 0x13: 0x20, 0x14: 0x20, 0x15: 0x20, 0x16: 0x20, 0x17: 0x20,
                             0x18: 0x20, 0x19: 0x20, 0x1A: 0x20, 0x1B: 0x20, 0x1C: 0x20, 0x1D: 0x20, 0x1E: 0x20,
                             0x1F: 0x20, 0x7F: 0x20, 0xB5: 0x75, 0x26: 0x6E, 0xA0: 0x2E, 0xB0: 0x20 }
+# control characters are never valid in XML, they are replaced (keeping offsets of XML intact) while XML is written,
+# rest of the mapping is applied only if XML still has syntax errors
+XML_CONTROL_CHARS = bytes(Char for Char in Xml_Sanitization_Mapping if (Char < 0x20) or (Char == 0x7F))
+XML_SANITIZATION_TABLE = bytes.maketrans(XML_CONTROL_CHARS, bytes(Xml_Sanitization_Mapping[Char] for Char in XML_CONTROL_CHARS))
+XML_SYNTAX_SANITIZATION_TABLE = bytes.maketrans(bytes(Xml_Sanitization_Mapping), bytes(Xml_Sanitization_Mapping.values()))
+XML_SANITIZATION_CHUNK_SIZE = 0x100000
+
+# Upper case ASCII hex digits of each byte value, as used for knob values in XML
+ASCII_HEX_TABLE = tuple(f"{Byte:02X}".encode() for Byte in range(0x100))
 
 # Constants for Bitwise Knobs
 BITWISE_KNOB_PREFIX = 0xC0000
 
+# Knob entry of CLI request buffer: VarId, Offset, Size followed by value
+CLI_REQUEST_ENTRY = struct.Struct('<BHB')
+# Knob entry of CLI response buffer: address of knob entry in XML, reserved, VarId, Offset, Size followed by default and current value
+CLI_RESPONSE_ENTRY = struct.Struct('<I2xBHB')
+
+# Polling of CLI response (in seconds)
+CLI_POLL_INITIAL_INTERVAL       = 0.002
+CLI_POLL_MAX_INTERVAL           = 0.5
+CLI_LATENCY_WEIGHT              = 0.25  # weight of latest sample in moving average of response latency
+
+
+class DramMailboxDescriptor(object):
+  """DRAM shared mailbox discovered on the target, cached by session until reset or signature mismatch"""
+  __slots__ = ("address", "cli_spec_version", "buffer")
+
+  def __init__(self, address, cli_spec_version):
+    self.address = address
+    self.cli_spec_version = cli_spec_version
+    self.buffer = b""  # content of shared mailbox, read on first use
+
+
+class XmlCliSession(object):
+  """
+  State of XmlCli operations with single target: access method instance,
+  DRAM shared mailbox layout, response flags and last error signature.
+
+  Module level functions (i.e. `SaveXml`, `CvProgKnobs`) operate on the session
+  activated in the calling thread, or on the default session if none is active.
+  Hence one process can drive multiple targets in parallel, i.e. with thread pool:
+
+  >>> def program_knobs(access_name, out_dir):
+  ...   with XmlCliSession(access_name, out_dir=out_dir) as session:
+  ...     cli.CvProgKnobs("WakeOnLanSupport=1")
+  ...     return session.LastErrorSig
+
+  :param access: name of access method or instance of access method,
+    if not specified access method is initialized on first use from `InterfaceType`
+  :param out_dir: directory for the files generated by operations of this session
+  """
+
+  def __init__(self, access=None, out_dir=None):
+    self.mailbox = None
+    self.cli_latency = {}  # CLI command id -> moving average of observed response latency (in seconds)
+    self.knob_entry_index = None  # `KnobEntryIndex` of the XML last saved or indexed
+    self.cliaccess = None
+    self.InterfaceType = configurations.ACCESS_METHOD
+    self._isExeAvailable = True
+    self.FlexConCfgFile = False
+    self.UfsFlag = False
+    self.AccessInstrumentation = configurations.ACCESS_INSTRUMENTATION
+    self._instrumentedOperationDepth = 0
+    self.LastErrorSig = 0x0000
+    self.CliRespFlags = 0
+    self.XmlCliRespFlags = {'Status': 0, 'CantExe': 0, 'WrongParam': 0, 'TimedOut': 0, 'SideEffect': 'NoSideEffect'}
+    self.gDramSharedMbAddr = 0
+    self.reset_mailbox_layout()
+    self.set_out_dir(out_dir if out_dir else configurations.OUT_DIR)
+    if isinstance(access, str):
+      self.set_access(access)
+    elif access is not None:
+      self.cliaccess = InstrumentedAccess(access) if self.AccessInstrumentation else access
+      self.InterfaceType = getattr(access, "InterfaceType", self.InterfaceType)
+
+  def __enter__(self):
+    _sessionContext.__dict__.setdefault("stack", []).append(self)
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    _sessionContext.stack.pop()
+
+  @property
+  def cliaccess(self):
+    return self._cliaccess
+
+  @cliaccess.setter
+  def cliaccess(self, access):
+    self._cliaccess = access
+    self.invalidate_mailbox()  # access method may not be connected to the same target
+
+  def invalidate_mailbox(self):
+    """Drop cached DRAM shared mailbox, it is discovered again by next operation"""
+    self.mailbox = None
+
+  def validate_mailbox(self):
+    """Validate cached DRAM shared mailbox by re-reading both of its signatures
+
+    :return: address of cached mailbox, 0 if mailbox is not cached or signatures mismatch
+    """
+    if self.mailbox is None:
+      return 0
+    signatures = bytearray(SHAREDMB_SIG2_OFF + 4)
+    self.check_access().mem_block_into(self.mailbox.address, signatures)
+    if (ReadBuffer(signatures, SHAREDMB_SIG1_OFF, 4, HEX) == SHAREDMB_SIG1) and (ReadBuffer(signatures, SHAREDMB_SIG2_OFF, 4, HEX) == SHAREDMB_SIG2):
+      return self.mailbox.address
+    log.debug(f'Signature of cached DRAM shared mailbox at 0x{self.mailbox.address:X} mismatched, discovering again')
+    self.invalidate_mailbox()
+    return 0
+
+  def reset_mailbox_layout(self):
+    """Reset mailbox layout to be detected again from CLI spec version of the target"""
+    self.MerlinxXmlCliEnableAddr = 0
+    self.CliSpecRelVersion = 0x00
+    self.CliSpecMajorVersion = 0x00
+    self.CliSpecMinorVersion = 0x00
+    self.CLI_REQ_READY_SIG = 0xC001C001
+    self.CLI_RES_READY_SIG = 0xCAFECAFE
+    self.LEGACYMB_XML_OFF = 0x0C
+
+  def set_out_dir(self, out_dir):
+    self.TempFolder = out_dir
+    self.KnobsXmlFile = os.path.join(out_dir, 'BiosKnobs.xml')
+    self.PlatformConfigXml = os.path.join(out_dir, 'PlatformConfig.xml')
+    self.PlatformConfigLiteXml = os.path.join(out_dir, 'PlatformConfigLite.xml')
+    self.SvXml = os.path.join(out_dir, 'SvPlatformConfig.xml')
+    self.TmpKnobsIniFile = os.path.join(out_dir, 'TmpBiosKnobs.ini')
+    self.AccessStatisticsFile = os.path.join(out_dir, 'ACCESS_STATISTICS.json')
+    self.JSON_OUT_FILE = os.path.join(out_dir, 'json_output.json')
+
+  def set_access(self, req_access=None):
+    if req_access != None:
+      self.InterfaceType = req_access
+    try:
+      cli_instance = CliLib(self.InterfaceType.lower())
+      self.cliaccess = cli_instance.access_instance  # Assign access method instance
+      self._isExeAvailable = is_exe_available(self.InterfaceType)
+    except Exception as e:
+      self.InterfaceType = 'stub'
+
+    if self.InterfaceType == 'stub':
+      cli_instance = CliLib(self.InterfaceType.lower())
+      self.cliaccess = cli_instance.access_instance
+    if self.AccessInstrumentation:
+      self.cliaccess = InstrumentedAccess(self.cliaccess)
+    if req_access not in ('stub', 'offline') and (self.InterfaceType == 'stub'):
+      self.LastErrorSig = 0x19FD  # Error initializing the given Interface Type
+      log.error('**** Error initializing the given Interface Type ****')
+    else:
+      self.LastErrorSig = 0x0000
+    log.result(f'****  Using \"{self.InterfaceType}\" mode as Interface  ****')
+
+  def check_access(self):
+    """Initialize access method if not yet initialized (or re-initialization is forced)
+
+    :return: access method instance
+    """
+    if ((self.cliaccess == None) or (ForceReInitCliAccess)):
+      self.set_access()
+    return self.cliaccess
+
+
+# Attributes of module owned by `XmlCliSession`, accessing them on module gives value of current session
+SESSION_ATTRIBUTES = ("cliaccess", "InterfaceType", "_isExeAvailable", "AccessInstrumentation", "_instrumentedOperationDepth",
+                      "LastErrorSig", "CliRespFlags", "XmlCliRespFlags", "gDramSharedMbAddr", "MerlinxXmlCliEnableAddr",
+                      "CliSpecRelVersion", "CliSpecMajorVersion", "CliSpecMinorVersion", "CLI_REQ_READY_SIG", "CLI_RES_READY_SIG",
+                      "LEGACYMB_XML_OFF", "TempFolder", "KnobsXmlFile", "PlatformConfigXml", "PlatformConfigLiteXml", "SvXml",
+                      "TmpKnobsIniFile", "AccessStatisticsFile", "JSON_OUT_FILE", "FlexConCfgFile", "UfsFlag")
+
+_sessionContext = threading.local()
+_defaultSession = XmlCliSession()
+_defaultSession.cliaccess = stub.StubAccess("stub")
+
+
+def getSession():
+  """
+  Session on which module level functions operate
+
+  :return: innermost session activated in current thread, else default session
+  """
+  stack = getattr(_sessionContext, "stack", None)
+  return stack[-1] if stack else _defaultSession
+
+
+def getDefaultSession():
+  return _defaultSession
+
+
+class _XmlCliLibModule(types.ModuleType):
+  """Module type redirecting `SESSION_ATTRIBUTES` to current session (i.e. `clb.LastErrorSig`)"""
+
+
+def _session_property(name):
+  return property(lambda module: getattr(getSession(), name), lambda module, value: setattr(getSession(), name, value))
+
+
+for _attribute in SESSION_ATTRIBUTES:
+  setattr(_XmlCliLibModule, _attribute, _session_property(_attribute))
+sys.modules[__name__].__class__ = _XmlCliLibModule
+
 
 def and_mask(width, unit="byte"):
   """Generate And Mask with all 1's for bit
@@ -183,6 +360,92 @@ def get_bitwise_knob_details(knob_size, knob_offset, padding=0x8000):
   return knob_width, knob_offset, bit_offset
 
 
+def decodeKnobEntry(KnobOffset, KnobSize):
+  """Decode offset and size of knob entry of CLI request or response buffer
+
+  :param KnobOffset: offset as in buffer, BIT15 is set for bitwise knob
+  :param KnobSize: size as in buffer, bit size in bits 3-7 and bit offset in bits 0-2 for bitwise knob
+  :return: tuple of (offset, size, byte size of value), bitwise knob has offset
+           prefixed by `BITWISE_KNOB_PREFIX` and size in bits
+  """
+  if KnobOffset & 0x8000:
+    BitSize = (KnobSize >> 3) & 0x3F
+    BitOffset = KnobSize & 0x7
+    return BITWISE_KNOB_PREFIX + ((KnobOffset & 0x7FFF) * 8) + BitOffset, BitSize, (BitSize + BitOffset + 7) // 8
+  return KnobOffset, KnobSize, KnobSize
+
+
+def parseCliRequestEntries(RequestBuff):
+  """Decode knob entries of CLI request buffer in single pass
+
+  :param RequestBuff: request buffer starting with number of entries
+  :return: list of tuple (VarId, Offset, Size, Value) in order of request
+  """
+  Buffer = memoryview(RequestBuff)
+  Entries = []
+  if len(Buffer) < 4:
+    return Entries
+  NumberOfEntries = int.from_bytes(Buffer[0:4], 'little')
+  Offset = 4
+  End = len(Buffer) - CLI_REQUEST_ENTRY.size
+  while NumberOfEntries and (Offset <= End):
+    VarId, KnobOffset, KnobSize = CLI_REQUEST_ENTRY.unpack_from(Buffer, Offset)
+    KnobOffset, KnobSize, ByteSize = decodeKnobEntry(KnobOffset, KnobSize)
+    Offset = Offset + CLI_REQUEST_ENTRY.size
+    Entries.append((VarId, KnobOffset, KnobSize, int.from_bytes(Buffer[Offset:Offset+ByteSize], 'little')))
+    Offset = Offset + ByteSize
+    NumberOfEntries = NumberOfEntries - 1
+  return Entries
+
+
+def parseCliResponseEntries(ResParambuff):
+  """Decode knob entries of CLI response buffer in single pass
+
+  :param ResParambuff: parameter buffer of CLI response
+  :return: list of tuple (KnobEntryAdd, VarId, Offset, Size, DefVal, OutValue) in order of response
+  """
+  Buffer = memoryview(ResParambuff)
+  Entries = []
+  Offset = 0
+  End = len(Buffer) - CLI_RESPONSE_ENTRY.size
+  while Offset <= End:
+    KnobEntryAdd, VarId, KnobOffset, KnobSize = CLI_RESPONSE_ENTRY.unpack_from(Buffer, Offset)
+    KnobOffset, KnobSize, ByteSize = decodeKnobEntry(KnobOffset, KnobSize)
+    Offset = Offset + CLI_RESPONSE_ENTRY.size
+    DefVal = int.from_bytes(Buffer[Offset:Offset+ByteSize], 'little')
+    OutValue = int.from_bytes(Buffer[Offset+ByteSize:Offset+(ByteSize*2)], 'little')
+    Entries.append((KnobEntryAdd, VarId, KnobOffset, KnobSize, DefVal, OutValue))
+    Offset = Offset + (ByteSize*2)
+  return Entries
+
+
+def matchCliResponseEntries(RequestBuff, ResParambuff, ResponseEntries=None):
+  """Join knob entries of CLI request with entries of CLI response on (VarId, Offset, Size)
+
+  Response is indexed once, each requested knob is then resolved by single lookup.
+  Requested knob is reported with the first response entry of the knob, requested knobs
+  missing in the response are skipped.
+
+  :param RequestBuff: request buffer, None to report every entry of response (i.e. load defaults)
+  :param ResParambuff: parameter buffer of CLI response
+  :param ResponseEntries: entries of response already decoded by `parseCliResponseEntries`, if any
+  :return: list of tuple (response entry as of `parseCliResponseEntries`, requested value)
+  """
+  if ResponseEntries is None:
+    ResponseEntries = parseCliResponseEntries(ResParambuff)
+  if RequestBuff is None:
+    return [(ResponseEntry, 0) for ResponseEntry in ResponseEntries]
+  ResponseIndex = {}
+  for ResponseEntry in ResponseEntries:
+    ResponseIndex.setdefault(ResponseEntry[1:4], ResponseEntry)
+  Matches = []
+  for VarId, KnobOffset, KnobSize, InputValue in parseCliRequestEntries(RequestBuff):
+    ResponseEntry = ResponseIndex.get((VarId, KnobOffset, KnobSize))
+    if ResponseEntry is not None:
+      Matches.append((ResponseEntry, InputValue))
+  return Matches
+
+
 class CliLib(object):
   def __init__(self, access_request=None, *args, **kwargs):
     access_methods = self.get_available_access_methods()
@@ -225,31 +488,92 @@ def is_exe_available(interface_type):
 
 
 def _setCliAccess(req_access=None):
-  global cliaccess, InterfaceType, _isExeAvailable, LastErrorSig
-  if req_access != None:
-    InterfaceType = req_access
-  try:
-    cli_instance = CliLib(InterfaceType.lower())
-    cliaccess = cli_instance.access_instance  # Assign access method instance
-    _isExeAvailable = is_exe_available(InterfaceType)
-  except Exception as e:
-    InterfaceType = 'stub'
-
-  if InterfaceType == 'stub':
-    cli_instance = CliLib(InterfaceType.lower())
-    cliaccess = cli_instance.access_instance
-  if req_access not in ('stub', 'offline') and (InterfaceType == 'stub'):
-    LastErrorSig = 0x19FD  # Error initializing the given Interface Type
-    log.error('**** Error initializing the given Interface Type ****')
-  else:
-    LastErrorSig = 0x0000
-  log.result(f'****  Using \"{InterfaceType}\" mode as Interface  ****')
+  getSession().set_access(req_access)
 
 
 def _checkCliAccess():
-  global cliaccess, ForceReInitCliAccess
-  if ((cliaccess == None) or (ForceReInitCliAccess)):
-    _setCliAccess()
+  return getSession().check_access()
+
+
+def enableAccessInstrumentation(enable=True):
+  """
+  Enable or disable recording of call count, bytes and latency of access method operations
+
+  :param enable: True to wrap current and any further access method instance with instrumentation
+  :return:
+  """
+  session = getSession()
+  session.AccessInstrumentation = enable
+  _checkCliAccess()
+  mailbox = session.mailbox  # wrapped instance is connected to the same target
+  if enable and not isinstance(session.cliaccess, InstrumentedAccess):
+    session.cliaccess = InstrumentedAccess(session.cliaccess)
+  elif not enable and isinstance(session.cliaccess, InstrumentedAccess):
+    session.cliaccess = session.cliaccess.access
+  session.mailbox = mailbox
+
+
+def getAccessStatistics():
+  """
+  Statistics of access method operations recorded since last reset
+
+  :return: dictionary {operation: {count, bytes, errors, total_ms, mean_us, min_us, max_us, p50_us, p95_us, p99_us}}
+  """
+  access = getSession().cliaccess
+  if isinstance(access, InstrumentedAccess):
+    return access.get_statistics()
+  return {}
+
+
+def resetAccessStatistics():
+  access = getSession().cliaccess
+  if isinstance(access, InstrumentedAccess):
+    access.reset_statistics()
+
+
+def dumpAccessStatistics(filename=None, operation=''):
+  """
+  Dump statistics of access method operations as json
+
+  :param filename: json file to be written, defaults to `AccessStatisticsFile`
+  :param operation: name of XmlCli operation for which statistics are recorded
+  :return: dumped dictionary
+  """
+  session = getSession()
+  filename = filename if filename else session.AccessStatisticsFile
+  result = {
+    "operation"   : operation,
+    "interface"   : session.InterfaceType,
+    "timestamp"   : time.strftime("%Y-%m-%dT%H:%M:%S"),
+    "last_error"  : f"0x{session.LastErrorSig:X}",
+    "statistics"  : getAccessStatistics(),
+  }
+  with open(filename, "w") as out_file:
+    json.dump(result, out_file, indent=2)
+  log.debug(f"Access statistics saved as {filename}")
+  return result
+
+
+def record_access_statistics(func):
+  """
+  Decorator to record access statistics of the outermost decorated operation,
+  statistics are reset on entry and dumped as json on exit when instrumentation is enabled
+  """
+  @functools.wraps(func)
+  def wrapper(*args, **kwargs):
+    session = getSession()
+    if not session.AccessInstrumentation:
+      return func(*args, **kwargs)
+    if session._instrumentedOperationDepth == 0:
+      resetAccessStatistics()
+    session._instrumentedOperationDepth += 1
+    try:
+      return func(*args, **kwargs)
+    finally:
+      session._instrumentedOperationDepth -= 1
+      if session._instrumentedOperationDepth == 0:
+        dumpAccessStatistics(operation=func.__name__)
+  return wrapper
 
 
 def haltcpu(delay=0):
@@ -264,9 +588,7 @@ def haltcpu(delay=0):
   :param delay: wait time in seconds for command execution
   :return: status of halt action from interface
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.halt_cpu(delay)
+  return _checkCliAccess().halt_cpu(delay)
 
 def runcpu():
   """
@@ -279,19 +601,13 @@ def runcpu():
 
   :return: status of run cpu action from interface
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.run_cpu()
+  return _checkCliAccess().run_cpu()
 
 def InitInterface():
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.initialize_interface()
+  return _checkCliAccess().initialize_interface()
 
 def CloseInterface():
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.close_interface()
+  return _checkCliAccess().close_interface()
 
 
 def warmreset():
@@ -301,9 +617,9 @@ def warmreset():
 
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.warm_reset()
+  status = _checkCliAccess().warm_reset()
+  getSession().invalidate_mailbox()
+  return status
 
 
 def coldreset():
@@ -314,9 +630,9 @@ def coldreset():
 
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.cold_reset()
+  status = _checkCliAccess().cold_reset()
+  getSession().invalidate_mailbox()
+  return status
 
 
 def memBlock(address, size):
@@ -324,16 +640,29 @@ def memBlock(address, size):
   Reads the data block of given size from target memory
   starting from given address.
 
-  > The read data is in bit format.
-  > It is converted in string/ASCII to allow manipulated on byte granularity.
+  > The read data is returned as bytearray which can be sliced or
+  > indexed directly on byte granularity.
 
   :param address: address from which memory block needs to be read
   :param size: size of block to be read
-  :return:
+  :return: bytearray of memory block
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.mem_block(address, size)
+  buffer = bytearray(size)
+  memBlockInto(address, buffer)
+  return buffer
+
+
+def memBlockInto(address, buffer):
+  """
+  Reads the data block from target memory starting from given address
+  directly in to the given writable buffer (i.e. bytearray, memoryview).
+  Size of the block is determined by length of the buffer.
+
+  :param address: address from which memory block needs to be read
+  :param buffer: writable buffer to be filled with memory block
+  :return: number of bytes read
+  """
+  return _checkCliAccess().mem_block_into(address, buffer)
 
 
 def memsave(filename, address, size):
@@ -343,11 +672,9 @@ def memsave(filename, address, size):
   :param filename: destination file where fetched data will be stored
   :param address: address from which data is to be copied
   :param size: total amount of data to be read
-  :return:
+  :return: value returned by `mem_save` of access method
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.mem_save(filename, address, size)
+  return _checkCliAccess().mem_save(filename, address, size)
 
 
 def memdump(address, size, unit=1):
@@ -360,10 +687,7 @@ def memdump(address, size, unit=1):
   :param unit: unit length in which data to be displayed (choices are: 1|2|4|8)
   :return:
   """
-  TempDataBinFile = os.path.join(os.path.dirname(KnobsXmlFile), 'MemData_%X.bin' %address)
-  memsave(TempDataBinFile, address, size)
-  with open(TempDataBinFile, 'rb') as TempData:
-    ListBuff = list(TempData.read())
+  ListBuff = memBlock(address, size)
   log.result('________________________________________________________________________________')
   if unit == 1:
     log.result('       Address | 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9 | A | B | C | D | E | F |')
@@ -423,9 +747,7 @@ def memread(address, size):
   :param size: size of the data to be read
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return int(cliaccess.mem_read(address, size))
+  return int(_checkCliAccess().mem_read(address, size))
 
 
 def memwrite(address, size, value):
@@ -439,9 +761,7 @@ def memwrite(address, size, value):
   :param size: size of the data to be read
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.mem_write(address, size, value)
+  return _checkCliAccess().mem_write(address, size, value)
 
 
 def load_data(filename, address):
@@ -452,9 +772,19 @@ def load_data(filename, address):
   :param address: address on which data has to be copied
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.load_data(filename, address)
+  return _checkCliAccess().load_data(filename, address)
+
+
+def memBlockWrite(address, data):
+  """
+  Writes the data block to target memory starting from given address
+  directly from the given buffer (i.e. bytes, bytearray, memoryview).
+
+  :param address: address on which data has to be copied
+  :param data: bytes-like object to be written
+  :return: number of bytes written
+  """
+  return _checkCliAccess().mem_block_write(address, data)
 
 
 def readIO(address, size):
@@ -465,9 +795,7 @@ def readIO(address, size):
   :param size: size of data to be read
   :return: integer value read from address
   """
-  global cliaccess
-  _checkCliAccess()
-  return int(cliaccess.read_io(address, size))
+  return int(_checkCliAccess().read_io(address, size))
 
 
 def writeIO(address, size, value):
@@ -479,9 +807,42 @@ def writeIO(address, size, value):
   :param value: value of data to write on specified address port
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.write_io(address, size, value)
+  return _checkCliAccess().write_io(address, size, value)
+
+
+def ioBatch(operations):
+  """
+  Perform sequence of IO port operations with single call to access method
+
+  :param operations: list of tuple (operation, port, size, value), operation is either `IO_READ` or `IO_WRITE`
+  :return: list with integer value read for each `IO_READ` and None for each `IO_WRITE` operation
+  """
+  return _checkCliAccess().io_batch(operations)
+
+
+def cmos_read_operations(register_address):
+  """IO operations to read CMOS register, value is read by the last operation"""
+  upper_register_val = 0x0 if register_address < 0x80 else 0x2
+  return [(IO_WRITE, 0x70 + upper_register_val, 1, register_address), (IO_READ, 0x71 + upper_register_val, 1, 0)]
+
+
+def cmos_write_operations(register_address, value):
+  """IO operations to write value to CMOS register"""
+  upper_register_val = 0x0 if register_address < 0x80 else 0x2
+  return [(IO_WRITE, 0x70 + upper_register_val, 1, register_address), (IO_WRITE, 0x71 + upper_register_val, 1, value)]
+
+
+def readcmos_block(register_addresses):
+  """
+  Read multiple CMOS registers with single batch of IO operations
+
+  :param register_addresses: iterable of CMOS register addresses
+  :return: list of values of registers in the order of given addresses
+  """
+  operations = []
+  for register_address in register_addresses:
+    operations += cmos_read_operations(register_address)
+  return [int(value) & 0xFF for value in ioBatch(operations)[1::2]]
 
 
 def triggerSMI(SmiVal):
@@ -493,21 +854,15 @@ def triggerSMI(SmiVal):
   :param SmiVal: Value with which SMI should be triggered
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.trigger_smi(SmiVal)
+  return _checkCliAccess().trigger_smi(SmiVal)
 
 
 def ReadMSR(Ap, MSR_Addr):
-  global cliaccess
-  _checkCliAccess()
-  return int(cliaccess.read_msr(Ap, MSR_Addr))
+  return int(_checkCliAccess().read_msr(Ap, MSR_Addr))
 
 
 def WriteMSR(Ap, MSR_Addr, MSR_Val):
-  global cliaccess
-  _checkCliAccess()
-  return cliaccess.write_msr(Ap, MSR_Addr, MSR_Val)
+  return _checkCliAccess().write_msr(Ap, MSR_Addr, MSR_Val)
 
 
 def ReadSmbase():
@@ -517,9 +872,7 @@ def ReadSmbase():
 
   :return:
   """
-  global cliaccess
-  _checkCliAccess()
-  return int(cliaccess.read_sm_base())
+  return int(_checkCliAccess().read_sm_base())
 
 
 def RemoveFile(file_name):
@@ -554,10 +907,7 @@ def readcmos(register_address):
   :param register_address: CMOS register address
   :return:
   """
-  upper_register_val = 0x0 if register_address < 0x80 else 0x2
-  writeIO(0x70 + upper_register_val, 1, register_address)
-  value = readIO(0x71 + upper_register_val, 1)
-  return value
+  return readcmos_block([register_address])[0]
 
 
 def writecmos(register_address, value):
@@ -568,13 +918,7 @@ def writecmos(register_address, value):
   :param value: value to be written on specified CMOS register
   :return:
   """
-  if register_address < 0x80:
-    writeIO(0x70, 1, register_address)
-    writeIO(0x71, 1, value)
-
-  if register_address >= 0x80:
-    writeIO(0x72, 1, register_address)
-    writeIO(0x73, 1, value)
+  ioBatch(cmos_write_operations(register_address, value))
 
 
 def clearcmos():
@@ -590,46 +934,33 @@ def clearcmos():
   :return:
   """
   log.warning('Clearing CMOS')
+  operations = []
   for i in range(0x0, 0x80, 1):
-    writeIO(0x70, 1, i)
-    writeIO(0x71, 1, 0)
+    operations += cmos_write_operations(i, 0)
     value = i | 0x80
     if value in (0xF0, 0xF1):
       # skip clearing the CMOS register's which hold Dram Shared MB address.
       continue
-    writeIO(0x72, 1, value)
-    writeIO(0x73, 1, 0)
-  writeIO(0x70, 1, 0x0E)
-  writeIO(0x71, 1, 0xC0)  # set CMOS BAD flag
+    operations += cmos_write_operations(value, 0)
+  operations += cmos_write_operations(0x0E, 0xC0)  # set CMOS BAD flag
 
   rtc_reg_pci_address = ((1 << 31) + (0 << 16) + (31 << 11) + (0 << 8) + 0xA4)
-  writeIO(0xCF8, 4, rtc_reg_pci_address)
-  rtc_value = readIO(0xCFC, 2)
+  operations += [(IO_WRITE, 0xCF8, 4, rtc_reg_pci_address), (IO_READ, 0xCFC, 2, 0)]
+  rtc_value = ioBatch(operations)[-1]
   rtc_value = rtc_value | 0x4
-  writeIO(0xCF8, 4, rtc_reg_pci_address)
-  writeIO(0xCFC, 2, rtc_value)  # set cmos bad in PCH RTC register
+  ioBatch([(IO_WRITE, 0xCF8, 4, rtc_reg_pci_address), (IO_WRITE, 0xCFC, 2, rtc_value)])  # set cmos bad in PCH RTC register
 
 # read all Cmos locations from 0 to 0xFF
 def readallcmos():
-  Value = [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]
+  Value = readcmos_block(range(0x0, 0x100))
   log.result('Reading CMOS')
   log.result('    |--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|')
   log.result('Addr|00|01|02|03|04|05|06|07|08|09|0A|0B|0C|0D|0E|0F|')
   log.result('----|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|')
-  for i in range(0x0,0x8,1):
-    for j in range(0x0,0x10,1):
-      writeIO(0x70, 1, ((i<<4) + j) )
-      Value[j] = readIO(0x71, 1)
-    log.result(
-      f' {(i << 4):2X} |{Value[0]:2X} {Value[1]:2X} {Value[2]:2X} {Value[3]:2X} {Value[4]:2X} {Value[5]:2X} {Value[6]:2X} {Value[7]:2X} {Value[8]:2X} {Value[9]:2X} {Value[10]:2X} {Value[11]:2X} {Value[12]:2X} {Value[13]:2X} {Value[14]:2X} {Value[15]:2X}|')
-  log.result(' ---|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|')
-  for i in range(0x8,0x10,1):
-    for j in range(0x0,0x10,1):
-      writeIO(0x72, 1, ((i<<4) + j) )
-      Value[j] = readIO(0x73, 1)
-    log.result(
-      f' {(i << 4):2X} |{Value[0]:2X} {Value[1]:2X} {Value[2]:2X} {Value[3]:2X} {Value[4]:2X} {Value[5]:2X} {Value[6]:2X} {Value[7]:2X} {Value[8]:2X} {Value[9]:2X} {Value[10]:2X} {Value[11]:2X} {Value[12]:2X} {Value[13]:2X} {Value[14]:2X} {Value[15]:2X}|')
-  log.result(' ---|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|')
+  for i in range(0x0,0x10,1):
+    log.result(f' {(i << 4):2X} |' + ' '.join(f'{Value[(i << 4) + j]:2X}' for j in range(0x0, 0x10, 1)) + '|')
+    if i in (0x7, 0xF):
+      log.result(' ---|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|--|')
 
 
 def ReadBuffer(inBuffer, offset, size, inType):
@@ -646,31 +977,23 @@ def ReadBuffer(inBuffer, offset, size, inType):
 
   :return: buffer read from input
   """
-  value_buffer = inBuffer[offset:offset+size]
-  value_string = ''
-  if len(value_buffer) == 0:
-    return 0
-  if inType == ASCII:
-    value_string = "".join(chr(value_buffer[i]) for i in range(len(value_buffer)))
-    return value_string
   if inType == HEX:
-    # value_string = "".join(f"{value_buffer[i]:02x}" for i in range(len(value_buffer)))
-    for count in range(len(value_buffer)):
-      value_string = f"{value_buffer[count]:02x}" + value_string
-    return int(value_string, 16)
+    return buffer_reader.read_integer(inBuffer, offset, size)
+  if inType == ASCII:
+    value_buffer = buffer_reader.read_bytes(inBuffer, offset, size)
+    return value_buffer.decode('latin-1') if value_buffer else 0
   return 0
 
 def ReadList(inBuffer, offset, size, inType=HEX):
-  value_buffer = inBuffer[offset:offset+size]
+  """
+  Read little endian integer or NUL terminated ASCII string of specified size
+  from the given offset of buffer (bytes like or list of byte values).
+
+  :return: integer (0 if offset is beyond buffer) or string for ASCII type
+  """
   if inType == ASCII:
-    for count in range(len(value_buffer)):
-      if value_buffer[count] == 0:
-        return ''.join(value_buffer[0:count])
-      value_buffer[count] = chr(value_buffer[count])
-    return ''.join(value_buffer)
-  for count in range(len(value_buffer)):
-    value_buffer[count]=hex(value_buffer[count])[2:].zfill(2)
-  return int(''.join(value_buffer[::-1]), 16)
+    return buffer_reader.read_c_string(inBuffer, offset, size)
+  return buffer_reader.read_integer(inBuffer, offset, size)
 
 
 def ListInsertVal(Val):
@@ -689,41 +1012,43 @@ def ReadBios(BiosBinListBuff, BinSize, Addr, Size):
     return ReadList(BiosBinListBuff, (BinSize-(0x100000000-Addr)), Size)
 
 def GetCliSpecVersion(DramMbAddr):
-  global CliSpecRelVersion, CliSpecMajorVersion, CliSpecMinorVersion, CLI_REQ_READY_SIG, CLI_RES_READY_SIG
-  CliSpecRelVersion    = memread((DramMbAddr+CLI_SPEC_VERSION_RELEASE_OFF), 1) & 0xF
-  CliSpecMajorVersion  = memread((DramMbAddr+CLI_SPEC_VERSION_MAJOR_OFF), 2)
-  CliSpecMinorVersion  = memread((DramMbAddr+CLI_SPEC_VERSION_MINOR_OFF), 1)
-  CLI_REQ_READY_SIG    = 0xC001C001
-  CLI_RES_READY_SIG    = 0xCAFECAFE
-  if(CliSpecRelVersion == 0):
-    if(CliSpecMajorVersion >= 7):
-      CLI_REQ_READY_SIG = 0xD055C001
-      CLI_RES_READY_SIG = 0xD055CAFE
+  session = getSession()
+  if session.mailbox and (session.mailbox.address == DramMbAddr):
+    return session.mailbox.cli_spec_version  # layout of cached mailbox is already set in session
+  session.CliSpecRelVersion    = memread((DramMbAddr+CLI_SPEC_VERSION_RELEASE_OFF), 1) & 0xF
+  session.CliSpecMajorVersion  = memread((DramMbAddr+CLI_SPEC_VERSION_MAJOR_OFF), 2)
+  session.CliSpecMinorVersion  = memread((DramMbAddr+CLI_SPEC_VERSION_MINOR_OFF), 1)
+  session.CLI_REQ_READY_SIG    = 0xC001C001
+  session.CLI_RES_READY_SIG    = 0xCAFECAFE
+  if(session.CliSpecRelVersion == 0):
+    if(session.CliSpecMajorVersion >= 7):
+      session.CLI_REQ_READY_SIG = 0xD055C001
+      session.CLI_RES_READY_SIG = 0xD055CAFE
   else:
-    LEGACYMB_XML_OFF  = 0x50
-    CLI_REQ_READY_SIG = 0xD055C001
-    CLI_RES_READY_SIG = 0xD055CAFE
-  return f'{CliSpecRelVersion:d}.{CliSpecMajorVersion:d}.{CliSpecMinorVersion:d}'
+    session.LEGACYMB_XML_OFF  = 0x50
+    session.CLI_REQ_READY_SIG = 0xD055C001
+    session.CLI_RES_READY_SIG = 0xD055CAFE
+  return f'{session.CliSpecRelVersion:d}.{session.CliSpecMajorVersion:d}.{session.CliSpecMinorVersion:d}'
 
 def FixLegXmlOffset(DramMbAddr):
-  global CliSpecRelVersion, CliSpecMajorVersion, CliSpecMinorVersion, LEGACYMB_XML_OFF
-  LEGACYMB_XML_OFF     = 0x0C
-  if(CliSpecRelVersion == 0):
-    if(CliSpecMajorVersion >= 7):
-      LEGACYMB_XML_OFF  = 0x50
-      if((CliSpecMajorVersion == 7) and (CliSpecMinorVersion == 0)):
+  session = getSession()
+  session.LEGACYMB_XML_OFF     = 0x0C
+  if(session.CliSpecRelVersion == 0):
+    if(session.CliSpecMajorVersion >= 7):
+      session.LEGACYMB_XML_OFF  = 0x50
+      if((session.CliSpecMajorVersion == 7) and (session.CliSpecMinorVersion == 0)):
         LegMbOffset = memread((DramMbAddr+LEGACYMB_OFF), 4)
         if(LegMbOffset < 0xFFFF):
           LegMbOffset = DramMbAddr+LegMbOffset
         if(memread((LegMbOffset+0x4C), 4) == 0):
-          LEGACYMB_XML_OFF  = 0x50
+          session.LEGACYMB_XML_OFF  = 0x50
         else:
-          LEGACYMB_XML_OFF  = 0x4C
+          session.LEGACYMB_XML_OFF  = 0x4C
   else:
-    LEGACYMB_XML_OFF  = 0x50
+    session.LEGACYMB_XML_OFF  = 0x50
 
 def IsLegMbSigValid(DramMbAddr):
-  global CliSpecRelVersion, CliSpecMajorVersion, MerlinxXmlCliEnableAddr
+  session = getSession()
   SharedMbSig1 = memread((DramMbAddr+SHAREDMB_SIG1_OFF), 4)
   SharedMbSig2 = memread((DramMbAddr+SHAREDMB_SIG2_OFF), 4)
   if ( (SharedMbSig1 == SHAREDMB_SIG1) and (SharedMbSig2 == SHAREDMB_SIG2) ):
@@ -731,12 +1056,12 @@ def IsLegMbSigValid(DramMbAddr):
     ShareMbEntry1Sig = memread((DramMbAddr+LEGACYMB_SIG_OFF), 4)
     if (ShareMbEntry1Sig == LEGACYMB_SIG):
       FixLegXmlOffset(DramMbAddr)
-      if( (CliSpecRelVersion >=0) and (CliSpecMajorVersion >=8) ):
+      if( (session.CliSpecRelVersion >=0) and (session.CliSpecMajorVersion >=8) ):
         LegMbOffset = int(memread(DramMbAddr+LEGACYMB_OFF, 4))
         if(LegMbOffset > 0xFFFF):
-          MerlinxXmlCliEnableAddr = LegMbOffset + MERLINX_XML_CLI_ENABLED_OFF
+          session.MerlinxXmlCliEnableAddr = LegMbOffset + MERLINX_XML_CLI_ENABLED_OFF
         else:
-          MerlinxXmlCliEnableAddr = DramMbAddr + LegMbOffset + MERLINX_XML_CLI_ENABLED_OFF
+          session.MerlinxXmlCliEnableAddr = DramMbAddr + LegMbOffset + MERLINX_XML_CLI_ENABLED_OFF
       return cli_spec_version
   return False
 
@@ -747,40 +1072,50 @@ def GetDramMbAddr(display_spec=True):
 
   :return:
   """
-  global gDramSharedMbAddr, InterfaceType, LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   InitInterface()
-  writeIO(0x72, 1, 0xF0)                          # Write a byte to cmos offset 0xF0
-  result0 = int(readIO(0x73, 1) & 0xFF)              # Read a byte from cmos offset 0xBB [23:16]
-  writeIO(0x72, 1, 0xF1)                          # Write a byte to cmos offset 0xF1
-  result1 = int(readIO(0x73, 1) & 0xFF)              # Read a byte from cmos offset 0xBC [31:24]
-  dram_shared_mb_address = int((result1 << 24) | (result0 << 16))    # Get bits [31:24] of the Dram MB address
-  if IsLegMbSigValid(dram_shared_mb_address):
+  dram_shared_mb_address = session.validate_mailbox()
+  if dram_shared_mb_address:
     CloseInterface()
     return dram_shared_mb_address
-
-  writeIO(0x70, 1, 0x78)                          # Write a byte to cmos offset 0x78
-  result0 = int(readIO(0x71, 1) & 0xFF)              # Read a byte from cmos offset 0xBB [23:16]
-  writeIO(0x70, 1, 0x79)                          # Write a byte to cmos offset 0x79
-  result1 = int(readIO(0x71, 1) & 0xFF)              # Read a byte from cmos offset 0xBC [31:24]
-  dram_shared_mb_address = int((result1 << 24) | (result0 << 16))    # Get bits [31:24] of the Dram MB address
-  if IsLegMbSigValid(dram_shared_mb_address):
-    CloseInterface()
-    return dram_shared_mb_address
-
-  if gDramSharedMbAddr != 0:
-    dram_shared_mb_address = int(gDramSharedMbAddr)
-    if IsLegMbSigValid(dram_shared_mb_address):
+  # DRAM MB address [23:16] & [31:24] at cmos offset 0xF0 & 0xF1 or at legacy cmos offset 0x78 & 0x79
+  result = readcmos_block((0xF0, 0xF1, 0x78, 0x79))
+  candidates = [int((result1 << 24) | (result0 << 16)) for result0, result1 in (result[0:2], result[2:4])]
+  if session.gDramSharedMbAddr != 0:
+    candidates.append(int(session.gDramSharedMbAddr))
+  for dram_shared_mb_address in candidates:
+    cli_spec_version = IsLegMbSigValid(dram_shared_mb_address)
+    if cli_spec_version:
+      session.mailbox = DramMailboxDescriptor(dram_shared_mb_address, cli_spec_version)
       CloseInterface()
       return dram_shared_mb_address
   CloseInterface()
-  LastErrorSig = 0xD9FD  # Dram Shared MailBox Not Found
+  session.LastErrorSig = 0xD9FD  # Dram Shared MailBox Not Found
   return 0
 
 
+def readDramSharedMb(dram_shared_mb_address, size=0x200):
+  """
+  Read content of DRAM shared mailbox (signatures, CLI spec version,
+  legacy mailbox offset and CLI request/response buffer details).
+  Content of mailbox cached by current session is served without accessing the target.
+
+  :param dram_shared_mb_address: address of DRAM shared mailbox as returned by `GetDramMbAddr`
+  :param size: size of mailbox content to be read
+  :return: mailbox content
+  """
+  mailbox = getSession().mailbox
+  if (mailbox is None) or (mailbox.address != dram_shared_mb_address):
+    return memBlock(dram_shared_mb_address, size)
+  if len(mailbox.buffer) < size:
+    mailbox.buffer = bytes(memBlock(dram_shared_mb_address, size))
+  return mailbox.buffer[:size]
+
+
 def ConfXmlCli(SkipEnable=0):
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   InitInterface()
   DRAM_MbAddr = GetDramMbAddr()  # Get DRam MAilbox Address from Cmos.
   log.result(f'CLI Spec Version = {GetCliSpecVersion(DRAM_MbAddr)}')
@@ -797,20 +1132,20 @@ def ConfXmlCli(SkipEnable=0):
         except ImportError:
           log.error(f'Import error on EnableXmlCli, current Python version {sys.version}')
           CloseInterface()
-          LastErrorSig = 0x13E4  # import error
+          session.LastErrorSig = 0x13E4  # import error
           return 0xF
       Status = exc.EnableXmlCli()
       if Status == 0:
         Status = 2
-        LastErrorSig = 0xCE4E  # XmlCli support was not Enabled, its now Enabled, Reboot Required
+        session.LastErrorSig = 0xCE4E  # XmlCli support was not Enabled, its now Enabled, Reboot Required
       else:
         log.error('XmlCli support is not Available in Your BIOS, Contact your BIOS Engineer..')
         Status = 1
-        LastErrorSig = 0xC19A  # XmlCli Support not Available in BIOS
+        session.LastErrorSig = 0xC19A  # XmlCli Support not Available in BIOS
     else:
       log.error('XmlCli support is not Enable at the moment')
       Status = 3
-      LastErrorSig = 0xC19E  # XmlCli Support not Enabled
+      session.LastErrorSig = 0xC19E  # XmlCli Support not Enabled
   else:
     log.result('XmlCli support is Enabled..')
     Status = 0
@@ -819,8 +1154,8 @@ def ConfXmlCli(SkipEnable=0):
 
 
 def TriggerXmlCliEntry():
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   status = 0
   try:
     from .tools.restricted import EnableXmlCli as exc
@@ -829,94 +1164,118 @@ def TriggerXmlCliEntry():
       from .tools import EnableXmlCli as exc
     except ImportError:
       log.error(f'Import error on EnableXmlCli, current Python version {sys.version}')
-      LastErrorSig = 0x13E4  # import error
+      session.LastErrorSig = 0x13E4  # import error
       return 1
   status = exc.XmlCliApiAuthenticate()
   if status:
-    LastErrorSig = 0xE7CA  # Error Triggering XmlCli command, Authentication Failed
+    session.LastErrorSig = 0xE7CA  # Error Triggering XmlCli command, Authentication Failed
     return 1
   triggerSMI(0xF6)  # trigger S/W SMI for CLI
   return status
 
 
-def WaitForCliResponse(CLI_ResBuffAddr, Delay=1, Retries=12, PrintRes=1):
+def WaitForCliResponse(CLI_ResBuffAddr, Delay=1, Retries=12, PrintRes=1, CmdId=None):
   """
   Whenever any command is requested to execute through Command Line Interface;
   it needs to be checked if that command is responded or not.
   It may take time to respond for a specific command.
-  For that a certain delay needs to be introduced. This function waits
-  for a certain delay and checks if given command is executed and
-  returned Response buffer is returned or not for a certain amount of time
-  else it returns  Error.
+
+  Response ready signature is polled, starting after the latency observed
+  for earlier responses of the same command (or immediately for the first one)
+  with intervals growing exponentially from `CLI_POLL_INITIAL_INTERVAL` to
+  `CLI_POLL_MAX_INTERVAL`, until `Delay * Retries` seconds are elapsed.
+  CPU is halted for polling only if access method requires it, such polls are
+  never done more often than every `Delay` seconds (as in the legacy scheme).
 
   :param CLI_ResBuffAddr: Address of CLI response Buffer
-  :param Delay: The amount of delay which needs to be introduced
-  :param Retries: Number of Retries to be attempt
+  :param Delay: Interval of polling in the legacy scheme, `Delay * Retries` is the timeout in seconds
+  :param Retries: Number of polls in the legacy scheme, `Delay * Retries` is the timeout in seconds
   :param PrintRes: If this flag is set then function prints CLI response buffer contents.
+  :param CmdId: CLI command id requested, used to learn the latency of the command
   :return:
   """
-  global CliRespFlags, LastErrorSig
-  CliRespFlags = 0
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.CliRespFlags = 0
+  session.LastErrorSig = 0x0000
   ret = 0
   CommandSideEffect = ['NoSideEffect', 'WarmResetRequired', 'PowerGoodResetRequired', 'Reserved']
 
-  XmlCliRespFlags['Status'] = 0
-  XmlCliRespFlags['TimedOut'] = 0
-  XmlCliRespFlags['CantExe'] = 0
-  XmlCliRespFlags['WrongParam'] = 0
-  XmlCliRespFlags['SideEffect'] = 'NoSideEffect'
-
-  for retryCnt in range(0x0, Retries, 1):
-    if UfsFlag:
-      time.sleep(Delay)
+  session.XmlCliRespFlags['Status'] = 0
+  session.XmlCliRespFlags['TimedOut'] = 0
+  session.XmlCliRespFlags['CantExe'] = 0
+  session.XmlCliRespFlags['WrongParam'] = 0
+  session.XmlCliRespFlags['SideEffect'] = 'NoSideEffect'
+
+  HaltRequired = getattr(session.check_access(), "halt_required", True)
+  StartTime = time.perf_counter()
+  Deadline = StartTime + (Delay * Retries)
+  Wait = session.cli_latency.get(CmdId, 0.0)
+  Interval = CLI_POLL_INITIAL_INTERVAL
+  MaxInterval = CLI_POLL_MAX_INTERVAL
+  if HaltRequired:
+    Wait = max(Wait, Delay)
+    Interval = Delay
+    MaxInterval = max(Delay, CLI_POLL_MAX_INTERVAL)
+  while True:
+    if Wait > 0:
+      time.sleep(max(0.0, min(Wait, Deadline - time.perf_counter())))
+    if HaltRequired:
       haltcpu()
-    else:
-      haltcpu(delay=Delay)
+    ResReadySig = int(memread(CLI_ResBuffAddr + CLI_REQ_RES_READY_SIG_OFF, 4))
+    if ResReadySig == session.CLI_RES_READY_SIG:    # Verify if BIOS is done with the request
+      break
+    # CLI Response is not Ready yet
+    if session.MerlinxXmlCliEnableAddr != 0:
+      if int(memread(session.MerlinxXmlCliEnableAddr, 1)) & 0x2 == 0:  # if BIT1 is cleared, this means XmlCli Interface was disabled
+        log.error('XmlCli Interface is Disabled, exiting..')
+        session.XmlCliRespFlags['TimedOut'] = 1
+        session.LastErrorSig = 0xC1D1  # XmlCli Interface is Disabled
+        return 1
+    if HaltRequired:
+      runcpu()
+    if time.perf_counter() >= Deadline:
+      log.error('CLI Response not ready even after retries, exiting..')
+      session.XmlCliRespFlags['TimedOut'] = 1
+      session.LastErrorSig = 0xC2E0  # XmlCli Resp. Timed-Out even after retries
+      return 1
+    log.debug('CLI Response not yet ready, retrying..')
+    Wait = Interval
+    Interval = min(Interval * 2, MaxInterval)
+
+  Latency = time.perf_counter() - StartTime
+  if CmdId is not None:
+    Average = session.cli_latency.get(CmdId)
+    session.cli_latency[CmdId] = Latency if Average is None else Average + CLI_LATENCY_WEIGHT * (Latency - Average)
+  if PrintRes == 1:
     ResHeaderbuff = memBlock(CLI_ResBuffAddr, CLI_REQ_RES_BUFF_HEADER_SIZE)
-    ResReadySig = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_SIG_OFF, 4, HEX)
-    if ResReadySig == CLI_RES_READY_SIG:    # Verify if BIOS is done with the request
-      if PrintRes == 1:
-        ResCmdId = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_CMD_OFF, 2, HEX)
-        ResFlags = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_FLAGS_OFF, 2, HEX)
-        CliRespFlags = ResFlags
-        ResStatus = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_STATUS_OFF, 4, HEX)
-        ResParamSize = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_PARAMSZ_OFF, 4, HEX)
-        XmlCliRespFlags['Status'] = ResStatus
-        XmlCliRespFlags['CantExe'] = ((ResFlags >> 1) & 0x1)
-        XmlCliRespFlags['WrongParam'] = (ResFlags & 0x1)
-        XmlCliRespFlags['SideEffect'] = CommandSideEffect[int((ResFlags >> 2) & 0xF)]
-        log.info('CLI Response Header:')
-        log.info(f'   CmdID = 0x{ResCmdId:X} (\"{CliCmdDict.get(ResCmdId, "??")}\") ')
-        log.info(
-          f'   Status = 0x{ResStatus:X};  ParamSize = 0x{ResParamSize:X};  Flags.WrongParam = {XmlCliRespFlags["WrongParam"]:X};')
-        log.info(
-          f'   Flags.CantExe = {XmlCliRespFlags["CantExe"]:X};  Flags.SideEffects = \"{XmlCliRespFlags["SideEffect"]}\"; ')
-        if ((ResFlags & 0x3) == 0) and (ResStatus == 0):
-          log.info('CLI command executed successfully..')
-        else:
-          log.error('CLI command executed, but with errors. See Logfile.')
-          if XmlCliRespFlags['Status'] != 0:
-            LastErrorSig = 0xC590  # XmlCli Return Status is Non-Zero
-          elif XmlCliRespFlags['CantExe'] != 0:
-            LastErrorSig = 0xCA8E  # XmlCli Resp. returned Cant Execute
-          elif XmlCliRespFlags['WrongParam'] != 0:
-            LastErrorSig = 0xC391  # XmlCli Resp. returned Wring Parameter
-          ret = 1
-      return ret
-    else:  # CLI Response is not Ready yet
-      if MerlinxXmlCliEnableAddr != 0:
-        if int(memread(MerlinxXmlCliEnableAddr, 1)) & 0x2 == 0:  # if BIT1 is cleared, this means XmlCli Interface was disabled
-          log.error('XmlCli Interface is Disabled, exiting..')
-          XmlCliRespFlags['TimedOut'] = 1
-          LastErrorSig = 0xC1D1  # XmlCli Interface is Disabled
-          return 1
-      log.info('CLI Response not yet ready, retrying..')
-    runcpu()
-  log.error('CLI Response not ready even after retries, exiting..')
-  XmlCliRespFlags['TimedOut'] = 1
-  LastErrorSig = 0xC2E0  # XmlCli Resp. Timed-Out even after retries
-  return 1
+    ResCmdId = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_CMD_OFF, 2, HEX)
+    ResFlags = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_FLAGS_OFF, 2, HEX)
+    session.CliRespFlags = ResFlags
+    ResStatus = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_STATUS_OFF, 4, HEX)
+    ResParamSize = ReadBuffer(ResHeaderbuff, CLI_REQ_RES_READY_PARAMSZ_OFF, 4, HEX)
+    session.XmlCliRespFlags['Status'] = ResStatus
+    session.XmlCliRespFlags['CantExe'] = ((ResFlags >> 1) & 0x1)
+    session.XmlCliRespFlags['WrongParam'] = (ResFlags & 0x1)
+    session.XmlCliRespFlags['SideEffect'] = CommandSideEffect[int((ResFlags >> 2) & 0xF)]
+    log.info('CLI Response Header:')
+    log.info(f'   CmdID = 0x{ResCmdId:X} (\"{CliCmdDict.get(ResCmdId, "??")}\") ')
+    log.info(
+      f'   Status = 0x{ResStatus:X};  ParamSize = 0x{ResParamSize:X};  Flags.WrongParam = {session.XmlCliRespFlags["WrongParam"]:X};')
+    log.info(
+      f'   Flags.CantExe = {session.XmlCliRespFlags["CantExe"]:X};  Flags.SideEffects = \"{session.XmlCliRespFlags["SideEffect"]}\"; ')
+    log.info(f'   Responded in {Latency * 1e3:.3f} ms')
+    if ((ResFlags & 0x3) == 0) and (ResStatus == 0):
+      log.info('CLI command executed successfully..')
+    else:
+      log.error('CLI command executed, but with errors. See Logfile.')
+      if session.XmlCliRespFlags['Status'] != 0:
+        session.LastErrorSig = 0xC590  # XmlCli Return Status is Non-Zero
+      elif session.XmlCliRespFlags['CantExe'] != 0:
+        session.LastErrorSig = 0xCA8E  # XmlCli Resp. returned Cant Execute
+      elif session.XmlCliRespFlags['WrongParam'] != 0:
+        session.LastErrorSig = 0xC391  # XmlCli Resp. returned Wring Parameter
+      ret = 1
+  return ret
 
 
 def readxmldetails(dram_shared_mailbox_buffer):
@@ -932,6 +1291,7 @@ def readxmldetails(dram_shared_mailbox_buffer):
   :param dram_shared_mailbox_buffer: Shared Mailbox temporary buffer address
   :return:
   """
+  session = getSession()
   SharedMbSig1 = ReadBuffer(dram_shared_mailbox_buffer, SHAREDMB_SIG1_OFF, 4, HEX)
   SharedMbSig2 = ReadBuffer(dram_shared_mailbox_buffer, SHAREDMB_SIG2_OFF, 4, HEX)
   GBT_XML_Addr = 0
@@ -941,9 +1301,9 @@ def readxmldetails(dram_shared_mailbox_buffer):
     if ShareMbEntry1Sig == LEGACYMB_SIG:
       LegMbOffset = ReadBuffer(dram_shared_mailbox_buffer, LEGACYMB_OFF, 4, HEX)
       if LegMbOffset > 0xFFFF:
-        GBT_XML_Addr = memread(LegMbOffset + LEGACYMB_XML_OFF, 4) + 4
+        GBT_XML_Addr = memread(LegMbOffset + session.LEGACYMB_XML_OFF, 4) + 4
       else:
-        GBT_XML_Addr = ReadBuffer(dram_shared_mailbox_buffer, LegMbOffset + LEGACYMB_XML_OFF, 4, HEX) + 4
+        GBT_XML_Addr = ReadBuffer(dram_shared_mailbox_buffer, LegMbOffset + session.LEGACYMB_XML_OFF, 4, HEX) + 4
       GBT_XML_Size = memread(GBT_XML_Addr - 4, 4)
   return GBT_XML_Addr, GBT_XML_Size
 
@@ -956,8 +1316,8 @@ def isxmlvalid(gbt_xml_address, gbt_xml_size):
   :param gbt_xml_size: Size of GBT XML
   :return:
   """
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   try:
     temp_buffer = memBlock(gbt_xml_address, 0x08)  # Read/save parameter buffer
     SystemStart = ReadBuffer(temp_buffer, 0, 0x08, ASCII)
@@ -966,11 +1326,11 @@ def isxmlvalid(gbt_xml_address, gbt_xml_size):
     if (SystemStart == XML_START) and (SystemEnd == XML_END):
       return True
     else:
-      LastErrorSig = 0x8311  # Xml data is in-valid
+      session.LastErrorSig = 0x8311  # Xml data is in-valid
       return False
   except Exception as e:
     log.error(f'Exception detected when determining if xml is valid.\n {e}')
-    LastErrorSig = 0xEC09  # Exception detected
+    session.LastErrorSig = 0xEC09  # Exception detected
     return False
 
 
@@ -1068,10 +1428,11 @@ def fetchHdrNknob(KnobFilename=None, PlatformXml=None):
   :param PlatformXml:
   :return:
   """
+  session = getSession()
   if KnobFilename == None:
-    KnobFilename = KnobsXmlFile
+    KnobFilename = session.KnobsXmlFile
   if PlatformXml == None:
-    PlatformXml = PlatformConfigXml
+    PlatformXml = session.PlatformConfigXml
   if SaveXml(PlatformXml) == 1:  # Check and Save the GBT XML knobs section.
     log.error('Aborting due to Error!')
     return 1
@@ -1111,66 +1472,176 @@ def fetchHdrNknob(KnobFilename=None, PlatformXml=None):
     newFile.write(file_content)
 
 
-def PatchXmlData(XmlListBuff, XmlAddr, XmlSize):
-  XmlPatchDataFound = 0
-  NewXmlPatchDataFound = 0
+def readXmlPatchData(XmlAddr, XmlSize):
+  """
+  Read XML patch packet (`$XKDT` or legacy `$XKDL`) following the XML in target memory
+
+  :param XmlAddr: target address of XML
+  :param XmlSize: size of XML
+  :return: tuple of (patch packet buffer, True if packet is `$XKDT`), buffer is None if packet is not found
+  """
   PacketAddr = ((XmlAddr+XmlSize+0xFFF) & 0xFFFFF000)
   for count in range (0, 4):
     PacketHdr  = int(memread(PacketAddr, 8))
     PacketSize = ((PacketHdr >> 40) & 0xFFFFFF)
     if ( ((PacketHdr & 0xFFFFFFFFFF) == 0x4c444B5824) and (PacketSize != 0) ):  # cmp with $XKDL
-      XmlKnobsDeltaBuff = memBlock((PacketAddr+8), PacketSize)
-      XmlPatchDataFound = 1
-      break
+      return memBlock((PacketAddr+8), PacketSize), False
     if ( ((PacketHdr & 0xFFFFFFFFFF) == 0x54444B5824) and (PacketSize != 0) ):  # cmp with $XKDT
-      XmlKnobsDeltaBuff = memBlock((PacketAddr+8), PacketSize)
-      NewXmlPatchDataFound = 1
-      break
+      return memBlock((PacketAddr+8), PacketSize), True
     PacketAddr = ((PacketAddr+8+PacketSize+0xFFF) & 0xFFFFF000)
-  if( (XmlPatchDataFound == 1) or (NewXmlPatchDataFound == 1) ):
-    offset = 0
-    while(1):   # read and print the return knobs entry parameters from CLI's response buffer
-      if (offset >= PacketSize):
+  return None, False
+
+
+def parseXmlPatchData(XmlKnobsDeltaBuff, NewXmlPatchDataFound):
+  """
+  Parse entries of XML patch packet
+
+  :param XmlKnobsDeltaBuff: patch packet buffer
+  :param NewXmlPatchDataFound: True for `$XKDT` packet, False for legacy `$XKDL` packet
+  :return: list of tuple (offset of value in XML, size of value in bytes, offset of little endian value in patch packet)
+  """
+  PatchEntries = []
+  offset = 0
+  PacketSize = len(XmlKnobsDeltaBuff) if XmlKnobsDeltaBuff else 0
+  while (offset < PacketSize):
+    KnobEntryOffset = int.from_bytes(XmlKnobsDeltaBuff[offset:offset+3], byteorder='little')
+    Data16          = int.from_bytes(XmlKnobsDeltaBuff[offset+3:offset+5], byteorder='little')
+    DataOfst        = KnobEntryOffset+(Data16 & 0xFFF)
+    if(NewXmlPatchDataFound):
+      DataSize    = XmlKnobsDeltaBuff[offset+5] if (offset+5 < PacketSize) else 0
+      ValueOfst   = offset + 6
+    else:
+      DataSize    = (Data16 >> 12) & 0xF
+      ValueOfst   = offset + 5
+    PatchEntries.append((DataOfst, DataSize, ValueOfst))
+    offset = ValueOfst + DataSize
+  return PatchEntries
+
+
+def PatchXmlData(XmlBuff, XmlAddr, XmlSize):
+  """
+  Apply knob values of XML patch packet in place on XML content
+
+  :param XmlBuff: XML content as bytearray (or memoryview of it)
+  :param XmlAddr: target address of XML
+  :param XmlSize: size of XML
+  """
+  XmlKnobsDeltaBuff, NewXmlPatchDataFound = readXmlPatchData(XmlAddr, XmlSize)
+  if XmlKnobsDeltaBuff is not None:
+    for DataOfst, DataSize, ValueOfst in parseXmlPatchData(XmlKnobsDeltaBuff, NewXmlPatchDataFound):
+      # value is little endian in packet, written in XML as big endian ASCII hex
+      Value = bytes(XmlKnobsDeltaBuff[ValueOfst:ValueOfst+DataSize]).ljust(DataSize, b'\x00')
+      XmlBuff[DataOfst:DataOfst+(DataSize*2)] = b''.join(ASCII_HEX_TABLE[Byte] for Byte in reversed(Value))
+    log.info(f'Patch buffer data size = {len(XmlKnobsDeltaBuff):d} bytes')
+
+
+def SaveXmlBlockDelta(filename, XmlAddr, XmlSize):
+  """
+  Download regular (uncompressed) XML reading only the blocks predicted to differ from the cached copy
+
+  Blocks holding values listed by the current patch packet and by the patch packets seen
+  at earlier downloads (recorded in cache) are read, rest of the blocks are served from cache.
+  Few sampled chunks outside those blocks are compared with target to validate the
+  prediction, on any mismatch (or if XML is not cached) complete XML is downloaded.
+
+  :param filename: file to save XML
+  :param XmlAddr: target address of XML
+  :param XmlSize: size of XML
+  :return: number of bytes read from target for the XML content
+  """
+  XmlCache = xml_cache.get_xml_cache()
+  XmlHeader = memBlock(XmlAddr, min(XmlSize, xml_cache.XML_HEADER_SIZE))
+  XmlCacheKey = XmlCache.fingerprint(XmlHeader, XmlSize, b'', b'')
+  PatchOffsets = [(DataOfst, DataSize * 2) for DataOfst, DataSize, _ in parseXmlPatchData(*readXmlPatchData(XmlAddr, XmlSize))]
+  CachedXml, Metadata = XmlCache.get_entry(XmlCacheKey)
+  XmlData = None
+  BytesRead = len(XmlHeader)
+  if (CachedXml is not None) and (len(CachedXml) == XmlSize):
+    PredictedOffsets = PatchOffsets + [tuple(Entry) for Entry in Metadata.get('patch_offsets', [])]
+    Blocks = xml_cache.get_blocks(XmlSize, PredictedOffsets)
+    Blocks.add(0)
+    XmlData = CachedXml
+    for SampleOffset, SampleSize in xml_cache.get_samples(XmlSize, Blocks):
+      BytesRead += SampleSize
+      if memBlock(XmlAddr + SampleOffset, SampleSize) != XmlData[SampleOffset:SampleOffset+SampleSize]:
+        log.result('Target XML differs from cached XML beyond the predicted blocks, downloading complete XML..')
+        XmlData = None
         break
-      KnobEntryOffset = ReadBuffer(XmlKnobsDeltaBuff, offset+0, 3, HEX)
-      Data16          = ReadBuffer(XmlKnobsDeltaBuff, offset+3, 2, HEX)
-      DataOfst        = KnobEntryOffset+(Data16 & 0xFFF)
-      if(NewXmlPatchDataFound):
-        DataSize    = ReadBuffer(XmlKnobsDeltaBuff, offset+5, 1, HEX)
-        ValueToReplace  = ReadBuffer(XmlKnobsDeltaBuff, offset+6, DataSize, HEX)
-      else:
-        DataSize    = (Data16 >> 12) & 0xF
-        ValueToReplace  = ReadBuffer(XmlKnobsDeltaBuff, offset+5, DataSize, HEX)
-      StrValToReplace = hex(ValueToReplace)[2::].strip('L').zfill(DataSize*2).upper()
-      XmlListBuff[DataOfst:DataOfst+(DataSize*2)] = list(StrValToReplace.encode())
-      if(NewXmlPatchDataFound):
-        offset = offset + 6 + DataSize
-      else:
-        offset = offset + 5 + DataSize
-    log.info(f'Patch buffer data size = {PacketSize:d} bytes')
+  if XmlData is not None:
+    XmlView = memoryview(XmlData)
+    for Start, End in xml_cache.get_block_ranges(XmlSize, Blocks):
+      memBlockInto(XmlAddr + Start, XmlView[Start:End])
+      BytesRead += End - Start
+    XmlView.release()
+    log.result(f'Downloaded 0x{BytesRead:X} of 0x{XmlSize:X} bytes of XML, rest is served from XML cache')
+  else:
+    log.result('Downloading complete Target XML..')
+    XmlData = memBlock(XmlAddr, XmlSize)
+    BytesRead = XmlSize
+  WriteXml(filename, XmlData)
+  XmlCache.put(XmlCacheKey, bytes(XmlData), XmlHeader, patch_offsets=PatchOffsets)
+  return BytesRead
+
 
 InValidXmlChar=['\x00', '\x01', '\x02', '\x03', '\x04', '\x05', '\x06', '\x07', '\x08', '\x0B', '\x0C', '\x0E', '\x0F', '\x10', '\x11', '\x12', '\x13', '\x14', '\x15', '\x16', '\x17', '\x18', '\x19', '\x1A', '\x1B', '\x1C', '\x1D', '\x1E', '\x1F', '\x7F', '\x80', '\x81', '\x82', '\x83', '\x84', '\x86', '\x87', '\x88', '\x89', '\x8A', '\x8B', '\x8C', '\x8D', '\x8E', '\x8F', '\x90', '\x91', '\x92', '\x93', '\x94', '\x95', '\x96', '\x97', '\x98', '\x99', '\x9A', '\x9B', '\x9C', '\x9D', '\x9E', '\x9F', '\xAE','\xB0']
-def SanitizeXml(filename):
+def WriteXml(filename, XmlData):
+  """
+  Write XML replacing the control characters, chunk by chunk
+
+  :param filename: XML file to be written
+  :param XmlData: content of XML as bytes like, str is written as by text mode file
+  """
+  if isinstance(XmlData, str):
+    XmlData = XmlData.replace('\n', os.linesep).encode(locale.getpreferredencoding(False))
+  with open(filename, 'wb') as XmlFile:
+    for Offset in range(0, len(XmlData), XML_SANITIZATION_CHUNK_SIZE):
+      XmlFile.write(XmlData[Offset:Offset+XML_SANITIZATION_CHUNK_SIZE].translate(XML_SANITIZATION_TABLE))
+
+
+def SanitizeXmlControlChars(filename, Table=XML_SANITIZATION_TABLE):
+  """
+  Replace the control characters of XML file in place, chunk by chunk
+
+  :param filename: XML file
+  :param Table: translation table of bytes to be replaced
+  """
+  with open(filename, 'r+b') as XmlFile:
+    while True:
+      Offset = XmlFile.tell()
+      Chunk = XmlFile.read(XML_SANITIZATION_CHUNK_SIZE)
+      if not Chunk:
+        break
+      CleanChunk = Chunk.translate(Table)
+      if CleanChunk != Chunk:
+        XmlFile.seek(Offset)
+        XmlFile.write(CleanChunk)
+
+
+def SanitizeXml(filename, XmlAddr=0):
   """
   Function to sanitize the given xmlfile
+
+  Control characters are expected to be replaced while writing the XML (`WriteXml`),
+  syntax of XML is validated by the same parse which builds index of its knob entries.
+
   :param filename: platform_config xml file path
-  :return: None
+  :param XmlAddr: target address of XML, for the knob entry index
+  :return: index of knob entries of XML (`KnobEntryIndex`), None if file does not exist
   """
-  try:
-    MyTree = ET.parse(filename)
+  if not os.path.isfile(filename):
+    return None
+  KnobIndex = KnobEntryIndex.from_file(filename, XmlAddr, use_cache=False)
+  if KnobIndex.valid:
     log.info('SanitizeXml(): No XML syntax errors found with source XML file.')
-  except:
+  else:
     log.info('SanitizeXml(): Fixing XML syntax errors found with source XML file.')
-    with open(filename, mode='r', newline='') as input_file, open(filename + '.clean', mode='w', newline='') as output_file:
-      for line in input_file.readlines():
-        cleaned_content = line.translate(Xml_Sanitization_Mapping)
-        output_file.write(cleaned_content)
-    RenameFile(f"{filename}", f"{filename}.raw")
-    RenameFile(f"{filename}.clean", f"{filename}")
+    SanitizeXmlControlChars(filename, XML_SYNTAX_SANITIZATION_TABLE)
+    KnobIndex = KnobEntryIndex.from_file(filename, XmlAddr, use_cache=False)
+  return KnobIndex
 
 def IsXmlGenerated():
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   Status = 0
   InitInterface()
   DRAM_MbAddr = GetDramMbAddr() # Get DRam Mailbox Address from Cmos.
@@ -1180,12 +1651,12 @@ def IsXmlGenerated():
     log.error('Dram Shared Mailbox not Valid, hence exiting')
     CloseInterface()
     return 1
-  DramSharedMBbuf = memBlock(DRAM_MbAddr,0x200) # Read/save parameter buffer
+  DramSharedMBbuf = readDramSharedMb(DRAM_MbAddr,0x200) # Read/save parameter buffer
   (XmlAddr,XmlSize)  = readxmldetails(DramSharedMBbuf) # read GBTG XML address and Size
   if (XmlAddr == 0):
     log.error('Platform Configuration XML not yet generated, hence exiting')
     CloseInterface()
-    LastErrorSig = 0x8AD0  # Xml Address is Zero
+    session.LastErrorSig = 0x8AD0  # Xml Address is Zero
     return 1
   if(isxmlvalid(XmlAddr,XmlSize)):
     log.result('Xml Is Generated and it is Valid')
@@ -1209,6 +1680,7 @@ NVAR_SIZE_OFFSET                  = 0x10
 BIOS_KNOB_BIN_GUID_OFFSET         = 0x12
 
 ZeroGuid              = [ 0x00000000, 0x0000, 0x0000, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00 ]
+ZeroGuidKey           = buffer_reader.ZERO_GUID_KEY
 SetupTypeHiiDict      = { EFI_IFR_ONE_OF_OP:'oneof', EFI_IFR_NUMERIC_OP:'numeric', EFI_IFR_CHECKBOX_OP:'checkbox', EFI_IFR_STRING_OP:'string', 0xF:'ReadOnly' }
 SetupTypeBinDict      = { 0x5:'oneof', 0x7:'numeric', 0x6:'checkbox', 0x8:'string', 0xF:'ReadOnly'}
 SetupTypeBin2ValDict  = { 0x5:EFI_IFR_ONE_OF_OP, 0x7:EFI_IFR_NUMERIC_OP, 0x6:EFI_IFR_CHECKBOX_OP, 0x8:EFI_IFR_STRING_OP }
@@ -1216,26 +1688,24 @@ OldBinNvarNameDict    = { 0: 'Setup', 1: 'ServerMgmt'}
 OldBinNvarNameDictPly = { 0 :'Setup', 1 :'SocketIioConfig', 2 :'SocketCommonRcConfig', 3 :'SocketMpLinkConfig', 4 :'SocketMemoryConfig', 5 :'SocketMiscConfig', 6 :'SocketPowerManagementConfig', 7 :'SocketProcessorCoreConfig', 8 :'SvOtherConfiguration', 9 :'SvPchConfiguration' }
 
 def GuidStr(GuidList):
+  if isinstance(GuidList, bytes):  # 16-byte key of GUID
+    GuidList = buffer_reader.guid_list(GuidList)
   GuidString = '{ 0x%08X, 0x%04X, 0x%04X, { 0x%02X, 0x%02X, 0x%02X, 0x%02X, 0x%02X, 0x%02X, 0x%02X, 0x%02X }}' %(GuidList[0], GuidList[1], GuidList[2], GuidList[3], GuidList[4], GuidList[5], GuidList[6], GuidList[7], GuidList[8], GuidList[9], GuidList[10])
   return GuidString
 
 def FetchGuid(BufferList, Offset):
-  GuidList = []
   if (len(BufferList) > (Offset + 0x10)):
-    GuidList.append(ReadList(BufferList, (Offset+0x0), 4))
-    GuidList.append(ReadList(BufferList, (Offset+0x4), 2))
-    GuidList.append(ReadList(BufferList, (Offset+0x6), 2))
-    GuidList.append(ReadList(BufferList, (Offset+0x8), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0x9), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xA), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xB), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xC), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xD), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xE), 1))
-    GuidList.append(ReadList(BufferList, (Offset+0xF), 1))
-  else:
-    GuidList = ZeroGuid
-  return GuidList
+    return buffer_reader.guid_list(buffer_reader.read_guid(BufferList, Offset))
+  return ZeroGuid
+
+def FetchGuidKey(BufferList, Offset):
+  """16-byte key of GUID at given offset, comparable with `GuidKey` of GUID list"""
+  if (len(BufferList) > (Offset + 0x10)):
+    return buffer_reader.read_guid(BufferList, Offset)
+  return ZeroGuidKey
+
+def GuidKey(GuidList):
+  return buffer_reader.guid_key(GuidList)
 
 def KnobsDataToXmlFile(OutFile, BiosKnobDict={}):
   NoOfVars = len(BiosKnobDict)
@@ -1273,8 +1743,11 @@ def KnobsDataToXmlFile(OutFile, BiosKnobDict={}):
   OutFile.write(result)
 
 def BiosKnobsDataBinParser(BiosKnobBinFile, BiosIdString='', StartOfst=0x1C, parselite=False):
-  with open(BiosKnobBinFile, 'rb') as BiosKnobFile:
-    BiosKnobBinBuff = list(BiosKnobFile.read())
+  if isinstance(BiosKnobBinFile, (bytes, bytearray, memoryview)):  # already in memory
+    BiosKnobBinBuff = BiosKnobBinFile
+  else:
+    with open(BiosKnobBinFile, 'rb') as BiosKnobFile:
+      BiosKnobBinBuff = BiosKnobFile.read()
   BiosKnobDict = {}
   TmpKnobDict = {}
   TmpDupKnobDict = {}
@@ -1310,12 +1783,7 @@ def BiosKnobsDataBinParser(BiosKnobBinFile, BiosIdString='', StartOfst=0x1C, par
           NvarGuid = FetchGuid(BiosKnobBinBuff, (BiosKnobBinPtr+BIOS_KNOB_BIN_GUID_OFFSET))
           NvarSize = ReadList(BiosKnobBinBuff, BiosKnobBinPtr+NVAR_SIZE_OFFSET, 2)
         NvarNameOfst = ReadList(BiosKnobBinBuff, (BiosKnobBinPtr+NVAR_NAME_OFFSET), 1)
-        NvarName = ''
-        for VarSizeCount in range (0, 0x30):
-          Val = ReadList(BiosKnobBinBuff, (BiosKnobBinPtr+NvarNameOfst+VarSizeCount), 1)
-          if(Val == 0):
-            break
-          NvarName = NvarName + chr(Val)
+        NvarName = buffer_reader.read_c_string(BiosKnobBinBuff, (BiosKnobBinPtr+NvarNameOfst), 0x30)
         if(KnobBinRevision >= 3): # revision equal or higher than 0.3?
           DataBinHdrSize = BIOS_KNOBS_DATA_BIN_HDR_SIZE_V03
         else:
@@ -1356,22 +1824,12 @@ def BiosKnobsDataBinParser(BiosKnobBinFile, BiosIdString='', StartOfst=0x1C, par
           SetupTypeBin = SetupTypeBin2ValDict.get(KnobType_bin, INVALID_KNOB_SIZE)
         if(BinHdrSig == '$NVRO'):
           SetupTypeBin = 0xF  # indicates its "Readonly" Type
-        StrSize = 0
-        while(ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr+StrSize, 1)):
-          StrSize = StrSize + 1
-        if(StrSize):
-          KnobName = ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr, StrSize, ASCII)
-        else:
-          KnobName = ''
-        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + StrSize + 1
-        StrSize = 0
-        while(ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr+StrSize, 1)):
-          StrSize = StrSize + 1
-        if(StrSize):
-          KnobDepex = ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr, StrSize, ASCII)
-        else:
+        KnobName = buffer_reader.read_c_string(BiosKnobBinBuff, tmpBiosKnobBinPtr)
+        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + len(KnobName) + 1
+        KnobDepex = buffer_reader.read_c_string(BiosKnobBinBuff, tmpBiosKnobBinPtr)
+        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + len(KnobDepex) + 1
+        if(KnobDepex == ''):
           KnobDepex = 'TRUE'
-        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + StrSize + 1
         if(parselite):
           if(KnobOffset not in TmpKnobDict):
             KnobNameList[KnobName] = KnobOffset
@@ -1386,22 +1844,12 @@ def BiosKnobsDataBinParser(BiosKnobBinFile, BiosIdString='', StartOfst=0x1C, par
       TmpDupKnobDict = {}
       DupCount = 0
       while( tmpBiosKnobBinPtr < (BiosKnobBinPtr+NvarPktSize) ):
-        StrSize = 0
-        while(ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr+StrSize, 1)):
-          StrSize = StrSize + 1
-        if(StrSize):
-          DupKnobName = ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr, StrSize, ASCII)
-        else:
-          DupKnobName = ''
-        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + StrSize + 1
-        StrSize = 0
-        while(ReadList(BiosKnobBinBuff, (tmpBiosKnobBinPtr+StrSize), 1)):
-          StrSize = StrSize + 1
-        if(StrSize):
-          DupKnobDepex = ReadList(BiosKnobBinBuff, tmpBiosKnobBinPtr, StrSize, ASCII)
-        else:
+        DupKnobName = buffer_reader.read_c_string(BiosKnobBinBuff, tmpBiosKnobBinPtr)
+        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + len(DupKnobName) + 1
+        DupKnobDepex = buffer_reader.read_c_string(BiosKnobBinBuff, tmpBiosKnobBinPtr)
+        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + len(DupKnobDepex) + 1
+        if(DupKnobDepex == ''):
           DupKnobDepex = 'TRUE'
-        tmpBiosKnobBinPtr = tmpBiosKnobBinPtr + StrSize + 1
         TmpDupKnobDict[DupCount] = { 'DupKnobName':DupKnobName, 'DupDepex':DupKnobDepex }
         DupCount = DupCount + 1
       BiosKnobDict[VarId]['DupKnobDict'] = TmpDupKnobDict
@@ -1427,11 +1875,12 @@ def Str2Int(StrVal):
   return int(StrVal)
 
 # save XmlLite generated from BiosKnobsData bin to desired file.
-def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDict={}):
-  global LastErrorSig
-  LastErrorSig = 0x0000
-  Binfilename = os.path.join(TempFolder, "BiosKnobsData.bin")
-  RemoveFile(Binfilename)
+def SaveXmlLite(filename=None, Operation='savexml', UserKnobsDict={}):
+  session = getSession()
+  if filename is None:
+    filename = session.PlatformConfigLiteXml
+  session.LastErrorSig = 0x0000
+  BiosKnobsData = None
   Status = 0
   InitInterface()
   DRAM_MbAddr = GetDramMbAddr() # Get DRam MAilbox Address from Cmos.
@@ -1439,12 +1888,12 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
     log.error('Dram Shared Mailbox not Valid, hence exiting')
     CloseInterface()
     return 1
-  DramSharedMBbuf = memBlock(DRAM_MbAddr,0x200) # Read/save parameter buffer
+  DramSharedMBbuf = readDramSharedMb(DRAM_MbAddr,0x200) # Read/save parameter buffer
   (XmlAddr,XmlSize)  = readxmldetails(DramSharedMBbuf) # read GBTG XML address and Size
   if (XmlAddr == 0):
     log.error('Platform Configuration XML not yet generated, hence exiting')
     CloseInterface()
-    LastErrorSig = 0x8AD0  # Xml Address is Zero
+    session.LastErrorSig = 0x8AD0  # Xml Address is Zero
     return 1
   IndependentLite = False
   if(isxmlvalid(XmlAddr,XmlSize)):
@@ -1461,12 +1910,9 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
     if ( ((PacketHdr & 0xFFFFFFFFFF) == 0x424B4E5424) and (PacketSize != 0) ):  # cmp with $TNKB
       if Operation == "savexml":
         log.info('Found Tiano Compressed BiosKnobsData Bin, Downloading it')
-      TempInFile = os.path.join(TempFolder, "CmpBiosKnobsData.bin")
-      memsave(TempInFile, (PacketAddr+8), int(PacketSize))
       try:
-        utils.system_call(cmd_lis=[TianoCompressUtility, "-d", "-q", TempInFile, "-o", Binfilename])
-        RemoveFile(TempInFile)
-        if os.path.getsize(Binfilename):
+        BiosKnobsData = compress.tiano_decompress_data(memBlock((PacketAddr+8), int(PacketSize)))
+        if len(BiosKnobsData):
           ComprXmlFound = True
           if Operation == "savexml":
             log.info('Tiano Compressed BiosKnobsData Bin Decompressed Successfully')
@@ -1479,11 +1925,11 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
   else:
     log.error('Compressed Data is not supported, aborting')
     CloseInterface()
-    LastErrorSig = 0x8311  # Xml is invalid
+    session.LastErrorSig = 0x8311  # Xml is invalid
     return 1
 
   MyKnobsDict = {}
-  MyKnobsDict = BiosKnobsDataBinParser(Binfilename, BiosIdString='', StartOfst=0, parselite=True)
+  MyKnobsDict = BiosKnobsDataBinParser(BiosKnobsData, BiosIdString='', StartOfst=0, parselite=True)
 
   if(Operation !='savexml'):
     if(len(UserKnobsDict) == 0):
@@ -1538,12 +1984,12 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
     FinalNvarBuffStr = FinalNvarBuffStr + '1D90FADE' + NvarBuffHeaderStr + '00'.zfill(18) + HexLiFy('Def'+MyKnobsDict[NvarCount]['NvarName']) + '00'.zfill(2)
     VarCount = VarCount + 1
   if(FinalNvarBuffStr != ''):
-    binfile = os.path.join(TempFolder, 'NvarReqBuff.bin')
+    binfile = os.path.join(session.TempFolder, 'NvarReqBuff.bin')
     with open(binfile, 'wb') as file_ptr:
       file_ptr.write(binascii.unhexlify(FinalNvarBuffStr))
 
   DRAM_MbAddr = GetDramMbAddr() # Get DRam Mailbox Address.
-  dram_shared_mailbox_buffer = memBlock(DRAM_MbAddr,0x200) # Read/save parameter buffer
+  dram_shared_mailbox_buffer = readDramSharedMb(DRAM_MbAddr,0x200) # Read/save parameter buffer
   CLI_ReqBuffAddr = readclireqbufAddr(DramSharedMBbuf)  # Get CLI Request Buffer Address
   CLI_ResBuffAddr = readcliresbufAddr(DramSharedMBbuf)  # Get CLI Response Buffer Address
   if Operation != "savexml":
@@ -1553,16 +1999,16 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
     if Operation != "savexml":
       log.error('CLI buffers are not valid or not supported, Aborting due to Error!')
     CloseInterface()
-    LastErrorSig = 0xC140  # XmlCli Req or Resp Buffer Address is Zero
+    session.LastErrorSig = 0xC140  # XmlCli Req or Resp Buffer Address is Zero
     return 1
 
-  binfile = os.path.join(TempFolder, 'NvarReqBuff.bin')
+  binfile = os.path.join(session.TempFolder, 'NvarReqBuff.bin')
   ClearCliBuff(CLI_ReqBuffAddr, CLI_ResBuffAddr)
   memwrite( CLI_ReqBuffAddr + CLI_REQ_RES_READY_PARAMSZ_OFF, 4, VarCount)
   # log.info('Req Buffer Bin file used is %s' %binfile)
   load_data(binfile, CLI_ReqBuffAddr+CLI_REQ_RES_READY_PARAMSZ_OFF+4)
   memwrite( CLI_ReqBuffAddr + CLI_REQ_RES_READY_CMD_OFF, 4, GET_SET_VARIABLE_OPCODE)
-  memwrite( CLI_ReqBuffAddr + CLI_REQ_RES_READY_SIG_OFF, 4, CLI_REQ_READY_SIG )
+  memwrite( CLI_ReqBuffAddr + CLI_REQ_RES_READY_SIG_OFF, 4, session.CLI_REQ_READY_SIG )
   if Operation != "savexml":
     log.info('CLI Mailbox programmed, issuing S/W SMI to program knobs...')
 
@@ -1571,7 +2017,7 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
     log.error('Error while triggering CLI Entry Point, Aborting....')
     CloseInterface()
     return 1
-  if (WaitForCliResponse(CLI_ResBuffAddr, 2, 3, PrintRes=bool(Operation!="savexml")) != 0):
+  if (WaitForCliResponse(CLI_ResBuffAddr, 2, 3, PrintRes=bool(Operation!="savexml"), CmdId=GET_SET_VARIABLE_OPCODE) != 0):
     log.error('CLI Response not ready, Aborting....')
     CloseInterface()
     return 1
@@ -1579,10 +2025,10 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
   CurParamSize = int(memread(CLI_ResBuffAddr + CLI_REQ_RES_READY_PARAMSZ_OFF, 4))
   if(CurParamSize != 0):
     CurParambuff = memBlock((CLI_ResBuffAddr + CLI_REQ_RES_BUFF_HEADER_SIZE), CurParamSize)
-    ResBufFilename = os.path.join(TempFolder, 'NvarRespBuff.bin')
+    ResBufFilename = os.path.join(session.TempFolder, 'NvarRespBuff.bin')
     with open(ResBufFilename, 'wb') as out_file:  # opening for writing
       out_file.write(CurParambuff)
-    CurParamList = list(CurParambuff)
+    CurParamList = CurParambuff
     RespBuffPtr = 0
     for Varcount in range (0, 0x100):
       if(RespBuffPtr >= CurParamSize):
@@ -1593,13 +2039,9 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
       CurNvarStatus = ReadList(CurParamList, RespBuffPtr+0x18, 4)
       if(CurNvarStatus != 0):
         CurNvarSize = 0
-      CurNvarName = ''
-      for VarSizeCount in range (0, 0x30):
-        Val = ReadList(CurParamList, (RespBuffPtr+0x1D+VarSizeCount), 1)
-        if(Val == 0):
-          RespBuffPtr = RespBuffPtr + 0x1D + VarSizeCount + 1
-          break
-        CurNvarName = CurNvarName + chr(Val)
+      CurNvarName = buffer_reader.read_c_string(CurParamList, (RespBuffPtr+0x1D), 0x30)
+      if(len(CurNvarName) < 0x30):
+        RespBuffPtr = RespBuffPtr + 0x1D + len(CurNvarName) + 1
       for VarId in MyKnobsDict:
         if( (CurNvarGuid == MyKnobsDict[VarId]['NvarGuid']) and (CurNvarName == MyKnobsDict[VarId]['NvarName']) ):
           MyKnobsDict[VarId]['NvarSize'] = CurNvarSize
@@ -1645,6 +2087,7 @@ def SaveXmlLite(filename=PlatformConfigLiteXml, Operation='savexml', UserKnobsDi
   return Status
 
 
+@record_access_statistics
 def SaveXml(filename=None, ITPOptimz=0, MbAddr=0, XmlAddr=0, XmlSize=0):
   """
   Save entire/complete Target XML to desired file.
@@ -1656,10 +2099,10 @@ def SaveXml(filename=None, ITPOptimz=0, MbAddr=0, XmlAddr=0, XmlSize=0):
   :param XmlSize:
   :return:
   """
-  global LastErrorSig, LEGACYMB_XML_OFF
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   if filename == None:
-    filename = PlatformConfigXml
+    filename = session.PlatformConfigXml
   Status = 0
   InitInterface()
   DRAM_MbAddr = 0
@@ -1673,51 +2116,47 @@ def SaveXml(filename=None, ITPOptimz=0, MbAddr=0, XmlAddr=0, XmlSize=0):
     log.error('Dram Shared Mailbox not Valid, hence exiting')
     CloseInterface()
     return 1
-  DramSharedMBbuf = memBlock(DRAM_MbAddr,0x200) # Read/save parameter buffer
-  if (filename == SvXml) :
-    TempXmlOfst = LEGACYMB_XML_OFF
-    LEGACYMB_XML_OFF = 0xC  # Point to SV PC XML offset (On-Demand)
+  DramSharedMBbuf = readDramSharedMb(DRAM_MbAddr,0x200) # Read/save parameter buffer
+  if (filename == session.SvXml) :
+    TempXmlOfst = session.LEGACYMB_XML_OFF
+    session.LEGACYMB_XML_OFF = 0xC  # Point to SV PC XML offset (On-Demand)
   if XmlAddr == 0:
     (XmlAddr,XmlSize)  = readxmldetails(DramSharedMBbuf) # read GBTG XML address and Size
   if (XmlAddr == 0):
     log.error('Platform Configuration XML not yet generated, hence exiting')
     CloseInterface()
-    LastErrorSig = 0x8AD0  # Xml Address is Zero
-    if (filename == SvXml) :
-      LEGACYMB_XML_OFF = TempXmlOfst  # Restore orignal offset value before returning
+    session.LastErrorSig = 0x8AD0  # Xml Address is Zero
+    if (filename == session.SvXml) :
+      session.LEGACYMB_XML_OFF = TempXmlOfst  # Restore orignal offset value before returning
     return 1
   if(isxmlvalid(XmlAddr,XmlSize)):
     ComprXmlFound = False
-    if(_isExeAvailable):
+    CachedXml = None
+    XmlCacheKey = None
+    XmlCache = xml_cache.get_xml_cache()
+    if(session._isExeAvailable):
       PacketAddr = ((XmlAddr+XmlSize+0xFFF) & 0xFFFFF000)
       for count in range (0, 2):
         PacketHdr  = int(memread(PacketAddr, 8))
         PacketSize = ((PacketHdr >> 40) & 0xFFFFFF)
-        if ( ((PacketHdr & 0xFFFFFFFFFF) == 0x414d5a4c24) and (PacketSize != 0) ):  # cmp with $LZMA
-          log.result('Found LZMA Compressed XML, Downloading it')
-          TempInFile = os.path.join(TempFolder, "GbtLzC.bin")
-          TempOutFile = os.path.join(TempFolder, "GbtPc.xml")
-          memsave(TempInFile, (PacketAddr+8), int(PacketSize))
-          try:
-            compress.lzma_decompress(TempInFile, TempOutFile)
-            RemoveFile(TempInFile)
-            if(os.path.getsize(os.path.join(TempFolder, "GbtPc.xml"))):
-              log.result('LZMA Compressed XML Decompressed Successfully')
-              ComprXmlFound = True
-              break
-          except:
-            log.result('Decompression Failed!, falling back to regular XML download.')
-            ComprXmlFound = False
-        if ( ((PacketHdr & 0xFFFFFFFFFF) == 0x434F4E5424) and (PacketSize != 0) ):  # cmp with $TNOC
-          log.result('Found Tiano Compressed XML, Downloading it')
-          TempInFile = os.path.join(TempFolder, "GbtTianoC.bin")
-          TempOutFile = os.path.join(TempFolder, "GbtPc.xml")
-          memsave(TempInFile, (PacketAddr+8), int(PacketSize))
+        if ( ((PacketHdr & 0xFFFFFFFFFF) in (0x414d5a4c24, 0x434F4E5424)) and (PacketSize != 0) and XmlCache ):  # $LZMA or $TNOC
+          XmlHeader = memBlock(XmlAddr, min(XmlSize, xml_cache.XML_HEADER_SIZE))
+          TailSize = min(PacketSize, xml_cache.PACKET_TAIL_SIZE)
+          XmlCacheKey = XmlCache.fingerprint(XmlHeader, XmlSize, PacketHdr.to_bytes(8, byteorder='little'), memBlock(PacketAddr+8+PacketSize-TailSize, TailSize))
+          CachedXml = XmlCache.get(XmlCacheKey)
+          if CachedXml:
+            log.result('Found Compressed XML in XML cache, skipping its download')
+            ComprXmlFound = True
+            break
+        if ( ((PacketHdr & 0xFFFFFFFFFF) in (0x414d5a4c24, 0x434F4E5424)) and (PacketSize != 0) ):  # cmp with $LZMA or $TNOC
+          IsLzma = ((PacketHdr & 0xFFFFFFFFFF) == 0x414d5a4c24)
+          CompressionType = 'LZMA' if IsLzma else 'Tiano'
+          log.result(f'Found {CompressionType} Compressed XML, Downloading it')
           try:
-            utils.system_call(cmd_lis=[TianoCompressUtility, "-d", "-q", TempInFile, "-o", TempOutFile])
-            RemoveFile(TempInFile)
-            if(os.path.getsize(os.path.join(TempFolder, "GbtPc.xml"))):
-              log.result('Tiano Compressed XML Decompressed Successfully')
+            CompressedXml = memBlock((PacketAddr+8), int(PacketSize))
+            XmlData = compress.lzma_decompress_data(CompressedXml) if IsLzma else compress.tiano_decompress_data(CompressedXml)
+            if(len(XmlData)):
+              log.result(f'{CompressionType} Compressed XML Decompressed Successfully')
               ComprXmlFound = True
               break
           except:
@@ -1725,29 +2164,33 @@ def SaveXml(filename=None, ITPOptimz=0, MbAddr=0, XmlAddr=0, XmlSize=0):
             ComprXmlFound = False
         PacketAddr = ((PacketAddr+8+PacketSize+0xFFF) & 0xFFFFF000)
     if (ComprXmlFound):
-      with open(os.path.join(TempFolder, "GbtPc.xml"), 'rb') as TempXML:
-        XmlListBuff = list(TempXML.read())
-      PatchXmlData(XmlListBuff, XmlAddr,XmlSize)
-      RemoveFile(os.path.join(TempFolder, "GbtPc.xml"))
-      with open(filename, 'wb') as NewXmlFile:  # opening for writing
-        NewXmlFile.write(bytearray(XmlListBuff))
+      if CachedXml is not None:
+        XmlData = CachedXml
+      elif XmlCacheKey:
+        XmlCache.put(XmlCacheKey, XmlData, XmlHeader)  # cached before patching, delta is applied on every download
+      PatchXmlData(XmlData, XmlAddr,XmlSize)
+      WriteXml(filename, XmlData)
     else:
       log.result('Compressed XML is not supported, Downloading Regular XML')
-      if((InterfaceType != 'itpii') and (InterfaceType != 'simics') and (InterfaceType != 'ltb') and (InterfaceType != 'svlegitp')):
+      if((session.InterfaceType != 'itpii') and (session.InterfaceType != 'simics') and (session.InterfaceType != 'ltb') and (session.InterfaceType != 'svlegitp')):
         ITPOptimz = 0
       if ( (XmlCmp(filename, XmlAddr) == False) or (ITPOptimz == 0) ):
-        log.result('Host XML did not exist or is different from Target XML, downloading Target XML..')
-        memsave(filename, XmlAddr, int(XmlSize))  # saves complete xml
+        if xml_cache.get_xml_cache() and configurations.XML_BLOCK_DELTA:
+          SaveXmlBlockDelta(filename, XmlAddr, int(XmlSize))
+        else:
+          log.result('Host XML did not exist or is different from Target XML, downloading Target XML..')
+          memsave(filename, XmlAddr, int(XmlSize))  # saves complete xml
+          SanitizeXmlControlChars(filename)
       else:
         log.result('Target XML is same as the one Pointed to, skipping XML download')
     log.result(f'Saved XML Data as {filename}')
   else:
     log.error(f'XML is not valid or not yet generated XmlAddr = 0x{XmlAddr:X}, XmlSize = 0x{XmlSize:X}')
     Status = 1
-  SanitizeXml(filename)
+  SanitizeXml(filename, XmlAddr)
   CloseInterface()
-  if (filename == SvXml) :
-    LEGACYMB_XML_OFF = TempXmlOfst  # Restore orignal offset value before returning
+  if (filename == session.SvXml) :
+    session.LEGACYMB_XML_OFF = TempXmlOfst  # Restore orignal offset value before returning
   return Status
 
 
@@ -1764,15 +2207,122 @@ def XmlCmp(filename, XmlAddr):
   :return:
   """
   HdrCmpLen = 0x140
-  targetbuff = list(memBlock(XmlAddr, HdrCmpLen))
+  targetbuff = bytes(memBlock(XmlAddr, HdrCmpLen))
   if (os.path.isfile(filename)) and (os.path.getsize(filename) > 0x800):
     log.info('File Exists:  comparing target & host XML header')
     with open(filename, 'rb') as HostXML:
-      hbuffer = list(HostXML.read(HdrCmpLen))
+      hbuffer = HostXML.read(HdrCmpLen)
     if hbuffer[0:HdrCmpLen - 1] == targetbuff[0:HdrCmpLen - 1]:  # compare host & target XML header
       return True  # indicates Target XML was unchanged
   return False  # indicates Target XML file was not yet created
 
+RE_KNOB_ENTRY = re.compile(rb'<knob\s[^>]*>')
+RE_KNOB_ENTRY_ATTRIBUTE = re.compile(rb'\s(setupType|name)="([^"]*)"')
+
+
+def parseKnobEntries(XmlData):
+  """
+  Parse XML in single pass, validating its syntax and locating its knob entries
+
+  :param XmlData: content of XML as bytes like
+  :return: list of tuple (start offset, end offset, setupType, name) of knob entries
+  :raises expat.ExpatError: if XML is not well-formed or declares entities
+  """
+  KnobEntries = []
+  Parser = expat.ParserCreate()
+
+  def StartElement(Tag, Attributes):
+    if Tag == 'knob':
+      Start = Parser.CurrentByteIndex
+      KnobEntries.append((Start, XmlData.index(b'>', Start) + 1, Attributes.get('setupType', ''), Attributes.get('name', '')))
+
+  def ForbidEntityDeclaration(*args):  # as done by defusedxml, against entity expansion
+    raise expat.ExpatError('Entity declarations are not allowed in XML')
+
+  Parser.StartElementHandler = StartElement
+  Parser.EntityDeclHandler = ForbidEntityDeclaration
+  Parser.UnparsedEntityDeclHandler = ForbidEntityDeclaration
+  Parser.Parse(XmlData, True)
+  return KnobEntries
+
+
+class KnobEntryIndex(object):
+  """
+  Index of knob entries of the XML downloaded from target,
+  maps target address of knob entry to tuple of (setupType, name).
+
+  CLI response refers to each knob by address of its entry in target XML,
+  resolving it from the index needs no target memory read (as `findKnobName` does).
+
+  Building the index validates the syntax of XML (`valid`), XML with syntax errors
+  is still indexed by scanning for knob tags.
+
+  :param xml_data: content of XML as bytes, as located in target memory
+  :param xml_address: target address of XML
+  """
+
+  def __init__(self, xml_data, xml_address):
+    self.xml_address = xml_address
+    self.signature = None  # (path, size, modification time) of XML file index is built from
+    try:
+      knob_entries = parseKnobEntries(xml_data)
+      self.valid = True
+    except expat.ExpatError as e:
+      log.debug(f'XML syntax error: {e}')
+      self.valid = False
+      knob_entries = []
+      for match in RE_KNOB_ENTRY.finditer(xml_data):
+        attributes = dict(RE_KNOB_ENTRY_ATTRIBUTE.findall(match.group(0)))
+        knob_entries.append((match.start(), match.end(), attributes.get(b'setupType', b'').decode('latin-1'), attributes.get(b'name', b'').decode('latin-1')))
+    self.addresses = [xml_address + start for start, _, _, _ in knob_entries]  # sorted target addresses of knob entries
+    self.end_addresses = [xml_address + end for _, end, _, _ in knob_entries]
+    self.entries = [(setup_type, name) for _, _, setup_type, name in knob_entries]
+
+  def __len__(self):
+    return len(self.entries)
+
+  @staticmethod
+  def get_signature(filename):
+    file_stat = os.stat(filename)
+    return os.path.abspath(filename), file_stat.st_size, file_stat.st_mtime_ns
+
+  @classmethod
+  def from_file(cls, filename, xml_address, xml_size=None, use_cache=True):
+    """
+    Create index from XML file saved from target
+
+    Index of the XML last saved (or indexed) in current session is reused, if the file is not modified since.
+
+    :param filename: XML file saved from target
+    :param xml_address: target address of XML
+    :param xml_size: size of XML in target memory, if specified XML file is expected to be of same size
+    :param use_cache: reuse index of current session
+    :return: index or None if XML file does not have the same layout as target XML
+    """
+    if (not os.path.isfile(filename)) or ((xml_size is not None) and (os.path.getsize(filename) != xml_size)):
+      return None
+    session = getSession()
+    signature = cls.get_signature(filename)
+    index = session.knob_entry_index
+    if use_cache and index and (index.signature == signature) and (index.xml_address == xml_address):
+      return index
+    with open(filename, 'rb') as xml_file:
+      index = cls(xml_file.read(), xml_address)
+    index.signature = signature
+    session.knob_entry_index = index
+    return index
+
+  def lookup(self, address):
+    """
+    :param address: target address within knob entry
+    :return: tuple of (setupType, name) or None if address is not within any knob entry
+    """
+    position = bisect.bisect_right(self.addresses, address) - 1
+    if (position >= 0) and (address < self.end_addresses[position]):
+      return self.entries[position]
+    return None
+
+
 # Extract knob name from given KnobEntry pointer.
 def findKnobName(KnobEntryAdd):
   KnobEntryBuff = memBlock(KnobEntryAdd, 0x100) # copy first 256 chars in temp buffer
@@ -1810,8 +2360,8 @@ def getBiosDetails():
 
   :return: Tuple of (Platform name, Bios Name, Bios Timestamp)
   """
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   Platformname = ''
   BiosName = ''
   BiosTimestamp = ''
@@ -1823,11 +2373,11 @@ def getBiosDetails():
     log.error('Dram Shared Mailbox not Valid, hence exiting')
     CloseInterface()
     return Platformname, BiosName, BiosTimestamp  # empty strings
-  DramSharedMBbuf = memBlock(DRAM_MbAddr, 0x200)  # Read/save parameter buffer
+  DramSharedMBbuf = readDramSharedMb(DRAM_MbAddr, 0x200)  # Read/save parameter buffer
   (XmlAddr, XmlSize) = readxmldetails(DramSharedMBbuf)
   if XmlAddr == 0:
     log.error('Platform Configuration XML not ready, hence exiting')
-    LastErrorSig = 0x8AD0  # Xml Address is Zero
+    session.LastErrorSig = 0x8AD0  # Xml Address is Zero
     runcpu()
     CloseInterface()
     return Platformname, BiosName, BiosTimestamp  # empty Strings
@@ -1891,8 +2441,8 @@ def getEfiCompatibleTableBase():
   Use-case would be to find DramMailbox in legacy way
   :return:
   """
-  global LastErrorSig
-  LastErrorSig = 0x0000
+  session = getSession()
+  session.LastErrorSig = 0x0000
   EfiComTblSig = 0x24454649
   for Index in range (0, 0x1000, 0x10):
     Sig1 = memread(0xE0000+Index, 4)
@@ -1906,7 +2456,7 @@ def getEfiCompatibleTableBase():
       log.debug(f'Found EfiCompatibleTable Signature at 0x{BaseAddress:X}')
       return BaseAddress
   log.result(hex(Index))
-  LastErrorSig = 0xEFC9  # EfiCompatibleTable Not Found
+  session.LastErrorSig = 0xEFC9  # EfiCompatibleTable Not Found
   return 0
 
 
@@ -1931,7 +2481,7 @@ def get_bin_file(access_method, **kwargs):
   """
   max_bios_size = kwargs.get("max_bios_size", 32 * (1024 ** 2))  # default: 32 MB
   memory_size = kwargs.get("memory_size", 4 * (1024 ** 3))  # default: 4 GB
-  bin_file = kwargs.get("output_bin_file", os.path.join(TempFolder, "online_bios.bin"))
+  bin_file = kwargs.get("output_bin_file", os.path.join(getSession().TempFolder, "online_bios.bin"))
   if access_method not in utils.VALID_ACCESS_METHODS:
     err_msg = "Invalid Access Method: {}".format(access_method)
     log.error(err_msg)
@@ -7,24 +7,25 @@ __author__ = ['Amol Shinde', 'Gahan Saraiya']
 # Built-in Imports
 import os
 import re
-import binascii
 import ast
+import struct
+import binascii
 
 # Custom Imports
 from .common.logger import log
 from . import XmlCliLib as clb
-
-try:
-  from defusedxml import ElementTree as ET
-except ModuleNotFoundError as e:
-  log.warn("Insecure module import used! Please install all the required dependencies by running `pip install -r requirements.txt`")
-  from xml.etree import ElementTree as ET
+from .common.knob_model import get_knob_model, to_int, INVALID_VARSTORE
+from .common.depex import get_depex_engine, MATH_OPERATIONS, DEPEX_RESULT_MAP, EQUALITY_MAP
 
 # Global variable
 # -------------------
 
 END_OF_BUFFER = 'F4FBD0E9'
-XML_TREE = None
+END_OF_BUFFER_BYTES = binascii.unhexlify(END_OF_BUFFER)
+REQUEST_ENTRY_COUNT = struct.Struct('<I')
+REQUEST_ENTRY_HEADER = struct.Struct('<BHB')  # varstore index, offset, size of knob entry
+REQUEST_SETUP_TYPES = ('CHECKBOX', 'NUMRIC', 'NUMERIC', 'ONEOF', 'STRING')
+RE_REQUEST_VALUE = re.compile(r'^0[xX]([0-9a-fA-F]+)$|^L"(.*)"$|^"(.*)"$|^(\d+)$')
 mydebug = 1
 SIG_FLAG = 0
 SETUP_FLAG = 0
@@ -32,10 +33,6 @@ SETUP_MAP = {0: {0: 'biosknobs', 1: 'biosknobs'}, 1: {0: 'setupknobs', 1: 'biosk
 NVAR_MAP = {}
 EXIT_ON_UNKNOWN_KNOB = False
 
-MATH_OPERATIONS = {'and', 'or', 'not', '==', '!=', '<=', '>=', '<', '>', '_LIST_'}
-DEPEX_RESULT_MAP = {True : {'Sif': 'Active', 'Gif': 'Active', 'Dif': 'Active', '': 'Active'},
-                    False: {'Sif': 'Suppressed', 'Gif': 'GrayedOut', 'Dif': 'Disabled', '': 'Unknown'}}
-EQUALITY_MAP = {'==': 'in', '!=': 'not in'}
 
 
 # User defined Function
@@ -55,25 +52,22 @@ def nstrip(input_string, default=''):
 
 def populate_nvar_map(file_name='biosKnobs.xml'):
   global NVAR_MAP
-  global XML_TREE
-  if XML_TREE is None:
-    XML_TREE = ET.parse(file_name)
+  knob_model = get_knob_model(file_name)
   re_nvar = re.compile('Nvar_(.*)_Size')
   offset = 0x100
   nvar_idx = 0
-  for setup_knobs in XML_TREE.iter(tag='biosknobs'):
-    for knob in setup_knobs:
-      setup_type = (nstrip(knob.get('setupType'))).upper()
-      if setup_type == 'STRING':
-        continue
-      name = (nstrip(knob.get('name')))
-      default = int((nstrip(knob.get('default'))), 16)
-      x1 = re.search(re_nvar, name)
-      if setup_type in ['LEGACY']:
-        if x1 is not None:
-          nvar_idx = int(x1.group(1))
-          NVAR_MAP[nvar_idx] = {'NvarSize': default, 'correction': offset}
-          offset = offset + NVAR_MAP[nvar_idx]['NvarSize']
+  for knob in knob_model.iter_knobs():
+    setup_type = (nstrip(knob.setup_type)).upper()
+    if setup_type == 'STRING':
+      continue
+    name = (nstrip(knob.name))
+    default = int((nstrip(knob.default)), 16)
+    x1 = re.search(re_nvar, name)
+    if setup_type in ['LEGACY']:
+      if x1 is not None:
+        nvar_idx = int(x1.group(1))
+        NVAR_MAP[nvar_idx] = {'NvarSize': default, 'correction': offset}
+        offset = offset + NVAR_MAP[nvar_idx]['NvarSize']
   if offset > 0x100:
     nvar_idx = nvar_idx + 1
     NVAR_MAP[nvar_idx] = {'NvarSize': 0x00, 'correction': offset}
@@ -81,20 +75,18 @@ def populate_nvar_map(file_name='biosKnobs.xml'):
 
 
 def get_setup_tag(file_name='biosKnobs.xml'):
-  global XML_TREE
   global SETUP_MAP
   global SETUP_FLAG
   global SIG_FLAG
-  if XML_TREE is None:
-    XML_TREE = ET.parse(file_name)
+  knob_model = get_knob_model(file_name)
   SIG_FLAG = 0xF
   SETUP_FLAG = 0xF
-  for setup_knobs in XML_TREE.iter(tag='biosknobs'):
+  for setup_knobs in knob_model.iter_sections('biosknobs'):
     SIG_FLAG = 0
     SETUP_FLAG = 0
-    for knob in setup_knobs:
-      setup_type = (nstrip(knob.get('setupType'))).upper()
-      name = (nstrip(knob.get('name')))
+    for knob in setup_knobs.knobs:
+      setup_type = (nstrip(knob.setup_type)).upper()
+      name = (nstrip(knob.name))
       if name in ['Signature']:
         SIG_FLAG = 1
         if setup_type in ['LEGACY']:
@@ -108,50 +100,52 @@ def get_setup_tag(file_name='biosKnobs.xml'):
 
   if SIG_FLAG == 1 and SETUP_FLAG == 1:
     log.info('Found XML Knobs in Ganges format')
-    populate_nvar_map(file_name)  # populate dictionary NVAR_MAP from xml
+    populate_nvar_map(knob_model)  # populate dictionary NVAR_MAP from xml
 
   return setup_tag
 
 
 def get_bios_lookup(file_name='biosKnobs.xml', force_parse_xml=False, build_type=None):
-  global XML_TREE
-  if XML_TREE is None or force_parse_xml:
-    XML_TREE = ET.parse(file_name)
-  setup_tag = get_setup_tag(file_name)
+  """
+  Lookup of setup knobs from given xml file
+
+  :param file_name: platform config xml file or its knob model
+  :param force_parse_xml: unused, xml file is parsed again whenever its content is changed
+  :param build_type: build type of setup knobs section
+  :return: dictionary map of knob name to its size, offset, varstore and current value
+  """
+  knob_model = get_knob_model(file_name)
+  setup_tag = get_setup_tag(knob_model)
   bios_map = {}
-  for setup_knobs in XML_TREE.iter(tag=setup_tag):
+  for setup_knobs in knob_model.iter_sections(setup_tag):
     if setup_knobs.get('BuildType') != build_type:
       continue
-    for knob in setup_knobs:
-      setup_type = (nstrip(knob.get('setupType'))).upper()
+    for knob in setup_knobs.knobs:
+      setup_type = (nstrip(knob.setup_type)).upper()
       if setup_type in ['CHECKBOX', 'NUMRIC', 'NUMERIC', 'ONEOF', 'STRING']:
-        bios_map[nstrip(knob.get('name'))] = {
-          'size'      : nstrip(knob.get('size')), 'offset': nstrip(knob.get('offset')),
+        bios_map[nstrip(knob.name)] = {
+          'size'      : nstrip(knob.size), 'offset': nstrip(knob.offset),
           'vstore'    : nstrip(knob.get('varstoreIndex', '0xFF')),
-          'CurrentVal': nstrip(knob.get('CurrentVal'))}
+          'CurrentVal': nstrip(knob.current)}
       elif setup_type not in ['LEGACY', 'READONLY']:
-        log.warning(f'Setup Type is unknown (Need to add this) biosName[{nstrip(knob.get("name"))}] setupType[{setup_type}].')
+        log.warning(f'Setup Type is unknown (Need to add this) biosName[{nstrip(knob.name)}] setupType[{setup_type}].')
   return bios_map
 
 
 def get_cpu_sv_bios_lookup(file_name='biosKnobs.xml'):
-  global XML_TREE
-  if XML_TREE is None:
-    XML_TREE = ET.parse(file_name)
-  setup_tag = 'biosknobs'
+  knob_model = get_knob_model(file_name)
   bios_map = {}
   offset_map = {}
-  for setup_knobs in XML_TREE.iter(tag=setup_tag):
-    for knob in setup_knobs:
-      knob_type = (nstrip(knob.get('type'))).upper()
-      if knob_type in ['SCALAR']:
-        if nstrip(knob.get('name')) not in bios_map:
-          bios_map[nstrip(knob.get('name'))] = nstrip(knob.get('offset'))
-          offset_map[nstrip(knob.get('offset'))] = {
-            'name'  : nstrip(knob.get('name')), 'size': nstrip(knob.get('size')),
-            'offset': nstrip(knob.get('offset')), 'default': nstrip(knob.get('default'))}
-        else:
-          log.warning(f'  Warning - Duplicate Knobs : {nstrip(knob.get("name"))} ')
+  for knob in knob_model.iter_knobs():
+    knob_type = (nstrip(knob.get('type'))).upper()
+    if knob_type in ['SCALAR']:
+      if nstrip(knob.name) not in bios_map:
+        bios_map[nstrip(knob.name)] = nstrip(knob.offset)
+        offset_map[nstrip(knob.offset)] = {
+          'name'  : nstrip(knob.name), 'size': nstrip(knob.size),
+          'offset': nstrip(knob.offset), 'default': nstrip(knob.default)}
+      else:
+        log.warning(f'  Warning - Duplicate Knobs : {nstrip(knob.name)} ')
   log.info(f'Lookup Prepared !! len[{str(len(bios_map))}]')
   return bios_map, offset_map
 
@@ -190,110 +184,214 @@ def offset_correction(knob_offset_hex, knob_vstore_hex):
   return offset_correction_format
 
 
+class RequestBuffer(object):
+  """
+  CLI request buffer of knob entries compiled in binary form
+
+  Request buffer consists of entry count (4 bytes), knob entries and end of buffer signature.
+  Each entry is varstore index (1 byte), offset (2 bytes) and size (1 byte) followed by
+  little endian value of knob width. Bitwise knob has BIT15 of offset set, its size carries
+  bit size in bits 3-7 and bit offset in bits 0-2.
+  Entries are kept in order of request as well as per varstore, request is programmed
+  either at once or one varstore at a time.
+
+  :param correct_nvar_offset: correct knob offsets by `NVAR_MAP` of XML knobs in Ganges format
+  """
+
+  def __init__(self, correct_nvar_offset=False):
+    self.correct_nvar_offset = correct_nvar_offset
+    self.data = bytearray()  # entries in order of request
+    self.varstore_data = {}  # varstore index -> entries of varstore
+    self.varstore_count = {}
+
+  def __len__(self):
+    return sum(self.varstore_count.values())
+
+  def add_knob(self, name, var_store, offset, size, value):
+    """Add entry of knob to request
+
+    :param name: name of knob
+    :param var_store: varstore index of knob
+    :param offset: offset of knob (bitwise knob has offset prefixed by `BITWISE_KNOB_PREFIX`)
+    :param size: size of knob (bit size for bitwise knob)
+    :param value: requested value as given in ini file (hex, decimal, `"string"` or `L"unicode string"`)
+    :return: True if entry is added, False if entry is skipped
+    """
+    knob_width = size
+    if offset >= clb.BITWISE_KNOB_PREFIX:  # bitwise knob?
+      knob_width, offset, bit_offset = clb.get_bitwise_knob_details(size, offset)
+      size = ((size & 0x1F) << 3) + (bit_offset & 0x7)  # Embed Bit Offset 7 Bit size info in size variable
+    if self.correct_nvar_offset and SETUP_FLAG == 1 and SIG_FLAG == 1 and var_store != 0xFF:
+      offset = offset - NVAR_MAP[var_store]['correction']
+    try:
+      value_bytes = encode_knob_value(value, knob_width)
+      entry = REQUEST_ENTRY_HEADER.pack(var_store, offset, size) + value_bytes
+    except ValueError as e:
+      log.warning(f'Knob [{name}] value [{value}] is skipped: {e}')
+      return False
+    except struct.error as e:
+      log.warning(f'Knob [{name}] having varstore [0x{var_store:X}] offset [0x{offset:X}] size [0x{size:X}] can not be requested: {e}')
+      return False
+    self.data += entry
+    self.varstore_data.setdefault(var_store, bytearray()).extend(entry)
+    self.varstore_count[var_store] = self.varstore_count.get(var_store, 0) + 1
+    return True
+
+  @staticmethod
+  def pack(count, entries):
+    result = bytearray(REQUEST_ENTRY_COUNT.size + len(entries) + len(END_OF_BUFFER_BYTES))
+    REQUEST_ENTRY_COUNT.pack_into(result, 0, count)
+    result[REQUEST_ENTRY_COUNT.size:REQUEST_ENTRY_COUNT.size + len(entries)] = entries
+    result[-len(END_OF_BUFFER_BYTES):] = END_OF_BUFFER_BYTES
+    return result
+
+  @property
+  def buffer(self):
+    """Request buffer of all the entries"""
+    return bytes(self.pack(len(self), self.data))
+
+  def get_varstore_buffers(self):
+    """Request buffer of each varstore
+
+    :return: dictionary of varstore index -> request buffer
+    """
+    return {var_store: bytes(self.pack(self.varstore_count[var_store], entries))
+            for var_store, entries in self.varstore_data.items()}
+
+  def write(self, bin_file):
+    request_buffer = self.buffer
+    with open(bin_file, 'wb') as out_bin:
+      out_bin.write(request_buffer)
+    return request_buffer
+
+
+def encode_knob_value(value, width):
+  """
+  Encode requested knob value in binary form of knob width
+
+  :param value: value as given in ini file, hex (`0x` prefixed), decimal, `"string"` or `L"unicode string"`
+  :param width: width of knob in bytes
+  :return: bytes of little endian value or zero padded string
+  :raises ValueError: if value is not in proper format or exceeds width of knob
+  """
+  value = value.strip()
+  match = RE_REQUEST_VALUE.search(value)
+  if match is None:
+    raise ValueError('value is not in proper format')
+  hex_value, unicode_value, string_value, decimal_value = match.groups()
+  if unicode_value is not None:
+    data = unicode_value.strip().encode('utf-16-le')
+  elif string_value is not None:
+    data = string_value.strip().encode()
+  else:
+    number = int(hex_value, 16) if hex_value is not None else int(decimal_value)
+    if number >> (width * 8):
+      raise ValueError(f'value is larger than knob size of {width} byte(s)')
+    return number.to_bytes(width, byteorder='little')
+  if len(data) > width:
+    raise ValueError(f'value is larger than knob size of {width} byte(s)')
+  return data.ljust(width, b'\x00')
+
+
+def get_knob_width(knob):
+  """Width in bytes of value of knob (`KnobRow`) in request buffer"""
+  if knob.offset_value >= clb.BITWISE_KNOB_PREFIX:
+    return clb.get_bitwise_knob_details(knob.size_value, knob.offset_value)[0]
+  return knob.size_value
+
+
+def is_same_knob_value(knob, value, reference):
+  """
+  Check whether requested value of knob is same as reference value (i.e. current or default value from XML)
+
+  :param knob: `KnobRow` of knob
+  :param value: requested value as given in ini file
+  :param reference: value to compare with, as present in XML
+  :return: True if both the values encode to same bytes, False otherwise or if either of them can not be encoded
+  """
+  if (value is None) or (reference is None):
+    return False
+  width = get_knob_width(knob)
+  try:
+    return encode_knob_value(value, width) == encode_knob_value(reference, width)
+  except ValueError:
+    return False
+
+
+def get_request_knobs(xml_file, build_type=None, setup_types=REQUEST_SETUP_TYPES):
+  """
+  Knobs which can be requested, from setup knobs section of given build type
+
+  :param xml_file: platform config xml file or its knob model
+  :param build_type: build type of setup knobs section
+  :param setup_types: setup types of knobs which can be requested, None to allow any setup type
+  :return: dictionary of knob name -> `KnobRow`
+  """
+  knob_model = get_knob_model(xml_file)
+  setup_tag = get_setup_tag(knob_model)
+  knobs = {}
+  for setup_knobs in knob_model.iter_sections(setup_tag):
+    if setup_knobs.get('BuildType') != build_type:
+      continue
+    for knob in setup_knobs.knobs:
+      if (setup_types is None) or (nstrip(knob.setup_type).upper() in setup_types):
+        knobs[nstrip(knob.name)] = knob
+  return knobs
+
+
+def compile_request_buffer(knobs, knob_values, correct_nvar_offset=False, exit_on_unknown_knob=None):
+  """
+  Compile request buffer from knobs of knob model and requested values
+
+  :param knobs: dictionary of knob name -> `KnobRow` (i.e. `get_request_knobs` or `KnobModel.knobs`)
+  :param knob_values: dictionary of knob name -> requested value (as given in ini file), in order of request
+  :param correct_nvar_offset: correct knob offsets for XML knobs in Ganges format
+  :param exit_on_unknown_knob: discard request if any requested knob is unknown, defaults to `EXIT_ON_UNKNOWN_KNOB`
+  :return: `RequestBuffer`, None if request is discarded
+  """
+  exit_on_unknown_knob = EXIT_ON_UNKNOWN_KNOB if exit_on_unknown_knob is None else exit_on_unknown_knob
+  request_buffer = RequestBuffer(correct_nvar_offset=correct_nvar_offset)
+  has_unknown_knob = False
+  for name, value in knob_values.items():
+    knob = knobs.get(name)
+    if knob is None:
+      log.warning(f'Bios Knob "{name}" does not currently exist ')
+      has_unknown_knob = True
+      continue
+    var_store = knob.varstore_id
+    request_buffer.add_knob(name, 0xFF if var_store == INVALID_VARSTORE else var_store, knob.offset_value, knob.size_value, value)
+  if exit_on_unknown_knob and has_unknown_knob:
+    log.error('Aborting Since ExitOnAlienKnob was set, see above for details. ')
+    return None
+  return request_buffer
+
+
 def create_bin_file(bin_file, bios_map, ini_map, knob_lis):
-  global SETUP_FLAG, SIG_FLAG, EXIT_ON_UNKNOWN_KNOB
-  buffer_lis = []
+  """
+  Create request buffer of knobs from lookup of `get_bios_lookup`
+
+  :param bin_file: output binary file location
+  :param bios_map: dictionary map of knob name to its size, offset and varstore
+  :param ini_map: dictionary of knob name -> requested value
+  :param knob_lis: requested knobs in order of request
+  :return: request buffer
+  """
+  request_buffer = RequestBuffer(correct_nvar_offset=True)
   has_unknown_knob = False
   for knob in knob_lis:
-    if knob in bios_map:
-      knob_val_hex = '00'
-      knobSize_int = 0
-      knob_offset_hex = '0000'
-      knob_var_store_hex = '00'
-      knob_size_hex = '00'
-      knob_val = ini_map[knob]
-      knob_size = bios_map[knob]['size']
-      knob_offset = bios_map[knob]['offset']
-      knob_var_store = bios_map[knob]['vstore']
-      a1 = re.search('0x(.*)', knob_val)
-      a2 = re.search('L"(.*)"', knob_val)
-      a3 = re.search('"(.*)"', knob_val)
-      b1 = re.search('0x(.*)', knob_size)
-      c1 = re.search('0x(.*)', knob_var_store)
-      d1 = re.search('0x(.*)', knob_offset)
-      if a1 is not None:
-        knob_val_hex = a1.group(1)
-      elif a2 is not None:
-        j = 0
-        data = a2.group(1).strip()[::-1]
-        total_str = ''
-        while j < len(data):
-          each_bit = '00' + clb.HexLiFy(data[j]).zfill(2)
-          total_str = total_str + each_bit
-          j = j + 1
-        knob_val_hex = total_str
-      elif a3 is not None:
-        knob_val_hex = clb.HexLiFy(a3.group(1).strip()[::-1])
-      else:
-        if knob_val.isdigit():
-          knob_val_hex = hex(int(knob_val))[2:]
-        else:
-          log.warning(f' Knob [{knob}] value [{knob_val}] is not in proper format')
-          continue
-      if b1 is not None:
-        knob_size_hex = b1.group(1).zfill(2)
-        knob_size_int = int('0x' + knob_size_hex, 16)
-      else:
-        knob_size_hex = hex(int(knob_size))[2:].zfill(2)
-        knob_size_int = int(knob_size)
-      if c1 is not None:
-        knob_var_store_hex = c1.group(1).zfill(2)
-      else:
-        knob_var_store_hex = hex(int(knob_var_store))[2:].zfill(2)
-      if d1 is not None:
-        knob_offset_hex = d1.group(1).zfill(4)
-        knob_offset_int = int(knob_offset_hex, 16)
-      else:
-        knob_offset_int = int(knob_offset)
-        knob_offset_hex = hex(knob_offset_int)[2:].zfill(4)
-
-      knob_size = knob_size_int
-      knob_width = knob_size_int
-      if knob_offset_int >= clb.BITWISE_KNOB_PREFIX:  # bitwise knob?
-        knob_width, knob_offset_int, bit_offset = clb.get_bitwise_knob_details(knob_size_int, knob_offset_int)
-        knob_size_int = ((knob_size_int & 0x1F) << 3) + (bit_offset & 0x7)
-      knob_size_hex = hex(knob_size_int)[2:].zfill(2)
-      knob_offset_hex = hex(knob_offset_int)[2:].zfill(4)
-
-      if SETUP_FLAG == 1 and SIG_FLAG == 1:
-        if int('0x' + knob_var_store_hex, 16) != 0xFF:
-          knob_offset_hex = offset_correction(knob_offset_hex, knob_var_store_hex)
-      if int(knob_width * 2) < len(knob_val_hex):
-        log.warning(f'Value [{knob_val}] of knob [{knob}] is larger in size compared to maximum size for the knob[{knob_size}] mentioned in xml')
-        continue
-      else:
-        knob_val_hex = knob_val_hex.zfill(knob_width * 2)
-    else:
+    if knob not in bios_map:
       log.warning(f'Bios Knob "{knob}" does not currently exist ')
       has_unknown_knob = True
       continue
-    value_line = ''
-    tbl_desc_line = []
-    inc = knob_width * 2
-    while inc > 0:
-      tbl_desc_line.append(knob_val_hex[inc - 2:inc])
-      inc = inc - 2
-    value_line = ''.join(tbl_desc_line)
-    binline = knob_var_store_hex.strip() + knob_offset_hex[2:].strip() + knob_offset_hex[0:2].strip() + knob_size_hex.strip() + value_line.strip()
-    binline_ascii = binline
-    buffer_lis.append(binline_ascii)
-
+    var_store, offset, size = (to_int(bios_map[knob][key]) for key in ('vstore', 'offset', 'size'))
+    if None in (var_store, offset, size):
+      log.warning(f'Bios Knob "{knob}" has invalid varstore, offset or size in xml, Ignoring this entry')
+      continue
+    request_buffer.add_knob(knob, var_store, offset, size, ini_map[knob])
   if EXIT_ON_UNKNOWN_KNOB and has_unknown_knob:
     log.error('Aborting Since ExitOnAlienKnob was set, see above for details. ')
     return ''
-
-  total_entries = hex(len(buffer_lis))[2:].zfill(8)
-  inc = 8
-  entries_line = []
-  while inc > 0:
-    entries_line.append(total_entries[inc - 2:inc])
-    inc = inc - 2
-  entry_line = ''.join(entries_line)
-  buffer_str = entry_line + ''.join(buffer_lis) + END_OF_BUFFER
-  request_buffer = binascii.unhexlify(buffer_str)
-  with open(bin_file, 'wb') as out_bin:
-    out_bin.write(request_buffer)
-  return request_buffer
+  return request_buffer.write(bin_file)
 
 
 def value_to_hex(val):
@@ -323,32 +421,30 @@ def value_to_hex(val):
 
 
 def parse_cli_ini_xml(file_name, ini_file, bin_file='bios.bin', build_type=None):
-  global XML_TREE
-  XML_TREE = None
-  bios_map = get_bios_lookup(file_name, build_type=build_type)
   ini_map, knob_lis = get_bios_ini(ini_file)
-  return create_bin_file(bin_file, bios_map, ini_map, knob_lis)
+  knobs = get_request_knobs(file_name, build_type=build_type)
+  request_buffer = compile_request_buffer(knobs, {knob: ini_map[knob] for knob in knob_lis}, correct_nvar_offset=True)
+  if request_buffer is None:
+    return ''
+  return request_buffer.write(bin_file)
 
 
 def generate_csv(xml_file, por_default_review=False):
-  global XML_TREE
   duplicateKnobs = []
   invalidOption = {}
   nullUQI = []
   unknown_setup_type = []
   knobList = {}
-  XML_TREE = None
-  if XML_TREE is None:
-    XML_TREE = ET.parse(xml_file)
+  knob_model = get_knob_model(xml_file)
 
   _bios_version = ''
-  for version in XML_TREE.iter(tag='BIOS'):
+  for version in knob_model.iter_sections('BIOS'):
     _bios_version = version.get('VERSION')
   if _bios_version == '':
-    for version in XML_TREE.iter(tag='SVBIOS'):
+    for version in knob_model.iter_sections('SVBIOS'):
       _bios_version = version.get('VERSION')
   if _bios_version == '':
-    for version in XML_TREE.iter(tag='CPUSVBIOS'):
+    for version in knob_model.iter_sections('CPUSVBIOS'):
       _bios_version = version.get('VERSION')
 
   log.info(f'\nBIOS XML is of VERSION [{_bios_version}]')
@@ -357,14 +453,13 @@ def generate_csv(xml_file, por_default_review=False):
     csv_data += 'Name,Description,Grouping,Type,Size(Bytes),Selection [Value],DefaultVal,SetupPagePtr,Depex\n'
   else:
     csv_data += 'Name,Description,Type,Size(Bytes),Selection [Value],DefaultVal,CurrentVal,SetupPagePtr,Depex\n'
-  for setup_knobs in XML_TREE.iter(tag='biosknobs'):
-    for knob in setup_knobs:
+  for setup_knobs in knob_model.iter_sections('biosknobs'):
+    for knob in setup_knobs.knobs:
       sel_str = '\"'
-      setup_type = (nstrip(knob.get('setupType'))).upper()
+      setup_type = (nstrip(knob.setup_type)).upper()
       if setup_type == 'ONEOF':
-        for options in knob:
-          for option in options:
-            sel_str += f'{nstrip(option.get("text"))} [{nstrip(option.get("value"))}]\n'
+        for text, value in knob.options:
+          sel_str += f'{nstrip(text)} [{nstrip(value)}]\n'
         if sel_str[len(sel_str) - 1] == '\n':
           sel_str = sel_str[0:(len(sel_str) - 1)]
       elif setup_type in ['NUMRIC', 'NUMERIC']:
@@ -392,20 +487,19 @@ def generate_csv(xml_file, por_default_review=False):
 
 
 def generate_bios_knobs_config(xml_file, flexcon_cfg_file, knobs_ini_file, build_type=None):
-  tree = ET.parse(xml_file)
+  knob_model = get_knob_model(xml_file)
   bios_knobs_map = {}
-  for setup_knobs in tree.iter(tag='biosknobs'):
+  for setup_knobs in knob_model.iter_sections('biosknobs'):
     if setup_knobs.get('BuildType') != build_type:
       continue
-    for knob in setup_knobs:
-      setup_type = (nstrip(knob.get('setupType'))).upper()
-      knob_name = nstrip(knob.get('name'))
+    for knob in setup_knobs.knobs:
+      setup_type = (nstrip(knob.setup_type)).upper()
+      knob_name = nstrip(knob.name)
       bios_knobs_map[knob_name] = {}
       bios_knobs_map[knob_name]['$SetUpType'] = setup_type
       if setup_type == 'ONEOF':
-        for options in knob:
-          for option in options:
-            bios_knobs_map[knob_name][nstrip(option.get('text'))] = nstrip(option.get('value'))
+        for text, value in knob.options:
+          bios_knobs_map[knob_name][nstrip(text)] = nstrip(value)
   with open(flexcon_cfg_file, "r") as f:
     bios_knobs_lis = f.readlines()
   knob_start = 0
@@ -479,7 +573,7 @@ def generate_bios_knobs_config(xml_file, flexcon_cfg_file, knobs_ini_file, build
 
 
 def generate_bios_config_ini(xml_file, bios_config_file, knobs_ini_file='', mode='genbiosconf', knobs_map={}):
-  tree = ET.parse(xml_file)
+  knob_model = get_knob_model(xml_file)
   bios_knobs_map = {}
   knob_count = 0
   xml_map = {}
@@ -487,7 +581,8 @@ def generate_bios_config_ini(xml_file, bios_config_file, knobs_ini_file='', mode
   knob_start = False
   comment = ''
   comment_map = {}
-  for line in open(xml_file, 'r').readlines():
+  xml_lines = open(knob_model.path, 'r').readlines() if knob_model.path else []  # comments are not part of parsed tree
+  for line in xml_lines:
     line = line.strip()
     if line == '':
       continue
@@ -505,8 +600,8 @@ def generate_bios_config_ini(xml_file, bios_config_file, knobs_ini_file='', mode
       if match != None:
         comment_map[match.group(2)] = comment
         comment = ''
-  for setup_knobs in tree.iter(tag='biosknobs'):
-    for knob in setup_knobs:
+  for setup_knobs in knob_model.iter_sections('biosknobs'):
+    for knob in setup_knobs.knobs:
       bios_knobs_map[knob_count] = {}
       setup_type = (nstrip(knob.get('setupType'))).upper()
       bios_knobs_map[knob_count]['$KnobName'] = nstrip(knob.get('name'))
@@ -529,11 +624,10 @@ def generate_bios_config_ini(xml_file, bios_config_file, knobs_ini_file='', mode
       bios_knobs_map[knob_count]['OptionsDict'] = {}
       if setup_type == 'ONEOF':
         options_count = 0
-        for options in knob:
-          for option in options:
-            bios_knobs_map[knob_count]['OptionsDict'][options_count] = {
-              'OptionText': nstrip(option.get('text')), 'OptionVal': value_to_hex(nstrip(option.get('value')))}
-            options_count = options_count + 1
+        for option_text, option_value in knob.options:
+          bios_knobs_map[knob_count]['OptionsDict'][options_count] = {
+            'OptionText': nstrip(option_text), 'OptionVal': value_to_hex(nstrip(option_value))}
+          options_count = options_count + 1
       elif setup_type in ['NUMRIC', 'NUMERIC', 'STRING']:
         bios_knobs_map[knob_count]['OptionsDict'][0] = {
           'OptionText': 'Minimum', 'OptionVal': value_to_hex(nstrip(knob.get('min')))}
@@ -633,32 +727,31 @@ def generate_all_knobs_ini(xml_file, all_knobs_ini):
   Generate bios knobs config file consisting of all setup options with their
   default value from given xml file
 
-  :param xml_file: xml file to generate all knobs
+  :param xml_file: xml file (or its knob model) to generate all knobs
   :param all_knobs_ini: output file at which all knobs will be stored
   :return:
   """
-  xml_tree = ET.parse(xml_file)
+  knob_model = get_knob_model(xml_file)
   ini_content = ';-------------------------------------------------\n'
   '; BIOS contact: xmlcli@intel.com\n'
   '; XML Shared MailBox settings for BIOS CLI based setup\n'
   '; The name entry here should be identical as the name from the XML file (retain the case)\n'
   ';-------------------------------------------------\n'
   '[BiosKnobs]\n'
-  for setup_knobs in xml_tree.iter(tag='biosknobs'):
-    for ref_bios_knob in setup_knobs:
-      ref_setup_type = (nstrip(ref_bios_knob.get('setupType'))).upper()
-      size = int(str_to_hex(nstrip(ref_bios_knob.get('size'))), 16)
-      if ref_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
-        default_value = int(nstrip(ref_bios_knob.get('default')), 16)
-        knob_name = nstrip(ref_bios_knob.get('name'))
-        if default_value:
-          new_value = 0
-        else:
-          new_value = 1
-        if ref_setup_type == 'STRING':
-          ini_content += f'{knob_name} = L\"{"IntelSrrBangaloreKarnatakaIndiaAsia"[0:((size // 2) - 1)]}\" \n'
-        else:
-          ini_content += f'{knob_name} = {new_value:d} \n'
+  for ref_bios_knob in knob_model.iter_knobs():
+    ref_setup_type = (nstrip(ref_bios_knob.setup_type)).upper()
+    size = int(str_to_hex(nstrip(ref_bios_knob.size)), 16)
+    if ref_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
+      default_value = int(nstrip(ref_bios_knob.default), 16)
+      knob_name = nstrip(ref_bios_knob.name)
+      if default_value:
+        new_value = 0
+      else:
+        new_value = 1
+      if ref_setup_type == 'STRING':
+        ini_content += f'{knob_name} = L\"{"IntelSrrBangaloreKarnatakaIndiaAsia"[0:((size // 2) - 1)]}\" \n'
+      else:
+        ini_content += f'{knob_name} = {new_value:d} \n'
   with open(all_knobs_ini, 'w') as out_ini:
     out_ini.write(ini_content)
 
@@ -667,21 +760,19 @@ def find_duplicates(xml_file):
   """
   Find duplicate setup knobs from given xml file
 
-  :param xml_file: platform config xml file
+  :param xml_file: platform config xml file or its knob model
   :return: list of duplicate setup knob(s) if any else empty list
   """
-  xml_tree = None
-  xml_tree = ET.parse(xml_file)
-  knob_name_lis = []
+  knob_model = get_knob_model(xml_file)
+  knob_names = set()
   duplicate_knobs = []
-  for setup_knobs in xml_tree.iter(tag='biosknobs'):
-    for ref_bios_knob in setup_knobs:
-      knob_name = nstrip(ref_bios_knob.get('name'))
-      if knob_name in knob_name_lis:
-        if knob_name not in duplicate_knobs:
-          duplicate_knobs.append(knob_name)
-      else:
-        knob_name_lis.append(knob_name)
+  for ref_bios_knob in knob_model.iter_knobs():
+    knob_name = nstrip(ref_bios_knob.name)
+    if knob_name in knob_names:
+      if knob_name not in duplicate_knobs:
+        duplicate_knobs.append(knob_name)
+    else:
+      knob_names.add(knob_name)
   if len(duplicate_knobs) != 0:
     log.error(f'Following knobs are duplicates \n [{",".join(duplicate_knobs)}]')
   else:
@@ -693,41 +784,33 @@ def xml_to_knob_map(xml_file, knob_map={}, operation='normal'):
   """
   Generate dictionary map for bios setup knobs from given xml file
 
-  :param xml_file: platform config xml file
+  :param xml_file: platform config xml file or its knob model
   :param knob_map: Map of setup knob and corresponding value
   :param operation: operation to perform -> `restore` or `normal`
   :return: tuple of 2 dictionary map consists result values knob map
       and non empty dictionary of old values in case of `restore` operation
   """
-  xml_tree = None
-  xml_tree = ET.parse(xml_file)
+  knob_model = get_knob_model(xml_file)
   result_knob_map = {}
   previous_value_map = {}
-  for setup_knobs in xml_tree.iter(tag='biosknobs'):
-    for ref_bios_knob in setup_knobs:
-      knob_name = nstrip(ref_bios_knob.get('name'))
-      var_store_idx = clb.Str2Int(ref_bios_knob.get('varstoreIndex'))
-      if operation == 'restore':
-        if knob_name in knob_map:
-          result_knob_map[knob_name] = knob_map[knob_name]
-        else:
-          default_value = nstrip(ref_bios_knob.get('default'))
-          current_value = nstrip(ref_bios_knob.get('CurrentVal'))
-          if default_value != current_value:
-            result_knob_map[knob_name] = default_value
-            previous_value_map[knob_name] = current_value
-      else:
-        if knob_name in knob_map:
-          knob_setup_type = nstrip(ref_bios_knob.get('setupType'))
-          size = clb.Str2Int(ref_bios_knob.get('size'))
-          offset = clb.Str2Int(ref_bios_knob.get('offset'))
-          default_value = clb.Str2Int(ref_bios_knob.get('default'))
-          current_value = clb.Str2Int(ref_bios_knob.get('CurrentVal'))
-          result_knob_map[knob_name] = {
-            'ReqVal': clb.Str2Int(knob_map[knob_name]), 'Type': knob_setup_type,
-            'VarId' : var_store_idx, 'CurVal': current_value, 'DefVal': default_value,
-            'Size'  : size, 'Offset': offset
-          }
+  if operation == 'restore':
+    modified_knobs = {nstrip(knob.name): knob for knob in knob_model.modified_knobs()}
+    for knob_name in knob_model.knobs:
+      if knob_name in knob_map:
+        result_knob_map[knob_name] = knob_map[knob_name]
+      elif knob_name in modified_knobs:
+        result_knob_map[knob_name] = nstrip(modified_knobs[knob_name].default)
+        previous_value_map[knob_name] = nstrip(modified_knobs[knob_name].current)
+  else:
+    requested_knobs = sorted((knob_model.knobs[knob_name] for knob_name in knob_map if knob_name in knob_model.knobs), key=lambda knob: knob.row)
+    for ref_bios_knob in requested_knobs:  # in order of xml
+      knob_name = nstrip(ref_bios_knob.name)
+      result_knob_map[knob_name] = {
+        'ReqVal': clb.Str2Int(knob_map[knob_name]), 'Type': nstrip(ref_bios_knob.setup_type),
+        'VarId' : ref_bios_knob.varstore_id, 'CurVal': clb.Str2Int(ref_bios_knob.current),
+        'DefVal': clb.Str2Int(ref_bios_knob.default), 'Size': ref_bios_knob.size_value,
+        'Offset': ref_bios_knob.offset_value
+      }
   return result_knob_map, previous_value_map
 
 
@@ -773,27 +856,14 @@ def generate_knobs_data_bin(xml_file, knobs_ini_file, bin_file, operation='Prog'
   """
   Generate BIOS knobs data binary
 
-  :param xml_file: platform config xml file
+  :param xml_file: platform config xml file or its knob model
   :param knobs_ini_file: bios config file consists of `<knob-name>=<value>`
   :param bin_file: output binary file location
   :param operation: Operation to perform -> Prog | LoadDef | ResMod
-  :return: tuple of 2 values -> (dictionary of buffer map, buffer value string)
+  :return: tuple of 2 values -> (dictionary of varstore index -> memoryview of its request buffer, request buffer of all knobs)
   """
-  tree = ET.parse(xml_file)
-  bios_knobs_map = {}
-  delta_map = {}
-  for setup_knobs in tree.iter(tag='biosknobs'):
-    for knob in setup_knobs:
-      knob_name = nstrip(knob.get('name'))
-      setup_type = (nstrip(knob.get('setupType'))).upper()
-      offset = nstrip(knob.get('offset'))
-      size = nstrip(knob.get('size'))
-      var_store_idx = nstrip(knob.get('varstoreIndex'))
-      default_val = nstrip(knob.get('default'))
-      current_value = nstrip(knob.get('CurrentVal'))
-      bios_knobs_map[knob_name] = {'VarId': var_store_idx, 'Type': setup_type, 'Size': size, 'offset': offset, 'DefVal': default_val, 'CurVal': current_value}
-      if default_val != current_value:
-        delta_map[knob_name] = default_val
+  knob_model = get_knob_model(xml_file)
+  delta_map = {nstrip(knob.name): nstrip(knob.default) for knob in knob_model.modified_knobs()}
   request_knob_map = {}
   if operation != 'LoadDef':
     knob_start = 0
@@ -814,51 +884,11 @@ def generate_knobs_data_bin(xml_file, knobs_ini_file, bin_file, operation='Prog'
           request_knob_map[knob_name] = delta_map[knob_name]
   else:
     request_knob_map = delta_map
-  buffer_map = {}
-  for name in request_knob_map:
-    try:
-      var_store = bios_knobs_map[name]['VarId']
-      offset = bios_knobs_map[name]['offset']
-      knob_offset = str_to_hex(offset)
-      size = int(str_to_hex(bios_knobs_map[name]['Size']), 16)
-      knob_width = size
-      var_store_idx = int(str_to_hex(var_store), 16)
-      if knob_offset >= clb.BITWISE_KNOB_PREFIX:  # bitwise knob?
-        knob_width, knob_offset, bit_offset = clb.get_bitwise_knob_details(size, knob_offset)
-        size = ((size & 0x1F) << 3) + (bit_offset & 0x7)  # Embed Bit Offset 7 Bit size info in size variable
-    except:
-      log.warning(f'Knob name \"{name}\" not found in XML, Skipping')
-      continue
-    if bios_knobs_map[name]['Type'] == 'STRING':
-      request_val_str = str_to_hex(request_knob_map[name]).ljust(knob_width * 2, '0')
-    else:
-      request_val_str = little_endian(str_to_hex(request_knob_map[name]).zfill(knob_width * 2))
-    if len(request_val_str) > (knob_width * 2):
-      log.warning(f'Requested Knob \"{name}\" Value exceeds the allowed size limit({(knob_width / 2):d} chars), Ignoring this entry')
-      continue
-    try:
-      len(buffer_map[var_store_idx])
-    except:
-      buffer_map[var_store_idx] = {}
-    buffer_map[var_store_idx][len(buffer_map[var_store_idx])] = str_to_hex(var_store).zfill(2) + little_endian(str_to_hex(offset).zfill(4)) + str_to_hex(size).zfill(2) + request_val_str
-  knob_buffer_str = ''
-  if len(buffer_map):
-    knob_count = 0
-    for Index in buffer_map:
-      current_buffer_str = ''
-      for count in range(0, len(buffer_map[Index])):
-        current_buffer_str = current_buffer_str + buffer_map[Index][count]
-        knob_count = knob_count + 1
-      if current_buffer_str != '':
-        current_bin_buffer_str = (little_endian(str_to_hex(hex(len(buffer_map[Index]))).zfill(8)) + current_buffer_str + END_OF_BUFFER).upper()
-        new_var_bin_file = os.path.join(clb.TempFolder, f'biosKnobsdata_{Index:d}.bin')
-        with open(new_var_bin_file, 'wb') as file_ptr:
-          file_ptr.write(binascii.unhexlify(current_bin_buffer_str))
-      knob_buffer_str = knob_buffer_str + current_buffer_str
-    knob_buffer_str = f"{little_endian(str_to_hex(hex(knob_count)).zfill(8))}{knob_buffer_str}{END_OF_BUFFER}".upper()
-    with open(bin_file, 'wb') as file_ptr:
-      file_ptr.write(binascii.unhexlify(knob_buffer_str))
-  return buffer_map, knob_buffer_str
+  request_buffer = compile_request_buffer(knob_model.knobs, request_knob_map, exit_on_unknown_knob=False)
+  if len(request_buffer) == 0:
+    return {}, b''
+  return request_buffer.get_varstore_buffers(), request_buffer.write(bin_file)
+
 
 def _safe_eval_depex(expr):
   """
@@ -1000,8 +1030,11 @@ def eval_knob_depex(xml_file=0, bios_knobs_map=0, csv_file=0):
   """
   Evaluate knob's dependency expression (depex)
 
-  :param xml_file: platform config xml file
-  :param bios_knobs_map:
+  Depex of the knobs map are compiled once (refer `common.depex.DepexEngine`), when called
+  again with the same knobs map only the knobs depending on changed `CurVal` are re-evaluated.
+
+  :param xml_file: platform config xml file or its knob model
+  :param bios_knobs_map: knobs map to be updated with status (`SetupPgSts`) of knobs, built from xml file if empty
   :param csv_file:
   :return:
   """
@@ -1009,30 +1042,27 @@ def eval_knob_depex(xml_file=0, bios_knobs_map=0, csv_file=0):
     bios_knobs_map = {}
   bios_knobs_lis = {}
   if (len(bios_knobs_map) == 0) and (xml_file != 0):
-    tree = ET.parse(xml_file)
+    knob_model = get_knob_model(xml_file)
     knob_idx = 0
     log.info(f'Parsing Xml File {xml_file}')
-    for setup_knobs in tree.iter(tag='biosknobs'):
-      for knob in setup_knobs:
-        setup_type = knob.get('setupType').strip().upper()
-        knob_name = knob.get('name').strip()
-        current_value = knob.get('CurrentVal').strip()
-        default_val = knob.get('default').strip()
+    for setup_knobs in knob_model.iter_sections('biosknobs'):
+      for knob in setup_knobs.knobs:
+        setup_type = knob.setup_type.strip().upper()
+        knob_name = knob.name.strip()
+        current_value = knob.current.strip()
+        default_val = knob.default.strip()
         depex = 'TRUE'
         setup_page_ptr = 'N.A.'
         prompt = ''
         _help = ''
         options_map = {}
         if setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
-          depex = knob.get('depex').strip()
+          depex = knob.depex.strip()
           prompt = knob.get('prompt').strip()
           _help = knob.get('description').strip()
           if setup_type == 'ONEOF':
-            options_count = 0
-            for options in knob:
-              for option in options:
-                options_map[options_count] = {'Text': nstrip(option.get('text')), 'Val': value_to_hex(nstrip(option.get('value')))}
-                options_count = options_count + 1
+            for options_count, (text, value) in enumerate(knob.options):
+              options_map[options_count] = {'Text': nstrip(text), 'Val': value_to_hex(nstrip(value))}
           elif setup_type in ['NUMRIC', 'NUMERIC']:
             options_map[0] = {'Text': 'Min', 'Val': int(value_to_hex(nstrip(knob.get('min'))), 16)}
             options_map[1] = {'Text': 'Max', 'Val': int(value_to_hex(nstrip(knob.get('max'))), 16)}
@@ -1058,13 +1088,12 @@ def eval_knob_depex(xml_file=0, bios_knobs_map=0, csv_file=0):
                                      'SetupPgSts': 'Unknown', 'Prompt': prompt, 'Help': _help, 'OptionsDict': options_map}
   else:
     log.warning('Skipped Parsing Xml, will directly operate & update the Knobs Dict that was passed as an Arg')
-  for Knob in bios_knobs_map:
-    if bios_knobs_map[Knob]['SetupType'] == 'READONLY':
-      continue
-    if bios_knobs_map[Knob]['SetupPgPtr'][0:4] == '???/':
-      bios_knobs_map[Knob]['SetupPgSts'] = 'Disabled'
-    else:
-      bios_knobs_map[Knob]['SetupPgSts'] = evaluate_depex(bios_knobs_map[Knob]['Depex'], Knob, bios_knobs_map)
+  # depex are compiled once for the knobs map, later calls with the same map re-evaluate dependents of changed knobs only
+  depex_engine, is_new_engine = get_depex_engine(bios_knobs_map)
+  if is_new_engine:
+    depex_engine.evaluate()
+  else:
+    depex_engine.refresh()
   if (csv_file != 0) and (xml_file != 0) and (len(bios_knobs_lis) != 0):
     with open(csv_file, 'w') as csv_file_ptr:
       csv_file_ptr.write('Name,SetupPgSts,SetupPgPtr,Depex\n')
@@ -3,3 +3,11 @@
 
 import sys
 from ._version import __version__
+
+
+def __getattr__(name):
+  # `xmlcli.knobs()` knob transaction, XmlCli module is imported on first use only
+  if name == "knobs":
+    from .XmlCli import knobs
+    return knobs
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
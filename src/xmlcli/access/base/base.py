@@ -4,10 +4,14 @@ __author__ = "Gahan Saraiya"
 # Built-in imports
 import os
 import binascii
+import tempfile
 import warnings
 import configparser
 
 SMI_TRIGGER_PORT = 0xB2
+# Operations of I/O batch
+IO_READ = 0
+IO_WRITE = 1
 DEPRECATION_WARNINGS = False
 
 
@@ -50,6 +54,8 @@ def deprecated(message):
 
 
 class BaseAccess(object):
+  halt_required = True  # whether CPU is to be halted to poll memory shared with firmware
+
   def __init__(self, access_name, child_class_directory):
     """
 
@@ -136,6 +142,21 @@ class BaseAccess(object):
   def memBlock(self, address, size):
     return self.mem_block(address, size)
 
+  def mem_block_into(self, address, buffer):
+    """
+    Read memory block directly in to the given writable buffer,
+    size of memory block to be read is determined by length of buffer.
+    Access methods shall override this to fill the buffer without
+    converting data to integer or string in between.
+
+    :param address: address from which memory block needs to be read
+    :param buffer: writable bytes-like object (i.e. bytearray, memoryview)
+    :return: number of bytes read
+    """
+    view = memoryview(buffer).cast("B")
+    view[:] = self.mem_block(address, len(view))
+    return len(view)
+
   def mem_save(self, filename, address, size):
     raise CliAccessException()
 
@@ -160,6 +181,25 @@ class BaseAccess(object):
   def load_data(self, filename, address):
     raise CliAccessException()
 
+  def mem_block_write(self, address, data):
+    """
+    Write memory block directly from the given bytes-like object.
+    Access methods shall override this to write the buffer without
+    staging it in a file, by default data is loaded through `load_data`.
+
+    :param address: address at which memory block is to be written
+    :param data: bytes-like object (i.e. bytes, bytearray, memoryview)
+    :return: number of bytes written
+    """
+    view = memoryview(data).cast("B")
+    with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as temp_file:
+      temp_file.write(view)
+    try:
+      self.load_data(temp_file.name, address)
+    finally:
+      os.remove(temp_file.name)
+    return len(view)
+
   def read_io(self, address, size):
     raise CliAccessException()
 
@@ -174,6 +214,24 @@ class BaseAccess(object):
   def writeIO(self, address, size, value):
     return self.write_io(address, size, value)
 
+  def io_batch(self, operations):
+    """
+    Perform sequence of I/O port operations with single call to access method.
+    Access methods shall override this to execute whole sequence natively.
+
+    :param operations: iterable of tuple (operation, port, size, value) where
+      operation is either `IO_READ` or `IO_WRITE` (value is ignored for `IO_READ`)
+    :return: list with integer value read for each `IO_READ` and None for each `IO_WRITE` operation
+    """
+    result = []
+    for operation, port, size, value in operations:
+      if operation == IO_READ:
+        result.append(int(self.read_io(port, size)))
+      else:
+        self.write_io(port, size, value)
+        result.append(None)
+    return result
+
   def trigger_smi(self, smi_value):
     """
     Trigger Software (S/W) SMI of desired value
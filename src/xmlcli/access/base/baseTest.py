@@ -6,6 +6,7 @@ and example to write test cases.
 import os
 import unittest
 from .base import BaseAccess
+from .instrumentation import LatencyHistogram
 
 
 class BaseTestCase(unittest.TestCase):
@@ -39,5 +40,17 @@ class BaseTestCase(unittest.TestCase):
     self.assertEqual(read_val, write_val, "Write Value does not match!!")
 
 
+class LatencyHistogramTestCase(unittest.TestCase):
+  def test_percentile(self):
+    histogram = LatencyHistogram()
+    for microseconds in range(1, 101):
+      histogram.record(microseconds / 1e6)
+    self.assertEqual(histogram.count, 100)
+    # percentiles are upper bound of bucket, resolution of bucket is within 10%
+    for percent in (50, 95, 99):
+      self.assertGreaterEqual(histogram.percentile(percent), percent / 1e6)
+      self.assertLessEqual(histogram.percentile(percent), percent * 1.1 / 1e6)
+
+
 if __name__ == '__main__':
   unittest.main()
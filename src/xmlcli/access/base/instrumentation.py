@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of access methods.
+
+`InstrumentedAccess` wraps instance of any `BaseAccess` subclass and records
+call count, bytes transferred and latency histogram of each access operation.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+import math
+import time
+
+__all__ = ["InstrumentedAccess", "OperationStatistics", "LatencyHistogram", "INSTRUMENTED_OPERATIONS"]
+
+
+def _buffer_size(buffer):
+  return memoryview(buffer).nbytes
+
+
+# operation name -> function returning number of bytes transferred by the call from its arguments
+INSTRUMENTED_OPERATIONS = {
+  "halt_cpu"            : None,
+  "run_cpu"             : None,
+  "initialize_interface": None,
+  "close_interface"     : None,
+  "warm_reset"          : None,
+  "cold_reset"          : None,
+  "mem_block"           : lambda address, size: size,
+  "mem_block_into"      : lambda address, buffer: _buffer_size(buffer),
+  "mem_block_write"     : lambda address, data: _buffer_size(data),
+  "mem_save"            : lambda filename, address, size: size,
+  "mem_read"            : lambda address, size: size,
+  "mem_write"           : lambda address, size, value: size,
+  "load_data"           : lambda filename, address: os.path.getsize(filename),
+  "read_io"             : lambda address, size: size,
+  "write_io"            : lambda address, size, value: size,
+  "io_batch"            : lambda operations: sum(operation[2] for operation in operations),
+  "trigger_smi"         : None,
+  "read_msr"            : None,
+  "write_msr"           : None,
+  "read_sm_base"        : None,
+}
+
+
+class LatencyHistogram(object):
+  """Histogram of latencies with logarithmic buckets
+
+  Each power of two (in nanoseconds) is split in `sub_buckets` buckets,
+  hence percentiles are reported with resolution of ~9% (for 8 sub buckets)
+  irrespective of number of samples recorded.
+  """
+
+  def __init__(self, sub_buckets=8):
+    self.sub_buckets = sub_buckets
+    self.buckets = {}  # bucket index -> count
+    self.count = 0
+
+  def record(self, seconds):
+    nanoseconds = max(1.0, seconds * 1e9)
+    index = int(math.log2(nanoseconds) * self.sub_buckets)
+    self.buckets[index] = self.buckets.get(index, 0) + 1
+    self.count += 1
+
+  def percentile(self, percent):
+    """Upper bound of latency (in seconds) within which given percent of samples fall"""
+    if not self.count:
+      return 0.0
+    threshold = self.count * percent / 100.0
+    cumulative = 0
+    for index in sorted(self.buckets):
+      cumulative += self.buckets[index]
+      if cumulative >= threshold:
+        return (2 ** ((index + 1) / self.sub_buckets)) / 1e9
+    return (2 ** ((max(self.buckets) + 1) / self.sub_buckets)) / 1e9
+
+
+class OperationStatistics(object):
+  """Call count, bytes and latency of single access operation"""
+
+  def __init__(self, name):
+    self.name = name
+    self.count = 0
+    self.bytes = 0
+    self.errors = 0
+    self.total_time = 0.0
+    self.min_time = None
+    self.max_time = 0.0
+    self.histogram = LatencyHistogram()
+
+  def record(self, elapsed, size=0, error=False):
+    self.count += 1
+    self.bytes += size
+    self.errors += int(error)
+    self.total_time += elapsed
+    self.min_time = elapsed if self.min_time is None else min(self.min_time, elapsed)
+    self.max_time = max(self.max_time, elapsed)
+    self.histogram.record(elapsed)
+
+  def to_dict(self):
+    to_us = lambda seconds: round(seconds * 1e6, 3)
+    percentile = lambda percent: min(self.histogram.percentile(percent), self.max_time)  # bucket bound may exceed max
+    return {
+      "count"   : self.count,
+      "bytes"   : self.bytes,
+      "errors"  : self.errors,
+      "total_ms": round(self.total_time * 1e3, 3),
+      "mean_us" : to_us(self.total_time / self.count) if self.count else 0,
+      "min_us"  : to_us(self.min_time or 0),
+      "max_us"  : to_us(self.max_time),
+      "p50_us"  : to_us(percentile(50)),
+      "p95_us"  : to_us(percentile(95)),
+      "p99_us"  : to_us(percentile(99)),
+    }
+
+
+class InstrumentedAccess(object):
+  """Wrapper over access method instance recording statistics of access operations
+
+  All the attributes other than instrumented operations are served by the wrapped instance.
+
+  :param access: instance of access method (subclass of BaseAccess)
+  """
+
+  def __init__(self, access):
+    self.access = access
+    self.statistics = {}
+    for name, byte_counter in INSTRUMENTED_OPERATIONS.items():
+      if hasattr(access, name):
+        setattr(self, name, self._instrument(name, getattr(access, name), byte_counter))
+
+  def __getattr__(self, name):
+    # invoked only for attributes not found on wrapper itself
+    return getattr(self.access, name)
+
+  def _instrument(self, name, method, byte_counter):
+    def instrumented_method(*args, **kwargs):
+      if name == "io_batch":
+        args = (list(args[0]),) + args[1:]  # operations may be iterator, which is to be consumed twice
+      error = True
+      start_time = time.perf_counter()
+      try:
+        result = method(*args, **kwargs)
+        error = False
+        return result
+      finally:
+        elapsed = time.perf_counter() - start_time
+        try:
+          size = byte_counter(*args, **kwargs) if byte_counter else 0
+        except (TypeError, ValueError, OSError):
+          size = 0
+        if name not in self.statistics:
+          self.statistics[name] = OperationStatistics(name)
+        self.statistics[name].record(elapsed, size, error)
+    instrumented_method.__name__ = name
+    instrumented_method.__doc__ = method.__doc__
+    return instrumented_method
+
+  def reset_statistics(self):
+    self.statistics = {}
+
+  def get_statistics(self):
+    """Statistics of all the operations invoked so far
+
+    :return: dictionary {operation name: {count, bytes, errors, total_ms, mean_us, min_us, max_us, p50_us, p95_us, p99_us}}
+    """
+    return {name: self.statistics[name].to_dict() for name in sorted(self.statistics)}
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Binary trace of access method calls, written by `record` and served by `replay` access method.
+
+Trace starts with `TRACE_SIGNATURE` followed by records of below format (little endian):
+
+| Field   | Size | Description                                                        |
+|---------|------|--------------------------------------------------------------------|
+| opcode  | 1    | operation as per `OPERATIONS`                                      |
+| arg0    | 8    | address or port (if applicable for operation)                      |
+| arg1    | 8    | size, value or count (if applicable for operation)                 |
+| length  | 4    | length of payload                                                  |
+| payload | n    | data read (for read operations) or data written (for write ones)   |
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import struct
+
+# Custom imports
+from . import base
+
+__all__ = ["TraceRecord", "TraceWriter", "TraceReader", "OPERATIONS", "OPCODES", "TRACE_SIGNATURE",
+           "pack_io_batch", "unpack_io_batch"]
+
+TRACE_SIGNATURE = b"XCLITRC\x01"
+RECORD_HEADER = struct.Struct("<BQQI")
+IO_BATCH_ENTRY = struct.Struct("<BBHI")  # operation, size, port, value (written or read)
+
+OPERATIONS = ("halt_cpu", "run_cpu", "initialize_interface", "close_interface", "warm_reset", "cold_reset",
+              "mem_block", "mem_block_into", "mem_save", "mem_read", "mem_write", "load_data",
+              "read_io", "write_io", "io_batch", "trigger_smi", "read_msr", "write_msr", "read_sm_base",
+              "mem_block_write")
+OPCODES = {operation: opcode for opcode, operation in enumerate(OPERATIONS)}
+
+
+class TraceRecord(object):
+  __slots__ = ("operation", "arg0", "arg1", "payload")
+
+  def __init__(self, operation, arg0=0, arg1=0, payload=b""):
+    self.operation = operation
+    self.arg0 = arg0
+    self.arg1 = arg1
+    self.payload = payload
+
+  def __repr__(self):
+    return f"{self.operation}(0x{self.arg0:x}, 0x{self.arg1:x}) [{len(self.payload)} bytes]"
+
+
+def pack_io_batch(operations, result):
+  """Pack operations of I/O batch along with value read/written by each operation"""
+  return b"".join(IO_BATCH_ENTRY.pack(operation, size, port, (value if operation == base.IO_WRITE else read_value) & 0xFFFFFFFF)
+                  for (operation, port, size, value), read_value in zip(operations, result))
+
+
+def unpack_io_batch(payload):
+  """Unpack I/O batch payload as list of tuple (operation, port, size, value)"""
+  return [(operation, port, size, value) for operation, size, port, value in IO_BATCH_ENTRY.iter_unpack(payload)]
+
+
+class TraceWriter(object):
+  def __init__(self, trace_file):
+    self.trace_file = trace_file
+    self.file_object = open(trace_file, "wb")
+    self.file_object.write(TRACE_SIGNATURE)
+    self.record_count = 0
+
+  def write(self, operation, arg0=0, arg1=0, payload=b""):
+    self.file_object.write(RECORD_HEADER.pack(OPCODES[operation], arg0 & 0xFFFFFFFFFFFFFFFF, arg1 & 0xFFFFFFFFFFFFFFFF, len(payload)))
+    if payload:
+      self.file_object.write(payload)
+    self.record_count += 1
+
+  def flush(self):
+    if not self.file_object.closed:
+      self.file_object.flush()
+
+  def close(self):
+    if not self.file_object.closed:
+      self.file_object.close()
+
+
+class TraceReader(object):
+  def __init__(self, trace_file):
+    self.trace_file = trace_file
+    with open(trace_file, "rb") as file_object:
+      data = file_object.read()
+    if not data.startswith(TRACE_SIGNATURE):
+      raise base.CliOperationException(f"{trace_file} is not a valid access trace")
+    self.records = []
+    position = len(TRACE_SIGNATURE)
+    data = memoryview(data)
+    while position + RECORD_HEADER.size <= len(data):
+      opcode, arg0, arg1, length = RECORD_HEADER.unpack_from(data, position)
+      position += RECORD_HEADER.size
+      self.records.append(TraceRecord(OPERATIONS[opcode], arg0, arg1, bytes(data[position:position + length])))
+      position += length
+
+  def __len__(self):
+    return len(self.records)
+
+  def __iter__(self):
+    return iter(self.records)
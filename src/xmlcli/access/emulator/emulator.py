@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+import mmap
+import time
+import tempfile
+
+# Custom imports
+from ..base import base
+from . import firmware
+
+__all__ = ["EmulatorAccess", "EmulatedMemory", "EmulatedTarget"]
+
+CMOS_INDEX_PORTS = {0x70: 0x00, 0x72: 0x80}  # index port -> base of CMOS bank
+CMOS_DATA_PORTS = {0x71: 0x70, 0x73: 0x72}  # data port -> index port
+RESET_CONTROL_PORT = 0xCF9
+
+
+class EmulatedMemory(object):
+  """Physical memory of emulated target backed by sparse file
+
+  Only pages written by firmware model or by the host consumes space,
+  rest of the memory reads as zero.
+  """
+
+  def __init__(self, memory_file=None, size=0x100000000):
+    self.size = size
+    if memory_file:
+      self.file_object = open(memory_file, "a+b")
+    else:
+      self.file_object = tempfile.TemporaryFile()
+    if os.fstat(self.file_object.fileno()).st_size < size:
+      self.file_object.truncate(size)
+    self.buffer = mmap.mmap(self.file_object.fileno(), size, mmap.MAP_SHARED, mmap.PROT_WRITE | mmap.PROT_READ)
+
+  def close(self):
+    self.buffer.close()
+    self.file_object.close()
+
+  def _check_range(self, address, size):
+    if address < 0 or size < 0 or address + size > self.size:
+      raise base.CliOperationException(f"Memory range 0x{address:x}+0x{size:x} is beyond emulated memory of size 0x{self.size:x}")
+
+  def read(self, address, size):
+    self._check_range(address, size)
+    return self.buffer[address:address + size]
+
+  def readinto(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    self._check_range(address, len(view))
+    view[:] = self.buffer[address:address + len(view)]
+    return len(view)
+
+  def save(self, address, size, out_file):
+    """Write memory range to file object without copying it"""
+    self._check_range(address, size)
+    with memoryview(self.buffer) as view:
+      return out_file.write(view[address:address + size])
+
+  def write(self, address, data):
+    data = memoryview(data).cast("B")
+    self._check_range(address, len(data))
+    self.buffer[address:address + len(data)] = data
+    return len(data)
+
+
+class EmulatedTarget(object):
+  """Emulated target platform having memory, I/O ports, CMOS and firmware serving S/W SMI"""
+
+  def __init__(self, memory_file=None, memory_size=0x100000000, smi_latency=0.0):
+    self.memory = EmulatedMemory(memory_file, memory_size)
+    self.cmos = bytearray(0x100)
+    self.cmos_index = {index_port: 0 for index_port in CMOS_INDEX_PORTS}
+    self.ports = {}
+    self.smi_latency = smi_latency
+    self.firmware = None
+
+  def read_io(self, port, size):
+    if port in CMOS_DATA_PORTS:
+      return self.cmos[self.cmos_index[CMOS_DATA_PORTS[port]]]
+    if port in CMOS_INDEX_PORTS:
+      return self.cmos_index[port] & 0x7F
+    return self.ports.get(port, 0) & ((1 << (size * 8)) - 1)
+
+  def write_io(self, port, size, value):
+    value &= (1 << (size * 8)) - 1
+    if port in CMOS_INDEX_PORTS:
+      self.cmos_index[port] = CMOS_INDEX_PORTS[port] | (value & 0x7F)
+    elif port in CMOS_DATA_PORTS:
+      self.cmos[self.cmos_index[CMOS_DATA_PORTS[port]]] = value & 0xFF
+    elif port == base.SMI_TRIGGER_PORT:
+      self.ports[port] = value
+      self.trigger_smi(value)
+    elif port == RESET_CONTROL_PORT and value & 0x4:
+      self.reset()
+    else:
+      self.ports[port] = value
+
+  def trigger_smi(self, smi_value):
+    if self.smi_latency:
+      time.sleep(self.smi_latency)
+    if self.firmware:
+      self.firmware.handle_smi(smi_value)
+
+  def reset(self):
+    """Platform reset, firmware publishes XML with current knob values as new baseline"""
+    if self.firmware:
+      self.firmware.publish()
+
+
+# Emulated targets backed by memory file are shared by instances of access method
+# using the same file, every other instance emulates a target of its own
+_targets = {}
+
+
+class EmulatorAccess(base.BaseAccess):
+  halt_required = False
+
+  def __init__(self, access_name="emulator"):
+    self.current_directory = os.path.dirname(os.path.abspath(__file__))
+    super(EmulatorAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
+    section = access_name.upper()
+    self.memory_file = self._get_path(section, "memory_file")
+    self.memory_size = int(self.config.get(section, "memory_size", fallback="0x100000000"), 0)
+    self.mailbox_address = int(self.config.get(section, "mailbox_address", fallback="0x7A000000"), 0)
+    self.spec_version = tuple(int(i, 0) for i in self.config.get(section, "cli_spec_version", fallback="0.8.0").split("."))
+    self.seed_xml = self._get_path(section, "seed_xml")
+    self.seed_knobs_bin = self._get_path(section, "seed_knobs_bin")
+    self.synthetic_knobs = int(self.config.get(section, "synthetic_knobs", fallback="256"), 0)
+    self.compress_xml = self.config.getboolean(section, "compress_xml", fallback=True)
+    self.smi_latency = float(self.config.get(section, "smi_latency", fallback="0") or 0)
+    if not self.memory_file:
+      self.target = self.create_target()
+    else:
+      if self.memory_file not in _targets:
+        _targets[self.memory_file] = self.create_target()
+      self.target = _targets[self.memory_file]
+
+  def _get_path(self, section, option):
+    path = self.config.get(section, option, fallback="")
+    if path and not os.path.isabs(path):
+      path = os.path.join(self.current_directory, path)
+    return path
+
+  @property
+  def memory(self):
+    return self.target.memory
+
+  @property
+  def cmos(self):
+    return self.target.cmos
+
+  @property
+  def firmware(self):
+    return self.target.firmware
+
+  def create_target(self):
+    """Create emulated target and seed its firmware with platform XML
+
+    Seed is taken from `seed_xml` if specified, else from `seed_knobs_bin`,
+    else platform XML with `synthetic_knobs` number of knobs is generated.
+    """
+    target = EmulatedTarget(self.memory_file, self.memory_size, self.smi_latency)
+    if self.seed_xml:
+      with open(self.seed_xml, "rb") as xml_file:
+        xml_content = xml_file.read()
+    elif self.seed_knobs_bin:
+      xml_content = firmware.knobs_bin_to_platform_xml(self.seed_knobs_bin)
+    else:
+      xml_content = firmware.create_synthetic_platform_xml(self.synthetic_knobs)
+    self.seed_target(target, xml_content)
+    return target
+
+  def seed_target(self, target, xml_content):
+    target.firmware = firmware.XmlCliFirmware(target, mailbox_address=self.mailbox_address,
+                                              spec_version=self.spec_version, compress_xml=self.compress_xml)
+    target.firmware.seed(xml_content)
+    target.firmware.publish()
+
+  def seed(self, xml_content):
+    """Re-seed firmware of emulated target with given platform XML content"""
+    self.seed_target(self.target, xml_content)
+
+  def halt_cpu(self, delay=0):
+    return 0
+
+  def run_cpu(self):
+    return 0
+
+  def initialize_interface(self):
+    return 0
+
+  def close_interface(self):
+    return 0
+
+  def warm_reset(self):
+    self.target.write_io(RESET_CONTROL_PORT, 1, 0x06)
+
+  def cold_reset(self):
+    self.target.write_io(RESET_CONTROL_PORT, 1, 0x0E)
+
+  def mem_block(self, address, size):
+    return self.memory.read(address, size)
+
+  def mem_block_into(self, address, buffer):
+    return self.memory.readinto(address, buffer)
+
+  def mem_save(self, filename, address, size):
+    with open(filename, "wb") as out_file:
+      return self.memory.save(address, size, out_file)
+
+  def mem_read(self, address, size):
+    return int.from_bytes(self.memory.read(address, size), byteorder="little")
+
+  def mem_write(self, address, size, value):
+    self.memory.write(address, (value & ((1 << (size * 8)) - 1)).to_bytes(size, byteorder="little"))
+
+  def load_data(self, filename, address):
+    with open(filename, "rb") as in_file:
+      self.memory.write(address, in_file.read())
+
+  def mem_block_write(self, address, data):
+    return self.memory.write(address, data)
+
+  def read_io(self, address, size):
+    return self.target.read_io(address, size)
+
+  def write_io(self, address, size, value):
+    self.target.write_io(address, size, value)
+
+  def trigger_smi(self, smi_value):
+    self.target.write_io(base.SMI_TRIGGER_PORT, 1, smi_value)
+
+  def read_msr(self, Ap, address):
+    return 0
+
+  def write_msr(self, Ap, address, value):
+    return 0
+
+  def read_sm_base(self):
+    return 0
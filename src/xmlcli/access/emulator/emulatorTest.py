@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from .emulator import EmulatorAccess
+from . import firmware
+from ... import XmlCliLib as clb
+from ... import XmlCli as cli
+from ... import XmlIniParser as prs
+from ... import knobs
+from ...common import utils
+from ...common import configurations
+from ...common import xml_cache
+
+
+class EmulatorTestCase(unittest.TestCase):
+  def test_initialize_interface(self):
+    access_method_name = "emulator"
+    self.base_object = EmulatorAccess(access_name=access_method_name)
+    self.assertEqual(self.base_object.interface, access_method_name)
+    self.assertEqual(self.base_object.interface, self.base_object.InterfaceType)
+
+  def test_memory_and_cmos(self):
+    access = EmulatorAccess(access_name="emulator")
+    access.mem_write(0x1000, 4, 0xDEADBEEF)
+    self.assertEqual(access.mem_read(0x1000, 4), 0xDEADBEEF)
+    buffer = bytearray(4)
+    self.assertEqual(access.mem_block_into(0x1000, buffer), 4)
+    self.assertEqual(bytes(buffer), b"\xef\xbe\xad\xde")
+    self.assertEqual(access.mem_block_write(0x1002, b"\x34\x12"), 2)
+    self.assertEqual(access.mem_read(0x1000, 4), 0x1234BEEF)
+    save_file = tempfile.mktemp(suffix=".bin")
+    self.addCleanup(lambda: os.path.exists(save_file) and os.remove(save_file))
+    self.assertEqual(access.mem_save(save_file, 0x1000, 4), 4)
+    with open(save_file, "rb") as saved_file:
+      self.assertEqual(saved_file.read(), b"\xef\xbe\x34\x12")
+    access.write_io(0x72, 1, 0xF1)
+    self.assertEqual(access.read_io(0x73, 1), (access.mailbox_address >> 24) & 0xFF)
+    access.write_io(0x70, 1, 0x78)
+    self.assertEqual(access.read_io(0x71, 1), (access.mailbox_address >> 16) & 0xFF)
+    self.assertIsNot(EmulatorAccess(access_name="emulator").target, access.target)  # target of its own unless memory file is shared
+
+
+class EmulatorMailboxTestCase(unittest.TestCase):
+  """Run XmlCli mailbox protocol end to end against emulated firmware"""
+
+  def setUp(self):
+    self.previous_interface = clb.InterfaceType
+    clb._setCliAccess("emulator")
+    self.access = clb.cliaccess
+    self.access.seed(firmware.create_synthetic_platform_xml(knob_count=20))
+    self.xml_file = tempfile.mktemp(suffix=".xml")
+
+  def tearDown(self):
+    clb._setCliAccess(self.previous_interface)
+    if os.path.exists(self.xml_file):
+      os.remove(self.xml_file)
+
+  def current_value(self, knob_name):
+    with open(self.xml_file, "r") as xml_file:
+      return re.search(rf'name="{knob_name}"[^>]*CurrentVal="(0x[0-9A-F]+)"', xml_file.read()).group(1)
+
+  def test_save_xml(self):
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(self.current_value("EmuKnob_00001"), "0x01")
+    self.access.firmware.compress_xml = False
+    self.access.firmware.publish()
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(self.current_value("EmuKnob_00001"), "0x01")
+
+  def test_program_and_read_knobs(self):
+    knobs = "EmuKnob_00000=1, EmuKnob_00002=0x1234, EmuKnob_00003=0x12345678, EmuKnob_00004=5, EmuKnob_00014=6"
+    self.assertEqual(cli.CvProgKnobs(knobs), 0)
+    self.assertEqual(cli.CvReadKnobs(knobs), 0)
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)  # XML is patched with `$XKDT` delta packet
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x1234")
+    self.assertEqual(self.current_value("EmuKnob_00003"), "0x12345678")
+    self.assertEqual(self.current_value("EmuKnob_00014"), "0x06")
+    self.assertEqual(cli.CvRestoreModifyKnobs("EmuKnob_00000=1"), 0)
+    self.assertEqual(cli.CvReadKnobs("EmuKnob_00000=1, EmuKnob_00002=0"), 0)
+    self.access.warm_reset()  # published XML gets the current values, delta packet is cleared
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(self.current_value("EmuKnob_00000"), "0x01")
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x0000")
+
+  def test_program_knobs_per_varstore(self):
+    knobs = "EmuKnob_00002=0x1234, EmuKnob_00003=0x12345678, EmuKnob_00004=5, EmuKnob_00009=3"
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    knob_values = dict(knob.split("=") for knob in knobs.replace(" ", "").split(","))
+    request_buffer = prs.compile_request_buffer(prs.get_request_knobs(self.xml_file), knob_values)
+    varstore_buffers = request_buffer.get_varstore_buffers()
+    self.assertEqual(sorted(varstore_buffers), [0, 1])  # knobs spread across both the varstores
+    self.assertEqual(bytes(varstore_buffers[0][:4]), (2).to_bytes(4, "little"))
+    self.assertEqual(sum(len(buffer) for buffer in varstore_buffers.values()), len(request_buffer.buffer) + 8)
+    clb.UfsFlag, previous_ufs_flag = True, clb.UfsFlag  # request is sent per varstore
+    knobs_dict = {}
+    try:
+      self.assertEqual(cli.cliProcessKnobs(clb.PlatformConfigXml, cli.CreateTmpIniFile(knobs), clb.CLI_KNOB_APPEND, 0, False, KnobsVerify=True, KnobsDict=knobs_dict), 0)
+    finally:
+      clb.UfsFlag = previous_ufs_flag
+    # response of each SMI is reported
+    self.assertEqual(sorted(knob["KnobName"] for knob in knobs_dict.values()), sorted(knob_values))
+    self.assertEqual(sorted({knob["VarId"] for knob in knobs_dict.values()}), [0, 1])
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x1234")
+    self.assertEqual(self.current_value("EmuKnob_00003"), "0x12345678")
+    self.assertEqual(self.current_value("EmuKnob_00004"), "0x05")
+    self.assertEqual(self.current_value("EmuKnob_00009"), "0x03")
+
+  def test_knob_transaction(self):
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    with knobs(self.xml_file) as tx:
+      tx.set("EmuKnob_00001", self.current_value("EmuKnob_00001"))  # no-op
+      tx.set("EmuKnob_00009", 3)
+      tx.set("EmuKnob_00002", 0x1234)
+      tx.set("EmuKnob_00003", 0x5)
+      tx.set("EmuKnob_00003", "0x12345678")  # overrides earlier request
+    self.assertEqual(tx.status, 0)
+    self.assertEqual(tx.skipped, ["EmuKnob_00001"])
+    self.assertEqual(sorted(tx.results), ["EmuKnob_00002", "EmuKnob_00003", "EmuKnob_00009"])
+    self.assertEqual(tx.results["EmuKnob_00003"]["OutValue"], 0x12345678)
+    self.assertRaises(utils.XmlCliException, tx.set, "EmuKnob_00002", 0)
+    smi_count = self.access.firmware.smi_count
+    with knobs(self.xml_file) as tx:
+      tx.set("EmuKnob_00002", "0x1234")
+      tx.set("EmuKnob_00009", "0x3")
+    self.assertEqual((tx.status, tx.skipped, tx.results), (0, ["EmuKnob_00002", "EmuKnob_00009"], {}))
+    self.assertEqual(self.access.firmware.smi_count, smi_count)  # knobs operation is not issued for no-op transaction
+    with self.assertRaises(RuntimeError):
+      with knobs(self.xml_file) as tx:
+        tx.set("EmuKnob_00002", 0)
+        raise RuntimeError("transaction is discarded")
+    self.assertIsNone(tx.status)
+
+  def test_cmos_batch(self):
+    self.assertEqual(clb.GetDramMbAddr(), self.access.firmware.mailbox_address)
+    self.assertEqual(clb.readcmos_block(range(0x100)), list(self.access.cmos))
+    clb.writecmos(0x40, 0x5A)
+    clb.writecmos(0xC0, 0xA5)
+    self.assertEqual([clb.readcmos(0x40), clb.readcmos(0xC0)], [0x5A, 0xA5])
+    result = self.access.io_batch([(clb.IO_WRITE, 0x70, 1, 0x40), (clb.IO_READ, 0x71, 1, 0)])
+    self.assertEqual(result, [None, 0x5A])
+
+  def test_access_instrumentation(self):
+    statistics_file = tempfile.mktemp(suffix=".json")
+    clb.AccessStatisticsFile, previous_statistics_file = statistics_file, clb.AccessStatisticsFile
+    clb.enableAccessInstrumentation(True)
+    try:
+      self.assertEqual(cli.CvProgKnobs("EmuKnob_00000=1"), 0)
+      with open(statistics_file, "r") as json_file:
+        result = json.load(json_file)
+      self.assertEqual(result["operation"], "cliProcessKnobs")
+      statistics = result["statistics"]
+      self.assertEqual(statistics["trigger_smi"]["count"], 1)
+      self.assertGreater(statistics["mem_block_into"]["bytes"], 0)
+      self.assertGreater(statistics["mem_block_write"]["bytes"], 0)
+      self.assertLessEqual(statistics["mem_read"]["p50_us"], statistics["mem_read"]["p99_us"])
+    finally:
+      clb.enableAccessInstrumentation(False)
+      clb.AccessStatisticsFile = previous_statistics_file
+      if os.path.exists(statistics_file):
+        os.remove(statistics_file)
+    self.assertEqual(clb.getAccessStatistics(), {})
+
+  def test_mailbox_cache(self):
+    session = clb.getSession()
+    mailbox_address = self.access.firmware.mailbox_address
+    self.assertIsNone(session.mailbox)
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(session.mailbox.address, mailbox_address)
+    clb.enableAccessInstrumentation(True)
+    try:
+      self.assertEqual(cli.CvProgKnobs("EmuKnob_00000=1"), 0)
+      statistics = clb.getAccessStatistics()
+    finally:
+      clb.enableAccessInstrumentation(False)
+    self.assertNotIn("io_batch", statistics)  # no CMOS probing for cached mailbox
+    self.assertEqual(clb.GetDramMbAddr(), mailbox_address)
+    signature = self.access.mem_read(mailbox_address, 4)
+    self.access.mem_write(mailbox_address, 4, 0)
+    self.assertEqual(clb.GetDramMbAddr(), 0)  # signature mismatch drops the cache
+    self.assertIsNone(session.mailbox)
+    self.access.mem_write(mailbox_address, 4, signature)
+    self.assertEqual(clb.GetDramMbAddr(), mailbox_address)
+    self.assertIsNotNone(session.mailbox)
+    clb.warmreset()
+    self.assertIsNone(session.mailbox)
+
+  def test_xml_cache(self):
+    cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+    previous_settings = configurations.XML_CACHE, configurations.XML_CACHE_DIR
+    configurations.XML_CACHE, configurations.XML_CACHE_DIR = True, cache_dir
+    self.addCleanup(setattr, configurations, "XML_CACHE", previous_settings[0])
+    self.addCleanup(setattr, configurations, "XML_CACHE_DIR", previous_settings[1])
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(len([file_name for file_name in os.listdir(cache_dir) if file_name.endswith(".xml")]), 1)
+    self.assertEqual(cli.CvProgKnobs("EmuKnob_00002=0x4321"), 0)
+    clb.enableAccessInstrumentation(True)
+    try:
+      self.assertEqual(clb.SaveXml(self.xml_file), 0)  # served from cache, current value applied from delta packet
+      statistics = clb.getAccessStatistics()
+    finally:
+      clb.enableAccessInstrumentation(False)
+    self.assertNotIn("mem_save", statistics)  # compressed XML is not downloaded
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x4321")
+    self.access.warm_reset()  # new baseline is published
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x4321")
+    cached_files = [os.path.join(cache_dir, file_name) for file_name in os.listdir(cache_dir) if file_name.endswith(".xml")]
+    self.assertEqual(len(cached_files), 2)
+    for cached_file in cached_files:
+      with open(cached_file, "r+b") as xml_file:
+        xml_file.write(b"<CORRUPTED>")
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)  # corrupted entry is discarded and downloaded again
+    self.assertEqual(self.current_value("EmuKnob_00002"), "0x4321")
+
+  def test_xml_block_delta(self):
+    cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+    previous_settings = configurations.XML_CACHE, configurations.XML_CACHE_DIR, configurations.XML_BLOCK_DELTA
+    configurations.XML_CACHE, configurations.XML_CACHE_DIR, configurations.XML_BLOCK_DELTA = True, cache_dir, True
+    self.addCleanup(setattr, configurations, "XML_CACHE", previous_settings[0])
+    self.addCleanup(setattr, configurations, "XML_CACHE_DIR", previous_settings[1])
+    self.addCleanup(setattr, configurations, "XML_BLOCK_DELTA", previous_settings[2])
+    target_firmware = self.access.firmware
+    target_firmware.compress_xml = False
+    target_firmware.seed(firmware.create_synthetic_platform_xml(knob_count=400))
+    target_firmware.publish()
+    xml_size = len(target_firmware.xml)
+
+    def save_xml():
+      clb.enableAccessInstrumentation(True)
+      try:
+        self.assertEqual(clb.SaveXml(self.xml_file), 0)
+        bytes_read = clb.getAccessStatistics()["mem_block_into"]["bytes"]
+      finally:
+        clb.enableAccessInstrumentation(False)
+      with open(self.xml_file, "rb") as xml_file:
+        self.assertEqual(xml_file.read(), self.access.mem_block(target_firmware.xml_address, xml_size))
+      return bytes_read
+
+    self.assertGreaterEqual(save_xml(), xml_size)
+    self.assertEqual(cli.CvProgKnobs("EmuKnob_00002=0x4321, EmuKnob_00300=7"), 0)
+    self.assertLess(save_xml(), xml_size // 4)  # only blocks of knobs listed by patch packet are read
+    self.assertEqual(self.current_value("EmuKnob_00300"), "0x07")
+    self.access.warm_reset()  # patch packet is cleared, blocks of knobs seen earlier are read
+    self.assertLess(save_xml(), xml_size // 4)
+    self.assertEqual(self.current_value("EmuKnob_00300"), "0x07")
+    knobs_end = target_firmware.xml.find(b"</biosknobs>")
+    self.access.memory.write(target_firmware.xml_address + xml_cache.BLOCK_SIZE, target_firmware.xml[xml_cache.BLOCK_SIZE:knobs_end].swapcase())
+    self.assertGreaterEqual(save_xml(), xml_size)  # sampling detects unpredicted change
+
+  def test_knob_entry_index(self):
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    target_firmware = self.access.firmware
+    knob_entry_index = clb.KnobEntryIndex.from_file(self.xml_file, target_firmware.xml_address, len(target_firmware.xml))
+    self.assertIs(knob_entry_index, clb.getSession().knob_entry_index)  # built while SaveXml validated the XML
+    self.assertTrue(knob_entry_index.valid)
+    self.assertGreaterEqual(len(knob_entry_index), len(target_firmware.knobs))
+    for knob in target_firmware.knobs:
+      entry_address = target_firmware.xml_address + knob.entry_offset
+      self.assertEqual(knob_entry_index.lookup(entry_address), clb.findKnobName(entry_address))
+      self.assertEqual(knob_entry_index.lookup(entry_address)[1], knob.name)
+    self.assertIsNone(knob_entry_index.lookup(target_firmware.xml_address))
+    self.assertIsNone(clb.KnobEntryIndex.from_file(self.xml_file, target_firmware.xml_address, len(target_firmware.xml) + 1))
+
+  def test_sanitize_xml(self):
+    target_firmware = self.access.firmware
+    knob = target_firmware.knobs[0]
+    xml_data = bytearray(target_firmware.xml)
+    xml_data[knob.entry_offset - 1] = 0x01  # control character before knob entry
+    clb.WriteXml(self.xml_file, xml_data)
+    with open(self.xml_file, "rb") as xml_file:
+      self.assertEqual(xml_file.read(), target_firmware.xml[:knob.entry_offset - 1] + b" " + target_firmware.xml[knob.entry_offset:])
+    knob_entry_index = clb.SanitizeXml(self.xml_file, target_firmware.xml_address)
+    self.assertTrue(knob_entry_index.valid)
+    self.assertEqual(knob_entry_index.lookup(target_firmware.xml_address + knob.entry_offset)[1], knob.name)
+    xml_data[knob.entry_offset - 1] = ord("&")  # fixed only if XML has syntax errors
+    clb.WriteXml(self.xml_file, xml_data)
+    self.assertTrue(clb.SanitizeXml(self.xml_file, target_firmware.xml_address).valid)
+    with open(self.xml_file, "rb") as xml_file:
+      self.assertNotIn(b"&", xml_file.read())
+    self.assertFalse(os.path.exists(f"{self.xml_file}.raw"))
+
+  def test_knob_names_of_response(self):
+    self.assertEqual(cli.CvReadKnobs("EmuKnob_00000=0"), 0)  # mailbox discovered and cached beforehand
+    mem_block_count = []
+    for knobs in ("EmuKnob_00000=1", "EmuKnob_00000=1, EmuKnob_00002=0x10, EmuKnob_00004=2, EmuKnob_00014=3"):
+      knobs_dict = {}
+      clb.enableAccessInstrumentation(True)
+      try:
+        self.assertEqual(cli.cliProcessKnobs(clb.PlatformConfigXml, cli.CreateTmpIniFile(knobs), clb.CLI_KNOB_APPEND, 0, 0, KnobsDict=knobs_dict), 0)
+        mem_block_count.append(clb.getAccessStatistics()["mem_block_into"]["count"])
+      finally:
+        clb.enableAccessInstrumentation(False)
+      self.assertEqual([knob["KnobName"] for knob in knobs_dict.values()], re.findall(r"(\w+)=", knobs))
+    self.assertLessEqual(mem_block_count[1] - mem_block_count[0], 1)  # only XML delta packet grows, no read per knob entry
+
+  def test_response_polling(self):
+    session = clb.getSession()
+    clb.enableAccessInstrumentation(True)
+    try:
+      self.assertEqual(cli.CvProgKnobs("EmuKnob_00000=1"), 0)
+      statistics = clb.getAccessStatistics()
+    finally:
+      clb.enableAccessInstrumentation(False)
+    self.assertNotIn("halt_cpu", statistics)  # emulated target is not halted for polling
+    self.assertIn(clb.APPEND_BIOS_KNOBS_CMD_ID, session.cli_latency)
+    start_time = time.perf_counter()
+    self.assertEqual(clb.WaitForCliResponse(0x1000, Delay=0.02, Retries=5), 1)  # response is never ready
+    self.assertLess(time.perf_counter() - start_time, 1)
+    self.assertEqual(clb.LastErrorSig, 0xC2E0)
+
+  def test_request_without_authentication(self):
+    smi_count = self.access.firmware.authenticated_smi_count
+    self.access.trigger_smi(firmware.XML_CLI_SMI_VALUE)
+    self.assertEqual(self.access.firmware.authenticated_smi_count, smi_count)
+
+
+class EmulatorSessionTestCase(unittest.TestCase):
+  """Drive multiple emulated targets in parallel with one session per target"""
+
+  def create_session(self, knob_count, bios_version="EMULATED.0001"):
+    access = EmulatorAccess(access_name="emulator")
+    access.seed(firmware.create_synthetic_platform_xml(knob_count=knob_count, bios_version=bios_version))
+    out_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, out_dir, ignore_errors=True)
+    return clb.XmlCliSession(access, out_dir=out_dir)
+
+  def program_knobs(self, session, knobs):
+    with session:
+      self.assertIs(clb.getSession(), session)
+      status = cli.CvProgKnobs(knobs)
+      return status, clb.LastErrorSig
+
+  def test_parallel_sessions(self):
+    sessions = [self.create_session(knob_count=20 + index) for index in range(4)]
+    knobs = [f"EmuKnob_00002=0x{index + 1:X}" for index in range(len(sessions))]
+    default_session = clb.getSession()
+    with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+      results = list(executor.map(self.program_knobs, sessions, knobs))
+    self.assertEqual(results, [(0, 0)] * len(sessions))
+    self.assertIs(clb.getSession(), default_session)
+    for index, session in enumerate(sessions):
+      target_firmware = session.cliaccess.firmware
+      knob = next(knob for knob in target_firmware.knobs if knob.name == "EmuKnob_00002")
+      self.assertEqual(knob.read(target_firmware.nvars[knob.var_id].data), index + 1)
+      self.assertTrue(os.path.exists(os.path.join(session.TempFolder, "PlatformConfig.xml")))
+
+  def test_fleet_knobs(self):
+    sessions = [self.create_session(knob_count=20) for _ in range(3)]
+    sessions.append(self.create_session(knob_count=30, bios_version="EMULATED.0002"))
+    results = cli.CvProgKnobsFleet(sessions, "EmuKnob_00000=1, EmuKnob_00002=0x55AA", max_workers=2)
+    self.assertEqual([result["Status"] for result in results], [0] * len(sessions))
+    for session, result in zip(sessions, results):
+      self.assertIs(result["Session"], session)
+      self.assertEqual({knob["KnobName"]: knob["OutValue"] for knob in result["KnobsDict"].values()}, {"EmuKnob_00000": 1, "EmuKnob_00002": 0x55AA})
+    results = cli.CvReadKnobsFleet(sessions, "EmuKnob_00002=0x1234")
+    self.assertEqual([result["LastErrorSig"] for result in results], [0xC42F] * len(sessions))  # verify fails as value differs
+
+  def test_shared_request_buffer(self):
+    sessions = [self.create_session(knob_count=20) for _ in range(2)]
+    shared_request_buffer = cli.SharedRequestBuffer()
+    for session in sessions:
+      with session:
+        self.assertEqual(clb.SaveXml(clb.PlatformConfigXml), 0)
+        ini_file = cli.CreateTmpIniFile("EmuKnob_00004=3")
+        varstore_buffers, request_buffer = shared_request_buffer.build(clb.PlatformConfigXml, ini_file, os.path.join(clb.TempFolder, "biosKnobsdata.bin"))
+        self.assertEqual(varstore_buffers, {})
+        with open(os.path.join(clb.TempFolder, "biosKnobsdata.bin"), "rb") as bin_file:
+          self.assertEqual(bin_file.read(), request_buffer)
+    self.assertEqual(shared_request_buffer.build_count, 1)
+    with sessions[0]:
+      clb.UfsFlag = True  # request buffer of each varstore is built separately
+      varstore_buffers, request_buffer = shared_request_buffer.build(clb.PlatformConfigXml, ini_file, os.path.join(clb.TempFolder, "biosKnobsdata.bin"))
+    self.assertEqual(list(varstore_buffers), [0])
+    self.assertEqual(shared_request_buffer.build_count, 2)
+
+  def test_session_attributes(self):
+    session = self.create_session(knob_count=20)
+    with session:
+      clb.LastErrorSig = 0xC140
+      self.assertEqual(session.LastErrorSig, 0xC140)
+      self.assertEqual(clb.TempFolder, session.TempFolder)
+      clb.UfsFlag = True
+      clb.FlexConCfgFile = True
+      self.assertTrue(session.UfsFlag and session.FlexConCfgFile)
+    self.assertIsNot(clb.getSession(), session)
+    self.assertFalse(clb.UfsFlag or clb.FlexConCfgFile)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+"""
+Emulated firmware (BIOS) side of the XmlCli DRAM shared mailbox protocol.
+
+Firmware publishes the shared mailbox, legacy mailbox, platform XML and the
+packets following the XML (`$LZMA` compressed XML, `$XKDT` knob delta) in to
+the emulated target memory and serves the S/W SMI 0xF6 requests for
+append/restore-modify/read/load-default knob commands and NVAR get/set/gms.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import io
+import re
+import lzma
+import uuid
+import struct
+import secrets
+
+# Custom imports
+from ... import XmlCliLib as clb
+
+__all__ = ["XmlCliFirmware", "EmulatedKnob", "EmulatedNvar", "create_synthetic_platform_xml", "knobs_bin_to_platform_xml"]
+
+XML_CLI_SMI_VALUE = 0xF6
+PAGE_SIZE = 0x1000
+LEGACY_MAILBOX_OFFSET = 0x100  # legacy mailbox must be within first 0x200 bytes of shared mailbox
+MERLINX_XML_CLI_ENABLED = 0x3  # BIT1 indicates XmlCli interface enabled
+INTERFACE_BUFFER_POINTER_OFFSET = 0x60  # offset in legacy mailbox holding address of XmlCli interface buffer
+INTERFACE_BUFFER_OFFSET = 0x1000  # offset of XmlCli interface buffer from shared mailbox
+INTERFACE_BUFFER_GUID = struct.pack("<IHH8B", 0xA8CBBBEA, 0xF37C, 0x4DA4, 0x5E, 0x81, 0x68, 0x4F, 0x6F, 0xC5, 0x12, 0x49)
+INTERFACE_KEY_OFFSET = 0x10
+INTERFACE_KEY_SIZE = 0x20
+INTERFACE_DIGEST_OFFSET = 0x30
+INTERFACE_DIGEST_SIZE = 0x20
+PACKET_HEADER_SIZE = 0x8
+LZMA_PACKET_SIG = 0x414D5A4C24  # $LZMA
+XKDT_PACKET_SIG = 0x54444B5824  # $XKDT
+MAX_XKDT_DATA_OFFSET = 0xFFF  # offset of value from knob entry is 12 bit wide in $XKDT entry
+DEFAULT_NVAR_GUID_PREFIX = 0xDEFA901D
+NVAR_STATUS_NOT_FOUND = 0xE
+NVAR_HEADER = struct.Struct("<16sIIIB")  # guid, attributes, size, status, operation
+CLI_HEADER = struct.Struct("<IHHII")  # signature, command id, flags, status, parameter size
+SIDE_EFFECT_WARM_RESET = 0x1 << 2
+FLAG_WRONG_PARAMETER = 0x1
+FLAG_CANT_EXECUTE = 0x2
+
+RE_KNOB = re.compile(rb"<knob\s[^>]*>")
+RE_NVAR = re.compile(rb"<Nvar\s[^>]*>")
+RE_ATTRIBUTE = re.compile(rb"(\w+)\s*=\s*\"([^\"]*)\"")
+RE_CURRENT_VALUE = re.compile(rb"CurrentVal\s*=\s*\"0x([0-9A-Fa-f]*)\"")
+RE_HEX = re.compile(r"0x([0-9A-Fa-f]+)")
+
+
+def align_page(address):
+  return (address + PAGE_SIZE - 1) & ~(PAGE_SIZE - 1)
+
+
+def to_int(value, default=0):
+  """Convert XML attribute value (hex with 0x prefix or decimal) to integer"""
+  value = value.strip() if value else ""
+  try:
+    return int(value, 16) if value.lower().startswith("0x") else int(value)
+  except ValueError:
+    return default
+
+
+def guid_to_bytes(guid=None, name=""):
+  """Convert GUID string (`{ 0x.., 0x.., { 0x.. }}` or xmlcli formatted) or list of 11 integers to 16 bytes
+
+  :param guid: GUID in any of the supported format
+  :param name: if GUID is not available, deterministic GUID is derived from the name
+  :return: bytes of GUID in EFI_GUID memory layout
+  """
+  if isinstance(guid, (list, tuple)) and len(guid) == 11 and any(guid):
+    return struct.pack("<IHH8B", *guid)
+  if isinstance(guid, str):
+    fields = [int(i, 16) for i in RE_HEX.findall(guid)]
+    if len(fields) == 11 and any(fields):
+      return struct.pack("<IHH8B", *fields)
+  return uuid.uuid5(uuid.NAMESPACE_OID, f"xmlcli.emulator.{name}").bytes_le
+
+
+class EmulatedNvar(object):
+  """UEFI variable of emulated NVRAM"""
+
+  def __init__(self, var_id, name, guid, size, attributes=0x7):
+    self.var_id = var_id
+    self.name = name
+    self.guid = guid
+    self.attributes = attributes
+    self.data = bytearray(size)
+    self.default = bytearray(size)
+
+  @property
+  def default_guid(self):
+    """GUID used by firmware to expose default values of variable as `Def<name>`"""
+    return struct.pack("<I", DEFAULT_NVAR_GUID_PREFIX) + self.guid[4:]
+
+  def resize(self, size):
+    if size > len(self.data):
+      self.data.extend(bytes(size - len(self.data)))
+      self.default.extend(bytes(size - len(self.default)))
+
+
+class EmulatedKnob(object):
+  """Setup knob of platform XML backed by the data of an emulated NVAR"""
+  __slots__ = ("name", "setup_type", "var_id", "offset", "size", "width", "byte_offset", "bit_offset",
+               "entry_offset", "value_offset", "value_digits", "xml_value")
+
+  def __init__(self, name, setup_type, var_id, offset, size):
+    self.name = name
+    self.setup_type = setup_type
+    self.var_id = var_id
+    self.offset = offset  # byte offset or bit offset prefixed with BITWISE_KNOB_PREFIX for bitwise knob
+    self.size = size  # size in bytes or size in bits for bitwise knob
+    if self.is_bitwise:
+      self.width, self.byte_offset, self.bit_offset = clb.get_bitwise_knob_details(size, offset, padding=0)
+    else:
+      self.width, self.byte_offset, self.bit_offset = size, offset, 0
+    self.entry_offset = 0  # offset of knob entry within XML
+    self.value_offset = 0  # offset of CurrentVal digits within XML
+    self.value_digits = 0  # number of hex digits of CurrentVal within XML (0 if can not be patched)
+    self.xml_value = 0  # value of knob as per published XML
+
+  @property
+  def is_bitwise(self):
+    return self.offset >= clb.BITWISE_KNOB_PREFIX
+
+  @property
+  def request_key(self):
+    """Offset and size as encoded in request/response buffer entries"""
+    if self.is_bitwise:
+      return self.byte_offset | 0x8000, ((self.size & 0x1F) << 3) + (self.bit_offset & 0x7)
+    return self.offset, self.size
+
+  def read(self, data):
+    value = int.from_bytes(data[self.byte_offset:self.byte_offset + self.width], byteorder="little")
+    if self.is_bitwise:
+      value = (value >> self.bit_offset) & ((1 << self.size) - 1)
+    return value
+
+  def write(self, data, value):
+    if self.is_bitwise:
+      mask = ((1 << self.size) - 1) << self.bit_offset
+      current = int.from_bytes(data[self.byte_offset:self.byte_offset + self.width], byteorder="little")
+      value = (current & ~mask) | ((value << self.bit_offset) & mask)
+    data[self.byte_offset:self.byte_offset + self.width] = (value & ((1 << (self.width * 8)) - 1)).to_bytes(self.width, byteorder="little")
+
+
+def create_synthetic_platform_xml(knob_count=64, var_count=2, bios_version="EMULATED.0001"):
+  """Create platform XML with synthetic knobs, used to seed emulator when no platform XML is specified
+
+  :param knob_count: total number of knobs distributed across varstores
+  :param var_count: number of varstores (NVARs)
+  :param bios_version: version string reported in BIOS tag
+  :return: XML string
+  """
+  knob_types = (("oneof", 1), ("checkbox", 1), ("numeric", 2), ("numeric", 4), ("bitwise", 3))
+  knobs = {var_id: [] for var_id in range(var_count)}
+  offsets = {var_id: 0 for var_id in range(var_count)}
+  for count in range(knob_count):
+    var_id = count % var_count
+    setup_type, size = knob_types[count % len(knob_types)]
+    offset = offsets[var_id]
+    if setup_type == "bitwise":  # bitwise knob of 3 bits, placed at bit 0 or bit 3 of its byte
+      setup_type = "oneof"
+      bit_offset = 3 * ((count // len(knob_types)) % 2)
+      offset_str = f"0x{clb.BITWISE_KNOB_PREFIX + (offset * 8) + bit_offset:05X}"
+      offsets[var_id] += 1
+      width = 1
+    else:
+      offset_str = f"0x{offset:04X}"
+      offsets[var_id] += size
+      width = size
+    default = count % 2
+    value = f"0x{default:0{width * 2}X}"
+    entry = (f'\t\t<knob setupType="{setup_type}" name="EmuKnob_{count:05d}" varstoreIndex="{var_id:02d}" '
+             f'prompt="Emulated Knob {count}" description="Synthetic knob {count} of emulated platform" size="{size}" '
+             f'offset="{offset_str}" depex="TRUE" default="{value}" CurrentVal="{value}"')
+    if setup_type == "numeric":
+      entry += f' min="0x0" max="0x{(1 << (size * 8)) - 1:X}" step="1"/>\n'
+    else:
+      entry += '>\n\t\t\t<options>\n\t\t\t\t<option text="Disable" value="0x0"/>\n\t\t\t\t<option text="Enable" value="0x1"/>\n' \
+               '\t\t\t</options>\n\t\t</knob>\n'
+    knobs[var_id].append(entry)
+  result = '<SYSTEM>\n<PLATFORM NAME="XmlCliEmulator"/>\n'
+  result += f'<BIOS VERSION="{bios_version}" TSTAMP="01.01.2024 at 00:00 Hrs"/>\n'
+  result += '<GBT Version="3.0005" TSTAMP="January 1 2024" Type="XmlCliEmulator" XmlCliVer="8.0" XmlCliType="00"/>\n'
+  result += '\t<Nvars>\n'
+  for var_id in range(var_count):
+    result += f'\t\t<Nvar varstoreIndex="{var_id:02d}" name="EmuSetup{var_id}" size="0x{offsets[var_id] + 0x10:04X}" attribute="0x00000007"/>\n'
+  result += '\t</Nvars>\n\t<biosknobs>\n'
+  for var_id in range(var_count):
+    result += "".join(knobs[var_id])
+  result += '\t</biosknobs>\n</SYSTEM>\n'
+  return result
+
+
+def knobs_bin_to_platform_xml(knobs_bin_file, bios_version="EMULATED.KNOBSBIN"):
+  """Create platform XML from BiosKnobsData bin
+
+  :param knobs_bin_file: BiosKnobsData bin file (decompressed `$TNKB` packet)
+  :param bios_version: version string reported in BIOS tag
+  :return: XML string
+  """
+  knobs_dict = clb.BiosKnobsDataBinParser(knobs_bin_file, BiosIdString="", StartOfst=0, parselite=True)
+  for var_id in knobs_dict:
+    knobs_dict[var_id]["NvarAttri"] = 0x7
+  xml_buffer = io.StringIO()
+  xml_buffer.write('<SYSTEM>\n<PLATFORM NAME="XmlCliEmulator"/>\n')
+  xml_buffer.write(f'<BIOS VERSION="{bios_version}" TSTAMP="01.01.2024 at 00:00 Hrs"/>\n')
+  xml_buffer.write('<GBT Version="3.0005" TSTAMP="January 1 2024" Type="XmlCliEmulator" XmlCliVer="8.0" XmlCliType="00"/>\n')
+  clb.KnobsDataToXmlFile(xml_buffer, BiosKnobDict=knobs_dict)
+  xml_buffer.write('</SYSTEM>\n')
+  return xml_buffer.getvalue()
+
+
+class XmlCliFirmware(object):
+  """Firmware model serving XmlCli mailbox of the emulated target
+
+  :param access: emulator access instance providing memory and CMOS
+  :param mailbox_address: DRAM shared mailbox address (64 KB aligned)
+  :param spec_version: XmlCli spec version as tuple of (release, major, minor)
+  :param buffer_size: size of each of CLI request and response buffer
+  :param compress_xml: publish `$LZMA` compressed XML packet after the XML
+  """
+
+  def __init__(self, access, mailbox_address=0x7A000000, spec_version=(0, 8, 0), buffer_size=0x100000, compress_xml=True):
+    self.access = access
+    self.memory = access.memory
+    self.mailbox_address = mailbox_address & 0xFFFF0000
+    self.spec_release, self.spec_major, self.spec_minor = spec_version
+    self.buffer_size = buffer_size
+    self.compress_xml = compress_xml
+    legacy_signature = (self.spec_release == 0) and (self.spec_major < 7)
+    self.request_ready_signature = 0xC001C001 if legacy_signature else 0xD055C001
+    self.response_ready_signature = 0xCAFECAFE if legacy_signature else 0xD055CAFE
+    self.legacy_xml_offset = 0x0C if legacy_signature else 0x50
+    self.legacy_mailbox_address = self.mailbox_address + LEGACY_MAILBOX_OFFSET
+    self.interface_buffer_address = self.mailbox_address + INTERFACE_BUFFER_OFFSET
+    self.request_address = self.mailbox_address + 0x10000
+    self.response_address = self.request_address + self.buffer_size
+    self.xml_base = (self.response_address + self.buffer_size + 0xFFFF) & ~0xFFFF
+    self.xml = bytearray()
+    self.nvars = {}  # var_id -> EmulatedNvar
+    self.knobs = []  # list of EmulatedKnob in order of XML
+    self.knob_lookup = {}  # (var_id, request offset, request size) -> EmulatedKnob
+    self.smi_count = 0
+    self.authenticated_smi_count = 0
+    self.command_handlers = {
+      clb.APPEND_BIOS_KNOBS_CMD_ID    : self.append_knobs,
+      clb.RESTOREMODIFY_KNOBS_CMD_ID  : self.restore_modify_knobs,
+      clb.READ_BIOS_KNOBS_CMD_ID      : self.read_knobs,
+      clb.LOAD_DEFAULT_KNOBS_CMD_ID   : self.load_default_knobs,
+      clb.GET_SET_VARIABLE_OPCODE     : self.get_set_variable,
+    }
+
+  @property
+  def xml_address(self):
+    return self.xml_base + 4
+
+  # Seeding of firmware model ##########################################################################################
+  def seed(self, xml_content):
+    """Seed NVRAM and knobs from the platform XML
+
+    :param xml_content: platform xml as string or bytes
+    """
+    xml = xml_content.encode() if isinstance(xml_content, str) else bytes(xml_content)
+    xml = xml.rstrip(b"\r\n\x00 \t")
+    if not xml.endswith(b"</SYSTEM>"):
+      raise ValueError("Platform XML shall end with </SYSTEM>")
+    self.xml = bytearray(xml + b"\r\n")  # XML size includes 2 bytes following `</SYSTEM>`
+    self.nvars = {}
+    self.knobs = []
+    self.knob_lookup = {}
+    for match in RE_NVAR.finditer(self.xml):
+      attributes = dict(RE_ATTRIBUTE.findall(match.group(0)))
+      var_id = to_int(attributes.get(b"varstoreIndex", b"0").decode())
+      name = attributes.get(b"name", b"").decode()
+      self.nvars[var_id] = EmulatedNvar(var_id, name, guid_to_bytes(attributes.get(b"guid", b"").decode(), name),
+                                        to_int(attributes.get(b"size", b"0").decode()),
+                                        to_int(attributes.get(b"attribute", b"0x7").decode(), 0x7))
+    knobs_start = self.xml.find(b"<biosknobs>")
+    knobs_end = self.xml.find(b"</biosknobs>", knobs_start)
+    if knobs_start < 0 or knobs_end < 0:
+      raise ValueError("Platform XML does not have biosknobs section")
+    for match in RE_KNOB.finditer(self.xml, knobs_start, knobs_end):
+      attributes = dict(RE_ATTRIBUTE.findall(match.group(0)))
+      setup_type = attributes.get(b"setupType", b"").decode().lower()
+      if setup_type not in ("oneof", "checkbox", "numeric", "numric", "string"):
+        continue
+      var_id = to_int(attributes.get(b"varstoreIndex", b"0").decode())
+      knob = EmulatedKnob(attributes.get(b"name", b"").decode(), setup_type, var_id,
+                          to_int(attributes.get(b"offset", b"0").decode()), to_int(attributes.get(b"size", b"0").decode()))
+      knob.entry_offset = match.start()
+      value_match = RE_CURRENT_VALUE.search(self.xml, match.start(), match.end())
+      if value_match and (value_match.start(1) - match.start()) <= MAX_XKDT_DATA_OFFSET and len(value_match.group(1)) % 2 == 0:
+        knob.value_offset = value_match.start(1)
+        knob.value_digits = len(value_match.group(1))
+      if var_id not in self.nvars:
+        name = attributes.get(b"Nvar", b"").decode() or clb.OldBinNvarNameDict.get(var_id, f"Nvar{var_id:02d}")
+        self.nvars[var_id] = EmulatedNvar(var_id, name, guid_to_bytes(name=name), 0)
+      nvar = self.nvars[var_id]
+      nvar.resize(knob.byte_offset + knob.width)
+      knob.write(nvar.default, to_int(attributes.get(b"default", b"0").decode()))
+      knob.write(nvar.data, to_int(attributes.get(b"CurrentVal", b"0").decode()))
+      self.knobs.append(knob)
+      self.knob_lookup[(var_id,) + knob.request_key] = knob
+
+  # Publishing of mailbox and XML ######################################################################################
+  def publish(self):
+    """Publish shared mailbox, legacy mailbox, XML and packets in to the target memory and CMOS"""
+    mailbox = bytearray(0x200)
+    struct.pack_into("<I", mailbox, clb.SHAREDMB_SIG1_OFF, clb.SHAREDMB_SIG1)
+    struct.pack_into("<I", mailbox, clb.SHAREDMB_SIG2_OFF, clb.SHAREDMB_SIG2)
+    struct.pack_into("<BHB", mailbox, clb.CLI_SPEC_VERSION_MINOR_OFF, self.spec_minor, self.spec_major, self.spec_release)
+    struct.pack_into("<II", mailbox, clb.LEGACYMB_SIG_OFF, clb.LEGACYMB_SIG, LEGACY_MAILBOX_OFFSET)
+    struct.pack_into("<III", mailbox, clb.SHARED_MB_CLI_REQ_BUFF_SIG_OFF, clb.SHARED_MB_CLI_REQ_BUFF_SIG, self.request_address, self.buffer_size)
+    struct.pack_into("<III", mailbox, clb.SHARED_MB_CLI_RES_BUFF_SIG_OFF, clb.SHARED_MB_CLI_RES_BUFF_SIG, self.response_address, self.buffer_size)
+    struct.pack_into("<B", mailbox, LEGACY_MAILBOX_OFFSET + clb.MERLINX_XML_CLI_ENABLED_OFF, MERLINX_XML_CLI_ENABLED)
+    struct.pack_into("<I", mailbox, LEGACY_MAILBOX_OFFSET + self.legacy_xml_offset, self.xml_base)
+    struct.pack_into("<I", mailbox, LEGACY_MAILBOX_OFFSET + INTERFACE_BUFFER_POINTER_OFFSET, self.interface_buffer_address)
+    self.memory.write(self.mailbox_address, mailbox)
+    self.renew_interface_key()
+    self.memory.write(self.request_address, bytes(clb.CLI_REQ_RES_BUFF_HEADER_SIZE))
+    self.memory.write(self.response_address, bytes(clb.CLI_REQ_RES_BUFF_HEADER_SIZE))
+    # DRAM shared mailbox address bits [31:16] in CMOS
+    for register in (0xF0, 0x78):
+      self.access.cmos[register] = (self.mailbox_address >> 16) & 0xFF
+      self.access.cmos[register + 1] = (self.mailbox_address >> 24) & 0xFF
+    self.publish_xml()
+
+  def publish_xml(self):
+    """Publish XML with current knob values, it becomes baseline for `$XKDT` delta packet"""
+    for knob in self.knobs:
+      knob.xml_value = knob.read(self.nvars[knob.var_id].data)
+      self._patch_xml(knob, knob.xml_value)
+    self.memory.write(self.xml_base, struct.pack("<I", len(self.xml)) + self.xml)
+    packet_address = align_page(self.xml_address + len(self.xml))
+    if self.compress_xml:
+      compressed_xml = lzma.compress(bytes(self.xml), format=lzma.FORMAT_ALONE)
+      self.memory.write(packet_address, struct.pack("<Q", LZMA_PACKET_SIG | (len(compressed_xml) << 40)) + compressed_xml)
+      packet_address = align_page(packet_address + PACKET_HEADER_SIZE + len(compressed_xml))
+    self.delta_packet_address = packet_address
+    self.update_delta_packet()
+
+  def _patch_xml(self, knob, value):
+    if knob.value_digits:
+      digits = f"{value & ((1 << (knob.value_digits * 4)) - 1):0{knob.value_digits}X}".encode()
+      self.xml[knob.value_offset:knob.value_offset + knob.value_digits] = digits
+      self.memory.write(self.xml_address + knob.value_offset, digits)
+
+  def update_delta_packet(self):
+    """Update CurrentVal of knobs in XML and regenerate `$XKDT` packet for the knobs changed since XML was published"""
+    delta = bytearray()
+    for knob in self.knobs:
+      value = knob.read(self.nvars[knob.var_id].data)
+      self._patch_xml(knob, value)
+      if value != knob.xml_value and knob.value_digits:
+        data_size = knob.value_digits // 2
+        delta += knob.entry_offset.to_bytes(3, byteorder="little") + \
+          struct.pack("<HB", knob.value_offset - knob.entry_offset, data_size) + \
+          (value & ((1 << (data_size * 8)) - 1)).to_bytes(data_size, byteorder="little")
+    self.memory.write(self.delta_packet_address, struct.pack("<Q", XKDT_PACKET_SIG | (len(delta) << 40)) + delta)
+
+  # S/W SMI handler ####################################################################################################
+  def renew_interface_key(self):
+    """Publish XmlCli interface buffer with new key and cleared digest"""
+    self.memory.write(self.interface_buffer_address, INTERFACE_BUFFER_GUID + secrets.token_bytes(INTERFACE_KEY_SIZE) + bytes(INTERFACE_DIGEST_SIZE))
+
+  def is_request_authenticated(self):
+    """Host shall write digest in interface buffer before triggering SMI
+
+    Digest is only checked to be present, emulator does not hold the secret to verify it.
+    """
+    digest = self.memory.read(self.interface_buffer_address + INTERFACE_DIGEST_OFFSET, INTERFACE_DIGEST_SIZE)
+    return any(digest)
+
+  def handle_smi(self, smi_value):
+    if smi_value != XML_CLI_SMI_VALUE:
+      return
+    self.smi_count += 1
+    signature, command_id, _, _, parameter_size = CLI_HEADER.unpack(self.memory.read(self.request_address, CLI_HEADER.size))
+    if signature != self.request_ready_signature:
+      return
+    if not self.is_request_authenticated():
+      return  # request stays pending, host times out waiting for response
+    self.authenticated_smi_count += 1
+    self.renew_interface_key()
+    request = memoryview(self.memory.read(self.request_address + clb.CLI_REQ_RES_BUFF_HEADER_SIZE, self.buffer_size - clb.CLI_REQ_RES_BUFF_HEADER_SIZE))
+    handler = self.command_handlers.get(command_id)
+    if handler:
+      flags, status, response = handler(request, parameter_size)
+    else:
+      flags, status, response = FLAG_CANT_EXECUTE, 0, b""
+    if len(response) > self.buffer_size - clb.CLI_REQ_RES_BUFF_HEADER_SIZE:
+      flags, status, response = FLAG_CANT_EXECUTE, 1, b""
+    self.memory.write(self.request_address, struct.pack("<I", 0))  # request consumed
+    self.memory.write(self.response_address + clb.CLI_REQ_RES_BUFF_HEADER_SIZE, response)
+    self.memory.write(self.response_address, CLI_HEADER.pack(self.response_ready_signature, command_id, flags, status, len(response)))
+
+  # Knob commands ######################################################################################################
+  def parse_knob_entries(self, request, entry_count):
+    """Parse knob entries of request buffer
+
+    :return: list of tuple (var_id, offset, size, value) where offset and size are as encoded in request
+    """
+    entries = []
+    position = 0
+    for _ in range(entry_count):
+      if position + 4 > len(request):
+        break
+      var_id, offset, size = struct.unpack_from("<BHB", request, position)
+      width = size
+      if offset & 0x8000:
+        bit_end = ((size >> 3) & 0x1F) + (size & 0x7)
+        width = (bit_end + 7) // 8
+      value = int.from_bytes(request[position + 4:position + 4 + width], byteorder="little")
+      entries.append((var_id, offset, size, value))
+      position += 4 + width
+    return entries
+
+  def knob_response(self, knob, first_value, second_value):
+    """Create response entry of knob as: entry address, reserved, var id, offset, size, value pair"""
+    offset, size = knob.request_key
+    value_mask = (1 << (knob.width * 8)) - 1
+    return struct.pack("<IHBHB", self.xml_address + knob.entry_offset, 0, knob.var_id, offset, size) + \
+      (first_value & value_mask).to_bytes(knob.width, byteorder="little") + \
+      (second_value & value_mask).to_bytes(knob.width, byteorder="little")
+
+  def _process_knobs(self, request, entry_count, modify=True, restore=False):
+    response = bytearray()
+    changed = False
+    entries = self.parse_knob_entries(request, entry_count)
+    requested = set()
+    for var_id, offset, size, value in entries:
+      knob = self.knob_lookup.get((var_id, offset, size))
+      if knob is None:
+        continue
+      requested.add(id(knob))
+    if restore:
+      for knob in self.knobs:
+        nvar = self.nvars[knob.var_id]
+        default_value = knob.read(nvar.default)
+        if knob.read(nvar.data) != default_value:
+          knob.write(nvar.data, default_value)
+          changed = True
+          if id(knob) not in requested:
+            response += self.knob_response(knob, default_value, default_value)
+    for var_id, offset, size, value in entries:
+      knob = self.knob_lookup.get((var_id, offset, size))
+      if knob is None:
+        continue
+      nvar = self.nvars[var_id]
+      if modify and knob.read(nvar.data) != value:
+        knob.write(nvar.data, value)
+        changed = True
+      response += self.knob_response(knob, knob.read(nvar.default), knob.read(nvar.data))
+    if changed:
+      self.update_delta_packet()
+    return (SIDE_EFFECT_WARM_RESET if changed else 0), 0, response
+
+  def append_knobs(self, request, entry_count):
+    return self._process_knobs(request, entry_count, modify=True)
+
+  def restore_modify_knobs(self, request, entry_count):
+    return self._process_knobs(request, entry_count, modify=True, restore=True)
+
+  def read_knobs(self, request, entry_count):
+    return self._process_knobs(request, entry_count, modify=False)
+
+  def load_default_knobs(self, request, entry_count):
+    response = bytearray()
+    for knob in self.knobs:
+      nvar = self.nvars[knob.var_id]
+      previous_value = knob.read(nvar.data)
+      default_value = knob.read(nvar.default)
+      if previous_value != default_value:
+        knob.write(nvar.data, default_value)
+        response += self.knob_response(knob, previous_value, default_value)
+    if response:
+      self.update_delta_packet()
+    return (SIDE_EFFECT_WARM_RESET if response else 0), 0, response
+
+  # NVAR get/set/gms ###################################################################################################
+  def find_nvar(self, guid, name):
+    """Find variable by guid and name
+
+    :return: tuple of (EmulatedNvar, is default variable)
+    """
+    for nvar in self.nvars.values():
+      if nvar.name == name and nvar.guid == guid:
+        return nvar, False
+      if name == f"Def{nvar.name}" and guid == nvar.default_guid:
+        return nvar, True
+    return None, False
+
+  def nvar_response(self, guid, attributes, status, operation, name, data):
+    return NVAR_HEADER.pack(guid, attributes, len(data), status, operation) + name.encode() + b"\x00" + bytes(data)
+
+  def get_set_variable(self, request, nvar_count):
+    response = bytearray()
+    changed_var_ids = set()
+    if nvar_count == 0 and request[NVAR_HEADER.size - 1] == 0x9A:  # getall
+      for nvar in self.nvars.values():
+        response += self.nvar_response(nvar.guid, nvar.attributes, 0, 0x9A, nvar.name, nvar.data)
+      return 0, 0, response
+    position = 0
+    for _ in range(nvar_count):
+      guid, attributes, size, _, operation = NVAR_HEADER.unpack_from(request, position)
+      name_end = bytes(request[position + NVAR_HEADER.size:position + NVAR_HEADER.size + 0x100]).find(b"\x00")
+      if name_end < 0:
+        return FLAG_WRONG_PARAMETER, 0, response
+      name = bytes(request[position + NVAR_HEADER.size:position + NVAR_HEADER.size + name_end]).decode(errors="replace")
+      position += NVAR_HEADER.size + name_end + 1
+      data = bytes(request[position:position + size]) if operation in (1, 2) else b""
+      position += len(data)
+      nvar, is_default = self.find_nvar(bytes(guid), name)
+      if operation == 0:  # get
+        if nvar is None:
+          response += self.nvar_response(guid, attributes, NVAR_STATUS_NOT_FOUND, operation, name, b"")
+        else:
+          response += self.nvar_response(guid, nvar.attributes, 0, operation, name, nvar.default if is_default else nvar.data)
+      elif operation == 1 and not is_default:  # set
+        if nvar is None:
+          var_id = max(self.nvars, default=-1) + 1
+          nvar = self.nvars[var_id] = EmulatedNvar(var_id, name, bytes(guid), 0, attributes)
+        nvar.data[:] = data
+        nvar.attributes = attributes or nvar.attributes
+        changed_var_ids.add(nvar.var_id)
+        response += self.nvar_response(guid, nvar.attributes, 0, operation, name, nvar.data)
+      elif operation == 2 and nvar is not None and not is_default:  # get-modify-set with knob entries as data
+        data_position = 0
+        while data_position + 3 <= len(data):
+          offset, knob_size = struct.unpack_from("<HB", data, data_position)
+          if offset & 0x8000:
+            knob = EmulatedKnob("", "", nvar.var_id, clb.BITWISE_KNOB_PREFIX + ((offset & 0x7FFF) * 8) + (knob_size & 0x7), (knob_size >> 3) & 0x1F)
+          else:
+            knob = EmulatedKnob("", "", nvar.var_id, offset, knob_size)
+          nvar.resize(knob.byte_offset + knob.width)
+          knob.write(nvar.data, int.from_bytes(data[data_position + 3:data_position + 3 + knob.width], byteorder="little"))
+          data_position += 3 + knob.width
+        changed_var_ids.add(nvar.var_id)
+        response += self.nvar_response(guid, nvar.attributes, 0, operation, name, nvar.data)
+      else:
+        response += self.nvar_response(guid, attributes, NVAR_STATUS_NOT_FOUND, operation, name, b"")
+    if changed_var_ids:
+      self.update_delta_packet()
+    return (SIDE_EFFECT_WARM_RESET if changed_var_ids else 0), 0, response
@@ -5,7 +5,6 @@ __author__ = ["ashinde", "Gahan Saraiya"]
 # Built-in imports
 import os
 import time
-import binascii
 
 # Custom imports
 from ..base import base
@@ -81,9 +80,16 @@ class CommonCliAccess(base.BaseAccess):
   def cold_reset(self):
     self.access.pulsepwrgood()
 
+  def mem_block_into(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    result = self.thread.memblock(hex(address).rstrip('L') + 'p', len(view), 0)
+    view[:] = int(result).to_bytes(len(view), byteorder="little", signed=False)
+    return len(view)
+
   def mem_block(self, address, size):
-    result = self.thread.memblock(hex(address).rstrip('L') + 'p', size, 0)
-    return binascii.unhexlify((hex(result)[2:]).zfill(size*2))[::-1]
+    result = bytearray(size)
+    self.mem_block_into(address, result)
+    return result
 
   def mem_save(self, filename, address, size):
     # Due to a bug in IPC (Lauterbach) relative path names do not resolve correctly. To adjust for this, all files must be absolute
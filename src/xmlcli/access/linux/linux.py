@@ -5,16 +5,142 @@ __author__ = "Gahan Saraiya"
 # Built-in imports
 import os
 import mmap
+import stat
 import ctypes
-import binascii
+from collections import OrderedDict
 
 # Custom imports
 from ..base import base
 
-__all__ = ["LinuxAccess"]
+__all__ = ["LinuxAccess", "MemoryMapPool"]
+
+
+class MemoryMapPool(object):
+  """Pool of memory mapped windows over the physical memory file.
+
+  Memory file is opened once and kept open until `close` is called.
+  Windows of `window_size` bytes (aligned to window size) are mapped on first
+  access and reused by subsequent accesses falling in the same window, least
+  recently used window is unmapped once `max_windows` windows are mapped.
+  If the kernel refuses to map a complete window (i.e. restricted /dev/mem
+  ranges) then access falls back to mapping only the page(s) being accessed.
+  """
+
+  def __init__(self, memory_file, window_size=0x400000, max_windows=4):
+    self.memory_file = memory_file
+    granularity = mmap.ALLOCATIONGRANULARITY
+    self.window_size = max(granularity, ((window_size + granularity - 1) // granularity) * granularity)
+    self.max_windows = max(1, max_windows)
+    self.page_mask = mmap.PAGESIZE - 1
+    self.file_descriptor = None
+    self.file_size = None  # size limit is only applicable when regular file is used in place of memory device
+    self.windows = OrderedDict()  # window base address -> mmap object
+    self.unmappable_windows = set()  # window base addresses which could only be mapped page wise
+
+  def open(self):
+    if self.file_descriptor is None:
+      self.file_descriptor = os.open(self.memory_file, os.O_RDWR | os.O_SYNC)
+      file_stat = os.fstat(self.file_descriptor)
+      self.file_size = file_stat.st_size if stat.S_ISREG(file_stat.st_mode) else None
+    return self.file_descriptor
+
+  def close(self):
+    while self.windows:
+      _, window = self.windows.popitem()
+      window.close()
+    self.unmappable_windows.clear()
+    if self.file_descriptor is not None:
+      os.close(self.file_descriptor)
+      self.file_descriptor = None
+
+  def _map(self, base, length):
+    if self.file_size is not None:
+      length = min(length, self.file_size - base)
+    if length <= 0:
+      raise ValueError("Address 0x{:x} is beyond the size of {}".format(base, self.memory_file))
+    window = mmap.mmap(self.file_descriptor, length, mmap.MAP_SHARED, mmap.PROT_WRITE | mmap.PROT_READ, offset=base)
+    self.windows[base] = window
+    while len(self.windows) > self.max_windows:
+      _, evicted_window = self.windows.popitem(last=False)
+      evicted_window.close()
+    return window
+
+  def get_window(self, address):
+    """Get mapped window covering given address
+
+    :param address: physical address
+    :return: tuple of (base address of window, mmap object of window)
+    """
+    window_base = address - (address % self.window_size)
+    page_base = address & ~self.page_mask
+    for base in (window_base, page_base):
+      window = self.windows.get(base)
+      if window is not None and address - base < len(window):
+        self.windows.move_to_end(base)
+        return base, window
+    self.open()
+    if window_base not in self.unmappable_windows:
+      try:
+        return window_base, self._map(window_base, self.window_size)
+      except OSError:
+        self.unmappable_windows.add(window_base)
+    return page_base, self._map(page_base, mmap.PAGESIZE)
+
+  def segments(self, address, size):
+    """Split memory range in to the chunks of mapped windows
+
+    :param address: start address of memory range
+    :param size: size of memory range
+    :return: generator of (mmap object, offset within window, length of chunk)
+    """
+    end_address = address + size
+    while address < end_address:
+      base, window = self.get_window(address)
+      offset = address - base
+      length = min(end_address - address, len(window) - offset)
+      yield window, offset, length
+      address += length
+
+  def readinto(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    position = 0
+    for window, offset, length in self.segments(address, len(view)):
+      with memoryview(window) as window_view:
+        view[position:position + length] = window_view[offset:offset + length]
+      position += length
+    return position
+
+  def read(self, address, size):
+    result = bytearray()
+    for window, offset, length in self.segments(address, size):
+      if length == size:
+        return window[offset:offset + length]
+      result += window[offset:offset + length]
+    return bytes(result)
+
+  def write(self, address, data):
+    data = memoryview(data).cast("B")
+    position = 0
+    for window, offset, length in self.segments(address, len(data)):
+      window[offset:offset + length] = data[position:position + length]
+      position += length
+    return position
+
+
+class IoOperation(ctypes.Structure):
+  """Entry of I/O batch as expected by `io_batch` of port library"""
+  _pack_ = 1
+  _fields_ = [
+    ("operation", ctypes.c_uint8),
+    ("size", ctypes.c_uint8),
+    ("port", ctypes.c_uint16),
+    ("value", ctypes.c_uint32),
+  ]
 
 
 class LinuxAccess(base.BaseAccess):
+  halt_required = False
+
   def __init__(self, access_name="linux"):
     self.current_directory = os.path.dirname(os.path.abspath(__file__))
     super(LinuxAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
@@ -30,6 +156,11 @@ class LinuxAccess(base.BaseAccess):
     # Write port configuration
     self._write_port = self.port_library.write_port
     self._write_port.argtypes = (ctypes.c_uint16, ctypes.c_uint8, ctypes.c_uint32)
+    # I/O batch configuration (not available with port library built from older source)
+    self._io_batch = getattr(self.port_library, "io_batch", None)
+    if self._io_batch:
+      self._io_batch.argtypes = (ctypes.POINTER(IoOperation), ctypes.c_uint32)
+      self._io_batch.restype = ctypes.c_int
     self.external_mem = self.config.getboolean(access_name.upper(), "external_mem")
     if self.external_mem:
       self.lib_mem = os.path.join(self.current_directory, self.config.get(access_name.upper(), "lib_mem"))
@@ -42,6 +173,11 @@ class LinuxAccess(base.BaseAccess):
       self._write_mem = self.mem_library.mem_write
       self._write_mem.argtypes = (ctypes.c_ulong, ctypes.c_void_p, ctypes.c_size_t)
       self._write_mem.restype = ctypes.c_int
+    # Persistent memory mapping pool for block access to memory file
+    self.map_pool_enabled = self.config.getboolean(access_name.upper(), "map_pool", fallback=False)
+    self.map_pool = MemoryMapPool(self.memory_file,
+                                  window_size=int(self.config.get(access_name.upper(), "map_window_size", fallback="0x400000"), 0),
+                                  max_windows=int(self.config.get(access_name.upper(), "map_max_windows", fallback="4"), 0))
 
   def halt_cpu(self, delay=0):
     return 0
@@ -53,6 +189,7 @@ class LinuxAccess(base.BaseAccess):
     return 0
 
   def close_interface(self):
+    self.map_pool.close()
     return 0
 
   def read_port(self, port, size):
@@ -71,7 +208,17 @@ class LinuxAccess(base.BaseAccess):
       ret = self._write_port(port, size, val)
       return ret
 
+  def io_batch(self, operations):
+    if not self._io_batch:
+      return super(LinuxAccess, self).io_batch(operations)
+    operations = list(operations)
+    batch = (IoOperation * len(operations))(*((operation, size, port, (value or 0) & 0xFFFFFFFF) for operation, port, size, value in operations))
+    self._io_batch(batch, len(batch))
+    return [entry.value if entry.operation == base.IO_READ else None for entry in batch]
+
   def read_memory_bytes(self, address, size):
+    if self.map_pool_enabled:
+      return self.map_pool.read(address, size)
     mem_file_obj = os.open(self.memory_file, os.O_RDWR | os.O_SYNC)
     mem = mmap.mmap(mem_file_obj, mmap.PAGESIZE, mmap.MAP_SHARED, mmap.PROT_WRITE | mmap.PROT_READ, offset=address & ~self.map_mask)
     data = None
@@ -88,20 +235,28 @@ class LinuxAccess(base.BaseAccess):
       raise Exception("Unable to read memory on the platform")
     return data
 
+  def read_external_memory_into(self, address, view):
+    dest = (ctypes.c_ubyte * len(view)).from_buffer(view)
+    try:
+      self._read_mem(address, ctypes.addressof(dest), len(view))
+    finally:
+      del dest  # release export of the buffer
+    return len(view)
+
   def read_memory(self, address, size):
     if self.external_mem:
-      dest = (ctypes.c_ubyte * size)()
-      self._read_mem(address, ctypes.cast(dest, ctypes.c_void_p), size)
-      result = 0
-      ctypes.cast(dest, ctypes.c_char_p)
-      for i in range(0, size):
-        result += dest[i] << 8 * i
+      dest = bytearray(size)
+      self.read_external_memory_into(address, memoryview(dest))
+      result = int.from_bytes(dest, byteorder="little", signed=False)
     else:
       result = self.read_memory_bytes(address, size)
       result = int.from_bytes(result, byteorder="little", signed=False)
     return result
 
   def write_memory_bytes(self, address, data, size):
+    if self.map_pool_enabled:
+      data_dump = data if isinstance(data, (bytes, bytearray, memoryview)) else self.int_to_byte(data, size)
+      return self.map_pool.write(address, data_dump)
     mem_file_obj = os.open(self.memory_file, os.O_RDWR | os.O_SYNC)
     mem = mmap.mmap(mem_file_obj, mmap.PAGESIZE, mmap.MAP_SHARED, mmap.PROT_WRITE | mmap.PROT_READ, offset=address & ~self.map_mask)
     bytes_written = 0
@@ -142,8 +297,12 @@ class LinuxAccess(base.BaseAccess):
 
   def read_memory_block(self, address, size, val=None):
     if val is None:
-      read_val = self.read_memory(address, size)
-      return binascii.unhexlify(hex(read_val)[2:].strip('L').zfill(size * 2))[::-1]
+      dest = bytearray(size)
+      if self.external_mem:
+        self.read_external_memory_into(address, memoryview(dest))
+      else:
+        dest[:] = self.read_memory_bytes(address, size)
+      return bytes(dest)
     else:
       ret = self.write_memory(address, val, size)
       return ret
@@ -154,35 +313,39 @@ class LinuxAccess(base.BaseAccess):
   def cold_reset(self):
     self.io(0xCF9, 1, 0x0E)
 
+  def mem_block_into(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    if self.map_pool_enabled:
+      try:
+        return self.map_pool.readinto(address, view)
+      except (OSError, ValueError):
+        if not self.external_mem:
+          raise  # pool already fell back to page wise mapping, nothing left to try
+        # memory range could not be mapped, fall back to read through memory library
+    if self.external_mem:
+      return self.read_external_memory_into(address, view)
+    position = 0
+    while position < len(view):  # without pool, memory file is mapped page wise
+      length = min(len(view) - position, mmap.PAGESIZE - ((address + position) & self.map_mask))
+      view[position:position + length] = self.read_memory_bytes(address + position, length)
+      position += length
+    return position
+
   def mem_block(self, address, size):
-    end_address = address + size
-    temp_address = address & 0xFFFFF000
-    result1 = []
-    if (end_address - temp_address) <= 0x1000:
-      result = self.read_memory_block(address, size)
-      result1.extend(result)
-    else:
-      first_end_page_address = (address + 0xFFF) & 0xFFFFF000
-      if first_end_page_address > address:
-        result = self.read_memory_block(address, (first_end_page_address - address))
-        result1.extend(result)
-      block_count = 0
-      block_size = (end_address - first_end_page_address)
-      block_number = int(block_size/0x1000)
-      for block_count in range(0, block_number):
-        result = self.read_memory_block(first_end_page_address + (block_count * 0x1000), 0x1000)
-        result1.extend(result)
-      if block_number != 0:
-        block_count = block_count+1
-      if block_size % 0x1000:
-        result = self.read_memory_block(first_end_page_address + (block_count * 0x1000), (block_size % 0x1000))
-        result1.extend(result)
-    return bytearray(result1)
+    result = bytearray(size)
+    self.mem_block_into(address, result)
+    return result
 
   def mem_save(self, filename, address, size):
-    temp_buffer = self.mem_block(address, size)
+    chunk = memoryview(bytearray(min(size, self.map_pool.window_size)))  # block is streamed to file, not buffered as whole
+    position = 0
     with open(filename, 'wb') as out_file:  # opening for writing
-      out_file.write(temp_buffer)
+      while position < size:
+        length = min(size - position, len(chunk))
+        self.mem_block_into(address + position, chunk[:length])
+        out_file.write(chunk[:length])
+        position += length
+    return position
 
   def mem_read(self, address, size):
     return self.mem(address, size)  # list of size entries of 1 Byte
@@ -194,8 +357,28 @@ class LinuxAccess(base.BaseAccess):
     with open(filename, 'rb') as in_file:  # opening for [r]eading as [b]inary
       data = in_file.read()  # if you only wanted to read 512 bytes, do .read(512)
     size = len(data)
+    if self.map_pool_enabled:
+      try:
+        self.map_pool.write(address, data)
+        return
+      except (OSError, ValueError):
+        if not self.external_mem:
+          raise  # pool already fell back to page wise mapping, nothing left to try
+        # memory range could not be mapped, fall back to write through memory library
     self.read_memory_block(address, size, data)  # list of size entries of 1 Byte
 
+  def mem_block_write(self, address, data):
+    view = memoryview(data).cast("B")
+    if self.map_pool_enabled:
+      try:
+        return self.map_pool.write(address, view)
+      except (OSError, ValueError):
+        if not self.external_mem:
+          raise  # pool already fell back to page wise mapping, nothing left to try
+        # memory range could not be mapped, fall back to write through memory library
+    self.read_memory_block(address, len(view), view.tobytes())
+    return len(view)
+
   def read_io(self, address, size):
     return self.io(address, size)
 
@@ -2,8 +2,11 @@
 # -*- coding: utf-8 -*-
 __author__ = "Gahan Saraiya"
 
+import os
+import mmap
+import tempfile
 import unittest
-from .linux import LinuxAccess
+from .linux import LinuxAccess, MemoryMapPool
 
 
 class LinuxTestCase(unittest.TestCase):
@@ -14,5 +17,79 @@ class LinuxTestCase(unittest.TestCase):
     self.assertEqual(self.base_object.interface, self.base_object.InterfaceType)
 
 
+class MemoryMapPoolTestCase(unittest.TestCase):
+  """Use regular file as stand-in for /dev/mem"""
+  memory_size = 0x300000
+
+  def setUp(self):
+    file_descriptor, self.memory_file = tempfile.mkstemp(suffix=".mem")
+    self.content = bytes(i & 0xFF for i in range(self.memory_size))
+    with os.fdopen(file_descriptor, "wb") as f:
+      f.write(self.content)
+    self.access = LinuxAccess(access_name="linux")
+    self.access.external_mem = False
+    self.access.map_pool_enabled = True
+    self.access.map_pool = MemoryMapPool(self.memory_file, window_size=0x100000, max_windows=2)
+
+  def tearDown(self):
+    self.access.close_interface()
+    os.remove(self.memory_file)
+
+  def test_mem_block_across_windows(self):
+    address = 0xFFFF0
+    size = 0x100020
+    self.assertEqual(self.access.mem_block(address, size), self.content[address:address + size])
+    self.assertLessEqual(len(self.access.map_pool.windows), 2)
+
+  def test_window_reuse_and_eviction(self):
+    pool = self.access.map_pool
+    self.access.read_memory_bytes(0x10, 4)
+    first_window = pool.windows[0]
+    self.access.read_memory_bytes(0x1000, 4)
+    self.assertIs(pool.windows[0], first_window)
+    self.access.read_memory_bytes(0x100000, 4)
+    self.access.read_memory_bytes(0x200000, 4)
+    self.assertEqual(list(pool.windows), [0x100000, 0x200000])
+
+  def test_write_and_read_back(self):
+    self.access.mem_write(0x1FFFFE, 4, 0xDEADBEEF)
+    self.assertEqual(self.access.mem_read(0x1FFFFE, 4), 0xDEADBEEF)
+    self.access.close_interface()
+    with open(self.memory_file, "rb") as f:
+      f.seek(0x1FFFFE)
+      self.assertEqual(f.read(4), (0xDEADBEEF).to_bytes(4, "little"))
+
+  def test_mem_block_into_buffer(self):
+    buffer = bytearray(0x3000)
+    view = memoryview(buffer)
+    self.assertEqual(self.access.mem_block_into(0xFF800, view[0x1000:]), 0x2000)
+    self.assertEqual(buffer[:0x1000], bytes(0x1000))
+    self.assertEqual(buffer[0x1000:], self.content[0xFF800:0x101800])
+    # page wise read of memory file without pool shall fill buffer the same way
+    self.access.map_pool_enabled = False
+    self.access.memory_file = self.memory_file
+    self.assertEqual(self.access.mem_block(0xFF800, 0x2000), buffer[0x1000:])
+
+  def test_mem_save_streams_windows(self):
+    address = 0xFFFF0
+    size = 0x180020  # larger than a window, saved chunk by chunk
+    save_file = self.memory_file + ".save"
+    self.addCleanup(os.remove, save_file)
+    self.assertEqual(self.access.mem_save(save_file, address, size), size)
+    with open(save_file, "rb") as f:
+      self.assertEqual(f.read(), self.content[address:address + size])
+
+  def test_unmappable_range_raises(self):
+    # without memory library there is no fall back once pool fails to map
+    with self.assertRaises(ValueError):
+      self.access.mem_block(self.memory_size + 0x1000, 0x10)
+    with self.assertRaises(ValueError):
+      self.access.mem_block_write(self.memory_size + 0x1000, bytes(0x10))
+
+  def test_page_aligned_window_size(self):
+    pool = MemoryMapPool(self.memory_file, window_size=0x10)
+    self.assertEqual(pool.window_size % mmap.ALLOCATIONGRANULARITY, 0)
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -41,6 +41,44 @@ void write_port(uint16_t port, uint8_t size, uint32_t val)
   }
 }
 
+// Operations of I/O batch, must be in sync with IO_READ and IO_WRITE of access/base/base.py
+#define IO_READ   0
+#define IO_WRITE  1
+
+typedef struct __attribute__((packed)) {
+  uint8_t operation;  // IO_READ or IO_WRITE
+  uint8_t size;       // number of bytes to be read/written
+  uint16_t port;      // I/O port address
+  uint32_t value;     // value to be written, holds value read after IO_READ operation
+} io_operation;
+
+int io_batch(io_operation *operations, uint32_t count)
+{
+  // Get access to all ports on the system once for whole batch
+  iopl(3);
+
+  uint32_t i;
+  for(i = 0; i < count; i++)
+  {
+    io_operation *op = &operations[i];
+    int r;
+    if (op->operation == IO_READ) {
+      uint32_t val = 0;
+      for(r = 0; r < op->size; r++)
+      {
+        val |= ((uint32_t)inb(op->port + r)) << (8 * r);
+      }
+      op->value = val;
+    } else {
+      for(r = 0; r < op->size; r++)
+      {
+        outb((op->value >> (8 * r)) & 0xFF, op->port + r);
+      }
+    }
+  }
+  return 0;
+}
+
 int main()
 {
   /*
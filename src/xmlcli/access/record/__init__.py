@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+
+# Custom imports
+
+
+if __name__ == "__main__":
+  pass
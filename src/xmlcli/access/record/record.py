@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+
+# Custom imports
+from ..base import base
+from ..base import trace
+from ...common import configurations
+
+__all__ = ["RecordAccess"]
+
+
+class RecordAccess(base.BaseAccess):
+  """Access method recording every call of the underlying access method and its result in binary trace
+
+  :param access_name: name of access method (section of configuration)
+  :param access: instance of access method to be recorded, if not specified it is created from `access_method` configuration
+  :param trace_file: trace file to be written, if not specified it is taken from `trace_file` configuration
+  """
+
+  def __init__(self, access_name="record", access=None, trace_file=None):
+    self.current_directory = os.path.dirname(os.path.abspath(__file__))
+    super(RecordAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
+    section = access_name.upper()
+    if access is None:
+      from ...XmlCliLib import CliLib
+      access = CliLib(self.config.get(section, "access_method")).access_instance
+    self.access = access
+    if not trace_file:
+      trace_file = self.config.get(section, "trace_file", fallback="")
+      if trace_file and not os.path.isabs(trace_file):
+        trace_file = os.path.join(self.current_directory, trace_file)
+    self.trace_file = trace_file if trace_file else os.path.join(configurations.OUT_DIR, "access_trace.bin")
+    self.trace = trace.TraceWriter(self.trace_file)
+
+  @property
+  def halt_required(self):
+    return getattr(self.access, "halt_required", True)
+
+  def halt_cpu(self, delay=0):
+    result = self.access.halt_cpu(delay)
+    self.trace.write("halt_cpu")
+    return result
+
+  def run_cpu(self):
+    result = self.access.run_cpu()
+    self.trace.write("run_cpu")
+    return result
+
+  def initialize_interface(self):
+    result = self.access.initialize_interface()
+    self.trace.write("initialize_interface")
+    return result
+
+  def close_interface(self):
+    result = self.access.close_interface()
+    self.trace.write("close_interface")
+    self.trace.flush()
+    return result
+
+  def close_trace(self):
+    self.trace.close()
+
+  def warm_reset(self):
+    result = self.access.warm_reset()
+    self.trace.write("warm_reset")
+    return result
+
+  def cold_reset(self):
+    result = self.access.cold_reset()
+    self.trace.write("cold_reset")
+    return result
+
+  def mem_block(self, address, size):
+    result = self.access.mem_block(address, size)
+    self.trace.write("mem_block", address, size, bytes(result))
+    return result
+
+  def mem_block_into(self, address, buffer):
+    result = self.access.mem_block_into(address, buffer)
+    self.trace.write("mem_block_into", address, memoryview(buffer).nbytes, memoryview(buffer).tobytes())
+    return result
+
+  def mem_save(self, filename, address, size):
+    result = self.access.mem_save(filename, address, size)
+    with open(filename, "rb") as saved_file:
+      self.trace.write("mem_save", address, size, saved_file.read())
+    return result
+
+  def mem_read(self, address, size):
+    result = self.access.mem_read(address, size)
+    self.trace.write("mem_read", address, size, (int(result) & ((1 << (size * 8)) - 1)).to_bytes(size, byteorder="little"))
+    return result
+
+  def mem_write(self, address, size, value):
+    result = self.access.mem_write(address, size, value)
+    self.trace.write("mem_write", address, size, (value & ((1 << (size * 8)) - 1)).to_bytes(size, byteorder="little"))
+    return result
+
+  def load_data(self, filename, address):
+    result = self.access.load_data(filename, address)
+    with open(filename, "rb") as loaded_file:
+      self.trace.write("load_data", address, 0, loaded_file.read())
+    return result
+
+  def mem_block_write(self, address, data):
+    result = self.access.mem_block_write(address, data)
+    self.trace.write("mem_block_write", address, memoryview(data).nbytes, memoryview(data).tobytes())
+    return result
+
+  def read_io(self, address, size):
+    result = self.access.read_io(address, size)
+    self.trace.write("read_io", address, size, (int(result) & 0xFFFFFFFF).to_bytes(4, byteorder="little"))
+    return result
+
+  def write_io(self, address, size, value):
+    result = self.access.write_io(address, size, value)
+    self.trace.write("write_io", address, size, (value & 0xFFFFFFFF).to_bytes(4, byteorder="little"))
+    return result
+
+  def io_batch(self, operations):
+    operations = list(operations)
+    result = self.access.io_batch(operations)
+    self.trace.write("io_batch", 0, len(operations), trace.pack_io_batch(operations, result))
+    return result
+
+  def trigger_smi(self, smi_value):
+    result = self.access.trigger_smi(smi_value)
+    self.trace.write("trigger_smi", smi_value)
+    return result
+
+  def read_msr(self, Ap, address):
+    result = self.access.read_msr(Ap, address)
+    self.trace.write("read_msr", address, Ap, int(result).to_bytes(8, byteorder="little"))
+    return result
+
+  def write_msr(self, Ap, address, value):
+    result = self.access.write_msr(Ap, address, value)
+    self.trace.write("write_msr", address, Ap, int(value).to_bytes(8, byteorder="little"))
+    return result
+
+  def read_sm_base(self):
+    result = self.access.read_sm_base()
+    self.trace.write("read_sm_base", 0, 0, int(result).to_bytes(8, byteorder="little"))
+    return result
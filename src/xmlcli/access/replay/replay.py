@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+
+# Custom imports
+from ..base import base
+from ..base import trace
+from ...common import configurations
+
+__all__ = ["ReplayAccess"]
+
+
+class ReplayAccess(base.BaseAccess):
+  """Access method serving the results of access calls from the trace recorded by `record` access method
+
+  Calls are expected in the same order as recorded, any divergence in operation,
+  address/port or size raises `CliOperationException`.
+
+  :param access_name: name of access method (section of configuration)
+  :param trace_file: trace file to be replayed, if not specified it is taken from `trace_file` configuration
+  :param strict: verify data written by host matches with recorded data, if not specified it is taken from configuration
+  """
+
+  def __init__(self, access_name="replay", trace_file=None, strict=None):
+    self.current_directory = os.path.dirname(os.path.abspath(__file__))
+    super(ReplayAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
+    section = access_name.upper()
+    if not trace_file:
+      trace_file = self.config.get(section, "trace_file", fallback="")
+      if trace_file and not os.path.isabs(trace_file):
+        trace_file = os.path.join(self.current_directory, trace_file)
+    self.trace_file = trace_file if trace_file else os.path.join(configurations.OUT_DIR, "access_trace.bin")
+    self.strict = self.config.getboolean(section, "strict", fallback=False) if strict is None else strict
+    self.records = trace.TraceReader(self.trace_file).records
+    self.position = 0
+    self.halt_required = any(record.operation == "halt_cpu" for record in self.records)
+
+  def rewind(self):
+    """Restart replay from the first record of trace"""
+    self.position = 0
+
+  def _next(self, operation, arg0=0, arg1=0):
+    if self.position >= len(self.records):
+      raise base.CliOperationException(f"Trace {self.trace_file} exhausted at {operation}(0x{arg0:x}, 0x{arg1:x})")
+    record = self.records[self.position]
+    if record.operation != operation or record.arg0 != (arg0 & 0xFFFFFFFFFFFFFFFF) or record.arg1 != (arg1 & 0xFFFFFFFFFFFFFFFF):
+      raise base.CliOperationException(f"Replay diverged from trace at record {self.position}: "
+                                       f"expected {record}, requested {operation}(0x{arg0:x}, 0x{arg1:x})")
+    self.position += 1
+    return record
+
+  def _verify(self, record, payload):
+    if self.strict and record.payload != payload:
+      raise base.CliOperationException(f"Replay diverged from trace at record {self.position - 1}: data written by host differs for {record}")
+
+  def halt_cpu(self, delay=0):
+    self._next("halt_cpu")
+    return 0
+
+  def run_cpu(self):
+    self._next("run_cpu")
+    return 0
+
+  def initialize_interface(self):
+    self._next("initialize_interface")
+    return 0
+
+  def close_interface(self):
+    self._next("close_interface")
+    return 0
+
+  def warm_reset(self):
+    self._next("warm_reset")
+
+  def cold_reset(self):
+    self._next("cold_reset")
+
+  def mem_block(self, address, size):
+    return self._next("mem_block", address, size).payload
+
+  def mem_block_into(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    view[:] = self._next("mem_block_into", address, len(view)).payload
+    return len(view)
+
+  def mem_save(self, filename, address, size):
+    payload = self._next("mem_save", address, size).payload
+    with open(filename, "wb") as out_file:
+      out_file.write(payload)
+    return payload
+
+  def mem_read(self, address, size):
+    return int.from_bytes(self._next("mem_read", address, size).payload, byteorder="little")
+
+  def mem_write(self, address, size, value):
+    record = self._next("mem_write", address, size)
+    self._verify(record, (value & ((1 << (size * 8)) - 1)).to_bytes(size, byteorder="little"))
+
+  def load_data(self, filename, address):
+    record = self._next("load_data", address)
+    if self.strict:
+      with open(filename, "rb") as in_file:
+        self._verify(record, in_file.read())
+
+  def mem_block_write(self, address, data):
+    view = memoryview(data).cast("B")
+    record = self._next("mem_block_write", address, len(view))
+    self._verify(record, view.tobytes())
+    return len(view)
+
+  def read_io(self, address, size):
+    return int.from_bytes(self._next("read_io", address, size).payload, byteorder="little")
+
+  def write_io(self, address, size, value):
+    record = self._next("write_io", address, size)
+    self._verify(record, (value & 0xFFFFFFFF).to_bytes(4, byteorder="little"))
+
+  def io_batch(self, operations):
+    operations = list(operations)
+    record = self._next("io_batch", 0, len(operations))
+    recorded_operations = trace.unpack_io_batch(record.payload)
+    result = []
+    for (operation, port, size, value), (recorded_operation, recorded_port, recorded_size, recorded_value) in zip(operations, recorded_operations):
+      if (operation, port, size) != (recorded_operation, recorded_port, recorded_size):
+        raise base.CliOperationException(f"Replay diverged from trace at record {self.position - 1}: I/O batch operations differ")
+      if operation == base.IO_READ:
+        result.append(recorded_value)
+      else:
+        if self.strict and (value & 0xFFFFFFFF) != recorded_value:
+          raise base.CliOperationException(f"Replay diverged from trace at record {self.position - 1}: value written to port 0x{port:x} differs")
+        result.append(None)
+    return result
+
+  def trigger_smi(self, smi_value):
+    self._next("trigger_smi", smi_value)
+
+  def read_msr(self, Ap, address):
+    return int.from_bytes(self._next("read_msr", address, Ap).payload, byteorder="little")
+
+  def write_msr(self, Ap, address, value):
+    record = self._next("write_msr", address, Ap)
+    self._verify(record, int(value).to_bytes(8, byteorder="little"))
+
+  def read_sm_base(self):
+    return int.from_bytes(self._next("read_sm_base").payload, byteorder="little")
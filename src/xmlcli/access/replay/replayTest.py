@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+__author__ = "Gahan Saraiya"
+
+import os
+import tempfile
+import unittest
+from .replay import ReplayAccess
+from ..record.record import RecordAccess
+from ..base import base
+from ..emulator import firmware
+from ... import XmlCliLib as clb
+from ... import XmlCli as cli
+from ...common import configurations
+
+
+class RecordReplayTestCase(unittest.TestCase):
+  """Record session against emulated target and replay it without target"""
+  knobs = "EmuKnob_00000=1, EmuKnob_00002=0x1234"
+
+  def setUp(self):
+    self.previous_interface = clb.InterfaceType
+    self.previous_xml_cache = configurations.XML_CACHE
+    configurations.XML_CACHE = False  # recorded and replayed sessions shall access target identically
+    clb._setCliAccess("emulator")
+    clb.cliaccess.seed(firmware.create_synthetic_platform_xml(knob_count=20))
+    self.emulator = clb.cliaccess
+    self.trace_file = tempfile.mktemp(suffix=".bin")
+    self.xml_file = tempfile.mktemp(suffix=".xml")
+
+  def tearDown(self):
+    clb._setCliAccess(self.previous_interface)
+    configurations.XML_CACHE = self.previous_xml_cache
+    for file in (self.trace_file, self.xml_file, self.xml_file + ".replay"):
+      if os.path.exists(file):
+        os.remove(file)
+
+  def record_session(self):
+    clb.cliaccess = RecordAccess(access=self.emulator, trace_file=self.trace_file)
+    self.assertEqual(clb.SaveXml(self.xml_file), 0)
+    self.assertEqual(cli.CvProgKnobs(self.knobs), 0)
+    self.assertEqual(clb.readcmos_block([0xF0, 0xF1]), [self.emulator.cmos[0xF0], self.emulator.cmos[0xF1]])
+    clb.cliaccess.close_trace()
+
+  def test_replay_session(self):
+    self.record_session()
+    clb.cliaccess = ReplayAccess(trace_file=self.trace_file, strict=True)
+    for _ in range(2):
+      self.assertEqual(clb.SaveXml(self.xml_file + ".replay"), 0)
+      self.assertEqual(cli.CvProgKnobs(self.knobs), 0)
+      self.assertEqual(clb.readcmos_block([0xF0, 0xF1]), [self.emulator.cmos[0xF0], self.emulator.cmos[0xF1]])
+      self.assertEqual(clb.cliaccess.position, len(clb.cliaccess.records))
+      clb.cliaccess.rewind()
+      clb.getSession().invalidate_mailbox()  # recorded session started with mailbox discovery
+    with open(self.xml_file, "rb") as recorded, open(self.xml_file + ".replay", "rb") as replayed:
+      self.assertEqual(recorded.read(), replayed.read())
+
+  def test_replay_divergence(self):
+    self.record_session()
+    clb.cliaccess = ReplayAccess(trace_file=self.trace_file)
+    self.assertRaises(base.CliOperationException, clb.cliaccess.mem_read, 0x1000, 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -12,6 +12,8 @@ __all__ = ["StubAccess"]
 
 
 class StubAccess(base.BaseAccess):
+  halt_required = False
+
   def __init__(self, access_name="stub"):
     self.current_directory = os.path.dirname(os.path.abspath(__file__))
     super(StubAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
@@ -37,6 +39,9 @@ class StubAccess(base.BaseAccess):
   def mem_block(self, address, size):
     return 0
 
+  def mem_block_into(self, address, buffer):
+    return 0
+
   def mem_save(self, filename, address, size):
     return 0
 
@@ -49,6 +54,9 @@ class StubAccess(base.BaseAccess):
   def load_data(self, filename, address):
     return 0
 
+  def mem_block_write(self, address, data):
+    return 0
+
   def read_io(self, address, size):
     return 0
 
@@ -13,6 +13,8 @@ __all__ = ["WinRweAccess"]
 
 
 class WinRweAccess(base.BaseAccess):
+  halt_required = False
+
   def __init__(self, access_name="winrwe"):
     self.current_directory = os.path.dirname(os.path.abspath(__file__))
     super(WinRweAccess, self).__init__(access_name=access_name, child_class_directory=self.current_directory)
@@ -38,11 +40,16 @@ class WinRweAccess(base.BaseAccess):
   def cold_reset(self):
     os.system('{} /Nologo /Min /Command="O 0xCF9 0x0E; RwExit"'.format(self.rw_executable))
 
-  def mem_block(self, address, size):
-    os.system('{} /Nologo /Min /Command="SAVE {} Memory 0x{:x} 0x{:x}; RwExit"'.format(self.rw_executable, self.temp_data_bin, address, size))
+  def mem_block_into(self, address, buffer):
+    view = memoryview(buffer).cast("B")
+    os.system('{} /Nologo /Min /Command="SAVE {} Memory 0x{:x} 0x{:x}; RwExit"'.format(self.rw_executable, self.temp_data_bin, address, len(view)))
     with open(self.temp_data_bin, 'rb') as f:
-      data_buffer = f.read()
-    return data_buffer
+      return f.readinto(view)
+
+  def mem_block(self, address, size):
+    result = bytearray(size)
+    self.mem_block_into(address, result)
+    return result
 
   def mem_save(self, filename, address, size):
     os.system('{} /Nologo /Min /Command="SAVE {} Memory 0x{:x} 0x{:x}; RwExit"'.format(self.rw_executable, filename, address, size))
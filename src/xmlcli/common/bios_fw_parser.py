@@ -35,9 +35,9 @@ if uefi_parser.guid_to_store:
 """
 
 # Built-in imports
+import io
 import os
 import json
-import shutil
 from collections import namedtuple
 
 # Custom imports
@@ -632,30 +632,28 @@ class UefiParser(object):
     decompressed_data = decompress_obj.decompress()
     key = f"0x{start:x}-{'SEC'}-0x{section_content_size:x}"
 
-    log.debug(f"===>>> Compressed file: {decompress_obj.temp_file_path}")
-    log.debug(f"===>>> DeCompressed file: {decompress_obj.decompressed_file_path}")
     if decompressed_data:
       is_compressed = True
       log.debug(f".........Going to nesting firmware level: {nesting_level}.........")
       if utils.EXTRACT_FV_FFS:
-        # copy decompressed and compressed files for debugging purpose
+        # store decompressed and compressed data for debugging purpose
         compressed_file_name = f"C_nested_fv_lvl_{nesting_level}_base_address_0x{buffer_pointer:x}{configurations.PY_VERSION}.bin"
         decompressed_file_name = f"D_nested_fv_lvl_{nesting_level}_base_address_0x{buffer_pointer:x}{configurations.PY_VERSION}.bin"
         file_dir = os.path.join(configurations.OUT_DIR, "temp")
         utils.make_directory(file_dir)  # create the directory if not exists
-        shutil.copy(decompress_obj.temp_file_path, os.path.join(file_dir, compressed_file_name))
-        shutil.copy(decompress_obj.decompressed_file_path, os.path.join(file_dir, decompressed_file_name))
-      with open(decompress_obj.decompressed_file_path, "rb") as decompressed_data:
-        # construct guided defined directory to store content within it
-        guid_defined_dir = os.path.join(bin_dir, f"GUID_DEFINED_SECTION_0x{start:x}_to_0x{end:x}")
-        result[key] = self.parse_ffs_section(buffer=decompressed_data,
-                                             buffer_pointer=0x00,
-                                             end_point=os.path.getsize(decompress_obj.decompressed_file_path),
-                                             ffs_data=ffs_data,
-                                             _type=structure.FFS_FILE_TYPE_MAP.get(ffs_data.Type, 0),
-                                             nesting_level=nesting_level, bin_dir=guid_defined_dir,
-                                             is_compressed=is_compressed
-                                             )
+        for file_name, data in ((compressed_file_name, compressed_data), (decompressed_file_name, decompressed_data)):
+          with open(os.path.join(file_dir, file_name), "wb") as f:
+            f.write(data)
+      # construct guided defined directory to store content within it
+      guid_defined_dir = os.path.join(bin_dir, f"GUID_DEFINED_SECTION_0x{start:x}_to_0x{end:x}")
+      result[key] = self.parse_ffs_section(buffer=io.BytesIO(decompressed_data),
+                                           buffer_pointer=0x00,
+                                           end_point=len(decompressed_data),
+                                           ffs_data=ffs_data,
+                                           _type=structure.FFS_FILE_TYPE_MAP.get(ffs_data.Type, 0),
+                                           nesting_level=nesting_level, bin_dir=guid_defined_dir,
+                                           is_compressed=is_compressed
+                                           )
     return result
 
   def parse_efi_variable_data(self, buffer, buffer_pointer=0x0, end_point=0x0):
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Typed readers of binary buffers parsed by XmlCli (BIOS binary, NVRAM, HII database,
+BiosKnobsData bin, CLI request/response buffers).
+
+Readers work on any object supporting buffer protocol (bytes, bytearray, memoryview, mmap),
+integers are read with `struct.unpack_from` and strings are located with `bytes.find`
+instead of reading a byte at a time. Lists of byte values (as used by legacy callers)
+are still accepted, they are read through slices.
+
+GUIDs are read as 16-byte keys (bytes, as laid out in memory), which are hashable
+and compare in single operation, `guid_list` converts key to the list form of `XmlCliLib`.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import struct
+
+__all__ = ["read_integer", "read_bytes", "read_c_string", "read_ucs2_string", "read_chars", "c_string_size", "ucs2_string_size", "find_bytes",
+           "read_guid", "guid_key", "guid_list", "find_guid",
+           "UINT8", "UINT16", "UINT32", "UINT64", "GUID", "GUID_SIZE", "ZERO_GUID_KEY"]
+
+UINT8 = struct.Struct("<B")
+UINT16 = struct.Struct("<H")
+UINT32 = struct.Struct("<I")
+UINT64 = struct.Struct("<Q")
+INTEGER_STRUCTS = {1: UINT8, 2: UINT16, 4: UINT32, 8: UINT64}
+GUID = struct.Struct("<IHH8B")  # Data1, Data2, Data3, Data4[8]
+GUID_SIZE = GUID.size
+ZERO_GUID_KEY = bytes(GUID_SIZE)
+
+
+def read_integer(buffer, offset, size):
+  """Little endian unsigned integer
+
+  Integer truncated by end of buffer is read from the available bytes (0 if none),
+  same as slicing the buffer would.
+
+  :param buffer: buffer to read from
+  :param offset: offset of integer
+  :param size: size of integer in bytes
+  :return: integer value
+  """
+  structure = INTEGER_STRUCTS.get(size)
+  if (structure is not None) and (offset >= 0) and (offset + size <= len(buffer)) and not isinstance(buffer, list):
+    return structure.unpack_from(buffer, offset)[0]
+  return int.from_bytes(bytes(buffer[offset:offset + size]), "little")
+
+
+def read_bytes(buffer, offset, size):
+  """Bytes of given size (or up to end of buffer)"""
+  return bytes(buffer[offset:offset + size])
+
+
+def find_bytes(buffer, pattern, start=0, end=None):
+  """Offset of first occurrence of pattern within buffer[start:end], -1 if not found"""
+  end = len(buffer) if end is None else end
+  find = getattr(buffer, "find", None)
+  if find is not None:
+    return find(pattern, start, end)
+  position = bytes(buffer[start:end]).find(pattern)  # memoryview or list, search within bounded copy
+  return position if position < 0 else start + position
+
+
+def c_string_size(buffer, offset, limit=None):
+  """Size of NUL terminated string (excluding NUL)
+
+  :param buffer: buffer to read from
+  :param offset: offset of string
+  :param limit: maximum size of string, defaults to end of buffer
+  :return: number of bytes before NUL, or up to limit (end of buffer) if string is not terminated
+  """
+  end = len(buffer) if limit is None else min(offset + limit, len(buffer))
+  if offset >= end:
+    return 0
+  position = find_bytes(buffer, b"\x00", offset, end)
+  return (end if position < 0 else position) - offset
+
+
+def ucs2_string_size(buffer, offset, limit=None):
+  """Size in bytes of NUL terminated UCS-2 string (excluding NUL character)
+
+  NUL character is looked up at even distance from start of string.
+
+  :param buffer: buffer to read from
+  :param offset: offset of string
+  :param limit: maximum size of string in bytes, defaults to end of buffer
+  :return: number of bytes before NUL character, or up to limit (end of buffer) if string is not terminated
+  """
+  end = len(buffer) if limit is None else min(offset + limit, len(buffer))
+  start = offset
+  while start < end:
+    position = find_bytes(buffer, b"\x00\x00", start, end)
+    if position < 0:
+      break
+    if (position - offset) % 2 == 0:
+      return position - offset
+    start = position + 1
+  return max(end - offset, 0) & ~1
+
+
+def read_c_string(buffer, offset, limit=None, encoding="latin-1"):
+  """NUL terminated string
+
+  :param buffer: buffer to read from
+  :param offset: offset of string
+  :param limit: maximum size of string, defaults to end of buffer
+  :param encoding: encoding of string, defaults to latin-1 (one character for each byte)
+  :return: decoded string
+  """
+  size = c_string_size(buffer, offset, limit)
+  return bytes(buffer[offset:offset + size]).decode(encoding)
+
+
+def read_ucs2_string(buffer, offset, limit=None):
+  """NUL terminated UCS-2 string
+
+  :param buffer: buffer to read from
+  :param offset: offset of string
+  :param limit: maximum size of string in bytes, defaults to end of buffer
+  :return: decoded string
+  """
+  size = ucs2_string_size(buffer, offset, limit)
+  return bytes(buffer[offset:offset + size]).decode("utf-16-le", errors="replace")
+
+
+def read_chars(buffer, offset, count, stride=1):
+  """String of bytes `stride` apart, up to first NUL byte
+
+  With stride of 2 it reads low byte of each character of UCS-2 string, which is how
+  legacy parsers read names of variables and BIOS ID.
+
+  :param buffer: buffer to read from
+  :param offset: offset of first character
+  :param count: maximum number of characters
+  :param stride: distance between characters in bytes
+  :return: string with one character for each byte
+  """
+  return bytes(buffer[offset:offset + (count * stride):stride]).split(b"\x00", 1)[0].decode("latin-1")
+
+
+def read_guid(buffer, offset):
+  """16-byte key of GUID
+
+  :return: key or `ZERO_GUID_KEY` if GUID is not within buffer
+  """
+  if (offset < 0) or (offset + GUID_SIZE > len(buffer)):
+    return ZERO_GUID_KEY
+  return bytes(buffer[offset:offset + GUID_SIZE])
+
+
+def guid_key(guid):
+  """16-byte key of GUID given as list of 11 integers (Data1, Data2, Data3 and 8 bytes of Data4) or as key"""
+  if isinstance(guid, (bytes, bytearray, memoryview)):
+    return bytes(guid)
+  return GUID.pack(*guid)
+
+
+def guid_list(key):
+  """List of 11 integers (Data1, Data2, Data3 and 8 bytes of Data4) from 16-byte key of GUID"""
+  return list(GUID.unpack(key))
+
+
+def find_guid(buffer, guid, start=0, end=None):
+  """Offset of first occurrence of GUID in buffer
+
+  :param guid: GUID as list or 16-byte key
+  :return: offset or -1 if not found
+  """
+  return find_bytes(buffer, guid_key(guid), start, end)
@@ -3,12 +3,12 @@
 # Built-in imports
 import os
 import sys
-import shlex
 from collections import namedtuple
 from datetime import datetime
 
 # Custom imports
 from . import utils
+from . import tiano
 from . import logger
 from . import configurations
 
@@ -16,6 +16,18 @@ __author__ = "Gahan Saraiya"
 
 log = logger.settings.logger
 
+# Optional native decompressors, in-process pure Python (Tiano) or binary utility (Brotli) is used when unavailable
+try:
+  from uefi_firmware import efi_compressor
+except (ModuleNotFoundError, ImportError):
+  efi_compressor = None
+try:
+  import brotli
+except (ModuleNotFoundError, ImportError):
+  brotli = None
+
+BROTLI_HEADER_SIZE = 0x10  # decompressed size (8 bytes) and scratch buffer size (8 bytes) prepended by EDK II Brotli
+
 COMPRESSION_GUIDS = [
   "ee4e5898-3914-4259-9d6edc7bd79403cf",
   "3d532050-5cda-4fd0-879e0f7f630d5afb"
@@ -42,6 +54,67 @@ def lzma_decompress(compressed_file, decompressed_file, min_python=(3, 7, 5)):
     log.error(f"Decompression not supported. Please move to Python version {min_python} or above")
 
 
+def lzma_decompress_data(compressed_data):
+  """Decompress LZMA compressed data in memory
+
+  :param compressed_data: compressed data (bytes like)
+  :return: decompressed data as bytearray
+  """
+  import lzma
+  decompressor = lzma.LZMADecompressor()
+  return bytearray(decompressor.decompress(compressed_data))
+
+
+def tiano_decompress_data(compressed_data, version=tiano.TIANO_VERSION, native=True):
+  """Decompress Tiano (or EFI if `version` is 1) compressed data in memory
+
+  Native decompressor of `uefi_firmware` is used if installed, else pure Python one.
+
+  :param compressed_data: compressed data (bytes like)
+  :param version: `tiano.EFI_VERSION` or `tiano.TIANO_VERSION`
+  :param native: use native decompressor if available
+  :return: decompressed data as bytearray
+  """
+  try:
+    if native and efi_compressor:
+      compressed_data = bytes(compressed_data)
+      decompress = efi_compressor.EfiDecompress if version == tiano.EFI_VERSION else efi_compressor.TianoDecompress
+      return bytearray(decompress(compressed_data, len(compressed_data)))
+    return tiano.decompress(compressed_data, version)
+  except Exception as e:  # native decompressor raises bare Exception on corrupted data
+    raise utils.XmlCliException(f"Tiano decompression failed: {e}")
+
+
+def brotli_decompress_data(compressed_data, temp_file=None):
+  """Decompress Brotli compressed data (with header of EDK II Brotli utility) in memory
+
+  `brotli` module is used if installed, else data is decompressed by Brotli binary utility.
+
+  :param compressed_data: compressed data (bytes like)
+  :param temp_file: file for compressed data handed over to binary utility, by default created in temp folder
+  :return: decompressed data as bytearray
+  """
+  if brotli:
+    try:
+      return bytearray(brotli.decompress(bytes(compressed_data[BROTLI_HEADER_SIZE:])))
+    except brotli.error as e:
+      raise utils.XmlCliException(f"Brotli decompression failed: {e}")
+  temp_file = temp_file if temp_file else os.path.join(utils.get_temp_folder(), f"brotli_compressed_{os.getpid()}.bin")
+  output_file = f"{temp_file}.out"
+  with open(temp_file, "wb") as f:
+    f.write(compressed_data)
+  try:
+    utils.system_call(cmd_lis=[configurations.BROTLI_COMPRESS_BIN, "-d", "-i", temp_file, "-o", output_file])
+    with open(output_file, "rb") as f:
+      return bytearray(f.read())
+  except OSError as e:
+    raise utils.XmlCliException(f"Brotli decompression failed: {e}")
+  finally:
+    for file_name in (temp_file, output_file):
+      if os.path.exists(file_name):
+        os.remove(file_name)
+
+
 class ProcessEncapsulatedData(object):
   def __init__(self, guid, compressed_data, section, **kwargs):
     self.guid = utils.guid_formatter(guid)
@@ -55,22 +128,8 @@ class ProcessEncapsulatedData(object):
     }
     self.temp_folder = kwargs.get("temp_folder", utils.get_temp_folder())
     self.tool_dir = kwargs.get("tool_dir", utils.get_tools_dir())
-    self.brotli_compression_utility = configurations.BROTLI_COMPRESS_BIN
-    self.tiano_compression_utility = configurations.TIANO_COMPRESS_BIN
     self.timestamp = datetime.now().strftime(logger.LOG_DATE_FORMAT)
     self.input_file_path = os.path.join(self.temp_folder, "fv_compressed_{}_{}{}.sec")
-    self.output_file_path = os.path.join(self.temp_folder, "fv_decompressed_{}_{}{}.sec")
-    self.directory_initialization()
-
-  def directory_initialization(self):
-    # write in memory data to file
-    with open(self.temp_file_path, "wb") as f:
-      f.write(self.compressed_data)
-
-  @property
-  def decompressed_file_path(self):
-    guid_str = utils.get_string(self.guid)
-    return self.output_file_path.format(guid_str, self.timestamp, configurations.PY_VERSION)
 
   @property
   def temp_file_path(self):
@@ -81,44 +140,17 @@ class ProcessEncapsulatedData(object):
     err_msg = "Given decompression method does not implemented so far, will be implemented in upcoming future"
     raise NotImplementedError(err_msg)
 
-  @staticmethod
-  def system_call(output_file_check, cmd=None, cmd_lis=None):
-    utils.system_call(cmd_lis)
-    if cmd_lis and not os.path.exists(output_file_check):
-      import subprocess
-      subprocess.call([cmd for cmd in cmd_lis])
-    elif cmd and not os.path.exists(output_file_check):
-      utils.system_call(shlex.split(cmd, posix=(configurations.PLATFORM != "win32")))
-
   def lzma_custom_decompress(self):
     if sys.version_info <= (3, 7, 5):
       raise utils.XmlCliException("Decompression not supported on your python version. Please move to Python version 3.7.5 or above")
-    else:
-      # lzma is built-in compression method since Python 3.4 (using 3.7.5 which has bug fixed)
-      import lzma
-      decompressed_data = lzma.decompress(self.compressed_data)
-      # write in memory data to file
-      with open(self.decompressed_file_path, "wb") as f:
-        f.write(decompressed_data)
-    return decompressed_data
+    # lzma is built-in compression method since Python 3.4 (using 3.7.5 which has bug fixed)
+    return lzma_decompress_data(self.compressed_data)
 
   def tiano_custom_decompress(self):
-    # decompress with binary utility
-    cmd = f'"{self.tiano_compression_utility}" -d -q "{self.temp_file_path}" -o "{self.decompressed_file_path}"'
-    cmd_lis = [self.tiano_compression_utility, "-d", "-q", self.temp_file_path, "-o", self.decompressed_file_path]
-    self.system_call(cmd=cmd, cmd_lis=cmd_lis, output_file_check=self.decompressed_file_path)
-    with open(self.decompressed_file_path, "rb") as f:
-      decompressed_data = f.read()
-    return decompressed_data
+    return tiano_decompress_data(self.compressed_data)
 
   def brotli_custom_decompress(self):
-    # decompress with binary utility
-    cmd = f'"{self.brotli_compression_utility}" -d -i "{self.temp_file_path}" -o "{self.decompressed_file_path}"'
-    cmd_lis = [self.brotli_compression_utility, "-d", "-i", self.temp_file_path, "-o", self.decompressed_file_path]
-    self.system_call(cmd=cmd, cmd_lis=cmd_lis, output_file_check=self.decompressed_file_path)
-    with open(self.decompressed_file_path, "rb") as f:
-      decompressed_data = f.read()
-    return decompressed_data
+    return brotli_decompress_data(self.compressed_data, temp_file=self.temp_file_path)
 
   def decompress(self):
     log.info(f"Decompressing File...GUID: {self.guid}")
@@ -48,6 +48,7 @@ XMLCLI_CONFIG = config_read(CONFIG_FILE)
 ENCODING = XMLCLI_CONFIG.get("GENERAL_SETTINGS", "ENCODING")
 ACCESS_METHOD = XMLCLI_CONFIG.get("GENERAL_SETTINGS", "ACCESS_METHOD")
 PERFORMANCE = XMLCLI_CONFIG.getboolean("GENERAL_SETTINGS", "PERFORMANCE")
+ACCESS_INSTRUMENTATION = XMLCLI_CONFIG.getboolean("GENERAL_SETTINGS", "ACCESS_INSTRUMENTATION", fallback=False)
 # BIOS Knobs Configuration file
 BIOS_KNOBS_CONFIG = os.path.join(XMLCLI_DIR, 'cfg', 'BiosKnobs.ini')
 
@@ -89,6 +90,18 @@ if not os.path.isfile(os.path.abspath(BROTLI_COMPRESS_BIN)):
 
 STATUS_CODE_RECORD_FILE = os.path.join(XMLCLI_DIR, "messages.json")
 
+# Persistent cache of decompressed platform XML
+XML_CACHE = XMLCLI_CONFIG.getboolean("GENERAL_SETTINGS", "XML_CACHE", fallback=False)
+XML_CACHE_DIR = XMLCLI_CONFIG.get("DIRECTORY_SETTINGS", "XML_CACHE_DIR", fallback="")
+if XML_CACHE_DIR and not os.path.isabs(XML_CACHE_DIR):
+  XML_CACHE_DIR = os.path.join(OUT_DIR, XML_CACHE_DIR)
+XML_CACHE_DIR = XML_CACHE_DIR if XML_CACHE_DIR else os.path.join(OUT_DIR, "xml_cache")
+XML_CACHE_MAX_ENTRIES = XMLCLI_CONFIG.getint("GENERAL_SETTINGS", "XML_CACHE_MAX_ENTRIES", fallback=8)
+# Download only the blocks of regular XML predicted to differ from cached XML
+XML_BLOCK_DELTA = XMLCLI_CONFIG.getboolean("GENERAL_SETTINGS", "XML_BLOCK_DELTA", fallback=False)
+# Number of parsed platform XML knob models kept in memory by the process
+KNOB_MODEL_CACHE_SIZE = XMLCLI_CONFIG.getint("GENERAL_SETTINGS", "KNOB_MODEL_CACHE_SIZE", fallback=4)
+
 # Reading other configuration parameters
 CLEANUP = XMLCLI_CONFIG.getboolean("INITIAL_CLEANUP", "CLEANUP")
 
@@ -98,9 +111,9 @@ ENABLE_EXPERIMENTAL_FEATURES = XMLCLI_CONFIG.getboolean("EXPERIMENTAL_FEATURES_S
 __all__ = ["XMLCLI_CONFIG",
            "PY3", "PY_VERSION", "SYSTEM_VERSION", "PLATFORM",
            "XMLCLI_DIR", "TEMP_DIR", "OUT_DIR",
-           "ACCESS_METHOD", "ENCODING", "PERFORMANCE",
+           "ACCESS_METHOD", "ENCODING", "PERFORMANCE", "ACCESS_INSTRUMENTATION",
            "TIANO_COMPRESS_BIN", "BROTLI_COMPRESS_BIN",
-           "STATUS_CODE_RECORD_FILE",
+           "STATUS_CODE_RECORD_FILE", "XML_CACHE", "XML_CACHE_DIR", "XML_CACHE_MAX_ENTRIES", "XML_BLOCK_DELTA", "KNOB_MODEL_CACHE_SIZE",
            "ENABLE_EXPERIMENTAL_FEATURES"
            ]
 
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled evaluation of knob dependency expressions (depex).
+
+Depex of each knob is pre-processed (operator tokens, `Sif`/`Gif`/`Dif` clauses,
+`_LIST_` and knob names) once and its restricted AST is compiled in to closures
+over operands, which are read from integer slots of knob values. Clauses of same
+form (i.e. `Sif( <knob> _EQU_ 0x1 )`) share the closure, identical depex strings are compiled once.
+
+`DepexEngine` keeps the compiled depex of every knob of the knobs map along with
+the graph of knob -> knobs whose depex refers to it. Status of knob depends only on
+current values of knobs referred by its depex, hence change of knob value
+re-evaluates depex of its dependents only.
+
+Results are the same as of `XmlIniParser.evaluate_depex`: clause referring to knob
+whose current value is not a literal (i.e. string knob) is evaluated from its text.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import re
+import ast
+import operator
+from functools import lru_cache
+
+# Custom imports
+from . import logger
+
+log = logger.settings.logger
+
+__all__ = ["CompiledDepex", "DepexEngine", "compile_depex", "get_depex_engine", "to_literal",
+           "MATH_OPERATIONS", "DEPEX_RESULT_MAP", "EQUALITY_MAP"]
+
+MATH_OPERATIONS = {'and', 'or', 'not', '==', '!=', '<=', '>=', '<', '>', '_LIST_'}
+DEPEX_RESULT_MAP = {True : {'Sif': 'Active', 'Gif': 'Active', 'Dif': 'Active', '': 'Active'},
+                    False: {'Sif': 'Suppressed', 'Gif': 'GrayedOut', 'Dif': 'Disabled', '': 'Unknown'}}
+EQUALITY_MAP = {'==': 'in', '!=': 'not in'}
+
+RE_OPERATION_CLAUSE = re.compile(r'\s*(Sif|Gif|Dif)\s*\((.*)\)\s*')
+RE_CLAUSE = re.compile(r'\s*\((.*?)\)\s*')
+RE_VARIABLE = re.compile(r'\s*(\w+)\s')
+RE_LIST = re.compile(r'\s*_LIST_\s*(.*?)\s*(==|!=)\s*(.*?)\s*(\)|or|and|not)\s*')
+SLOT_PREFIX = '__depex_slot_'  # knob names are substituted by index of their operand in clause, i.e. `__depex_slot_0__`
+RE_SLOT = re.compile(r'__depex_slot_(\d+)__')
+COMPARE_OPERATIONS = {
+  ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+  ast.In: lambda left, right: left in right, ast.NotIn: lambda left, right: left not in right,
+}
+
+
+class InvalidValue(object):
+  """Value of knob which is not a literal operand of depex"""
+  __slots__ = ()
+
+  def __repr__(self):
+    return "<InvalidValue>"
+
+
+INVALID_VALUE = InvalidValue()
+
+
+@lru_cache(maxsize=4096)
+def to_literal(value):
+  """Operand for current value of knob, as the value would be evaluated when written in depex
+
+  :param value: current value of knob as string (i.e. `0x01`)
+  :return: integer, float or bool; `INVALID_VALUE` if value is not such literal
+  """
+  value = value.strip()
+  if value[:1] not in ('+', '-'):
+    try:
+      return int(value, 0)
+    except ValueError:
+      pass
+  try:
+    node = ast.parse(value, mode='eval').body
+  except SyntaxError:
+    return INVALID_VALUE
+  if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float)):
+    return node.value
+  return INVALID_VALUE
+
+
+def is_hex(variable):
+  try:
+    int(variable, 16)
+    return True
+  except ValueError:
+    return False
+
+
+def _raise(error):
+  def evaluate(operands):
+    raise error
+  return evaluate
+
+
+def _compile_node(node):
+  """Compile node of restricted AST (same as `XmlIniParser._safe_eval_depex`) in to closure of operands of clause
+
+  Disallowed nodes are compiled in to closure raising ValueError, so that they fail
+  only when evaluated, same as AST walk does.
+  """
+  if isinstance(node, ast.Expression):
+    return _compile_node(node.body)
+  if isinstance(node, ast.Constant):
+    if not isinstance(node.value, (bool, int, float)):
+      return _raise(ValueError(f'Disallowed literal type: {type(node.value).__name__!r}'))
+    constant = node.value
+    return lambda operands: constant
+  if isinstance(node, ast.Name) and node.id.startswith(SLOT_PREFIX):
+    index = int(node.id[len(SLOT_PREFIX):-2])
+
+    def get_value(operands):
+      value = operands[index]
+      if value is INVALID_VALUE:
+        raise ValueError('Value of knob is not literal')
+      return value
+    return get_value
+  if isinstance(node, ast.List):
+    elements = [_compile_node(element) for element in node.elts]
+    return lambda operands: [element(operands) for element in elements]
+  if isinstance(node, ast.BoolOp):
+    terms = [_compile_node(term) for term in node.values]
+    if isinstance(node.op, ast.And):
+      return lambda operands: all(term(operands) for term in terms)
+    return lambda operands: any(term(operands) for term in terms)
+  if isinstance(node, ast.UnaryOp):
+    if not isinstance(node.op, ast.Not):
+      return _raise(ValueError(f'Disallowed UnaryOp: {type(node.op).__name__!r}'))
+    operand = _compile_node(node.operand)
+    return lambda operands: not operand(operands)
+  if isinstance(node, ast.Compare):
+    for op in node.ops:
+      if type(op) not in COMPARE_OPERATIONS:
+        return _raise(ValueError(f'Disallowed comparison op: {type(op).__name__!r}'))
+    left_operand = _compile_node(node.left)
+    comparisons = [(COMPARE_OPERATIONS[type(op)], _compile_node(comparator)) for op, comparator in zip(node.ops, node.comparators)]
+    if len(comparisons) == 1:
+      compare, right_operand = comparisons[0]
+      return lambda operands: bool(compare(left_operand(operands), right_operand(operands)))
+
+    def compare_chain(operands):
+      left = left_operand(operands)
+      for compare, right_operand in comparisons:
+        right = right_operand(operands)
+        if not compare(left, right):
+          return False
+        left = right
+      return True
+    return compare_chain
+  return _raise(ValueError(f'Disallowed AST node: {type(node).__name__!r}'))
+
+
+def _rewrite_clause(sub_expression):
+  """`_LIST_` and boolean operators of clause in which knob names are substituted"""
+  match = RE_LIST.search(sub_expression)
+  if match is not None:
+    sub_expression = '( ' + match.group(1).strip() + ' ' + EQUALITY_MAP[match.group(2).strip()] + ' [%s] )' % re.sub(r'\s\s*', ', ', match.group(3).strip())
+  return sub_expression.replace('OR', 'or').replace('AND', 'and')
+
+
+@lru_cache(maxsize=8192)
+def _compile_clause(sub_expression):
+  """Closure of clause, knobs are referred by index of operand within the clause (i.e. `__depex_slot_0__`),
+  so that clauses of same form share the closure
+  """
+  try:
+    return _compile_node(ast.parse(_rewrite_clause(sub_expression).strip(), mode='eval'))
+  except SyntaxError as e:
+    return _raise(e)
+
+
+class CompiledDepex(object):
+  """Depex of knob compiled in to list of clauses
+
+  Each clause is tuple of (operation, closure of operands, slots of knobs referred by clause in order of operands,
+  clause text with operand names in place of knob names).
+
+  :param clauses: list of clauses
+  :param slots: set of slots of knobs referred by depex
+  """
+  __slots__ = ("clauses", "slots")
+
+  def __init__(self, clauses, slots):
+    self.clauses = clauses
+    self.slots = slots
+
+  def evaluate(self, values, current):
+    """Status of knob for given values of knob slots
+
+    Clause referring to knob of which value is not literal is evaluated from its
+    text with current value written in place of knob, same as `XmlIniParser.evaluate_depex`.
+
+    :param values: list of operands (`to_literal`) of knob values, indexed by slot
+    :param current: list of current values of knobs as string, indexed by slot
+    :return: one of the status of `DEPEX_RESULT_MAP`
+    """
+    overall_operation = ''
+    overall_result = True
+    for operation, clause, slots, text in self.clauses:
+      try:
+        operands = [values[slot] for slot in slots]
+        if INVALID_VALUE in operands:
+          clause = _compile_clause(RE_SLOT.sub(lambda match: current[slots[int(match.group(1))]], text))
+        result = clause(operands)
+        if operation:
+          result = not result
+      except Exception:
+        result = True
+      if result == False:
+        overall_operation = operation
+        overall_result = result
+        if operation in ('Sif', 'Dif'):
+          break
+    return DEPEX_RESULT_MAP[overall_result][overall_operation]
+
+
+def compile_depex(depex, knob_name, knob_slots):
+  """Compile dependency expression
+
+  :param depex: dependency expression
+  :param knob_name: name of knob having the depex (for logging)
+  :param knob_slots: dictionary of knob name -> slot of its value
+  :return: `CompiledDepex`
+  """
+  clauses = []
+  slots = set()
+  main_exp = depex.replace('_EQU_', '==').replace('_NEQ_', '!=').replace('_LTE_', '<=').replace('_GTE_', '>=').replace('_LT_', '<').replace(
+    '_GT_', '>').replace(' AND ', ' and ').replace(' OR ', ' or ').strip()
+  for expression in main_exp.split('_AND_'):
+    operation = ''
+    if expression.strip() == 'TRUE':
+      continue
+    match = RE_OPERATION_CLAUSE.search(expression)
+    if match is not None:
+      operation = match.group(1).strip()
+      sub_expression = '( ' + match.group(2).strip() + ' )'
+    else:
+      match = RE_CLAUSE.search(expression)
+      if match is None:
+        log.warning(f'skipping this ({knob_name}) iteration')
+        continue
+      sub_expression = '( ' + match.group(1).strip() + ' )'
+    clause_slots = []
+    for variable_match in RE_VARIABLE.finditer(sub_expression):
+      variable = variable_match.group(1).strip()
+      if (variable not in knob_slots) or (variable in MATH_OPERATIONS) or is_hex(variable) or (f' {variable} ' not in sub_expression):
+        continue
+      sub_expression = sub_expression.replace(f' {variable} ', f' {SLOT_PREFIX}{len(clause_slots)}__ ')
+      clause_slots.append(knob_slots[variable])
+    clause_slots = tuple(clause_slots)
+    clauses.append((operation, _compile_clause(sub_expression), clause_slots, sub_expression))
+    slots.update(clause_slots)
+  return CompiledDepex(clauses, slots)
+
+
+class DepexEngine(object):
+  """Depex of all the knobs of knobs map compiled once, re-evaluated incrementally on change of knob values
+
+  :param bios_knobs_map: dictionary of knob name -> dictionary of knob details
+                         (`SetupType`, `CurVal`, `Depex`, `SetupPgPtr`, `SetupPgSts`) as built by `eval_knob_depex`,
+                         `SetupPgSts` of knobs is updated in place
+  """
+
+  def __init__(self, bios_knobs_map):
+    self.bios_knobs_map = bios_knobs_map
+    self.names = list(bios_knobs_map)
+    self.slots = {name: slot for slot, name in enumerate(self.names)}
+    self.current = [bios_knobs_map[name]['CurVal'] for name in self.names]
+    self.values = [to_literal(value) for value in self.current]
+    self.depex = [None] * len(self.names)  # None for knobs of which status is not evaluated from depex
+    self.dependents = {}  # slot -> list of slots of knobs whose depex refer to it
+    compiled_depex = {}
+    for slot, name in enumerate(self.names):
+      knob = bios_knobs_map[name]
+      if (knob['SetupType'] == 'READONLY') or (knob['SetupPgPtr'][0:4] == '???/'):
+        continue
+      depex = knob['Depex']
+      if depex not in compiled_depex:
+        compiled_depex[depex] = compile_depex(depex, name, self.slots)
+      self.depex[slot] = compiled_depex[depex]
+      for dependency in compiled_depex[depex].slots:
+        self.dependents.setdefault(dependency, []).append(slot)
+
+  def is_valid_for(self, bios_knobs_map):
+    """Whether engine is built for given knobs map (and its knobs are not added or removed since)"""
+    return (self.bios_knobs_map is bios_knobs_map) and (len(self.names) == len(bios_knobs_map))
+
+  def get_dependents(self, names):
+    """Names of knobs whose depex refer to any of the given knobs"""
+    slots = set()
+    for name in names:
+      slots.update(self.dependents.get(self.slots[name], ()))
+    return [self.names[slot] for slot in sorted(slots)]
+
+  def evaluate(self, slots=None):
+    """Evaluate status of knobs, status is updated in knobs map
+
+    :param slots: slots of knobs to be evaluated, defaults to all the knobs
+    :return: dictionary of knob name -> status of evaluated knobs
+    """
+    slots = range(len(self.names)) if slots is None else slots
+    statuses = {}
+    for slot in slots:
+      name = self.names[slot]
+      knob = self.bios_knobs_map[name]
+      if knob['SetupType'] == 'READONLY':
+        continue
+      depex = self.depex[slot]
+      knob['SetupPgSts'] = 'Disabled' if depex is None else depex.evaluate(self.values, self.current)
+      statuses[name] = knob['SetupPgSts']
+    return statuses
+
+  def _update(self, slot, value):
+    self.current[slot] = value
+    self.values[slot] = to_literal(value)
+
+  def set_value(self, name, value):
+    """Set current value of knob and re-evaluate status of its dependents
+
+    :param name: name of knob
+    :param value: current value of knob as string (i.e. `0x01`)
+    :return: dictionary of knob name -> status of re-evaluated knobs
+    """
+    slot = self.slots[name]
+    self.bios_knobs_map[name]['CurVal'] = value
+    self._update(slot, value)
+    return self.evaluate(sorted(self.dependents.get(slot, ())))
+
+  def refresh(self):
+    """Pick the current values changed in knobs map since last evaluation and re-evaluate status of their dependents
+
+    :return: dictionary of knob name -> status of re-evaluated knobs
+    """
+    affected = set()
+    for slot, name in enumerate(self.names):
+      value = self.bios_knobs_map[name]['CurVal']
+      if value != self.current[slot]:
+        self._update(slot, value)
+        affected.update(self.dependents.get(slot, ()))
+    return self.evaluate(sorted(affected))
+
+
+_depex_engine = None
+
+
+def get_depex_engine(bios_knobs_map):
+  """Depex engine of given knobs map, engine of last knobs map is reused (refreshed with changed knob values)
+
+  :param bios_knobs_map: dictionary of knob name -> dictionary of knob details
+  :return: tuple of (`DepexEngine`, True if engine is newly built and its knobs are yet to be evaluated)
+  """
+  global _depex_engine
+  if (_depex_engine is not None) and _depex_engine.is_valid_for(bios_knobs_map):
+    return _depex_engine, False
+  _depex_engine = DepexEngine(bios_knobs_map)
+  return _depex_engine, True
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Process wide cache of parsed platform XML (knob model).
+
+Platform XML is parsed once in to `KnobModel` which holds the parsed tree along
+with columnar table of knobs (`KnobTable`: varstore, offset, size, type, default,
+current value, depex, options) and name -> row index of the table; knobs are
+offered as lightweight row views (`KnobRow`). Consumers (XmlIniParser, XmlCli, helpers, utils)
+accept either the model or the XML file; the model of XML file is served from
+in-memory LRU cache keyed by (path, size, mtime, content hash), so the XML is
+parsed again only when its content changes.
+
+Models are shared between consumers, they are to be treated as read only.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+import sys
+import array
+import hashlib
+import threading
+from collections import namedtuple
+from collections import OrderedDict
+from collections.abc import Mapping
+from collections.abc import Sequence
+
+# Custom imports
+from . import logger
+from . import configurations
+
+log = logger.settings.logger
+
+try:
+  from defusedxml import ElementTree as ET
+except ModuleNotFoundError as e:
+  log.warn("Insecure module import used! Please install all the required dependencies by running `pip install -r requirements.txt`")
+  from xml.etree import ElementTree as ET
+
+__all__ = ["KnobTable", "KnobRow", "KnobRows", "KnobIndex", "KnobSection", "KnobModel", "get_knob_model", "clear_knob_model_cache", "knob_model_cache_info"]
+
+KNOB_SECTION_TAG = "biosknobs"
+BIOS_TAGS = ("BIOS", "SVBIOS", "CPUSVBIOS")
+INVALID_VARSTORE = 0xFFFF
+MAX_VALUE = 0xFFFFFFFFFFFFFFFF  # values wider than 64 bits are kept as text
+NO_OPTIONS = ()
+
+
+def to_int(value):
+  """Integer of hex (`0x` prefixed) or decimal attribute value, None if value is not an integer"""
+  try:
+    value = value.strip()
+    return int(value, 16) if value[:2] in ("0x", "0X") else int(value, 10)
+  except (AttributeError, ValueError):
+    return None
+
+
+class KnobTable(object):
+  """Columnar table of knobs
+
+  Numeric attributes are held in parallel arrays (varstore, offset, size, default and current value),
+  repeating strings (name, setup type, prompt, depex, option text) are interned.
+  Default and current values which are not integer (i.e. string knobs) or exceed 64 bits
+  are compared from raw attributes, their rows are recorded in `text_rows`.
+  Raw attributes of knob are referred from parsed tree, not copied.
+  """
+  __slots__ = ("names", "setup_types", "prompts", "depex", "options", "attribs",
+               "varstores", "offsets", "sizes", "defaults", "currents", "text_rows")
+
+  def __init__(self):
+    self.names = []
+    self.setup_types = []
+    self.prompts = []
+    self.depex = []
+    self.options = []
+    self.attribs = []
+    self.varstores = array.array("H")
+    self.offsets = array.array("L")
+    self.sizes = array.array("L")
+    self.defaults = array.array("Q")
+    self.currents = array.array("Q")
+    self.text_rows = set()
+
+  def __len__(self):
+    return len(self.names)
+
+  def extend(self, elements):
+    """Append child elements of section as rows
+
+    :return: tuple of (start row, end row) of appended rows
+    """
+    start = len(self.names)
+    intern = sys.intern
+    names, setup_types, prompts, depex, options, attribs = self.names, self.setup_types, self.prompts, self.depex, self.options, self.attribs
+    varstores, offsets, sizes, defaults, currents = self.varstores, self.offsets, self.sizes, self.defaults, self.currents
+    for row, element in enumerate(elements, start):
+      attrib = element.attrib
+      get = attrib.get
+      for column, key in ((names, "name"), (setup_types, "setupType"), (prompts, "prompt"), (depex, "depex")):
+        value = get(key)
+        column.append(value if value is None else intern(value))
+      if len(element):
+        options.append(tuple((intern(option.get("text", "")), intern(option.get("value", ""))) for child in element for option in child))
+      else:
+        options.append(NO_OPTIONS)
+      attribs.append(attrib)
+      varstore, offset, size = to_int(get("varstoreIndex")), to_int(get("offset")), to_int(get("size"))
+      varstores.append(varstore if varstore is not None and 0 <= varstore < INVALID_VARSTORE else INVALID_VARSTORE)
+      offsets.append(offset if offset is not None and 0 <= offset <= 0xFFFFFFFF else 0)
+      sizes.append(size if size is not None and 0 <= size <= 0xFFFFFFFF else 0)
+      default, current = to_int(get("default")), to_int(get("CurrentVal"))
+      if default is None or current is None or not (0 <= default <= MAX_VALUE and 0 <= current <= MAX_VALUE):
+        self.text_rows.add(row)
+        default = current = 0
+      defaults.append(default)
+      currents.append(current)
+    return start, len(names)
+
+  def modified_rows(self, rows=None):
+    """Rows of which current value differs from default value
+
+    :param rows: iterable of rows to look at, defaults to all rows
+    :return: list of rows
+    """
+    defaults, currents, text_rows, attribs = self.defaults, self.currents, self.text_rows, self.attribs
+    rows = range(len(self.names)) if rows is None else rows
+    result = []
+    for row in rows:
+      if row in text_rows:
+        if (attribs[row].get("default") or "").strip() != (attribs[row].get("CurrentVal") or "").strip():
+          result.append(row)
+      elif defaults[row] != currents[row]:
+        result.append(row)
+    return result
+
+
+class KnobRow(object):
+  """Lightweight view of single row of `KnobTable`
+
+  Offers fields of knob entry as raw attribute values (None if attribute is absent) same as
+  `Element.get`, along with integer values from the columns of table.
+  """
+  __slots__ = ("table", "row")
+
+  def __init__(self, table, row):
+    self.table = table
+    self.row = row
+
+  name = property(lambda self: self.table.names[self.row])
+  setup_type = property(lambda self: self.table.setup_types[self.row])
+  prompt = property(lambda self: self.table.prompts[self.row])
+  depex = property(lambda self: self.table.depex[self.row])
+  options = property(lambda self: self.table.options[self.row], doc="tuple of (text, value) of options")
+  attrib = property(lambda self: self.table.attribs[self.row])
+  varstore = property(lambda self: self.attrib.get("varstoreIndex"))
+  offset = property(lambda self: self.attrib.get("offset"))
+  size = property(lambda self: self.attrib.get("size"))
+  default = property(lambda self: self.attrib.get("default"))
+  current = property(lambda self: self.attrib.get("CurrentVal"))
+  varstore_id = property(lambda self: self.table.varstores[self.row])
+  offset_value = property(lambda self: self.table.offsets[self.row])
+  size_value = property(lambda self: self.table.sizes[self.row])
+
+  @property
+  def default_value(self):
+    """Integer default value, raw attribute if value is not integer"""
+    return self.default if self.row in self.table.text_rows else self.table.defaults[self.row]
+
+  @property
+  def current_value(self):
+    return self.current if self.row in self.table.text_rows else self.table.currents[self.row]
+
+  @property
+  def is_modified(self):
+    return bool(self.table.modified_rows((self.row,)))
+
+  def get(self, key, default=None):
+    """Attribute of knob, same as `Element.get`"""
+    return self.attrib.get(key, default)
+
+  def to_dict(self):
+    """Knob in form of dictionary, same as `utils.etree_to_dict` of knob element"""
+    result = {}
+    options = self.options
+    if options:
+      option_list = [{"@text": text, "@value": value} for text, value in options]
+      result["options"] = {"option": option_list[0] if len(option_list) == 1 else option_list}
+    result.update(("@" + key, value) for key, value in self.attrib.items())
+    return result
+
+  def __eq__(self, other):
+    return isinstance(other, KnobRow) and self.table is other.table and self.row == other.row
+
+  def __hash__(self):
+    return hash((id(self.table), self.row))
+
+  def __repr__(self):
+    return f"<KnobRow {self.row}: {self.name}>"
+
+
+class KnobRows(Sequence):
+  """Rows of table from `start` to `stop` (i.e. knobs of one section)"""
+  __slots__ = ("table", "start", "stop")
+
+  def __init__(self, table, start, stop):
+    self.table = table
+    self.start = start
+    self.stop = stop
+
+  def __len__(self):
+    return self.stop - self.start
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("knob row index out of range")
+    return KnobRow(self.table, self.start + index)
+
+  def __iter__(self):
+    table = self.table
+    return (KnobRow(table, row) for row in range(self.start, self.stop))
+
+  @property
+  def rows(self):
+    return range(self.start, self.stop)
+
+
+class KnobIndex(Mapping):
+  """Name -> `KnobRow` index of knobs (last entry wins for duplicate knobs)"""
+  __slots__ = ("table", "rows")
+
+  def __init__(self, table):
+    self.table = table
+    self.rows = {}  # name -> row
+
+  def __getitem__(self, name):
+    return KnobRow(self.table, self.rows[name])
+
+  def __contains__(self, name):
+    return name in self.rows
+
+  def __iter__(self):
+    return iter(self.rows)
+
+  def __len__(self):
+    return len(self.rows)
+
+
+class KnobSection(namedtuple("KnobSection", ["tag", "attrib", "knobs"])):
+  """Top level element of XML (i.e. `<BIOS>`, `<biosknobs>`) along with its child entries as `KnobRows`"""
+  __slots__ = ()
+
+  def get(self, key, default=None):
+    return self.attrib.get(key, default)
+
+
+class KnobModel(object):
+  """Parsed platform XML
+
+  :param root: root element of parsed XML
+  :param key: cache key of XML (path, size, mtime, sha256) if model is created from file
+  """
+
+  def __init__(self, root, key=None):
+    self.root = root
+    self.key = key
+    self.path = key[0] if key else None
+    self.table = KnobTable()  # child entries of all top level elements
+    self.sections = tuple(self.get_section(element, self.table) for element in root)  # top level elements
+    self.top_level_sections = {id(element): section for element, section in zip(root, self.sections)}
+    self.section_elements = {}  # tag -> elements of tag at any depth, looked up on first use
+    self.knobs = KnobIndex(self.table)
+    for section in self.sections:
+      if section.tag == KNOB_SECTION_TAG:
+        for row in section.knobs.rows:
+          self.knobs.rows[(self.table.names[row] or "").strip()] = row
+
+  @staticmethod
+  def get_section(element, table=None):
+    table = KnobTable() if table is None else table
+    return KnobSection(element.tag, element.attrib, KnobRows(table, *table.extend(element)))
+
+  def iter_sections(self, tag):
+    """Sections of given tag at any depth (root included) in order of XML, same as `Element.iter`
+
+    Top level sections share the table of model, others are built on demand.
+    """
+    elements = self.section_elements.get(tag)
+    if elements is None:
+      elements = self.section_elements[tag] = tuple(self.root.iter(tag))
+    top_level_sections = self.top_level_sections
+    for element in elements:
+      section = top_level_sections.get(id(element))
+      yield section if section is not None else self.get_section(element)
+
+  def iter_knobs(self, tag=KNOB_SECTION_TAG):
+    """Knobs of all sections of given tag in order of XML"""
+    for section in self.iter_sections(tag):
+      yield from section.knobs
+
+  def get_knob(self, name):
+    return self.knobs.get(name)
+
+  def modified_knobs(self):
+    """Knobs of which current value differs from default value, in order of XML
+
+    :return: list of `KnobRow`
+    """
+    table = self.table
+    return [KnobRow(table, row) for row in table.modified_rows(sorted(self.knobs.rows.values()))]
+
+  def get_attribute(self, tags, attribute, default=""):
+    """Value of attribute from the first section among the given tags (in order of preference)
+
+    >>> model.get_attribute(BIOS_TAGS, "VERSION")
+    """
+    for tag in tags:
+      for section in self.iter_sections(tag):
+        return section.get(attribute, default)
+    return default
+
+  @property
+  def bios_version(self):
+    return (self.get_attribute(BIOS_TAGS, "VERSION") or "").strip()
+
+  def __len__(self):
+    return len(self.knobs)
+
+  def __contains__(self, name):
+    return name in self.knobs
+
+  def __repr__(self):
+    return f"<KnobModel {self.path or 'in-memory'}: {len(self.knobs)} knobs>"
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_cache_key(xml_file):
+  """Key of XML file in cache: (absolute path, size, mtime in ns, sha256 of content)
+
+  :return: tuple of (key, content of XML)
+  """
+  path = os.path.abspath(xml_file)
+  with open(path, "rb") as xml_ptr:
+    stat = os.fstat(xml_ptr.fileno())
+    data = xml_ptr.read()
+  return (path, stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest()), data
+
+
+def get_knob_model(xml_file, cache_size=None):
+  """Knob model of given XML file, served from cache unless XML file is changed
+
+  :param xml_file: XML file location or `KnobModel` (returned as is)
+  :param cache_size: number of models kept in cache, defaults to `KNOB_MODEL_CACHE_SIZE` of configuration
+  :return: `KnobModel`
+  """
+  if isinstance(xml_file, KnobModel):
+    return xml_file
+  cache_size = configurations.KNOB_MODEL_CACHE_SIZE if cache_size is None else cache_size
+  key, data = get_cache_key(xml_file)
+  with _cache_lock:
+    model = _cache.get(key)
+    if model is not None:
+      _cache.move_to_end(key)
+      _cache_stats["hits"] += 1
+      return model
+    _cache_stats["misses"] += 1
+  log.debug(f"Parsing XML {key[0]} in to knob model")
+  model = KnobModel(ET.fromstring(data), key)
+  with _cache_lock:
+    for cached_key in [cached_key for cached_key in _cache if cached_key[0] == key[0]]:
+      del _cache[cached_key]  # stale model of same file
+    if cache_size > 0:
+      _cache[key] = model
+      while len(_cache) > cache_size:
+        _cache.popitem(last=False)
+  return model
+
+
+def clear_knob_model_cache():
+  with _cache_lock:
+    _cache.clear()
+    _cache_stats.update(hits=0, misses=0)
+
+
+def knob_model_cache_info():
+  """Statistics of cache
+
+  :return: dictionary of hits, misses, number of cached models and cached files
+  """
+  with _cache_lock:
+    return dict(_cache_stats, size=len(_cache), files=[key[0] for key in _cache])
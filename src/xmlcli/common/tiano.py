@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Pure Python implementation of EFI and Tiano decompression algorithm,
+as implemented by `UefiDecompressLib` of EDK II.
+
+Compressed data starts with header of compressed size (4 bytes) and original
+size (4 bytes) followed by blocks of Huffman coded LZ77 stream.
+Both the algorithms differ only in number of bits used to encode the position set:
+4 bits for EFI (version 1) and 5 bits for Tiano (version 2).
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import struct
+
+__all__ = ["TianoDecompressor", "TianoDecompressError", "decompress", "get_info", "EFI_VERSION", "TIANO_VERSION"]
+
+EFI_VERSION = 1
+TIANO_VERSION = 2
+
+BITBUFSIZ = 32
+MAXMATCH = 256
+THRESHOLD = 3
+CODE_BIT = 16
+BAD_TABLE = -1
+NC = 0xFF + MAXMATCH + 2 - THRESHOLD  # size of char & length set
+CBIT = 9
+MAXPBIT = 5
+TBIT = 5
+MAXNP = (1 << MAXPBIT) - 1
+NT = CODE_BIT + 3
+NPT = max(NT, MAXNP)
+BITBUF_MASK = (1 << BITBUFSIZ) - 1
+HEADER = struct.Struct("<II")  # compressed size, original size
+
+
+class TianoDecompressError(Exception):
+  pass
+
+
+def get_info(data):
+  """Size of compressed stream and size of decompressed data from header of compressed data
+
+  :param data: compressed data
+  :return: tuple of (compressed size, original size)
+  """
+  if len(data) < HEADER.size:
+    raise TianoDecompressError("Compressed data is smaller than its header")
+  return HEADER.unpack_from(data, 0)
+
+
+class TianoDecompressor(object):
+  """Decompressor holding state of single decompression
+
+  :param data: compressed data (bytes like)
+  :param version: `EFI_VERSION` or `TIANO_VERSION`
+  """
+
+  def __init__(self, data, version=TIANO_VERSION):
+    if version not in (EFI_VERSION, TIANO_VERSION):
+      raise TianoDecompressError(f"Invalid version of decompression algorithm: {version}")
+    self.comp_size, self.orig_size = get_info(data)
+    if len(data) < self.comp_size + HEADER.size:
+      raise TianoDecompressError(f"Compressed data is truncated, expected 0x{self.comp_size + HEADER.size:X} bytes")
+    source = bytes(data[HEADER.size:HEADER.size + self.comp_size]) + bytes(16)  # stream is read as zero beyond its end
+    # 64 bits window starting at each byte, any 32 bits of the stream are then read with single shift
+    window_count = self.comp_size + 8
+    self.windows = [0] * window_count
+    for offset in range(8):
+      self.windows[offset::8] = struct.unpack_from(f">{(window_count - offset + 7) // 8}Q", source, offset)
+    self.position = 0  # bit position in compressed stream
+    self.p_bit = 4 if version == EFI_VERSION else 5
+    self.block_size = 0
+    self.left = [0] * (2 * NC - 1)
+    self.right = [0] * (2 * NC - 1)
+    self.c_len = [0] * NC
+    self.pt_len = [0] * NPT
+    self.c_table = [0] * 4096
+    self.pt_table = [0] * 256
+
+  # Bit stream ##########################################################################################################
+  @property
+  def bit_buf(self):
+    """Next 32 bits of the stream"""
+    position = self.position
+    return (self.windows[position >> 3] >> (32 - (position & 7))) & BITBUF_MASK
+
+  def fill_buf(self, number_of_bits):
+    self.position += number_of_bits
+
+  def get_bits(self, number_of_bits):
+    out_bits = self.bit_buf >> (BITBUFSIZ - number_of_bits)
+    self.position += number_of_bits
+    return out_bits
+
+  # Huffman tables ######################################################################################################
+  def make_table(self, number_of_char, bit_len, table_bits, table):
+    """Create Huffman code mapping table of `table_bits` along with tree (left/right) for longer codes
+
+    :return: 0 on success or `BAD_TABLE`
+    """
+    count = [0] * 17
+    for index in range(number_of_char):
+      if bit_len[index] > 16:
+        return BAD_TABLE
+      count[bit_len[index]] += 1
+    start = [0] * 18
+    for index in range(1, 17):
+      start[index + 1] = (start[index] + (count[index] << (16 - index))) & 0xFFFF
+    if start[17] != 0:
+      return BAD_TABLE
+    ju_bits = 16 - table_bits
+    weight = [0] * 17
+    for index in range(1, table_bits + 1):
+      start[index] >>= ju_bits
+      weight[index] = 1 << (table_bits - index)
+    for index in range(table_bits + 1, 17):
+      weight[index] = 1 << (16 - index)
+    index = start[table_bits + 1] >> ju_bits
+    if index != 0:
+      for position in range(index, 1 << table_bits):
+        table[position] = 0
+    avail = number_of_char
+    mask = 1 << (15 - table_bits)
+    max_table_length = 1 << table_bits
+    left, right = self.left, self.right
+    for char in range(number_of_char):
+      length = bit_len[char]
+      if length == 0 or length >= 17:
+        continue
+      next_code = (start[length] + weight[length]) & 0xFFFF
+      if length <= table_bits:
+        if start[length] >= next_code or next_code > max_table_length:
+          return BAD_TABLE
+        for position in range(start[length], next_code):
+          table[position] = char
+      else:
+        code = start[length]
+        node_list, node_index = table, code >> ju_bits
+        for _ in range(length - table_bits):
+          if node_list[node_index] == 0 and avail < (2 * NC - 1):
+            right[avail] = left[avail] = 0
+            node_list[node_index] = avail
+            avail += 1
+          if node_list[node_index] < (2 * NC - 1):
+            node_index = node_list[node_index]
+            node_list = right if code & mask else left
+          code = (code << 1) & 0xFFFF
+        node_list[node_index] = char
+      start[length] = next_code
+    return 0
+
+  def read_pt_len(self, nn, n_bit, special):
+    """Read code length array of extra set or position set and create its table"""
+    number = self.get_bits(n_bit)
+    pt_len = self.pt_len
+    if number == 0:
+      char = self.get_bits(n_bit)
+      self.pt_table[:] = [char] * 256
+      for index in range(nn):
+        pt_len[index] = 0
+      return 0
+    index = 0
+    while index < number and index < NPT:
+      char = self.bit_buf >> (BITBUFSIZ - 3)
+      if char == 7:
+        mask = 1 << (BITBUFSIZ - 1 - 3)
+        while mask & self.bit_buf:
+          mask >>= 1
+          char += 1
+      self.fill_buf(3 if char < 7 else char - 3)
+      pt_len[index] = char
+      index += 1
+      if index == special:
+        for _ in range(self.get_bits(2)):
+          if index < NPT:
+            pt_len[index] = 0
+          index += 1
+    while index < nn and index < NPT:
+      pt_len[index] = 0
+      index += 1
+    return self.make_table(nn, pt_len, 8, self.pt_table)
+
+  def read_c_len(self):
+    """Read code length array of char & length set and create its table"""
+    number = self.get_bits(CBIT)
+    c_len = self.c_len
+    if number == 0:
+      char = self.get_bits(CBIT)
+      c_len[:] = [0] * NC
+      self.c_table[:] = [char] * 4096
+      return 0
+    index = 0
+    left, right, pt_table, pt_len = self.left, self.right, self.pt_table, self.pt_len
+    while index < number and index < NC:
+      char = pt_table[self.bit_buf >> (BITBUFSIZ - 8)]
+      if char >= NT:
+        mask = 1 << (BITBUFSIZ - 1 - 8)
+        while char >= NT:
+          char = right[char] if self.bit_buf & mask else left[char]
+          mask >>= 1
+      self.fill_buf(pt_len[char])
+      if char <= 2:
+        if char == 0:
+          char = 1
+        elif char == 1:
+          char = self.get_bits(4) + 3
+        else:
+          char = self.get_bits(CBIT) + 20
+        for _ in range(char):
+          if index < NC:
+            c_len[index] = 0
+          index += 1
+      else:
+        c_len[index] = char - 2
+        index += 1
+    while index < NC:
+      c_len[index] = 0
+      index += 1
+    return self.make_table(NC, c_len, 12, self.c_table)
+
+  def read_block_header(self):
+    self.block_size = self.get_bits(16) or 0x10000  # 16 bit counter wraps on decrement
+    if self.read_pt_len(NT, TBIT, 3) == BAD_TABLE:
+      raise TianoDecompressError("Invalid extra set code length table")
+    if self.read_c_len() == BAD_TABLE:
+      raise TianoDecompressError("Invalid char & length set code length table")
+    if self.read_pt_len(MAXNP, self.p_bit, -1) == BAD_TABLE:
+      raise TianoDecompressError("Invalid position set code length table")
+
+  # Decoding ############################################################################################################
+  def decompress(self):
+    """
+    :return: decompressed data as bytearray
+    """
+    orig_size = self.orig_size
+    output = bytearray(orig_size)
+    out_buf = 0
+    windows, left, right = self.windows, self.left, self.right
+    while out_buf < orig_size:
+      # symbols of block are decoded on local variables, block header is read by methods sharing `position`
+      if self.block_size == 0:
+        self.read_block_header()
+      c_table, c_len, pt_table, pt_len = self.c_table, self.c_len, self.pt_table, self.pt_len
+      position = self.position
+      block_size = self.block_size
+      while block_size and out_buf < orig_size:
+        block_size -= 1
+        bit_buf = (windows[position >> 3] >> (32 - (position & 7))) & BITBUF_MASK
+        char = c_table[bit_buf >> 20]
+        if char >= NC:
+          mask = 1 << 19
+          while char >= NC:
+            char = right[char] if bit_buf & mask else left[char]
+            mask >>= 1
+        position += c_len[char]
+        if char < 256:
+          output[out_buf] = char
+          out_buf += 1
+          continue
+        length = char - (256 - THRESHOLD)
+        bit_buf = (windows[position >> 3] >> (32 - (position & 7))) & BITBUF_MASK
+        value = pt_table[bit_buf >> 24]
+        if value >= MAXNP:
+          mask = 1 << 23
+          while value >= MAXNP:
+            value = right[value] if bit_buf & mask else left[value]
+            mask >>= 1
+        position += pt_len[value]
+        if value > 1:
+          extra_bits = value - 1
+          bit_buf = (windows[position >> 3] >> (32 - (position & 7))) & BITBUF_MASK
+          value = (1 << extra_bits) + (bit_buf >> (BITBUFSIZ - extra_bits))
+          position += extra_bits
+        data_index = out_buf - value - 1
+        if data_index < 0:
+          raise TianoDecompressError(f"Invalid match position at offset 0x{out_buf:X}")
+        if length > orig_size - out_buf:
+          length = orig_size - out_buf
+        if data_index + length <= out_buf:
+          output[out_buf:out_buf + length] = output[data_index:data_index + length]
+        else:  # overlapping match repeats the pattern
+          for index in range(length):
+            output[out_buf + index] = output[data_index + index]
+        out_buf += length
+      self.position = position
+      self.block_size = block_size
+    return output
+
+
+def decompress(data, version=TIANO_VERSION):
+  """Decompress EFI or Tiano compressed data
+
+  :param data: compressed data (bytes like) starting with header of compressed and original size
+  :param version: `EFI_VERSION` or `TIANO_VERSION`
+  :return: decompressed data as bytearray
+  """
+  return TianoDecompressor(data, version).decompress()
@@ -348,7 +348,7 @@ def get_set_var(operation="get", xml_file=None, knob_string="", nvar_name="", nv
   # start cli interface
   clb.InitInterface()
   dram_mb_address = clb.GetDramMbAddr()  # Get DRAM mailbox address
-  dram_shared_mb_buffer = clb.memBlock(dram_mb_address, 0x200)  # Read/save parameter buffer
+  dram_shared_mb_buffer = clb.readDramSharedMb(dram_mb_address, 0x200)  # Read/save parameter buffer
   cli_request_buffer_address = clb.readclireqbufAddr(dram_shared_mb_buffer)
   cli_response_buffer_address = clb.readcliresbufAddr(dram_shared_mb_buffer)
   log.info(f"CLI Request Buffer Addr = 0x{cli_request_buffer_address:x}   CLI Response Buffer Addr = 0x{cli_response_buffer_address:x}")
@@ -383,7 +383,7 @@ def get_set_var(operation="get", xml_file=None, knob_string="", nvar_name="", nv
     clb.CloseInterface()
     return 1
 
-  if clb.WaitForCliResponse(cli_response_buffer_address, 2, 3):
+  if clb.WaitForCliResponse(cli_response_buffer_address, 2, 3, CmdId=clb.GET_SET_VARIABLE_OPCODE):
     log.error("CLI Response not ready, Aborting....: \nPossible cause: None of the nvar provided does not exists!!!")
     clb.CloseInterface()
     return 1
@@ -21,14 +21,9 @@ from collections import OrderedDict
 
 # Custom imports
 from .logger import log
+from .knob_model import KnobModel, get_knob_model
 from .configurations import XMLCLI_CONFIG, ENCODING, XMLCLI_DIR, OUT_DIR, PY3, STATUS_CODE_RECORD_FILE
 
-try:
-  from defusedxml import ElementTree as ET
-except ModuleNotFoundError as e:
-  log.warn("Insecure module import used! Please install all the required dependencies by running `pip install -r requirements.txt`")
-  from xml.etree import ElementTree as ET
-
 __author__ = "Gahan Saraiya"
 
 ###############################################################################
@@ -845,16 +840,14 @@ class Guid(StructureHelper):  # 16 bytes
 def load_nvar_xml(xml_file):
   """Loads Nvar XML into the python dictionary
 
-  :param xml_file: XML file location to load
+  :param xml_file: XML file location (or its knob model) to load
   :return: dictionary of nvars loaded from xml file
   """
   db = OrderedDict()
-  if not os.path.exists(xml_file):
+  if not isinstance(xml_file, KnobModel) and not os.path.exists(xml_file):
     # return empty db
     return db
-  tree = ET.parse(xml_file)
-  root = tree.getroot()
-  for nvar in root:
+  for nvar in get_knob_model(xml_file).sections:
     occupied_size = 0
     key = f"{nvar.attrib['name']}_{nvar.attrib['guid']}"
     db[key] = {
@@ -868,7 +861,7 @@ def load_nvar_xml(xml_file):
       "operation"  : nvar.attrib.get("operation", "get"),
       "knobs"      : {}
     }
-    for knob in nvar:
+    for knob in nvar.knobs:
       knob_details = {
         "name"         : knob.attrib["name"],
         "knob_type"    : knob.attrib["setupType"],
@@ -887,8 +880,7 @@ def load_nvar_xml(xml_file):
         knob_unique_key = knob.attrib["name"]
         db[key]["knobs"][knob_unique_key] = knob_details
         if knob.attrib["setupType"] == "oneof":
-          for options in knob:  # one only
-            db[key]["knobs"][knob_unique_key]["options"] = [option.attrib for option in options]
+          db[key]["knobs"][knob_unique_key]["options"] = [{"text": text, "value": value} for text, value in knob.options]
         elif knob.attrib["setupType"] == "string":
           db[key]["knobs"][knob_unique_key]["min_characters"] = knob.attrib["minsize"]
           db[key]["knobs"][knob_unique_key]["max_characters"] = knob.attrib["maxsize"]
@@ -1014,34 +1006,27 @@ def dict_to_etree(d):
 def get_bios_knobs(file_path):
   """Parse the knobs from given xml file
 
-  :param file_path: xml file location
+  :param file_path: xml file location or its knob model
   :return: dict of knobs
   """
-  if not os.path.exists(file_path):
+  if not isinstance(file_path, KnobModel) and not os.path.exists(file_path):
     err_msg = "File not exist"
     return False
-  tree = ET.parse(file_path)
-  root = tree.getroot()
-  # get list of bios knobs from xml
-  xml_dict = etree_to_dict(root)
-  # filter out for only biosknobs from whole xml dictionary
-  biosknobs = xml_dict.get("SYSTEM", {}).get("biosknobs", {}).get("knob", [])
+  # get list of bios knobs from xml, in the form of `etree_to_dict`
+  biosknobs = [knob.to_dict() for knob in get_knob_model(file_path).iter_knobs()]
   return biosknobs
 
 
 def get_bios_version(file_path):
   """Get bios version from given xml file
 
-  :param file_path: xml file location
+  :param file_path: xml file location or its knob model
   :return: Bios version string
   """
-  if not os.path.exists(file_path):
+  if not isinstance(file_path, KnobModel) and not os.path.exists(file_path):
     err_msg = "File not exist"
     return False
-  tree = ET.parse(file_path)
-  root = tree.getroot()
-  bios_tag = root.find("BIOS") if root.find("BIOS") is not None else root.find("SVBIOS")
-  bios_version = bios_tag.attrib.get("VERSION", "")
+  bios_version = get_knob_model(file_path).get_attribute(("BIOS", "SVBIOS"), "VERSION")
   return bios_version
 
 def save_binary(input_bin_file, out_bin_file, offset, size):
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of platform XML downloaded from target.
+
+Compressed XML packet (`$LZMA`/`$TNOC`) is the baseline on which `$XKDT` delta
+packet is applied for current values of knobs. Entries are content addressed by
+the fingerprint of baseline, computed from data read cheaply from target:
+XML header (which carries BIOS version and timestamp), XML size,
+header and trailing bytes of the compressed packet.
+
+Regular (uncompressed) XML is cached by fingerprint of XML header and size,
+it is refreshed by block delta download (`SaveXmlBlockDelta`).
+
+Each entry consists of `<fingerprint>.xml` (decompressed XML, without delta applied)
+and `<fingerprint>.json` (metadata including sha256 of XML), entry is served only if
+sha256 of complete XML matches the metadata. Once cache holds more than `max_entries`
+entries, least recently used entries are evicted.
+"""
+__author__ = "Gahan Saraiya"
+
+# Built-in imports
+import os
+import re
+import random
+import json
+import hashlib
+import threading
+
+# Custom imports
+from . import logger
+from . import configurations
+
+log = logger.settings.logger
+
+__all__ = ["XmlCache", "get_xml_cache", "get_blocks", "get_block_ranges", "get_samples",
+           "XML_HEADER_SIZE", "PACKET_TAIL_SIZE", "BLOCK_SIZE", "SAMPLE_COUNT", "SAMPLE_SIZE"]
+
+XML_HEADER_SIZE = 0x200  # bytes of XML read for fingerprint, BIOS details are within first 512 bytes
+PACKET_TAIL_SIZE = 0x40  # trailing bytes of compressed packet read for fingerprint
+BLOCK_SIZE = 0x1000  # granularity of block delta download of XML
+SAMPLE_COUNT = 16  # number of chunks sampled outside predicted blocks to validate block delta download
+SAMPLE_SIZE = 0x40
+RE_BIOS_VERSION = re.compile(rb'<(?:CPUSV|SV)?BIOS\s[^>]*?VERSION="([^"]*)"')
+
+
+class XmlCache(object):
+  """
+  :param cache_dir: directory to store cached XMLs
+  :param max_entries: maximum number of entries kept in cache, 0 for no limit
+  """
+
+  def __init__(self, cache_dir, max_entries=0):
+    self.cache_dir = cache_dir
+    self.max_entries = max_entries
+
+  @staticmethod
+  def fingerprint(xml_header, xml_size, packet_header, packet_tail):
+    """Fingerprint of compressed XML baseline
+
+    :param xml_header: first `XML_HEADER_SIZE` bytes of XML
+    :param xml_size: size of XML
+    :param packet_header: 8 bytes header (signature and size) of compressed XML packet
+    :param packet_tail: last `PACKET_TAIL_SIZE` bytes of compressed XML packet
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(bytes(xml_header))
+    digest.update(int(xml_size).to_bytes(4, byteorder="little"))
+    digest.update(bytes(packet_header))
+    digest.update(bytes(packet_tail))
+    return digest.hexdigest()
+
+  @staticmethod
+  def get_bios_version(xml_header):
+    match = RE_BIOS_VERSION.search(bytes(xml_header))
+    return match.group(1).decode("latin-1") if match else ""
+
+  def _path(self, key, extension):
+    return os.path.join(self.cache_dir, f"{key}{extension}")
+
+  def get(self, key):
+    """Cached XML of given fingerprint
+
+    :param key: fingerprint
+    :return: content of XML as bytearray, None if not cached or cached XML is corrupted
+    """
+    return self.get_entry(key)[0]
+
+  def get_entry(self, key):
+    """Cached XML of given fingerprint along with its metadata
+
+    :param key: fingerprint
+    :return: tuple of (content of XML as bytearray, metadata dictionary), (None, {}) if not cached or cached XML is corrupted
+    """
+    try:
+      with open(self._path(key, ".json"), "r") as metadata_file:
+        metadata = json.load(metadata_file)
+      with open(self._path(key, ".xml"), "rb") as xml_file:
+        data = bytearray(os.fstat(xml_file.fileno()).st_size)  # read in to buffer which is patched in place by caller
+        xml_file.readinto(data)
+    except (OSError, ValueError):
+      return None, {}
+    if hashlib.sha256(data).hexdigest() != metadata.get("sha256"):
+      log.debug(f"Cached XML {key} is corrupted, discarding it")
+      self.remove(key)
+      return None, {}
+    try:
+      os.utime(self._path(key, ".json"))  # modification time of metadata records last use of entry
+    except OSError:
+      pass
+    return data, metadata
+
+  def put(self, key, data, xml_header=b"", **kwargs):
+    """Store XML for given fingerprint
+
+    :param key: fingerprint
+    :param data: content of XML, without delta applied
+    :param xml_header: header of XML, to record BIOS version in metadata
+    :param kwargs: additional metadata to be recorded
+    """
+    metadata = {"bios_version": self.get_bios_version(xml_header), "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    metadata.update(kwargs)
+    try:
+      os.makedirs(self.cache_dir, exist_ok=True)
+      for extension, mode, content in ((".xml", "wb", data), (".json", "w", json.dumps(metadata, indent=2))):
+        temp_file = self._path(key, f"{extension}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_file, mode) as out_file:
+          out_file.write(content)
+        os.replace(temp_file, self._path(key, extension))  # entry is never seen partially written
+    except OSError as e:
+      log.debug(f"Unable to cache XML {key}: {e}")
+    self.evict(keep=key)
+
+  def evict(self, keep=None):
+    """Remove least recently used entries exceeding `max_entries`
+
+    :param keep: fingerprint of entry which is never evicted (i.e. the one just stored)
+    """
+    if self.max_entries <= 0:
+      return
+    entries = []
+    try:
+      for file_name in os.listdir(self.cache_dir):
+        if file_name.endswith(".json") and file_name != f"{keep}.json":
+          entries.append((os.stat(os.path.join(self.cache_dir, file_name)).st_mtime_ns, file_name[:-len(".json")]))
+    except OSError:
+      return
+    for _, key in sorted(entries)[:max(0, len(entries) + (keep is not None) - self.max_entries)]:
+      log.debug(f"Evicting cached XML {key}")
+      try:
+        self.remove(key)
+      except OSError:
+        pass
+
+  def remove(self, key):
+    for extension in (".json", ".xml"):
+      if os.path.exists(self._path(key, extension)):
+        os.remove(self._path(key, extension))
+
+  def clear(self):
+    if os.path.isdir(self.cache_dir):
+      for file_name in os.listdir(self.cache_dir):
+        if file_name.endswith((".xml", ".json")):
+          os.remove(os.path.join(self.cache_dir, file_name))
+
+
+def get_blocks(size, ranges, block_size=BLOCK_SIZE):
+  """Indexes of blocks touched by given ranges
+
+  :param size: size of XML
+  :param ranges: iterable of tuple (offset, length)
+  :param block_size: size of block
+  :return: set of block indexes
+  """
+  blocks = set()
+  for offset, length in ranges:
+    if 0 <= offset < size:
+      blocks.update(range(offset // block_size, (min(offset + max(length, 1), size) - 1) // block_size + 1))
+  return blocks
+
+
+def get_block_ranges(size, blocks, block_size=BLOCK_SIZE):
+  """Merge consecutive blocks in to ranges, so that each range is read by single bulk read
+
+  :param size: size of XML
+  :param blocks: iterable of block indexes
+  :param block_size: size of block
+  :return: list of tuple (start offset, end offset)
+  """
+  ranges = []
+  for block in sorted(blocks):
+    start, end = block * block_size, min((block + 1) * block_size, size)
+    if ranges and ranges[-1][1] == start:
+      ranges[-1] = (ranges[-1][0], end)
+    elif start < end:
+      ranges.append((start, end))
+  return ranges
+
+
+def get_samples(size, blocks, sample_count=SAMPLE_COUNT, sample_size=SAMPLE_SIZE, block_size=BLOCK_SIZE):
+  """Randomly chosen chunks outside given blocks
+
+  :param size: size of XML
+  :param blocks: block indexes to be excluded
+  :return: list of tuple (offset, length)
+  """
+  candidates = [block for block in range((size + block_size - 1) // block_size) if block not in blocks]
+  samples = []
+  for block in random.sample(candidates, min(sample_count, len(candidates))):
+    end = min((block + 1) * block_size, size)
+    length = min(sample_size, end - block * block_size)
+    samples.append((random.randint(block * block_size, end - length), length))
+  return sorted(samples)
+
+
+_xml_cache = None
+
+
+def get_xml_cache():
+  """Cache at `XML_CACHE_DIR` of configuration, None if `XML_CACHE` is disabled"""
+  global _xml_cache
+  if not configurations.XML_CACHE:
+    return None
+  if (_xml_cache is None) or (_xml_cache.cache_dir != configurations.XML_CACHE_DIR):
+    _xml_cache = XmlCache(configurations.XML_CACHE_DIR)
+  _xml_cache.max_entries = configurations.XML_CACHE_MAX_ENTRIES
+  return _xml_cache
@@ -11,16 +11,12 @@ import os
 from .. import XmlCli as cli
 from .. import XmlCliLib as clb
 from ..common import utils
+from ..common import buffer_reader
 from ..common.logger import log
+from ..common.knob_model import get_knob_model
 from ..XmlIniParser import nstrip
 from .winContextMenu.install_context_menu import install_context_menu
 
-try:
-  from defusedxml import ElementTree as ET
-except ModuleNotFoundError as e:
-  log.warn("Insecure module import used! Please install all the required dependencies by running `pip install -r requirements.txt`")
-  from xml.etree import ElementTree as ET
-
 
 def move_output_files_to(destination_path):
   """
@@ -60,7 +56,7 @@ def print_nvar_response_buffer(nvar_response_buffer_file=None):
   if not nvar_response_buffer_file:
     nvar_response_buffer_file = os.path.join(clb.TempFolder, 'NvarRespBuff.bin')
   with open(nvar_response_buffer_file, 'rb') as out_file:  # opening for writing
-    current_parameters = list(out_file.read())
+    current_parameters = out_file.read()
   current_parameter_size = len(current_parameters)
   response_buffer_ptr = 0
   header = ['Offset Ptr', 'Status', 'Attribute', 'Data Size', 'Variable Name', 'VarGuid']
@@ -74,13 +70,9 @@ def print_nvar_response_buffer(nvar_response_buffer_file=None):
     size = clb.ReadList(current_parameters, response_buffer_ptr + 0x14, 4)
     status = clb.ReadList(current_parameters, response_buffer_ptr + 0x18, 4)
     operation = clb.ReadList(current_parameters, response_buffer_ptr + 0x1C, 1)
-    name = ''
-    for VarSizeCount in range(0, 0x80):
-      val = clb.ReadList(current_parameters, (response_buffer_ptr + 0x1D + VarSizeCount), 1)
-      if val == 0:
-        response_buffer_ptr = response_buffer_ptr + 0x1D + VarSizeCount + 1
-        break
-      name += chr(val)
+    name = buffer_reader.read_c_string(current_parameters, response_buffer_ptr + 0x1D, 0x80)
+    if len(name) < 0x80:
+      response_buffer_ptr = response_buffer_ptr + 0x1D + len(name) + 1
     response_buffer_ptr = response_buffer_ptr + size
     data_lis.append([hex(offset), hex(status), hex(attribute), hex(size), name, clb.GuidStr(guid)])
 
@@ -91,8 +83,8 @@ def generate_knobs_delta(ref_xml, new_xml, out_file=r'KnobsDiff.log', compare_ta
   """
   Take difference of Setup Option between two BIOS/IFWI xml file
 
-  :param ref_xml: reference bios/ifwi binary
-  :param new_xml: another bios/ifwi binary to compare against reference file
+  :param ref_xml: reference bios/ifwi xml file or its knob model
+  :param new_xml: another bios/ifwi xml file (or its knob model) to compare against reference file
   :param out_file: output file location to store difference result at
   :param compare_tag: xml attribute to be compared against (default|CurrentVal|size|prompt|depex|...)
   :return: file content of result_log_file
@@ -100,10 +92,8 @@ def generate_knobs_delta(ref_xml, new_xml, out_file=r'KnobsDiff.log', compare_ta
   Usage:
   >>> generate_knobs_delta("/path/to/PlatformConfig.2277_FwInfo.xml", "/path/to/PlatformConfig.2283_FwInfo.xml", "KnobsDiff.log")
   """
-  ref_tree = None
-  new_tree = None
-  ref_tree = ET.parse(ref_xml)
-  new_tree = ET.parse(new_xml)
+  ref_model = get_knob_model(ref_xml)
+  new_model = get_knob_model(new_xml)
   ref_knobs_map = {}
   new_knobs_map = {}
   bios_tag = ['BIOS', 'SVBIOS', 'CPUSVBIOS']
@@ -119,40 +109,38 @@ def generate_knobs_delta(ref_xml, new_xml, out_file=r'KnobsDiff.log', compare_ta
 
   for count in range(0, 3):
     if ref_knobs_bios_version == '':
-      for ref_xml_bios in ref_tree.iter(tag=bios_tag[count]):
+      for ref_xml_bios in ref_model.iter_sections(bios_tag[count]):
         ref_knobs_bios_version = nstrip(ref_xml_bios.get('VERSION'))
         break
 
   for count in range(0, 3):
     if new_knobs_bios_version == '':
-      for MyXmlBios in new_tree.iter(tag=bios_tag[count]):
+      for MyXmlBios in new_model.iter_sections(bios_tag[count]):
         new_knobs_bios_version = nstrip(MyXmlBios.get('VERSION'))
         break
 
-  for ref_setup_knobs in ref_tree.iter(tag='biosknobs'):
-    for ref_bios_knob in ref_setup_knobs:
-      ref_setup_type = (nstrip(ref_bios_knob.get('setupType'))).upper()
-      if ref_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
-        ref_knob_name = nstrip(ref_bios_knob.get('name'))
-        ref_knobs_map[ref_knob_name] = {}
-        for current_tag in current_compare_tags:
-          if current_tag in internal_compare_tags:
-            ref_value = int(nstrip(ref_bios_knob.get(current_tag)), 16)
-          else:
-            ref_value = nstrip(ref_bios_knob.get(current_tag))
-          ref_knobs_map[ref_knob_name][current_tag] = ref_value
-  for new_setup_knobs in new_tree.iter(tag='biosknobs'):
-    for new_bios_knob in new_setup_knobs:
-      current_setup_type = (nstrip(new_bios_knob.get('setupType'))).upper()
-      if current_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
-        new_knob_name = nstrip(new_bios_knob.get('name'))
-        new_knobs_map[new_knob_name] = {}
-        for current_tag in current_compare_tags:
-          if current_tag in internal_compare_tags:
-            new_value = int(nstrip(new_bios_knob.get(current_tag)), 16)
-          else:
-            new_value = nstrip(new_bios_knob.get(current_tag))
-          new_knobs_map[new_knob_name][current_tag] = new_value
+  for ref_bios_knob in ref_model.iter_knobs():
+    ref_setup_type = (nstrip(ref_bios_knob.setup_type)).upper()
+    if ref_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
+      ref_knob_name = nstrip(ref_bios_knob.name)
+      ref_knobs_map[ref_knob_name] = {}
+      for current_tag in current_compare_tags:
+        if current_tag in internal_compare_tags:
+          ref_value = int(nstrip(ref_bios_knob.get(current_tag)), 16)
+        else:
+          ref_value = nstrip(ref_bios_knob.get(current_tag))
+        ref_knobs_map[ref_knob_name][current_tag] = ref_value
+  for new_bios_knob in new_model.iter_knobs():
+    current_setup_type = (nstrip(new_bios_knob.setup_type)).upper()
+    if current_setup_type in ['ONEOF', 'CHECKBOX', 'NUMRIC', 'NUMERIC', 'STRING']:
+      new_knob_name = nstrip(new_bios_knob.name)
+      new_knobs_map[new_knob_name] = {}
+      for current_tag in current_compare_tags:
+        if current_tag in internal_compare_tags:
+          new_value = int(nstrip(new_bios_knob.get(current_tag)), 16)
+        else:
+          new_value = nstrip(new_bios_knob.get(current_tag))
+        new_knobs_map[new_knob_name][current_tag] = new_value
 
   file_content = ""
   log_msg = f'\n\nWriting delta knobs for comparing following fields \"{compare_tag}\"\n   RefXmlBiosVer = Arg 1 File = {ref_knobs_bios_version} \n   MyXmlBiosVer = Arg 2 File = {new_knobs_bios_version}\n'
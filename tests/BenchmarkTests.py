@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for performance critical paths of XmlCli.
+
+Benchmarks run completely offline (i.e. file backed stand-in for target memory)
+and only report timings in the log. Results of the measured paths are verified
+by known-answer tests of `CommonTests` and of the access methods.
+"""
+# Built-in imports
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import binascii
+import tracemalloc
+import subprocess
+
+# Custom imports
+from . import UnitTestHelper
+from xmlcli import XmlCli as cli
+from xmlcli import XmlCliLib as clb
+from xmlcli import XmlIniParser as prs
+from xmlcli.common import compress
+from xmlcli.common import configurations
+from xmlcli.common import knob_model
+from xmlcli.common import buffer_reader
+from xmlcli.common import depex
+from xmlcli.access.linux.linux import LinuxAccess, MemoryMapPool
+from xmlcli.access.emulator import firmware
+from xmlcli.access.emulator.emulator import EmulatorAccess
+from xmlcli.access.record.record import RecordAccess
+from xmlcli.access.replay.replay import ReplayAccess
+
+__author__ = "Gahan Saraiya"
+
+settings = UnitTestHelper.settings
+log = settings.logger
+
+
+def measure(func, *args, repeat=3, **kwargs):
+  """Execute function for `repeat` times and return tuple of (best time in seconds, last result)"""
+  best_time = None
+  result = None
+  for _ in range(repeat):
+    start_time = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start_time
+    best_time = elapsed if best_time is None else min(best_time, elapsed)
+  return best_time, result
+
+
+def compare(description, baseline, candidate, *args, repeat=3, baseline_repeat=None):
+  """Measure baseline and candidate implementation on same arguments and log their timings
+
+  :param description: what is measured
+  :param baseline: tuple of (label, function) of previous implementation
+  :param candidate: tuple of (label, function) of implementation compared against baseline
+  :param repeat: number of executions, best time is reported
+  :param baseline_repeat: number of executions of baseline if different than `repeat` (i.e. for slow baseline)
+  :return: tuple of (baseline time, candidate time, result of candidate)
+  """
+  (baseline_label, baseline_func), (candidate_label, candidate_func) = baseline, candidate
+  baseline_time, _ = measure(baseline_func, *args, repeat=repeat if baseline_repeat is None else baseline_repeat)
+  candidate_time, result = measure(candidate_func, *args, repeat=repeat)
+  log.result(f"{description}: {baseline_label} = {baseline_time * 1000:.2f} ms, {candidate_label} = {candidate_time * 1000:.2f} ms "
+             f"(x{baseline_time / candidate_time:.1f})")
+  return baseline_time, candidate_time, result
+
+
+class LinuxMemoryMapBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare per page open/mmap/munmap path against persistent mapping pool
+  using regular file as stand-in for /dev/mem
+  """
+  memory_size = 0x800000  # 8 MB
+  block_sizes = (0x100000, 0x400000)  # 1 MB and 4 MB downloads
+
+  def setUp(self):
+    file_descriptor, self.memory_file = tempfile.mkstemp(suffix=".mem")
+    with os.fdopen(file_descriptor, "wb") as f:
+      f.write(os.urandom(self.memory_size))
+    self.legacy_access = LinuxAccess(access_name="linux")
+    self.legacy_access.memory_file = self.memory_file
+    self.legacy_access.external_mem = False
+    self.legacy_access.map_pool_enabled = False
+    self.pool_access = LinuxAccess(access_name="linux")
+    self.pool_access.external_mem = False
+    self.pool_access.map_pool_enabled = True
+    self.pool_access.map_pool = MemoryMapPool(self.memory_file)
+
+  def tearDown(self):
+    self.legacy_access.close_interface()
+    self.pool_access.close_interface()
+    os.remove(self.memory_file)
+
+  @settings.log_function_entry_and_exit
+  def test_mem_block_download(self):
+    address = 0x1234  # unaligned start address to cover partial pages
+    for size in self.block_sizes:
+      compare(f"mem_block of 0x{size:x} bytes", ("per page mmap", self.legacy_access.mem_block), ("mapping pool", self.pool_access.mem_block), address, size)
+
+  @settings.log_function_entry_and_exit
+  def test_scalar_access(self):
+    addresses = range(0x1000, 0x1000 + 0x4000 * 4, 4)
+    read_bytes = lambda access: [access.read_memory_bytes(address, 4) for address in addresses]
+    compare(f"{len(addresses)} reads of 4 bytes", ("per page mmap", lambda: read_bytes(self.legacy_access)), ("mapping pool", lambda: read_bytes(self.pool_access)))
+
+
+class EmulatedMailboxBenchmark(UnitTestHelper.UnitTestHelper):
+  """Measure end to end latency of XmlCli mailbox operations against emulated target"""
+  knob_count = 2000
+  request_sizes = (1, 10, 100)
+
+  def setUp(self):
+    self.previous_interface = clb.InterfaceType
+    clb._setCliAccess("emulator")
+    clb.cliaccess.seed(firmware.create_synthetic_platform_xml(knob_count=self.knob_count))
+    self.xml_file = os.path.join(tempfile.gettempdir(), "EmulatedPlatformConfig.xml")
+
+  def tearDown(self):
+    clb._setCliAccess(self.previous_interface)
+    if os.path.exists(self.xml_file):
+      os.remove(self.xml_file)
+
+  @settings.log_function_entry_and_exit
+  def test_save_xml(self):
+    elapsed, status = measure(clb.SaveXml, self.xml_file)
+    self.assertEqual(status, 0)
+    log.result(f"SaveXml of {self.knob_count} knobs ({os.path.getsize(self.xml_file)} bytes): {elapsed * 1000:.2f} ms")
+
+  @settings.log_function_entry_and_exit
+  def test_program_knobs(self):
+    for request_size in self.request_sizes:
+      knob_string = ", ".join(f"EmuKnob_{count:05d}=1" for count in range(0, request_size * 5, 5))  # oneof knobs
+      elapsed, status = measure(cli.CvProgKnobs, knob_string)
+      self.assertEqual(status, 0)
+      log.result(f"CvProgKnobs of {request_size} knob(s): {elapsed * 1000:.2f} ms ({request_size / elapsed:.1f} knobs/s)")
+
+
+class ReplayedSessionBenchmark(UnitTestHelper.UnitTestHelper):
+  """Measure host side processing of XmlCli by replaying session recorded against emulated target"""
+  knob_count = 2000
+  knob_string = ", ".join(f"EmuKnob_{count:05d}=1" for count in range(0, 500, 5))
+
+  def setUp(self):
+    self.previous_interface = clb.InterfaceType
+    self.previous_xml_cache = configurations.XML_CACHE
+    configurations.XML_CACHE = False  # recorded and replayed sessions shall access target identically
+    clb._setCliAccess("emulator")
+    clb.cliaccess.seed(firmware.create_synthetic_platform_xml(knob_count=self.knob_count))
+    self.xml_file = os.path.join(tempfile.gettempdir(), "ReplayedPlatformConfig.xml")
+    self.trace_file = os.path.join(tempfile.gettempdir(), "ReplayedSession.bin")
+    clb.cliaccess = RecordAccess(access=clb.cliaccess, trace_file=self.trace_file)
+    self.session()
+    clb.cliaccess.close_trace()
+
+  def tearDown(self):
+    clb._setCliAccess(self.previous_interface)
+    configurations.XML_CACHE = self.previous_xml_cache
+    for file in (self.xml_file, self.trace_file):
+      if os.path.exists(file):
+        os.remove(file)
+
+  def session(self):
+    return clb.SaveXml(self.xml_file) or cli.CvProgKnobs(self.knob_string)
+
+  @settings.log_function_entry_and_exit
+  def test_replay_session(self):
+    clb.cliaccess = ReplayAccess(trace_file=self.trace_file, strict=True)
+
+    def replay():
+      clb.cliaccess.rewind()
+      clb.getSession().invalidate_mailbox()
+      return self.session()
+
+    elapsed, status = measure(replay)
+    self.assertEqual(status, 0)
+    log.result(f"Replayed SaveXml + CvProgKnobs of 100 knobs ({len(clb.cliaccess.records)} access calls): {elapsed * 1000:.2f} ms")
+
+
+class FleetKnobsBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare programming knobs on multiple emulated targets serially and with fleet API"""
+  target_count = 8
+  knob_count = 2000
+  smi_latency = 0.05  # seconds taken by each emulated SMI
+  knob_string = ", ".join(f"EmuKnob_{count:05d}=1" for count in range(0, 50, 5))
+
+  def setUp(self):
+    self.sessions = []
+    for index in range(self.target_count):
+      access = EmulatorAccess(access_name="emulator")
+      access.target.smi_latency = self.smi_latency
+      access.seed(firmware.create_synthetic_platform_xml(knob_count=self.knob_count))
+      self.sessions.append(clb.XmlCliSession(access, out_dir=tempfile.mkdtemp()))
+
+  def tearDown(self):
+    for session in self.sessions:
+      shutil.rmtree(session.TempFolder, ignore_errors=True)
+
+  def program_serially(self):
+    status = 0
+    for session in self.sessions:
+      with session:
+        status |= cli.CvProgKnobs(self.knob_string)
+    return status
+
+  def program_fleet(self):
+    results = cli.CvProgKnobsFleet(self.sessions, self.knob_string)
+    return max(result["Status"] for result in results)
+
+  @settings.log_function_entry_and_exit
+  def test_fleet_program_knobs(self):
+    serial_elapsed, status = measure(self.program_serially, repeat=1)
+    self.assertEqual(status, 0)
+    fleet_elapsed, status = measure(self.program_fleet, repeat=1)
+    self.assertEqual(status, 0)
+    log.result(f"CvProgKnobs on {self.target_count} targets: serial {serial_elapsed * 1000:.2f} ms, "
+               f"fleet {fleet_elapsed * 1000:.2f} ms ({serial_elapsed / fleet_elapsed:.1f}x)")
+
+
+class SectionDecompressionBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare per section cost of decompressing Tiano compressed sections with
+  TianoCompress utility (temp files and subprocess) against in-process decompressors
+  """
+  section_count = 16
+  knob_count = 500  # ~150 KB of XML per section
+
+  def setUp(self):
+    self.work_dir = tempfile.mkdtemp()
+    self.utility = os.path.join(self.work_dir, os.path.basename(configurations.TIANO_COMPRESS_BIN))
+    shutil.copy(configurations.TIANO_COMPRESS_BIN, self.utility)
+    os.chmod(self.utility, 0o755)  # utility is not shipped as executable
+    self.sections = []
+    for index in range(self.section_count):
+      data = firmware.create_synthetic_platform_xml(knob_count=self.knob_count, bios_version=f"EMULATED.{index:04d}").encode()
+      in_file, out_file = os.path.join(self.work_dir, "section.bin"), os.path.join(self.work_dir, "section.cmp")
+      with open(in_file, "wb") as f:
+        f.write(data)
+      try:
+        subprocess.run([self.utility, "-e", "-q", in_file, "-o", out_file], check=True)
+      except (OSError, subprocess.CalledProcessError) as e:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        self.skipTest(f"TianoCompress utility is not usable on this platform: {e}")
+      with open(out_file, "rb") as f:
+        self.sections.append((f.read(), data))
+
+  def tearDown(self):
+    shutil.rmtree(self.work_dir, ignore_errors=True)
+
+  def decompress_with_utility(self):
+    result = []
+    for compressed_data, _ in self.sections:
+      in_file, out_file = os.path.join(self.work_dir, "compressed.bin"), os.path.join(self.work_dir, "decompressed.bin")
+      with open(in_file, "wb") as f:
+        f.write(compressed_data)
+      subprocess.run([self.utility, "-d", "-q", in_file, "-o", out_file], check=True)
+      with open(out_file, "rb") as f:
+        result.append(f.read())
+      os.remove(in_file)
+      os.remove(out_file)
+    return result
+
+  def decompress_in_process(self, native):
+    return [compress.tiano_decompress_data(compressed_data, native=native) for compressed_data, _ in self.sections]
+
+  @settings.log_function_entry_and_exit
+  def test_tiano_section_decompress(self):
+    description = f"Tiano decompression of {self.section_count} sections ({len(self.sections[0][1])} bytes each)"
+    compare(description, ("utility", self.decompress_with_utility), ("pure python", lambda: self.decompress_in_process(native=False)))
+    if compress.efi_compressor:
+      compare(description, ("utility", self.decompress_with_utility), ("native", lambda: self.decompress_in_process(native=True)))
+
+
+class KnobTableBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare dict-of-dicts knob map (as built by XmlIniParser before knob model) against columnar knob table"""
+  knob_count = 20000
+
+  def setUp(self):
+    self.root = knob_model.ET.fromstring(firmware.create_synthetic_platform_xml(knob_count=self.knob_count))
+
+  def build_knob_map(self):
+    knob_map = {}
+    for setup_knobs in self.root.iter(tag="biosknobs"):
+      for knob in setup_knobs:
+        options = {}
+        for options_count, option in enumerate(option for child in knob for option in child):
+          options[options_count] = {"Text": option.get("text").strip(), "Val": option.get("value").strip()}
+        knob_map[knob.get("name").strip()] = {
+          "VarId": knob.get("varstoreIndex").strip(), "Type": knob.get("setupType").strip().upper(),
+          "Size": knob.get("size").strip(), "offset": knob.get("offset").strip(), "DefVal": knob.get("default").strip(),
+          "CurVal": knob.get("CurrentVal").strip(), "Depex": knob.get("depex").strip(), "Prompt": knob.get("prompt").strip(),
+          "OptionsDict": options}
+    return knob_map
+
+  def build_knob_table(self):
+    return knob_model.KnobModel(self.root)
+
+  @staticmethod
+  def measure_memory(func):
+    tracemalloc.start()
+    try:
+      result = func()
+      return tracemalloc.get_traced_memory()[0], result
+    finally:
+      tracemalloc.stop()
+
+  @settings.log_function_entry_and_exit
+  def test_knob_table(self):
+    compare(f"Knob lookup of {self.knob_count} knobs", ("dict map", self.build_knob_map), ("knob table", self.build_knob_table))
+    map_memory, _ = self.measure_memory(self.build_knob_map)
+    table_memory, _ = self.measure_memory(self.build_knob_table)
+    log.result(f"Memory of knob lookup of {self.knob_count} knobs: dict map = {map_memory / 1024:.0f} KB, knob table = {table_memory / 1024:.0f} KB")
+
+
+class RequestBufferBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare hex string assembly of request buffer (as done by XmlIniParser before binary compiler) against
+  binary request buffer compiler
+  """
+  knob_count = 10000
+
+  def setUp(self):
+    self.model = knob_model.KnobModel(knob_model.ET.fromstring(firmware.create_synthetic_platform_xml(knob_count=self.knob_count)))
+    self.knob_values = {name: f"0x{index % 7:X}" for index, name in enumerate(self.model.knobs)}
+
+  def assemble_hex_string(self):
+    buffer_lis = []
+    for name, value in self.knob_values.items():
+      knob = self.model.knobs[name]
+      knob_val_hex = value[2:]
+      knob_var_store_int, knob_size_int, knob_offset_int = (int(field[2:], 16) if field.startswith("0x") else int(field) for field in (knob.varstore, knob.size, knob.offset))
+      knob_width = knob_size_int
+      if knob_offset_int >= clb.BITWISE_KNOB_PREFIX:
+        knob_width, knob_offset_int, bit_offset = clb.get_bitwise_knob_details(knob_size_int, knob_offset_int)
+        knob_size_int = ((knob_size_int & 0x1F) << 3) + (bit_offset & 0x7)
+      knob_offset_hex = hex(knob_offset_int)[2:].zfill(4)
+      knob_val_hex = knob_val_hex.zfill(knob_width * 2)
+      value_line = "".join(knob_val_hex[inc - 2:inc] for inc in range(knob_width * 2, 0, -2))
+      buffer_lis.append(hex(knob_var_store_int)[2:].zfill(2) + knob_offset_hex[2:] + knob_offset_hex[0:2] + hex(knob_size_int)[2:].zfill(2) + value_line)
+    total_entries = hex(len(buffer_lis))[2:].zfill(8)
+    entry_line = "".join(total_entries[inc - 2:inc] for inc in range(8, 0, -2))
+    return binascii.unhexlify(entry_line + "".join(buffer_lis) + prs.END_OF_BUFFER)
+
+  def compile_binary(self):
+    return prs.compile_request_buffer(self.model.knobs, self.knob_values).buffer
+
+  @settings.log_function_entry_and_exit
+  def test_request_buffer(self):
+    compare(f"Request buffer of {self.knob_count} knobs", ("hex string", self.assemble_hex_string), ("binary", self.compile_binary))
+
+
+class ResponseMatchBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare nested scan of CLI response for each requested knob (as done by XmlCli before hash join)
+  against single pass decoding of response joined on (VarId, Offset, Size)
+
+  Nested scan is quadratic, it is measured on `scan_entry_count` entries only.
+  """
+  entry_count = 10000
+  scan_entry_count = 500
+
+  @staticmethod
+  def create_buffers(entry_count):
+    request_buffer = prs.RequestBuffer()
+    response = bytearray()
+    for index in range(entry_count):
+      var_id, offset = index % 4, (index // 4) * 4
+      if index % 5 == 4:  # bitwise knob
+        request_buffer.add_knob(f"Knob{index}", var_id, clb.BITWISE_KNOB_PREFIX + (offset * 8) + 2, 3, "0x5")
+        response += clb.CLI_RESPONSE_ENTRY.pack(index, var_id, offset | 0x8000, (3 << 3) | 2) + bytes([0, 5])
+      else:
+        request_buffer.add_knob(f"Knob{index}", var_id, offset, 2, f"0x{index:X}")
+        response += clb.CLI_RESPONSE_ENTRY.pack(index, var_id, offset, 2) + bytes(2) + index.to_bytes(2, "little")
+    return request_buffer.buffer, bytes(response)
+
+  @staticmethod
+  def scan_response(request_buffer, response):
+    matches = []
+    offset_in = 4
+    number_of_entries = clb.ReadBuffer(request_buffer, 0, 4, clb.HEX)
+    while number_of_entries != 0:
+      in_var_id = clb.ReadBuffer(request_buffer, offset_in + 0, 1, clb.HEX)
+      in_offset, in_size, in_byte_size = clb.decodeKnobEntry(clb.ReadBuffer(request_buffer, offset_in + 1, 2, clb.HEX), clb.ReadBuffer(request_buffer, offset_in + 3, 1, clb.HEX))
+      input_value = clb.ReadBuffer(request_buffer, offset_in + 4, in_byte_size, clb.HEX)
+      offset_out = 0
+      while offset_out < len(response):
+        out_var_id = clb.ReadBuffer(response, offset_out + 6, 1, clb.HEX)
+        out_offset, out_size, out_byte_size = clb.decodeKnobEntry(clb.ReadBuffer(response, offset_out + 7, 2, clb.HEX), clb.ReadBuffer(response, offset_out + 9, 1, clb.HEX))
+        if (out_var_id == in_var_id) and (out_offset == in_offset) and (out_size == in_size):
+          default_value = clb.ReadBuffer(response, offset_out + 10, out_byte_size, clb.HEX)
+          out_value = clb.ReadBuffer(response, offset_out + 10 + out_byte_size, out_byte_size, clb.HEX)
+          knob_entry_address = clb.ReadBuffer(response, offset_out + 0, 4, clb.HEX)
+          matches.append(((knob_entry_address, out_var_id, out_offset, out_size, default_value, out_value), input_value))
+          break
+        offset_out = offset_out + 10 + (out_byte_size * 2)
+      offset_in = offset_in + 4 + in_byte_size
+      number_of_entries = number_of_entries - 1
+    return matches
+
+  @settings.log_function_entry_and_exit
+  def test_match_response(self):
+    request_buffer, response = self.create_buffers(self.scan_entry_count)
+    compare(f"Response of {self.scan_entry_count} knobs", ("nested scan", self.scan_response), ("hash join", clb.matchCliResponseEntries),
+            request_buffer, response, baseline_repeat=1)
+    request_buffer, response = self.create_buffers(self.entry_count)
+    join_time, _ = measure(clb.matchCliResponseEntries, request_buffer, response)
+    log.result(f"Response of {self.entry_count} knobs: hash join = {join_time * 1000:.1f} ms")
+
+
+class BufferReaderBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare byte at a time reading of lists (as done by UefiFwParser before buffer reader) against
+  struct and `bytes.find` based buffer reader, for the scan of NVRAM for variable store GUID
+  and reading of HII strings
+  """
+  scan_size = 0x8000
+  string_count = 2000
+  guid = [0xDDCF3616, 0x3275, 0x4164, 0x98, 0xB6, 0xFE, 0x85, 0x70, 0x7F, 0xFE, 0x7D]
+
+  @staticmethod
+  def legacy_read_list(in_buffer, offset, size):
+    value_buffer = in_buffer[offset:offset + size]
+    for count in range(len(value_buffer)):
+      value_buffer[count] = hex(value_buffer[count])[2:].zfill(2)
+    return int("".join(value_buffer[::-1]), 16)
+
+  def legacy_fetch_guid(self, buffer, offset):
+    return ([self.legacy_read_list(buffer, offset, 4), self.legacy_read_list(buffer, offset + 4, 2), self.legacy_read_list(buffer, offset + 6, 2)] +
+            [self.legacy_read_list(buffer, offset + index, 1) for index in range(8, 0x10)])
+
+  def legacy_scan(self, buffer):
+    for offset in range(0, len(buffer) - 0x10):
+      if self.legacy_fetch_guid(buffer, offset) == self.guid:
+        return offset
+    return -1
+
+  def legacy_read_strings(self, buffer):
+    strings, offset = [], 0
+    for _ in range(self.string_count):
+      string = ""
+      while True:
+        value = self.legacy_read_list(buffer, offset, 2)
+        offset = offset + 2
+        if not value:
+          break
+        string = string + chr(value & 0xFF)
+      strings.append(string)
+    return strings
+
+  def read_strings(self, buffer):
+    strings, offset = [], 0
+    for _ in range(self.string_count):
+      size = buffer_reader.ucs2_string_size(buffer, offset)
+      strings.append(buffer_reader.read_chars(buffer, offset, size // 2, 2))
+      offset = offset + size + 2
+    return strings
+
+  @settings.log_function_entry_and_exit
+  def test_buffer_reader(self):
+    nvram = bytes(self.scan_size - 0x20) + buffer_reader.guid_key(self.guid) + bytes(0x10)
+    compare(f"GUID scan of {len(nvram)} bytes", ("byte at a time", lambda: self.legacy_scan(list(nvram))),
+            ("find", lambda: buffer_reader.find_guid(bytearray(nvram), self.guid)), baseline_repeat=1)
+    strings = b"".join(f"Setup Question {index}".encode("utf-16-le") + bytes(2) for index in range(self.string_count))
+    compare(f"{self.string_count} UCS-2 strings", ("byte at a time", lambda: self.legacy_read_strings(list(strings))),
+            ("buffer reader", lambda: self.read_strings(bytearray(strings))))
+
+
+class DepexBenchmark(UnitTestHelper.UnitTestHelper):
+  """Compare evaluation of depex of all the knobs by string substitution and AST walk (as done by XmlIniParser
+  before depex engine) against depex compiled once, for initial evaluation and for edit of `edit_count` knobs
+  """
+  knob_count = 20000
+  edit_count = 24
+
+  def create_knobs_map(self):
+    knobs_map = {}
+    for index in range(self.knob_count):
+      first, second = f"Knob{(index * 7) % self.knob_count:05d}", f"Knob{(index * 13 + 1) % self.knob_count:05d}"
+      knob_depex = (f"Sif( {first} _EQU_ 0x1 ) _AND_ Gif( {second} _NEQ_ 0x0 OR _LIST_ {first} _EQU_ 0x2 0x3 )"
+                    if index % 4 else "TRUE")
+      knobs_map[f"Knob{index:05d}"] = {"SetupType": "ONEOF", "CurVal": f"0x{index % 3:X}", "Depex": knob_depex,
+                                       "SetupPgPtr": "Main/Page", "SetupPgSts": "Unknown"}
+    return knobs_map
+
+  @staticmethod
+  def legacy_evaluate(knobs_map):
+    return {name: prs.evaluate_depex(knob["Depex"], name, knobs_map) for name, knob in knobs_map.items()}
+
+  @staticmethod
+  def compile_and_evaluate(knobs_map):
+    engine = depex.DepexEngine(knobs_map)
+    engine.evaluate()
+    return engine
+
+  @settings.log_function_entry_and_exit
+  def test_depex(self):
+    knobs_map = self.create_knobs_map()
+    _, _, engine = compare(f"Depex of {self.knob_count} knobs", ("AST walk", self.legacy_evaluate), ("compile and evaluate", self.compile_and_evaluate),
+                           knobs_map, repeat=1)
+    for index in range(self.edit_count):
+      knobs_map[f"Knob{index * 97:05d}"]["CurVal"] = "0x1"
+    compare(f"Depex after edit of {self.edit_count} knobs", ("AST walk", self.legacy_evaluate), ("incremental", lambda _: engine.refresh()),
+            knobs_map, repeat=1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 # Built-in imports
 import os
+import tempfile
+import struct
 import unittest
 from random import SystemRandom
 
@@ -8,7 +10,15 @@ from random import SystemRandom
 # Custom imports
 from . import UnitTestHelper
 from xmlcli.common import utils
+from xmlcli.common import tiano
+from xmlcli.common import compress
 from xmlcli.common import configurations
+from xmlcli.common import knob_model
+from xmlcli.common import buffer_reader
+from xmlcli.common import depex
+from xmlcli.common import xml_cache
+from xmlcli import XmlCliLib as clb
+from xmlcli import XmlIniParser as prs
 
 __author__ = "Gahan Saraiya"
 
@@ -276,5 +286,282 @@ class UtilityTest(UnitTestHelper.UnitTestHelper):
                      "\n=================================\n")
 
 
+class CompressTest(UnitTestHelper.UnitTestHelper):
+  # knob section compressed by `TianoCompress -e` (Tiano) and `TianoCompress -e --uefi` (EFI)
+  DECOMPRESSED_DATA = b'<SYSTEM><biosknobs><knob name="Knob0" default="0x00" CurrentVal="0x00"/><knob name="Knob1" default="0x01" CurrentVal="0x01"/></biosknobs></SYSTEM>\n' * 4
+  TIANO_COMPRESSED_DATA = bytes.fromhex(
+    "620000004c02000000484a6f097fb3dc028e9573ab862c5162620b2293044ca0aa1739a8382081e93b8ca4801b69a2a3546786472ab874"
+    "396b950396920353d2cc1c6750c20d97ba64c89823ec73baf93deb6c744b2b8456284f4a12c5094282f3ea2aa26efd25f24800")
+  EFI_COMPRESSED_DATA = bytes.fromhex(
+    "620000004c02000000484a6f097fb3dc028e9573ab862c5162620b2293044ca0aa1739a8382081e93b8ca90036d34546a8cf0c8e5570e8"
+    "72d72a072d2406a7a59838cea1841b2f74c9913047d8e775f27bd6d8e8965708ac509e94258a128505e7d45544ddfa4be49000")
+
+  @settings.log_function_entry_and_exit
+  def test_tiano_decompress(self):
+    self.assertEqual(tiano.get_info(self.TIANO_COMPRESSED_DATA), (len(self.TIANO_COMPRESSED_DATA) - 8, len(self.DECOMPRESSED_DATA)))
+    for native in ((False, True) if compress.efi_compressor else (False,)):
+      decompressed_data = compress.tiano_decompress_data(memoryview(self.TIANO_COMPRESSED_DATA), native=native)
+      self.assertIsInstance(decompressed_data, bytearray)
+      self.assertEqual(decompressed_data, self.DECOMPRESSED_DATA)
+      self.assertEqual(compress.tiano_decompress_data(self.EFI_COMPRESSED_DATA, version=tiano.EFI_VERSION, native=native), self.DECOMPRESSED_DATA)
+      with self.assertRaises(utils.XmlCliException):  # position set of Tiano is wider than of EFI
+        compress.tiano_decompress_data(self.TIANO_COMPRESSED_DATA, version=tiano.EFI_VERSION, native=native)
+      with self.assertRaises(utils.XmlCliException):
+        compress.tiano_decompress_data(self.TIANO_COMPRESSED_DATA[:-8], native=native)
+
+  @settings.log_function_entry_and_exit
+  def test_lzma_decompress(self):
+    import lzma
+    decompressed_data = compress.lzma_decompress_data(lzma.compress(self.DECOMPRESSED_DATA, format=lzma.FORMAT_ALONE) + bytes(0x10))
+    self.assertIsInstance(decompressed_data, bytearray)
+    self.assertEqual(decompressed_data, self.DECOMPRESSED_DATA)
+
+
+class CliBufferTest(UnitTestHelper.UnitTestHelper):
+  @staticmethod
+  def response_entry(knob_entry_address, var_id, offset, size, default_value, current_value, byte_size):
+    return (clb.CLI_RESPONSE_ENTRY.pack(knob_entry_address, var_id, offset, size) +
+            default_value.to_bytes(byte_size, "little") + current_value.to_bytes(byte_size, "little"))
+
+  @settings.log_function_entry_and_exit
+  def test_match_response_entries(self):
+    request_buffer = prs.RequestBuffer()
+    request_buffer.add_knob("Knob0", 0, 0x10, 2, "0x1234")
+    request_buffer.add_knob("Knob1", 1, clb.BITWISE_KNOB_PREFIX + (0x20 * 8) + 6, 3, "5")  # bitwise knob spanning 2 bytes
+    request_buffer.add_knob("Knob2", 0, 0x30, 1, "1")  # missing in response
+    self.assertEqual(clb.parseCliRequestEntries(request_buffer.buffer),
+                     [(0, 0x10, 2, 0x1234), (1, clb.BITWISE_KNOB_PREFIX + (0x20 * 8) + 6, 3, 5), (0, 0x30, 1, 1)])
+    response = (self.response_entry(0x1000, 0, 0x12, 1, 0, 1, 1) +
+                self.response_entry(0x2000, 1, 0x8020, (3 << 3) | 6, 0, 5, 2) +
+                self.response_entry(0x3000, 0, 0x10, 2, 0, 0x1234, 2) +
+                self.response_entry(0x4000, 0, 0x10, 2, 0, 0xFFFF, 2))
+    matches = clb.matchCliResponseEntries(request_buffer.buffer, response)
+    self.assertEqual(matches, [((0x3000, 0, 0x10, 2, 0, 0x1234), 0x1234),
+                               ((0x2000, 1, clb.BITWISE_KNOB_PREFIX + (0x20 * 8) + 6, 3, 0, 5), 5)])
+    self.assertEqual([entry[0] for entry, _ in clb.matchCliResponseEntries(None, response)], [0x1000, 0x2000, 0x3000, 0x4000])
+
+  @settings.log_function_entry_and_exit
+  def test_compile_request_buffer(self):
+    model = knob_model.KnobModel(knob_model.ET.fromstring(
+      '<SYSTEM><biosknobs>'
+      '<knob setupType="oneof" name="Knob0" varstoreIndex="0x01" size="0x01" offset="0x0010" default="0x00" CurrentVal="0x00"/>'
+      '<knob setupType="numeric" name="Knob1" varstoreIndex="0x02" size="0x02" offset="0x0020" default="0x0000" CurrentVal="0x0000"/>'
+      '<knob setupType="oneof" name="Knob2" varstoreIndex="0x01" size="0x03" offset="0xC0106" default="0x0" CurrentVal="0x0"/>'
+      '<knob setupType="string" name="Knob3" varstoreIndex="0x02" size="0x04" offset="0x0030" default="" CurrentVal=""/>'
+      '</biosknobs></SYSTEM>'))
+    knob_values = {"Knob1": "300", "Knob0": "0x1", "Unknown": "0x1", "Knob2": "0x5", "Knob3": 'L"AB"'}
+    request_buffer = prs.compile_request_buffer(model.knobs, knob_values, exit_on_unknown_knob=False)
+    # count | varstore, offset, size, value of each knob in order of request | end of buffer signature
+    self.assertEqual(request_buffer.buffer.hex(), "04000000" "022000022c01" "0110000101" "0120801e0500" "0230000441004200" "f4fbd0e9")
+    self.assertEqual({var_store: bytes(buffer).hex() for var_store, buffer in request_buffer.get_varstore_buffers().items()},
+                     {1: "02000000" "0110000101" "0120801e0500" "f4fbd0e9", 2: "02000000" "022000022c01" "0230000441004200" "f4fbd0e9"})
+    self.assertIsNone(prs.compile_request_buffer(model.knobs, knob_values, exit_on_unknown_knob=True))
+
+
+class BufferReaderTest(UnitTestHelper.UnitTestHelper):
+  GUID = [0x92DAAF2F, 0xC02B, 0x455B, 0xB2, 0xEC, 0xF5, 0xA3, 0x59, 0x4F, 0x4A, 0xEA]
+  BUFFER = (b"\xAA" * 3 + b"Name\x00" + "Wide".encode("utf-16-le") + bytes(2) +
+            struct.pack("<IHH8B", *GUID) + b"\x34\x12\x78\x56")
+
+  @settings.log_function_entry_and_exit
+  def test_read_integer(self):
+    for buffer in (self.BUFFER, bytearray(self.BUFFER), memoryview(self.BUFFER), list(self.BUFFER)):
+      self.assertEqual(buffer_reader.read_integer(buffer, len(self.BUFFER) - 4, 4), 0x56781234)
+      self.assertEqual(buffer_reader.read_integer(buffer, len(self.BUFFER) - 4, 3), 0x781234)
+      self.assertEqual(buffer_reader.read_integer(buffer, len(self.BUFFER) - 2, 4), 0x5678)  # truncated by end of buffer
+      self.assertEqual(buffer_reader.read_integer(buffer, len(self.BUFFER), 2), 0)
+
+  @settings.log_function_entry_and_exit
+  def test_read_strings(self):
+    for buffer in (self.BUFFER, memoryview(self.BUFFER), list(self.BUFFER)):
+      self.assertEqual(buffer_reader.read_c_string(buffer, 3), "Name")
+      self.assertEqual(buffer_reader.read_c_string(buffer, 3, 2), "Na")
+      self.assertEqual(buffer_reader.ucs2_string_size(buffer, 8), 8)
+      self.assertEqual(buffer_reader.read_ucs2_string(buffer, 8), "Wide")
+      self.assertEqual(buffer_reader.read_chars(buffer, 8, 10, 2), "Wide")
+    self.assertEqual(buffer_reader.ucs2_string_size(b"A\x00\x00B\x00\x00", 0), 4)  # NUL character is aligned to start of string
+    self.assertEqual(buffer_reader.c_string_size(b"Name", 0), 4)  # not terminated
+
+  @settings.log_function_entry_and_exit
+  def test_string_package(self):
+    strings = ["Setup", "", "Boot Order"]
+    package = bytearray(b"".join(string.encode("utf-16-le") + bytes(2) for string in strings))
+    offset, result = 0, []
+    for _ in strings:
+      size = buffer_reader.ucs2_string_size(package, offset)
+      result.append(buffer_reader.read_chars(package, offset, size // 2, 2))
+      offset = offset + size + 2
+    self.assertEqual(result, strings)
+    self.assertEqual(offset, len(package))
+
+  @settings.log_function_entry_and_exit
+  def test_guid_scan(self):
+    guid_key = buffer_reader.guid_key(self.GUID)
+    nvram = bytearray(0x100) + guid_key[:-1] + bytes(0x11) + guid_key + bytes(0x10)  # partial match precedes the GUID
+    self.assertEqual(buffer_reader.find_guid(nvram, self.GUID), 0x120)
+    self.assertEqual(buffer_reader.find_guid(nvram, self.GUID, 0x121), -1)
+    self.assertEqual(buffer_reader.find_guid(nvram, guid_key, 0, 0x12F), -1)
+
+  @settings.log_function_entry_and_exit
+  def test_guid_key(self):
+    offset = self.BUFFER.find(struct.pack("<I", self.GUID[0]))
+    self.assertEqual(buffer_reader.find_guid(self.BUFFER, self.GUID), offset)
+    self.assertEqual(buffer_reader.find_guid(list(self.BUFFER), self.GUID, offset + 1), -1)
+    self.assertEqual(clb.FetchGuid(self.BUFFER, offset), self.GUID)
+    self.assertEqual(clb.FetchGuid(list(self.BUFFER), offset), self.GUID)
+    self.assertEqual(clb.FetchGuidKey(self.BUFFER, offset), clb.GuidKey(self.GUID))
+    self.assertEqual(clb.GuidStr(clb.FetchGuidKey(self.BUFFER, offset)), clb.GuidStr(self.GUID))
+    self.assertEqual(clb.FetchGuid(self.BUFFER, len(self.BUFFER) - 0x10), clb.ZeroGuid)
+
+  @settings.log_function_entry_and_exit
+  def test_legacy_wrappers(self):
+    self.assertEqual(clb.ReadList(list(self.BUFFER), 3, 8, clb.ASCII), "Name")
+    self.assertEqual(clb.ReadList(self.BUFFER, 3, 8, clb.ASCII), "Name")
+    self.assertEqual(clb.ReadList(self.BUFFER, len(self.BUFFER) - 4, 4), 0x56781234)
+    self.assertEqual(clb.ReadBuffer(self.BUFFER, len(self.BUFFER) - 4, 2, clb.HEX), 0x1234)
+    self.assertEqual(clb.ReadBuffer(self.BUFFER, 3, 4, clb.ASCII), "Name")
+    self.assertEqual(clb.ReadBuffer(self.BUFFER, len(self.BUFFER), 4, clb.HEX), 0)
+
+
+class DepexTest(UnitTestHelper.UnitTestHelper):
+  DEPEX = {
+    "Knob0": "TRUE",
+    "Knob1": "Sif( Knob0 _EQU_ 0x1 )",
+    "Knob2": "Gif( Knob0 _NEQ_ 0x1 OR Knob1 _GT_ 2 ) _AND_ Sif( _LIST_ Knob3 _EQU_ 0x1 0x2 )",
+    "Knob3": "Dif( Knob1 _LTE_ 0x3 AND Knob4 _EQU_ 0x0 )",
+    "Knob4": "( Knob2 _GTE_ 0x1 ) _AND_ Gif( Unknown _EQU_ 0x1 )",
+    "Knob5": "Sif( Knob6 _EQU_ 0x1 )",  # Knob6 is string knob
+  }
+
+  STATUS = {"Knob0": "Active", "Knob1": "Suppressed", "Knob2": "Suppressed", "Knob3": "Disabled", "Knob4": "Unknown", "Knob5": "Active", "Knob6": "Active"}
+  EDITS = (  # knob, new value, changed status of other knobs
+    ("Knob0", "0x0", {"Knob1": "Active"}),
+    ("Knob3", "0x5", {"Knob2": "GrayedOut"}),
+    ("Knob6", "0x1", {"Knob5": "Suppressed"}),  # string knob compared with integer
+    ("Knob1", "0x0", {}),
+  )
+
+  def create_knobs_map(self):
+    values = {"Knob0": "0x1", "Knob1": "0x3", "Knob2": "0x0", "Knob3": "0x2", "Knob4": "0x0", "Knob5": "0x0", "Knob6": "abc"}
+    return {name: {"SetupType": "ONEOF", "CurVal": value, "Depex": self.DEPEX.get(name, "TRUE"), "SetupPgPtr": "Main/Page", "SetupPgSts": "Unknown"}
+            for name, value in values.items()}
+
+  @staticmethod
+  def get_status(knobs_map):
+    return {name: knob["SetupPgSts"] for name, knob in knobs_map.items()}
+
+  @settings.log_function_entry_and_exit
+  def test_compiled_depex(self):
+    knobs_map = self.create_knobs_map()
+    self.assertEqual({name: prs.evaluate_depex(knob["Depex"], name, knobs_map) for name, knob in knobs_map.items()}, self.STATUS)
+    engine = depex.DepexEngine(knobs_map)
+    self.assertEqual(engine.evaluate(), self.STATUS)
+    self.assertEqual(self.get_status(knobs_map), self.STATUS)
+    self.assertEqual(engine.get_dependents(["Knob0"]), ["Knob1", "Knob2"])
+    status = dict(self.STATUS)
+    for name, value, changes in self.EDITS:
+      self.assertEqual(sorted(engine.set_value(name, value)), engine.get_dependents([name]))  # only dependents are re-evaluated
+      status.update(changes)
+      self.assertEqual(self.get_status(knobs_map), status)
+
+  @settings.log_function_entry_and_exit
+  def test_eval_knob_depex_reuses_engine(self):
+    knobs_map = self.create_knobs_map()
+    self.assertEqual(prs.eval_knob_depex(0, knobs_map), 0)
+    self.assertEqual(self.get_status(knobs_map), self.STATUS)
+    engine, is_new_engine = depex.get_depex_engine(knobs_map)
+    self.assertFalse(is_new_engine)
+    name, value, changes = self.EDITS[0]
+    knobs_map[name]["CurVal"] = value
+    self.assertEqual(prs.eval_knob_depex(0, knobs_map), 0)
+    self.assertIs(depex.get_depex_engine(knobs_map)[0], engine)
+    self.assertEqual(self.get_status(knobs_map), dict(self.STATUS, **changes))
+
+
+class XmlCacheTest(UnitTestHelper.UnitTestHelper):
+  @settings.log_function_entry_and_exit
+  def test_eviction(self):
+    with tempfile.TemporaryDirectory() as cache_dir:
+      cache = xml_cache.XmlCache(cache_dir, max_entries=2)
+      for index, key in enumerate(("first", "second")):
+        cache.put(key, b"<SYSTEM/>", b'<BIOS VERSION="TEST.000%d"/>' % index)
+        os.utime(os.path.join(cache_dir, f"{key}.json"), ns=(index, index))
+      self.assertEqual(cache.get("first"), b"<SYSTEM/>")  # first entry is used most recently
+      cache.put("third", b"<SYSTEM/>")
+      self.assertEqual(sorted(os.listdir(cache_dir)), ["first.json", "first.xml", "third.json", "third.xml"])
+      self.assertEqual(cache.get_entry("first")[1]["bios_version"], "TEST.0000")
+
+
+class KnobModelTest(UnitTestHelper.UnitTestHelper):
+  XML_DATA = ('<SYSTEM>\n<BIOS VERSION="TEST.0001"/>\n<biosknobs>\n'
+              '<knob setupType="oneof" name="Knob0" varstoreIndex="0x01" prompt="Knob 0" description="" size="0x01" offset="0x0010" depex="TRUE" default="0x00" CurrentVal="0x01">'
+              '<options><option text="Disable" value="0x0"/><option text="Enable" value="0x1"/></options></knob>\n'
+              '<knob setupType="numeric" name="Knob1" varstoreIndex="0x02" prompt="Knob 1" description="" size="0x02" offset="0x0020" depex="TRUE" default="0x0005" CurrentVal="0x0005"/>\n'
+              '</biosknobs>\n</SYSTEM>\n')
+
+  def setUp(self):
+    knob_model.clear_knob_model_cache()
+    self.work_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(self.work_dir.cleanup)
+    self.xml_files = [os.path.join(self.work_dir.name, f"PlatformConfig{index}.xml") for index in range(3)]
+    for xml_file in self.xml_files:
+      with open(xml_file, "w") as out_file:
+        out_file.write(self.XML_DATA)
+
+  @settings.log_function_entry_and_exit
+  def test_knob_model(self):
+    model = knob_model.get_knob_model(self.xml_files[0])
+    self.assertEqual(model.bios_version, "TEST.0001")
+    self.assertEqual(list(model.knobs), ["Knob0", "Knob1"])
+    knob = model.get_knob("Knob0")
+    self.assertEqual((knob.setup_type, knob.varstore, knob.offset, knob.size, knob.default, knob.current, knob.depex),
+                     ("oneof", "0x01", "0x0010", "0x01", "0x00", "0x01", "TRUE"))
+    self.assertEqual(knob.options, (("Disable", "0x0"), ("Enable", "0x1")))
+    self.assertEqual(knob.get("prompt"), "Knob 0")
+    self.assertEqual((knob.varstore_id, knob.offset_value, knob.size_value, knob.default_value, knob.current_value), (0x1, 0x10, 0x1, 0x0, 0x1))
+    self.assertEqual(model.table.offsets.tolist(), [0x10, 0x20])
+    self.assertEqual(model.modified_knobs(), [knob])
+    self.assertEqual(knob.to_dict(), utils.etree_to_dict(model.root.find("biosknobs").find("knob"))["knob"])
+    self.assertIs(knob_model.get_knob_model(model), model)
+    # consumers take the model in place of the xml file
+    self.assertEqual(prs.xml_to_knob_map(model, {"Knob1": "0x7"})[0]["Knob1"]["Offset"], 0x20)
+    self.assertEqual(prs.xml_to_knob_map(model, operation="restore"), ({"Knob0": "0x00"}, {"Knob0": "0x01"}))
+    self.assertEqual(utils.get_bios_version(model), "TEST.0001")
+
+  @settings.log_function_entry_and_exit
+  def test_iter_sections(self):
+    model = knob_model.KnobModel(knob_model.ET.fromstring('<SYSTEM><PLATFORM><BIOS VERSION="NESTED.0001"/></PLATFORM><BIOS VERSION="TOP.0001"/></SYSTEM>'))
+    self.assertEqual([section.get("VERSION") for section in model.iter_sections("BIOS")], ["NESTED.0001", "TOP.0001"])
+    self.assertIs(list(model.iter_sections("BIOS"))[1], model.sections[1])
+    self.assertEqual([section.tag for section in model.iter_sections("SYSTEM")], ["SYSTEM"])
+    self.assertEqual(model.bios_version, "NESTED.0001")
+
+  @settings.log_function_entry_and_exit
+  def test_generate_bios_config_ini(self):
+    bios_config_file = os.path.join(self.work_dir.name, "BiosConf.txt")
+    prs.generate_bios_config_ini(knob_model.get_knob_model(self.xml_files[0]), bios_config_file)
+    with open(bios_config_file) as bios_config:
+      content = bios_config.read()
+    self.assertIn("// [No UQI] ONE_OF 01 // Knob 0\n// 00 = Disable\n// 01 = Enable\n", content)
+    self.assertNotIn("Knob 1", content)  # knobs sharing (empty) UQI are listed once
+
+  @settings.log_function_entry_and_exit
+  def test_knob_model_cache(self):
+    model = knob_model.get_knob_model(self.xml_files[0])
+    self.assertIs(knob_model.get_knob_model(self.xml_files[0]), model)
+    self.assertEqual(knob_model.knob_model_cache_info()["hits"], 1)
+    with open(self.xml_files[0], "w") as out_file:  # same size, content is changed
+      out_file.write(self.XML_DATA.replace('CurrentVal="0x01"', 'CurrentVal="0x00"'))
+    changed_model = knob_model.get_knob_model(self.xml_files[0])
+    self.assertIsNot(changed_model, model)
+    self.assertEqual(changed_model.get_knob("Knob0").current, "0x00")
+    self.assertEqual(knob_model.knob_model_cache_info()["size"], 1)  # stale model is dropped
+    # least recently used model is evicted
+    knob_model.get_knob_model(self.xml_files[1], cache_size=2)
+    knob_model.get_knob_model(self.xml_files[0], cache_size=2)
+    knob_model.get_knob_model(self.xml_files[2], cache_size=2)
+    self.assertEqual(knob_model.knob_model_cache_info()["files"], [os.path.abspath(self.xml_files[0]), os.path.abspath(self.xml_files[2])])
+
+
 if __name__ == "__main__":
   pass